@@ -0,0 +1,66 @@
+"""
+Benchmark: batch (column-at-a-time) cleaners vs. the scalar cleaners they replace.
+
+Reads the raw strings of each numeric column of a synthetic Amazon-style CSV (with its
+missing and malformed values), then times, per column and chunk of --chunk-size values
+(read_table's chunking), the scalar cleaner mapped into a typed array against the batch
+cleaner. Best of --repeat runs.
+
+    python3 benchmarks/cleaners.py --rows 200000
+"""
+import argparse
+import csv
+import os
+import sys
+import time
+from array import array
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.dirname(__file__))
+
+from dataset import dataset_path
+from sales_analysis.ingestion import cleaning
+from sales_analysis.ingestion.columnar import CHUNK_SIZE
+
+COLUMNS = (
+    ('discounted_price', cleaning.currency_cleaner, cleaning.currency_cleaner_batch, 'd'),
+    ('discount_percentage', cleaning.percent_cleaner, cleaning.percent_cleaner_batch, 'd'),
+    ('rating', cleaning.rating_cleaner, cleaning.rating_cleaner_batch, 'd'),
+    ('rating_count', cleaning.count_cleaner, cleaning.count_cleaner_batch, 'q'),
+)
+
+
+def _best(function, chunks, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for chunk in chunks:
+            function(chunk)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with open(dataset_path(args.rows), newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    print(f"dataset: {len(rows):,} rows, chunks of {args.chunk_size:,} values")
+
+    for name, scalar, batch, typecode in COLUMNS:
+        values = [row[name] for row in rows]
+        chunks = [values[i:i + args.chunk_size] for i in range(0, len(values), args.chunk_size)]
+        invalid = sum(sum(batch(chunk)[1]) for chunk in chunks)
+        scalar_seconds = _best(lambda chunk: array(typecode, map(scalar, chunk)), chunks, args.repeat)
+        batch_seconds = _best(batch, chunks, args.repeat)
+        print(f"  {name:<20} scalar {scalar_seconds:7.3f}s  batch {batch_seconds:7.3f}s"
+              f"  speedup {scalar_seconds / batch_seconds:5.2f}x  ({invalid:,} invalid values)")
+
+
+if __name__ == '__main__':
+    main()
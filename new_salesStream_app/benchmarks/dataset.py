@@ -0,0 +1,124 @@
+"""
+Deterministic synthetic amazon.csv files for the benchmarks.
+
+write_dataset(path, rows, seed) always writes the same bytes for the same arguments, so
+results of different commits are measured on identical input. The rows have the
+columns of the real Kaggle file the analysis reads, plus a free-text about_product
+column that the reports never use, and the same kinds of dirt:
+  * prices like '₹1,099' (thousands separators inside quotes), sometimes missing,
+  * ratings like '4.2', '4.5|1,234' or '|', sometimes missing,
+  * rating counts like '24,269', sometimes missing,
+  * quoted product names with commas, double quotes and line breaks,
+  * names repeated across rows (about three rows per name), for distinct() and joins.
+
+    python3 benchmarks/dataset.py --size 1m      # writes benchmarks/data/amazon-1000000-7.csv
+"""
+import argparse
+import csv
+import os
+import random
+
+SIZES = {'10k': 10_000, '1m': 1_000_000, '10m': 10_000_000}
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+DEFAULT_SEED = 7
+
+HEADER = ["product_id", "product_name", "category", "discounted_price", "actual_price",
+          "discount_percentage", "rating", "rating_count", "about_product"]
+CATEGORIES = [
+    "Computers&Accessories|Accessories&Peripherals|Cables&Accessories|Cables|USBCables",
+    "Computers&Accessories|Accessories&Peripherals|Keyboards,Mice&InputDevices|Mice",
+    "Electronics|HomeTheater,TV&Video|Televisions|SmartTelevisions",
+    "Electronics|Mobiles&Accessories|Smartphones&BasicMobiles|Smartphones",
+    "Electronics|Headphones,Earbuds&Accessories|Headphones|In-Ear",
+    "Home&Kitchen|Kitchen&HomeAppliances|SmallKitchenAppliances|MixerGrinders",
+    "Home&Kitchen|Heating,Cooling&AirQuality|Fans|CeilingFans",
+    "OfficeProducts|OfficePaperProducts|Paper|Stationery|Pens,Pencils&WritingSupplies",
+    "Toys&Games|Arts&Crafts|Drawing&PaintingSupplies|ColouringPens&Markers",
+    "MusicalInstruments|Microphones|Condenser",
+    "Car&Motorbike|CarAccessories|InteriorAccessories|AirPurifiers&Ionizers",
+    "Health&PersonalCare|HomeMedicalSupplies&Equipment|HealthMonitors|WeighingScales",
+]
+BRANDS = ["Wayona", "Ambrane", "boAt", "Portronics", "Redmi", "OnePlus", "Samsung", "pTron",
+          "Syska", "Pigeon", "Havells", "Classmate", "Faber-Castell", "Zebronics", "AGARO"]
+ITEMS = ["Nylon Braided USB Cable", "Wireless Mouse", "Smart LED TV", "Smartphone",
+         "Earphones with Mic", "Mixer Grinder", "Ceiling Fan", "Gel Pen Set", "Sketch Pens",
+         "Condenser Microphone", "Car Air Purifier", "Digital Weighing Scale"]
+FEATURES = ["Fast charging", "2 year warranty", "Tangle-free", "Compatible with all devices",
+            "Energy efficient", "Ergonomic design", "Made in India", "1.5m length"]
+
+
+def _name(number):
+    # Names are drawn from a pool, so a name repeats about three times in the file.
+    brand = BRANDS[number % len(BRANDS)]
+    item = ITEMS[number % len(ITEMS)]
+    name = f"{brand} {item}, Model {number}"
+    if number % 37 == 0:
+        name += '\n(2nd line, "Pack of 2")'
+    elif number % 11 == 0:
+        name += ' with 3.5mm "Jack"'
+    return name
+
+
+def _rating(rng):
+    roll = rng.random()
+    if roll < 0.01:
+        return ""
+    if roll < 0.015:
+        return f"{rng.uniform(3, 5):.1f}|{rng.randint(1, 99999):,}"
+    if roll < 0.016:
+        return "|"
+    return f"{rng.choice((3.0, 3.5, 3.8, 3.9, 4.0, 4.1, 4.2, 4.3, 4.4, 4.5, 4.6, 4.7, 5.0)):.1f}"
+
+
+def write_dataset(path, rows, seed=DEFAULT_SEED):
+    """Writes 'rows' synthetic products to 'path'; the same arguments give the same bytes."""
+    rng = random.Random(seed)
+    pool = max(1, rows // 3)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        for i in range(rows):
+            actual = rng.randint(99, 99999)
+            discounted = rng.randint(max(1, actual // 10), actual)
+            discount = round(100 * (actual - discounted) / actual)
+            count = rng.randint(0, 500000)
+            writer.writerow([
+                f"B{i:09d}",
+                _name(rng.randrange(pool)),
+                rng.choice(CATEGORIES),
+                "" if rng.random() < 0.005 else f"₹{discounted:,}",
+                f"₹{actual:,}",
+                f"{discount}%",
+                _rating(rng),
+                "" if rng.random() < 0.01 else f"{count:,}",
+                "|".join(rng.sample(FEATURES, 3)),
+            ])
+
+
+def dataset_path(rows, seed=DEFAULT_SEED, directory=DATA_DIR):
+    """
+    Path of the generated file for 'rows' and 'seed' in 'directory', writing it first if
+    it does not exist yet (large files take minutes, so they are kept between runs).
+    """
+    path = os.path.join(directory, f"amazon-{rows}-{seed}.csv")
+    if not os.path.exists(path):
+        os.makedirs(directory, exist_ok=True)
+        temp = path + '.tmp'
+        write_dataset(temp, rows, seed)
+        os.replace(temp, path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', choices=sorted(SIZES), default='10k')
+    parser.add_argument('--rows', type=int, help="any row count (overrides --size)")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--dir', default=DATA_DIR)
+    args = parser.parse_args()
+    path = dataset_path(args.rows or SIZES[args.size], args.seed, args.dir)
+    print(f"{path}: {os.path.getsize(path) / 1e6:,.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark: bytes per row of the in-memory product representations.
+
+Loads a synthetic Amazon-style CSV and measures (with tracemalloc) how much memory stays
+allocated while the whole dataset is held in memory as:
+  * the original model: frozen dataclass with a __dict__ and a category string per row,
+  * Product: slotted frozen dataclass with interned categories (read_csv),
+  * ProductTable: typed columns + dictionary-encoded categories (read_table),
+  * ProductTable plus a ProductView per row (e.g. what collect() would keep alive).
+
+    python3 benchmarks/memory_footprint.py --rows 200000
+"""
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import tracemalloc
+from dataclasses import dataclass
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.dirname(__file__))
+
+from dataset import write_dataset
+from sales_analysis.ingestion.columnar import read_table
+from sales_analysis.ingestion.loader import read_csv
+
+
+@dataclass(frozen=True)
+class DictProduct:
+    # The Product model before __slots__ and category interning, kept as the baseline.
+    name: str
+    category: str
+    discounted_price: float
+    actual_price: float
+    discount_percentage: float
+    rating: float
+    rating_count: int
+
+
+def original_model(path):
+    # Rebuilds every row the way the original loader did: one fresh category string each.
+    return [DictProduct(p.name, ''.join(p.category), p.discounted_price, p.actual_price,
+                        p.discount_percentage, p.rating, p.rating_count)
+            for p in read_csv(path)]
+
+
+def table_with_views(path):
+    table = read_table(path)
+    return table, list(table.views())
+
+
+def retained_bytes(load, path):
+    # Memory still allocated after 'load' returns (its result is kept alive).
+    gc.collect()
+    tracemalloc.start()
+    result = load(path)
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200_000)
+    args = parser.parse_args()
+
+    representations = [
+        ("dataclass + __dict__ (before)", original_model),
+        ("Product: __slots__ + interned", lambda path: list(read_csv(path))),
+        ("ProductTable (columns)", read_table),
+        ("ProductTable + row views", table_with_views),
+    ]
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'amazon.csv')
+        write_dataset(path, args.rows)
+        print(f"dataset: {args.rows:,} rows")
+
+        baseline = None
+        for label, load in representations:
+            per_row = retained_bytes(load, path) / args.rows
+            baseline = baseline or per_row
+            print(f"{label:<32} {per_row:8.1f} bytes/row   {baseline / per_row:5.2f}x vs. before")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""
+Benchmark: parallel chunked CSV ingestion throughput vs. worker count.
+
+Generates a synthetic Amazon-style CSV (dirty prices, piped ratings, quoted multi-line
+names), then times the single-process columnar loader against read_csv_parallel with
+1, 2, 4, ... workers up to the CPU count.
+
+    python3 benchmarks/parallel_ingest.py --rows 1000000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.dirname(__file__))
+
+from dataset import write_dataset
+from sales_analysis.ingestion.columnar import read_table
+from sales_analysis.ingestion.parallel import read_csv_parallel
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--chunk-mb', type=float, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'amazon.csv')
+        write_dataset(path, args.rows)
+        size_mb = os.path.getsize(path) / 1e6
+        print(f"dataset: {args.rows:,} rows, {size_mb:.1f} MB, {os.cpu_count()} CPUs")
+
+        start = time.perf_counter()
+        rows = len(read_table(path))
+        baseline = time.perf_counter() - start
+        print(f"  read_table (1 process)   {baseline:7.2f}s  {rows / baseline:12,.0f} rows/s")
+
+        workers = 1
+        while workers <= (os.cpu_count() or 1):
+            start = time.perf_counter()
+            rows = sum(len(batch) for batch in
+                       read_csv_parallel(path, workers=workers, chunk_bytes=int(args.chunk_mb * 1e6)))
+            elapsed = time.perf_counter() - start
+            print(f"  read_csv_parallel x{workers:<3}  {elapsed:7.2f}s  {rows / elapsed:12,.0f} rows/s"
+                  f"  speedup {baseline / elapsed:5.2f}x")
+            workers *= 2
+
+
+if __name__ == '__main__':
+    main()
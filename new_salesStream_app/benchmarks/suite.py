@@ -0,0 +1,371 @@
+"""
+Benchmark suite: every Stream operator, every cleaner and the full app.main report on
+synthetic amazon.csv files (benchmarks/dataset.py), with machine-readable results.
+
+Each case runs in a fresh process, so its peak RSS is its own. Per case the results
+record:
+  * seconds (best of --repeat runs) and throughput in input rows (and MB for the cases
+    reading the file) per second,
+  * time to first row for cases that stream their output (a sorted() only yields once
+    every row is in, a filter() almost at once), None for terminal operations,
+  * peak RSS of the process, and its growth while the case ran ('rss_growth_bytes').
+    The process holds the case's input first (e.g. the products for operator cases), so
+    the growth is what the case itself held, e.g. ~0 for streaming operators.
+Operator cases run over the first --operator-rows products held in a list, so they
+measure the operators rather than CSV parsing; the ingestion cases cover parsing.
+Cleaners run over the raw strings of their column.
+
+    python3 benchmarks/suite.py --size 10k --size 1m --output results.json
+    python3 benchmarks/suite.py --size 1m --only stream. --compare results.json
+"""
+import argparse
+import contextlib
+import csv
+import io
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from itertools import islice
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.dirname(__file__))
+
+from dataset import DEFAULT_SEED, SIZES, dataset_path
+from sales_analysis.core import aggregations as agg
+from sales_analysis.core import approximate as approx
+from sales_analysis.core.expressions import col
+from sales_analysis.core.memo import ResultCache
+from sales_analysis.core.stream import Stream
+from sales_analysis.core.windows import counting
+from sales_analysis.ingestion import cleaning
+from sales_analysis.ingestion.loader import CsvSource, read_csv
+
+RESULTS_VERSION = 1
+DEFAULT_OPERATOR_ROWS = 1_000_000
+
+try:
+    import resource
+except ImportError:  # Windows: RSS is not reported
+    resource = None
+
+
+def _peak_rss():
+    # High-water mark of this process's resident set, in bytes (KiB on Linux, bytes on macOS).
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+# --- Inputs: built before the clock starts ---
+
+def _products(path, operator_rows):
+    return list(islice(read_csv(path), operator_rows))
+
+
+def _column(name):
+    def load(path, operator_rows):
+        with open(path, encoding='utf-8', newline='') as f:
+            reader = csv.reader(f)
+            index = next(reader).index(name)
+            return [row[index] for row in reader]
+    return load
+
+
+def _path(path, operator_rows):
+    return path
+
+
+def _cached_path(path, operator_rows):
+    # Builds the column cache next to the dataset unless it is fresh already.
+    from sales_analysis.ingestion.cache import load_table
+    load_table(path)
+    return path
+
+
+def _converted(format):
+    # Converts the dataset (once) next to itself, e.g. amazon-10000-7.parquet.
+    def load(path, operator_rows):
+        from sales_analysis.ingestion.formats import FORMATS, convert
+        target = os.path.splitext(path)[0] + FORMATS[format].extensions[0]
+        if not os.path.exists(target) or os.path.getmtime(target) < os.path.getmtime(path):
+            convert(path, target, format)
+        return target
+    return load
+
+
+def _gzipped(path, operator_rows):
+    # A gzip copy of the dataset next to it, written once.
+    import gzip
+    target = path + '.gz'
+    if not os.path.exists(target) or os.path.getmtime(target) < os.path.getmtime(path):
+        with open(path, 'rb') as source, gzip.open(target + '.tmp', 'wb', compresslevel=6) as sink:
+            shutil.copyfileobj(source, sink, 1 << 20)
+        os.replace(target + '.tmp', target)
+    return target
+
+
+# --- Cases: name -> (input loader, function of the input, streams its output) ---
+
+def _column_of(batch_cleaner):
+    # Batch cleaners return (column, invalid mask); the column's length is the row count.
+    return lambda values: batch_cleaner(values)[0]
+
+
+CASES = {
+    'stream.map': (_products, lambda products: Stream(products).map(lambda p: p.discounted_price), True),
+    'stream.filter': (_products, lambda products: Stream(products).filter(lambda p: p.rating > 4.2), True),
+    'stream.filter_col': (_products, lambda products: Stream(products).filter(col('rating') > 4.2), True),
+    'stream.distinct': (_products, lambda products: Stream(products).distinct(lambda p: p.name), True),
+    'stream.distinct_spill': (_products, lambda products: Stream(products).distinct(
+        lambda p: p.name, method='spill', memory_limit=4 << 20), True),
+    'stream.distinct_bloom': (_products, lambda products: Stream(products).distinct(
+        lambda p: p.name, method='bloom'), True),
+    'stream.limit': (_products, lambda products: Stream(products).limit(100), True),
+    'stream.sorted': (_products, lambda products: Stream(products).sorted(key=lambda p: p.rating_count), True),
+    'stream.sorted_external': (_products, lambda products: Stream(products).sorted(
+        key=lambda p: p.rating_count, run_size=100_000), True),
+    'stream.top_k': (_products, lambda products: Stream(products).top_k(
+        5, key=lambda p: p.discount_percentage, reverse=True, distinct_key=lambda p: p.name), True),
+    'stream.join': (_products, lambda products: Stream(products).join(
+        {p.category: 0.1 for p in products[:1000]}, key=lambda p: p.category), True),
+    'stream.window': (_products, lambda products: Stream(products).window(
+        counting(1000), {'revenue': agg.sum('discounted_price')}), True),
+    'stream.memoize': (_products, lambda products: Stream(products).memoize(ResultCache()).collect(), False),
+    'stream.reduce': (_products, lambda products: Stream(products).map(
+        lambda p: p.discounted_price).reduce(lambda acc, x: acc + x, 0.0), False),
+    'stream.collect': (_products, lambda products: Stream(products).collect(), False),
+    'stream.group_by': (_products, lambda products: Stream(products).group_by(lambda p: p.category), False),
+    'stream.group_by_agg': (_products, lambda products: Stream(products).group_by(
+        lambda p: p.category, agg={'avg_rating': agg.mean('rating'), 'count': agg.count()}), False),
+    'stream.count_distinct': (_products, lambda products: Stream(products).count_distinct(lambda p: p.name), False),
+    'stream.parallel_reduce': (_products, lambda products: Stream(products).parallel().map(
+        lambda p: p.discounted_price).reduce(lambda acc, x: acc + x, 0.0, combine=lambda a, b: a + b), False),
+    'stream.sample': (_products, lambda products: Stream(products).sample(0.01, seed=1), True),
+    'stream.reservoir': (_products, lambda products: Stream(products).reservoir(1000, seed=1), True),
+    'stream.quantiles': (_products, lambda products: Stream(products).aggregate(
+        {'price': approx.quantiles('discounted_price')}), False),
+    'stream.heavy_hitters': (_products, lambda products: Stream(products).aggregate(
+        {'names': approx.heavy_hitters('name', 10)}), False),
+
+    'clean.currency': (_column('discounted_price'), lambda values: map(cleaning.currency_cleaner, values), True),
+    'clean.percent': (_column('discount_percentage'), lambda values: map(cleaning.percent_cleaner, values), True),
+    'clean.rating': (_column('rating'), lambda values: map(cleaning.rating_cleaner, values), True),
+    'clean.count': (_column('rating_count'), lambda values: map(cleaning.count_cleaner, values), True),
+    'clean.currency_batch': (_column('discounted_price'), _column_of(cleaning.currency_cleaner_batch), False),
+    'clean.percent_batch': (_column('discount_percentage'), _column_of(cleaning.percent_cleaner_batch), False),
+    'clean.rating_batch': (_column('rating'), _column_of(cleaning.rating_cleaner_batch), False),
+    'clean.count_batch': (_column('rating_count'), _column_of(cleaning.count_cleaner_batch), False),
+
+    'ingest.read_csv': (_path, read_csv, True),
+    'ingest.read_csv_gz': (_gzipped, read_csv, True),
+    'ingest.scan_projected': (_path, lambda path: Stream(CsvSource(path)).map(lambda p: p.rating), True),
+    'ingest.scan_filtered': (_path, lambda path: Stream(CsvSource(path)).filter(col('rating') > 4.5), True),
+    'ingest.mmap_projected': (_path, lambda path: Stream(CsvSource(path, use_mmap=True)).map(lambda p: p.rating), True),
+    'ingest.mmap_filtered': (_path, lambda path: Stream(CsvSource(path, use_mmap=True)).filter(col('rating') > 4.5), True),
+    'ingest.read_table': (_path, lambda path: _read_table(path), False),
+    'ingest.read_csv_parallel': (_path, lambda path: _read_csv_parallel(path), True),
+    'ingest.cache_read': (_cached_path, lambda path: read_csv(path, use_cache=True), True),
+    'ingest.jsonl': (_converted('jsonl'), lambda path: _open_source(path), True),
+    'ingest.jsonl_projected': (_converted('jsonl'), lambda path: Stream(_open_source(path)).map(lambda p: p.rating), True),
+    'ingest.arrow': (_converted('arrow'), lambda path: _open_source(path), True),
+    'ingest.arrow_projected': (_converted('arrow'), lambda path: Stream(_open_source(path)).map(lambda p: p.rating), True),
+    'ingest.parquet': (_converted('parquet'), lambda path: _open_source(path), True),
+    'ingest.parquet_projected': (_converted('parquet'), lambda path: Stream(_open_source(path)).map(lambda p: p.rating), True),
+
+    'app.main': (_path, lambda path: _main(path), False),
+    'app.main_approximate': (_path, lambda path: _main(path, approximate=0.01, seed=1), False),
+}
+
+
+def _open_source(path):
+    from sales_analysis.ingestion.formats import open_source
+    return open_source(path)
+
+
+def _read_table(path):
+    from sales_analysis.ingestion.columnar import read_table
+    return read_table(path)
+
+
+def _read_csv_parallel(path):
+    from sales_analysis.ingestion.parallel import iter_products, read_csv_parallel
+    return iter_products(read_csv_parallel(path))
+
+
+def _main(path, **options):
+    from sales_analysis.app import main
+    with contextlib.redirect_stdout(io.StringIO()):
+        main(path, **options)
+
+
+def _size_of(result):
+    try:
+        return len(result)
+    except TypeError:
+        return None
+
+
+def run_case(name, path, operator_rows):
+    """Runs one case in this process and returns its measurements."""
+    load, function, streams = CASES[name]
+    data = load(path, operator_rows)
+    rows = len(data) if isinstance(data, list) else None
+    baseline = _peak_rss()
+    first = None
+    start = time.perf_counter()
+    result = function(data)
+    if streams:
+        rows_out = 0
+        for _ in result:
+            if rows_out == 0:
+                first = time.perf_counter() - start
+            rows_out += 1
+    else:
+        rows_out = _size_of(result)
+    seconds = time.perf_counter() - start
+    peak = _peak_rss()
+    return {'seconds': seconds, 'first_row_seconds': first, 'rows': rows, 'rows_out': rows_out,
+            'peak_rss_bytes': peak, 'rss_growth_bytes': None if peak is None else peak - baseline}
+
+
+def _child(connection, name, path, operator_rows):
+    try:
+        connection.send(('ok', run_case(name, path, operator_rows)))
+    except BaseException as error:  # reported by the parent, which keeps going
+        connection.send(('error', f"{type(error).__name__}: {error}"))
+    finally:
+        connection.close()
+
+
+def measure(name, path, operator_rows, repeat=1):
+    """Best of 'repeat' runs of case 'name', each in a fresh process (None on failure)."""
+    context = multiprocessing.get_context('spawn')
+    best = None
+    for _ in range(repeat):
+        receiver, sender = context.Pipe(duplex=False)
+        process = context.Process(target=_child, args=(sender, name, path, operator_rows))
+        process.start()
+        sender.close()
+        try:
+            status, value = receiver.recv()
+        except EOFError:  # killed, e.g. out of memory
+            status, value = 'error', "the benchmark process died"
+        process.join()
+        if status == 'error':
+            print(f"WARNING: Benchmark {name} failed: {value}")
+            return None
+        if best is None:
+            best = value
+        else:
+            peak = max(best['peak_rss_bytes'] or 0, value['peak_rss_bytes'] or 0) or None
+            if value['seconds'] < best['seconds']:
+                best = value
+            best['peak_rss_bytes'] = peak
+    return best
+
+
+def _git_commit():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--', '..'], capture_output=True, text=True,
+                               cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, bool(dirty)
+
+
+def run_suite(sizes, names, operator_rows=DEFAULT_OPERATOR_ROWS, repeat=1, seed=DEFAULT_SEED,
+              data_dir=None, report=print):
+    """Runs 'names' on every dataset size and returns the results document."""
+    commit, dirty = _git_commit()
+    document = {
+        'version': RESULTS_VERSION,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': commit,
+        'dirty': dirty,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'operator_rows': operator_rows,
+        'datasets': {},
+        'results': [],
+    }
+    for size in sizes:
+        rows = SIZES.get(size) or int(size)
+        path = dataset_path(rows, seed) if data_dir is None else dataset_path(rows, seed, data_dir)
+        megabytes = os.path.getsize(path) / 1e6
+        document['datasets'][size] = {'rows': rows, 'seed': seed, 'bytes': os.path.getsize(path)}
+        if report:
+            report(f"dataset {size}: {rows:,} rows, {megabytes:,.1f} MB")
+        for name in names:
+            result = measure(name, path, operator_rows, repeat)
+            if result is None:
+                continue
+            if result['rows'] is None:  # the case read the whole file
+                result['rows'] = rows
+                result['mb_per_second'] = megabytes / result['seconds']
+            result['rows_per_second'] = result['rows'] / result['seconds']
+            result.update(name=name, dataset=size)
+            document['results'].append(result)
+            if report:
+                report(format_result(result))
+    return document
+
+
+def format_result(result):
+    first = "-" if result['first_row_seconds'] is None else f"{result['first_row_seconds'] * 1000:,.1f}"
+    peak = "-" if result['peak_rss_bytes'] is None else f"{result['peak_rss_bytes'] / 2 ** 20:,.0f}"
+    growth = "-" if result['rss_growth_bytes'] is None else f"{result['rss_growth_bytes'] / 2 ** 20:,.0f}"
+    return (f"  {result['name']:<26} {result['seconds']:9.3f}s {result['rows_per_second']:14,.0f} rows/s"
+            f"  first row {first:>9} ms  peak RSS {peak:>6} MiB (+{growth})")
+
+
+def compare(document, baseline, report=print):
+    """Reports the speed of every case relative to an earlier results document."""
+    before = {(result['dataset'], result['name']): result for result in baseline['results']}
+    report(f"compared with {baseline.get('commit') or 'unknown commit'} ({baseline.get('created')}):")
+    for result in document['results']:
+        old = before.get((result['dataset'], result['name']))
+        if old is None:
+            continue
+        change = old['seconds'] / result['seconds']
+        report(f"  {result['dataset']:>4} {result['name']:<26} {change:6.2f}x "
+               f"{'faster' if change >= 1 else 'slower'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', action='append',
+                        help=f"dataset size: {', '.join(SIZES)} or a row count (repeatable; default 10k)")
+    parser.add_argument('--only', action='append', default=[],
+                        help="run the cases whose name starts with this prefix (repeatable)")
+    parser.add_argument('--operator-rows', type=int, default=DEFAULT_OPERATOR_ROWS,
+                        help="products held in memory for the stream.* cases")
+    parser.add_argument('--repeat', type=int, default=1, help="runs per case; the fastest is kept")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--data-dir', help="where generated datasets are kept")
+    parser.add_argument('--output', default='benchmark-results.json')
+    parser.add_argument('--compare', metavar='RESULTS', help="an earlier results file")
+    args = parser.parse_args()
+
+    names = [name for name in CASES if not args.only or name.startswith(tuple(args.only))]
+    document = run_suite(args.size or ['10k'], names, args.operator_rows, args.repeat, args.seed,
+                         args.data_dir)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=2)
+    print(f"results written to {args.output}")
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(document, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+import argparse
+import os
+import sys
+import time
+
+# Add 'src' to the python path so we can import the 'sales_analysis' package
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from sales_analysis.ingestion.formats import BATCH_SIZE, FORMATS, convert
+
+if __name__ == "__main__":
+    DATA_PATH = os.path.join(os.path.dirname(__file__), 'data', 'amazon.csv')
+
+    parser = argparse.ArgumentParser(
+        description="Convert an amazon.csv export once into a format that is read without "
+                    "text parsing (analyze it with: python3 run.py --input PATH)")
+    parser.add_argument('source', nargs='?', default=DATA_PATH, help="CSV file (default: data/amazon.csv)")
+    parser.add_argument('target', nargs='?',
+                        help="output file; its extension picks the format (default: the CSV path "
+                             "with the extension of --format)")
+    parser.add_argument('--format', choices=sorted(FORMATS),
+                        help="output format (default: from the target's extension, else parquet)")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                        help="rows per record batch / Parquet row group")
+    args = parser.parse_args()
+
+    target = args.target
+    if target is None:
+        format = args.format or 'parquet'
+        target = os.path.splitext(args.source)[0] + FORMATS[format].extensions[0]
+    if not os.path.exists(args.source):
+        print(f"CRITICAL ERROR: Data file not found at: {args.source}")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    try:
+        rows = convert(args.source, target, args.format, args.batch_size)
+    except (ImportError, ValueError) as error:
+        print(f"CRITICAL ERROR: {error}")
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {rows:,} products to {target} "
+          f"({os.path.getsize(target) / 1e6:,.1f} MB) in {elapsed:.2f}s")
@@ -1,3 +1,5 @@
+import argparse
+import asyncio
 import sys
 import os
 
@@ -6,12 +8,46 @@ import os
 # without setting PYTHONPATH manually.
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
-from sales_analysis.app import main
+from sales_analysis.app import follow, main
+from sales_analysis.core.memo import ResultCache
 
 if __name__ == "__main__":
     # Define the absolute path to the dataset
     # Uses __file__ to locate the data directory relative to this script
     DATA_PATH = os.path.join(os.path.dirname(__file__), 'data', 'amazon.csv')
+
+    parser = argparse.ArgumentParser(description="Amazon product stream analysis")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="parse the CSV directly instead of using the binary column cache")
+    parser.add_argument('--rebuild-cache', action='store_true',
+                        help="force the binary column cache to be rebuilt from the CSV")
+    parser.add_argument('--follow', action='store_true',
+                        help="keep running and report windowed results as the CSV grows")
+    parser.add_argument('--window', type=int, default=1000,
+                        help="sales per window in --follow mode (default: 1000)")
+    parser.add_argument('--input', metavar='PATH', default=DATA_PATH,
+                        help="analyze this file instead, e.g. a .parquet/.arrow/.jsonl written by convert.py "
+                             "(--follow tails this CSV)")
+    parser.add_argument('--memo', metavar='DIR',
+                        help="reuse report results stored in DIR by earlier runs on the same data")
+    parser.add_argument('--checkpoint', nargs='?', const=True, metavar='PATH',
+                        help="resume from the checkpoint of the last run and only read the rows "
+                             "appended since (default PATH: the CSV path + '.checkpoint')")
+    parser.add_argument('--approximate', type=float, metavar='FRACTION',
+                        help="estimate the reports with error bounds from a random sample of "
+                             "this fraction of the rows, e.g. 0.01")
+    parser.add_argument('--seed', type=int,
+                        help="random seed of --approximate, for reproducible estimates")
+    args = parser.parse_args()
     
     # Trigger the application
-    main(DATA_PATH)
\ No newline at end of file
+    if args.follow:
+        try:
+            asyncio.run(follow(args.input, window=args.window))
+        except KeyboardInterrupt:
+            pass
+    else:
+        result_cache = ResultCache(directory=args.memo) if args.memo else None
+        main(args.input, use_cache=not args.no_cache, rebuild_cache=args.rebuild_cache,
+             result_cache=result_cache, checkpoint=args.checkpoint,
+             approximate=args.approximate, seed=args.seed)
\ No newline at end of file
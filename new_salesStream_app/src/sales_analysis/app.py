@@ -1,74 +1,241 @@
+from sales_analysis.core import aggregations as agg
+from sales_analysis.core import approximate as approx
+from sales_analysis.core.windows import WindowedAggregation, counting, running
+from sales_analysis.core.expressions import col
+from sales_analysis.core.scan import SharedScan
 from sales_analysis.core.stream import Stream
-from sales_analysis.ingestion.loader import read_csv
+from sales_analysis.ingestion.async_sources import POLL_INTERVAL, tail_csv
+from sales_analysis.ingestion.checkpoint import IncrementalScan
+from sales_analysis.ingestion.compression import detect_compression
+from sales_analysis.ingestion.formats import open_source
+from sales_analysis.ingestion.loader import CsvSource, read_csv
 
 def use_stream(file_path):
     """
     Factory function to create a new Stream instance.
     Crucial: Since generators are single-use, we must create a NEW stream/generator
     for each distinct analysis pipeline (Metrics, Categories, Top Discounts, etc.).
+    A CsvSource lets each pipeline parse only the columns it uses.
     """
-    return Stream(read_csv(file_path))
+    return Stream(CsvSource(file_path))
 
-def main(file_path):
+def _report_aggregations():
+    """
+    The reports of main() as mergeable aggregations (core/aggregations.py): revenue and
+    savings totals, ratings per category (to be grouped by category) and the top-5 lists.
+    follow() computes them per window; main(checkpoint=...) resumes them from a checkpoint.
+    """
+    totals = {'revenue': agg.sum('discounted_price'), 'savings': agg.sum('savings')}
+    ratings = {'avg_rating': agg.mean('rating'), 'count': agg.count()}
+    leaders = {
+        'top_discounts': agg.where(lambda product: product.discount_percentage > 0,
+            agg.top_k(5, key=lambda product: product.discount_percentage, reverse=True,
+                      distinct_key=lambda product: product.name)),
+        'verified_hits': agg.where(lambda product: product.rating > 4.5 and product.rating_count > 1000,
+            agg.top_k(5, key=lambda product: product.rating_count, reverse=True,
+                      distinct_key=lambda product: product.name)),
+    }
+    return totals, ratings, leaders
+
+def _by_category(product):
+    return product.category
+
+# Quantiles of the approximate reports.
+QUANTILES = (0.5, 0.9, 0.99)
+
+def main(file_path, use_cache=False, rebuild_cache=False, result_cache=None, checkpoint=None,
+         approximate=None, seed=None):
     print("\n" + "-"*50)
     print(" AMAZON PRODUCT STREAM ANALYSIS ")
     print("-"*50)
 
+    # Files converted by convert.py (JSON-lines, Arrow, Parquet) are read without parsing.
+    dataset = open_source(file_path)
+    if approximate is not None:
+        # Dashboard mode: estimates with error bounds from a sample of the rows.
+        _approximate_reports(dataset, approximate, seed)
+        print("\n" + "-"*50)
+        return
+    incremental = None
+    if checkpoint is not None:
+        if isinstance(dataset, CsvSource) and detect_compression(file_path) is None:
+            incremental = IncrementalScan(file_path, None if checkpoint is True else checkpoint)
+        else:
+            print("\nWARNING: Checkpoints need an uncompressed CSV file; analyzing the whole file.")
+
+    if incremental is not None:
+        # With a checkpoint (ingestion/checkpoint.py), the aggregation states of the
+        # previous run are loaded and only the rows appended since then are read.
+        totals, ratings, leaders = _report_aggregations()
+        totals = incremental.register(totals)
+        ratings = incremental.register(ratings, key=_by_category)
+        leaders = incremental.register(leaders)
+        incremental.run()
+        revenue, savings = totals.result()['revenue'], totals.result()['savings']
+        categories = ratings.result()
+        top_discounts = leaders.result()['top_discounts']
+        verified_hits = leaders.result()['verified_hits']
+    else:
+        revenue, savings, categories, top_discounts, verified_hits = _scan_reports(
+            file_path, dataset, use_cache, rebuild_cache, result_cache)
+
     # [1] KEY METRICS
-    # Calculate global financial totals using map-reduce.
-    # Note: We re-create the stream for each calculation because the previous stream is consumed.
     print("\n[1] KEY FINANCIAL METRICS")
-    cumulative_revenue = use_stream(file_path) \
-        .map(lambda product: product.discounted_price) \
-        .reduce(lambda acc, x: acc + x, 0.0)
-    
-    cumulative_savings = use_stream(file_path) \
-        .map(lambda product: product.savings) \
-        .reduce(lambda acc, x: acc + x, 0.0)
-
-    print(f"   > Total Revenue:     ₹{cumulative_revenue:,.2f}")
-    print(f"   > Total Customer Savings:  ₹{cumulative_savings:,.2f}")
+    print(f"   > Total Revenue:     ₹{revenue:,.2f}")
+    print(f"   > Total Customer Savings:  ₹{savings:,.2f}")
 
     # [2] CATEGORY ANALYSIS
-    # Group products by category to compute aggregate statistics (average rating).
     print("\n[2] AVERAGE/MEAN RATING BY CATEGORY")
-    grouping = use_stream(file_path).group_by(lambda product: product.category)
-    
-    category_stats = []
-    for cat, products in grouping.items():
-        if not products: continue
-        # Compute average rating for the category
-        avg = sum(product.rating for product in products) / len(products)
-        category_stats.append((cat, avg, len(products)))
+    category_stats = [
+        (cat, stats['avg_rating'], stats['count'])
+        for cat, stats in categories.items()
+    ]
     
     # Sort categories by average rating (descending) for display
     for cat, avg, count in sorted(category_stats, key=lambda x: x[1], reverse=True):
-        if count > 0:
-            print(f"   > {cat:<25} : {avg:.2f} stars ({count} items)")
+        print(f"   > {cat:<25} : {avg:.2f} stars ({count} items)")
 
     # [3] TOP DISCOUNTS (Unique)
-    # Filter for discounted items, sort by percentage, and deduplicate by name.
-    # This pipeline demonstrates chaining filter -> sorted -> distinct.
     print("\n[3] TOP 5 MOST DISCOUNTED PRODUCTS")
-    top_discounts = use_stream(file_path) \
-        .filter(lambda product: product.discount_percentage > 0) \
-        .sorted(key=lambda product: product.discount_percentage, reverse=True) \
-        .distinct(lambda product: product.name) \
-        .collect()[:5]
-
     for product in top_discounts:
         print(f"   > {product.discount_percentage}% off: {product.name[:50]}...")
 
     # [4] VERIFIED HITS
-    # Find high-quality products (high rating + high review count).
     print("\n[4] VERIFIED HITS (>4.5 Stars, >1000 Reviews)")
-    verfied_hits = use_stream(file_path) \
-        .filter(lambda product: product.rating > 4.5 and product.rating_count > 1000) \
-        .sorted(key=lambda product: product.rating_count, reverse=True) \
-        .distinct(lambda product: product.name) \
-        .collect()[:5]
-
-    for product in verfied_hits:
+    for product in verified_hits:
         print(f"   > [{product.rating}★ | {product.rating_count} reviews] {product.name[:60]}...")
-    
-    print("\n" + "-"*50)
\ No newline at end of file
+
+    if result_cache is not None and incremental is None:
+        print(f"\n   Result cache: {result_cache.stats()}")
+    if incremental is not None:
+        print(f"\n   Checkpoint: {incremental.stats}")
+    print("\n" + "-"*50)
+
+def _scan_reports(file_path, dataset, use_cache, rebuild_cache, result_cache):
+    # Every report below is registered against ONE shared scan of the CSV, so each row is
+    # read and cleaned exactly once no matter how many pipelines consume it.
+    # With a result_cache (core/memo.ResultCache), reports already computed for this exact
+    # file are reused, and the file is not read at all when every report is stored.
+    if isinstance(dataset, CsvSource):
+        items = read_csv(file_path, use_cache=use_cache, rebuild_cache=rebuild_cache)
+    else:
+        items = iter(dataset)
+    scan = SharedScan(items, cache=result_cache, dataset=dataset)
+
+    # Global financial totals using map-reduce.
+    revenue = scan.register(lambda stream: stream
+        .map(lambda product: product.discounted_price)
+        .reduce(lambda acc, x: acc + x, 0.0))
+
+    savings = scan.register(lambda stream: stream
+        .map(lambda product: product.savings)
+        .reduce(lambda acc, x: acc + x, 0.0))
+
+    # Group products by category to compute aggregate statistics (average rating).
+    # Only a running (sum, count) per category is kept, never the products themselves.
+    categories = scan.register(lambda stream: stream
+        .group_by(lambda product: product.category,
+                  agg={'avg_rating': agg.mean('rating'), 'count': agg.count()}))
+
+    # Filter for discounted items and keep the 5 best percentages, deduplicated by name.
+    # top_k holds only 5 candidates instead of sorting every discounted product.
+    top_discounts = scan.register(lambda stream: stream
+        .filter(lambda product: product.discount_percentage > 0)
+        .top_k(5, key=lambda product: product.discount_percentage, reverse=True,
+               distinct_key=lambda product: product.name)
+        .collect())
+
+    # Find high-quality products (high rating + high review count).
+    # col() predicates can be checked by a scan-capable source before Products are built.
+    verified_hits = scan.register(lambda stream: stream
+        .filter((col('rating') > 4.5) & (col('rating_count') > 1000))
+        .top_k(5, key=lambda product: product.rating_count, reverse=True,
+               distinct_key=lambda product: product.name)
+        .collect())
+
+    scan.run()
+    return (revenue.result(), savings.result(), categories.result(),
+            top_discounts.result(), verified_hits.result())
+
+def _approximate_reports(dataset, fraction, seed=None):
+    # The revenue and category reports estimated from a Bernoulli sample of 'fraction' of
+    # the rows (core/approximate.py), plus price/rating quantiles and the most frequent
+    # products. The sampler is pushed into the source scan, so unsampled rows are never
+    # cleaned, and one shared scan of the sample feeds every report. Top-5 lists of
+    # extremes cannot be estimated from a sample and are left out.
+    totals, ratings, _ = _report_aggregations()
+    totals = approx.estimating(dict(totals,
+                                    price=approx.quantiles('discounted_price', QUANTILES),
+                                    rating=approx.quantiles('rating', QUANTILES),
+                                    products=approx.heavy_hitters('name', 5)), fraction)
+    ratings = approx.estimating(ratings, fraction)
+    scan = SharedScan(iter(Stream(dataset).sample(fraction, seed)))
+    summary = scan.register(lambda stream: stream.aggregate(totals))
+    categories = scan.register(lambda stream: stream.group_by(_by_category, agg=ratings))
+    scan.run()
+    summary, categories = summary.result(), categories.result()
+
+    print(f"\n[1] KEY FINANCIAL METRICS (estimated from a {fraction * 100:g}% sample, 95% confidence)")
+    print(f"   > Total Revenue:     ₹{summary['revenue']:,.2f}")
+    print(f"   > Total Customer Savings:  ₹{summary['savings']:,.2f}")
+
+    print("\n[2] AVERAGE/MEAN RATING BY CATEGORY")
+    rated = [(cat, stats) for cat, stats in categories.items() if stats['avg_rating'] is not None]
+    for cat, stats in sorted(rated, key=lambda x: x[1]['avg_rating'], reverse=True):
+        print(f"   > {cat:<25} : {stats['avg_rating']:.2f} stars (~{stats['count']:,.0f} items)")
+
+    print("\n[3] PRICE AND RATING QUANTILES")
+    for label, name, unit in (("Discounted price", 'price', "₹"), ("Rating", 'rating', "")):
+        values = ", ".join(f"p{q * 100:g} {unit}{estimate:,.2f}" for q, estimate in summary[name].items()
+                           if estimate is not None)
+        print(f"   > {label:<17}: {values or 'no data'}")
+
+    print("\n[4] MOST FREQUENT CATEGORIES AND PRODUCTS")
+    frequent = sorted(categories.items(), key=lambda x: x[1]['count'], reverse=True)[:5]
+    for cat, stats in frequent:
+        print(f"   > {cat:<25} : ~{stats['count']:,.0f} items")
+    for name, count in summary['products']:
+        print(f"   > {name[:50]:<50} : ~{count:,.0f} listings")
+
+def _print_window(result, report):
+    # Prints one windowed report; early (still open) windows are marked as partial.
+    status = "" if result.final else " (partial)"
+    if result.start is None:
+        print(f"\n[{report}] running{status}")
+    else:
+        print(f"\n[{report}] sales {result.start:,}-{result.end:,}{status}")
+
+async def follow(file_path, window=1000, stop=None, poll_interval=POLL_INTERVAL):
+    """
+    Live version of main(): follows the CSV as it grows (like 'tail -f') and keeps the
+    reports up to date with windowed aggregations instead of re-scanning the file:
+      * revenue and savings per tumbling window of 'window' sales,
+      * average rating per category over the last 5 windows (sliding),
+      * running top-5 discounts and verified hits, refreshed every window.
+    Runs until the asyncio.Event 'stop' is set (or forever).
+    """
+    totals, ratings, leaders = _report_aggregations()
+    totals = WindowedAggregation(counting(window), totals)
+    ratings = WindowedAggregation(counting(5 * window, window), ratings, key=_by_category)
+    leaders = WindowedAggregation(running(), leaders, every=window)
+
+    def report(results_by_report):
+        for name, results in results_by_report:
+            for result in results:
+                _print_window(result, name)
+                if name == "REVENUE":
+                    print(f"   > Revenue: ₹{result.values['revenue']:,.2f}  "
+                          f"Savings: ₹{result.values['savings']:,.2f}")
+                elif name == "RATINGS":
+                    for cat, stats in sorted(result.values.items(), key=lambda x: x[1]['avg_rating'], reverse=True):
+                        print(f"   > {cat:<25} : {stats['avg_rating']:.2f} stars ({stats['count']} items)")
+                else:
+                    for product in result.values['top_discounts']:
+                        print(f"   > {product.discount_percentage}% off: {product.name[:50]}...")
+                    for product in result.values['verified_hits']:
+                        print(f"   > [{product.rating}★ | {product.rating_count} reviews] {product.name[:60]}...")
+
+    async for product in tail_csv(file_path, poll_interval=poll_interval, stop=stop):
+        report([("REVENUE", totals.add(product)), ("RATINGS", ratings.add(product)),
+                ("LEADERS", leaders.add(product))])
+    report([("REVENUE", totals.flush()), ("RATINGS", ratings.flush()), ("LEADERS", leaders.flush())])
@@ -0,0 +1,340 @@
+"""
+Incremental aggregators for Stream.group_by(key, agg={...}).
+
+Each aggregator folds values into a small state one item at a time, so a grouped
+aggregation keeps O(#groups) state instead of a list of every item per group. States are
+immutable values, except top_k's heap, which add() updates in place.
+States can also be merged, which lets partial aggregates (e.g. from different chunks of
+a file) be combined into the same answer a single pass would give.
+
+Usage:
+    from sales_analysis.core import aggregations as agg
+    stream.group_by(lambda p: p.category, agg={'avg_rating': agg.mean('rating'), 'n': agg.count()})
+"""
+import builtins
+import heapq
+from operator import attrgetter
+
+
+class Aggregator:
+    """
+    Base class describing one aggregation: how to extract a value from an item,
+    the empty state, how to fold a value in, how to merge two states, and the final result.
+    """
+    # False for aggregators that ignore the values they are given (count), so planners
+    # know the item itself is not needed.
+    uses_value = True
+
+    def __init__(self, field=None):
+        # 'field' may be an attribute name ('rating'), a callable, or None (the item itself)
+        self.field = field
+        if field is None:
+            self.extract = lambda item: item
+        elif isinstance(field, str):
+            self.extract = attrgetter(field)
+        else:
+            self.extract = field
+
+    def initial(self):
+        raise NotImplementedError
+
+    def add(self, state, value):
+        raise NotImplementedError
+
+    def merge(self, left, right):
+        raise NotImplementedError
+
+    def fold(self, state, values):
+        # Folds a whole column of values at once. Subclasses override this with C-level
+        # builtins (len, sum, min, max) for the columnar engine.
+        for value in values:
+            state = self.add(state, value)
+        return state
+
+    def result(self, state):
+        return state
+
+
+class Count(Aggregator):
+    uses_value = False
+
+    def initial(self):
+        return 0
+
+    def add(self, state, value):
+        return state + 1
+
+    def fold(self, state, values):
+        return state + len(values)
+
+    def merge(self, left, right):
+        return left + right
+
+
+class Sum(Aggregator):
+    def initial(self):
+        return 0.0
+
+    def add(self, state, value):
+        return state + value
+
+    def fold(self, state, values):
+        return builtins.sum(values, state)
+
+    def merge(self, left, right):
+        return left + right
+
+
+class Mean(Aggregator):
+    # State: (running_sum, count). The result is sum / count, matching sum(values) / len(values).
+    def initial(self):
+        return (0.0, 0)
+
+    def add(self, state, value):
+        return (state[0] + value, state[1] + 1)
+
+    def fold(self, state, values):
+        return (builtins.sum(values, state[0]), state[1] + len(values))
+
+    def merge(self, left, right):
+        return (left[0] + right[0], left[1] + right[1])
+
+    def result(self, state):
+        return state[0] / state[1] if state[1] else None
+
+
+class Min(Aggregator):
+    def initial(self):
+        return None
+
+    def add(self, state, value):
+        return value if state is None or value < state else state
+
+    def fold(self, state, values):
+        return self.merge(state, builtins.min(values, default=None))
+
+    def merge(self, left, right):
+        if left is None:
+            return right
+        return self.add(left, right) if right is not None else left
+
+
+class Max(Aggregator):
+    def initial(self):
+        return None
+
+    def add(self, state, value):
+        return value if state is None or value > state else state
+
+    def fold(self, state, values):
+        return self.merge(state, builtins.max(values, default=None))
+
+    def merge(self, left, right):
+        if left is None:
+            return right
+        return self.add(left, right) if right is not None else left
+
+
+class Variance(Aggregator):
+    # Welford's online algorithm. State: (count, mean, sum_of_squared_deviations).
+    # ddof=0 gives the population variance, ddof=1 the sample variance.
+    def __init__(self, field=None, ddof=0):
+        super().__init__(field)
+        self.ddof = ddof
+
+    def initial(self):
+        return (0, 0.0, 0.0)
+
+    def add(self, state, value):
+        count, mean, m2 = state
+        count += 1
+        delta = value - mean
+        mean += delta / count
+        return (count, mean, m2 + delta * (value - mean))
+
+    def fold(self, state, values):
+        # Two-pass variance of the whole batch, then merged into the running state.
+        count = len(values)
+        if not count:
+            return state
+        mean = builtins.sum(values) / count
+        m2 = builtins.sum([(value - mean) ** 2 for value in values])
+        return self.merge(state, (count, mean, m2))
+
+    def merge(self, left, right):
+        # Chan et al. parallel combination of two Welford states.
+        if left[0] == 0:
+            return right
+        if right[0] == 0:
+            return left
+        count = left[0] + right[0]
+        delta = right[1] - left[1]
+        mean = left[1] + delta * right[0] / count
+        m2 = left[2] + right[2] + delta * delta * left[0] * right[0] / count
+        return (count, mean, m2)
+
+    def result(self, state):
+        count, _, m2 = state
+        return m2 / (count - self.ddof) if count > self.ddof else None
+
+
+class _Descending:
+    # Inverts comparisons so the heap can treat "largest key" as "worst" for ascending top_k.
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+class _TopKState:
+    # Candidates of a TopK, kept as in Stream.top_k: a heap of [rank, -seq, value,
+    # distinct key, alive] entries with the current worst candidate at heap[0], plus the
+    # live entry of every distinct key. Superseded entries are dropped lazily.
+    __slots__ = ('heap', 'entries', 'live', 'seq')
+
+    def __init__(self):
+        self.heap = []
+        self.entries = {}
+        self.live = 0
+        self.seq = 0
+
+    def __len__(self):
+        return self.live
+
+    def best_first(self):
+        return [entry[2] for entry in sorted((e for e in self.heap if e[4]), reverse=True)]
+
+
+class TopK(Aggregator):
+    """
+    Keeps the k best values by 'key' (smallest first, largest first with reverse=True),
+    optionally only the best one per distinct_key. The state is a heap of at most k live
+    candidates (O(log k) per value), so it stays bounded on endless streams (e.g. a
+    running top-K in a window). Ties keep the earliest value, like Stream.top_k. Unlike
+    the other states, it is updated in place; merge() leaves both of its inputs intact.
+    """
+    def __init__(self, k, key=None, reverse=False, distinct_key=None, field=None):
+        super().__init__(field)
+        self.k = k
+        self.key = key or (lambda value: value)
+        self.reverse = reverse
+        self.distinct_key = distinct_key
+
+    def _rank(self, entry):
+        return entry[0] if self.reverse else entry[0].value
+
+    def initial(self):
+        return _TopKState()
+
+    def add(self, state, value):
+        if self.k <= 0:
+            return state
+        rank = self.key(value)
+        reverse = self.reverse
+        identity = None
+        if self.distinct_key is not None:
+            identity = self.distinct_key(value)
+            current = state.entries.get(identity)
+            if current is not None:
+                # Same key already competing: keep whichever is strictly better.
+                held = self._rank(current)
+                if not (rank > held if reverse else rank < held):
+                    return state
+                current[4] = False
+                state.live -= 1
+
+        heap = state.heap
+        if state.live >= self.k:
+            while not heap[0][4]:
+                heapq.heappop(heap)
+            worst = self._rank(heap[0])
+            if not (rank > worst if reverse else rank < worst):
+                return state
+            evicted = heapq.heappop(heap)
+            state.live -= 1
+            if self.distinct_key is not None:
+                del state.entries[evicted[3]]
+
+        entry = [rank if reverse else _Descending(rank), -state.seq, value, identity, True]
+        heapq.heappush(heap, entry)
+        state.seq += 1
+        state.live += 1
+        if self.distinct_key is not None:
+            state.entries[identity] = entry
+        if len(heap) > 2 * self.k:
+            state.heap = [e for e in heap if e[4]]
+            heapq.heapify(state.heap)
+        return state
+
+    def merge(self, left, right):
+        # 'right' holds later values: adding its candidates best-first after a copy of
+        # 'left' gives them later sequence numbers in their order, so ties stay stable.
+        merged = _TopKState()
+        merged.seq = left.seq
+        merged.live = left.live
+        merged.heap = [list(entry) for entry in left.heap if entry[4]]
+        heapq.heapify(merged.heap)
+        if self.distinct_key is not None:
+            merged.entries = {entry[3]: entry for entry in merged.heap}
+        for value in right.best_first():
+            self.add(merged, value)
+        return merged
+
+    def result(self, state):
+        return state.best_first()
+
+
+class Where(Aggregator):
+    # Feeds only the items matching 'predicate' to the wrapped aggregator, so several
+    # differently filtered aggregations can share one pass (e.g. one window).
+    def __init__(self, predicate, aggregator):
+        super().__init__()
+        self.predicate = predicate
+        self.aggregator = aggregator
+
+    def initial(self):
+        return self.aggregator.initial()
+
+    def add(self, state, item):
+        if self.predicate(item):
+            return self.aggregator.add(state, self.aggregator.extract(item))
+        return state
+
+    def merge(self, left, right):
+        return self.aggregator.merge(left, right)
+
+    def result(self, state):
+        return self.aggregator.result(state)
+
+
+# Factory functions used in group_by(agg={...}) specifications.
+def count():
+    return Count()
+
+def sum(field=None):
+    return Sum(field)
+
+def mean(field=None):
+    return Mean(field)
+
+def min(field=None):
+    return Min(field)
+
+def max(field=None):
+    return Max(field)
+
+def variance(field=None, ddof=0):
+    return Variance(field, ddof)
+
+
+def top_k(k, key=None, reverse=False, distinct_key=None):
+    return TopK(k, key, reverse, distinct_key)
+
+def where(predicate, aggregator):
+    return Where(predicate, aggregator)
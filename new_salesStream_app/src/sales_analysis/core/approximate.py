@@ -0,0 +1,370 @@
+"""
+Approximate analytics: sampling, sketch aggregators and estimates with error bounds.
+
+Dashboards rarely need exact totals. Stream.sample(fraction) keeps each item with
+probability 'fraction' (Bernoulli sampling); as a col()-style expression the sampler is
+pushed down into the source scan, so a rejected row is never cleaned or turned into a
+Product. Stream.reservoir(n) keeps a uniform sample of exactly n items.
+
+Aggregations over a sample estimate the full data's: counts and sums are scaled by
+1 / fraction, means are taken as they are, and every result is an Estimate carrying a
+confidence interval (normal approximation, 95% by default). Stream.approximate(fraction)
+is the execution mode tying both together: it samples, and its group_by()/aggregate()
+replace count, sum and mean aggregators with their estimating versions (estimating()),
+so the report code of an exact pipeline runs unchanged on a sample.
+
+Besides those, quantiles() (t-digest), heavy_hitters() (Space-Saving) and frequencies()
+(Count-Min) aggregate into the sketches of core/sketches.py, exactly or over a sample,
+and report Estimates too.
+
+Usage:
+    from sales_analysis.core import approximate as approx
+    Stream(CsvSource(path)).approximate(0.01).aggregate({
+        'revenue': agg.sum('discounted_price'),
+        'price': approx.quantiles('discounted_price', (0.5, 0.9)),
+        'top_products': approx.heavy_hitters('name', 10)})
+"""
+import builtins
+import math
+import random
+from collections import namedtuple
+from itertools import islice
+from statistics import NormalDist
+
+from sales_analysis.core import aggregations
+from sales_analysis.core.expressions import Expr
+from sales_analysis.core.sketches import CountMinSketch, SpaceSaving, TDigest
+
+
+def _z(confidence):
+    # Two-sided normal quantile: 1.96 for 95%.
+    return NormalDist().inv_cdf((1 + confidence) / 2)
+
+
+def _check_fraction(fraction):
+    if not 0 < fraction <= 1:
+        raise ValueError(f"Sampling fraction must be in (0, 1], got {fraction}.")
+
+
+class Estimate(namedtuple('Estimate', 'value error confidence')):
+    """
+    An approximate result: the true value lies within value ± error with probability
+    'confidence' (1.0 for deterministic sketch bounds). Compares and sorts by value.
+    """
+    __slots__ = ()
+
+    @property
+    def low(self):
+        return self.value - self.error
+
+    @property
+    def high(self):
+        return self.value + self.error
+
+    def __format__(self, spec):
+        # Format specs apply to both numbers: f"{estimate:,.2f}" -> "1,234.50 ± 12.25".
+        spec = spec or ',.6g'
+        return f"{self.value:{spec}} ± {self.error:{spec}}"
+
+    def __str__(self):
+        return f"{self:} ({self.confidence:.0%} confidence)"
+
+
+class Sample(Expr):
+    """
+    Bernoulli sampler: a predicate true for each item independently with probability
+    'fraction'. A 'seed' makes the sequence of decisions reproducible: the generator is
+    seeded again whenever a run starts (restart()), so every run of a seeded stream keeps
+    the same items. Reads no fields, so as the first filter it is checked before any
+    column is cleaned.
+    """
+    def __init__(self, fraction, seed=None):
+        _check_fraction(fraction)
+        self.fraction = fraction
+        self.seed = seed
+        self.restart()
+
+    def restart(self):
+        self._random = random.Random(self.seed).random
+
+    def __call__(self, item):
+        return self._random() < self.fraction
+
+    def evaluate(self, table, rows=None):
+        size = len(table) if rows is None else len(rows)
+        fraction = self.fraction
+        draw = self._random
+        return [draw() < fraction for _ in range(size)]
+
+    def fields(self):
+        return set()
+
+    def __repr__(self):
+        return f"sample({self.fraction!r}, seed={self.seed!r})"
+
+
+def reservoir_sample(items, size, seed=None):
+    """
+    Uniform random sample of 'size' items (all of them if there are fewer), in one pass
+    with Li's Algorithm L: after the reservoir fills, the number of items to skip before
+    the next replacement is drawn directly, so only O(size * log(n / size)) items cost
+    any Python work; the skipped ones are consumed by islice.
+    """
+    if size <= 0:
+        return []
+    draw = random.Random(seed).random
+    items = iter(items)
+    reservoir = list(islice(items, size))
+    if len(reservoir) < size:
+        return reservoir
+    weight = math.exp(math.log(draw()) / size)
+    while True:
+        skip = int(math.log(draw()) / math.log1p(-weight))
+        replacement = next(islice(items, skip, None), _END)
+        if replacement is _END:
+            return reservoir
+        reservoir[int(draw() * size)] = replacement
+        weight *= math.exp(math.log(draw()) / size)
+
+
+_END = object()
+
+
+class _Estimator(aggregations.Aggregator):
+    # Base of the aggregators estimating a full-data result from a 'fraction' sample.
+    def __init__(self, field=None, fraction=1.0, confidence=0.95):
+        super().__init__(field)
+        _check_fraction(fraction)
+        self.fraction = fraction
+        self.confidence = confidence
+
+
+class ApproxCount(_Estimator):
+    # Horvitz-Thompson count n / p; variance n (1 - p) / p^2.
+    uses_value = False
+
+    def initial(self):
+        return 0
+
+    def add(self, state, value):
+        return state + 1
+
+    def fold(self, state, values):
+        return state + len(values)
+
+    def merge(self, left, right):
+        return left + right
+
+    def result(self, state):
+        p = self.fraction
+        error = _z(self.confidence) * math.sqrt(state * (1 - p)) / p
+        return Estimate(state / p, error, self.confidence)
+
+
+class ApproxSum(_Estimator):
+    # Horvitz-Thompson total sum / p; variance (1 - p) / p^2 * sum of squares.
+    # State: (sum, sum_of_squares).
+    def initial(self):
+        return (0.0, 0.0)
+
+    def add(self, state, value):
+        return (state[0] + value, state[1] + value * value)
+
+    def fold(self, state, values):
+        return (builtins.sum(values, state[0]), builtins.sum([value * value for value in values], state[1]))
+
+    def merge(self, left, right):
+        return (left[0] + right[0], left[1] + right[1])
+
+    def result(self, state):
+        p = self.fraction
+        error = _z(self.confidence) * math.sqrt(state[1] * (1 - p)) / p
+        return Estimate(state[0] / p, error, self.confidence)
+
+
+class ApproxMean(_Estimator):
+    # Sample mean with its standard error s / sqrt(n) * sqrt(1 - p) (finite population
+    # correction); the state is a Welford (count, mean, m2) triple as in Variance.
+    def __init__(self, field=None, fraction=1.0, confidence=0.95):
+        super().__init__(field, fraction, confidence)
+        self._variance = aggregations.Variance(field)
+
+    def initial(self):
+        return self._variance.initial()
+
+    def add(self, state, value):
+        return self._variance.add(state, value)
+
+    def fold(self, state, values):
+        return self._variance.fold(state, values)
+
+    def merge(self, left, right):
+        return self._variance.merge(left, right)
+
+    def result(self, state):
+        count, mean, m2 = state
+        if not count:
+            return None
+        if count == 1:
+            # One sampled value says nothing about the spread.
+            return Estimate(mean, 0.0 if self.fraction == 1 else math.inf, self.confidence)
+        error = _z(self.confidence) * math.sqrt(m2 / (count - 1) / count * (1 - self.fraction))
+        return Estimate(mean, error, self.confidence)
+
+
+class Quantiles(_Estimator):
+    """
+    Quantiles 'qs' of a numeric field from a t-digest, as {q: Estimate}. The bound
+    covers the digest's rank error and, over a sample, the sampling error of the rank
+    (z * sqrt(q (1 - q) (1 - p) / n)), translated into values through the digest.
+    """
+    def __init__(self, field=None, qs=(0.5, 0.9, 0.99), compression=100, fraction=1.0, confidence=0.95):
+        super().__init__(field, fraction, confidence)
+        self.qs = tuple(qs)
+        self.compression = compression
+
+    def initial(self):
+        return TDigest(self.compression)
+
+    def add(self, state, value):
+        state.add(value)
+        return state
+
+    def merge(self, left, right):
+        return left.copy().merge(right)
+
+    def result(self, state):
+        if not state.count:
+            return {q: None for q in self.qs}
+        z = _z(self.confidence)
+        estimates = {}
+        for q in self.qs:
+            spread = state.rank_error(q) + z * math.sqrt(q * (1 - q) * (1 - self.fraction) / state.count)
+            value = state.quantile(q)
+            low = state.quantile(max(q - spread, 0.0))
+            high = state.quantile(min(q + spread, 1.0))
+            estimates[q] = Estimate(value, max(value - low, high - value), self.confidence)
+        return estimates
+
+
+class HeavyHitters(_Estimator):
+    """
+    The k most frequent values of a field, from a Space-Saving summary of 'capacity'
+    counters, as [(value, Estimate of its count)] most frequent first. The sketch bound
+    is deterministic (the true sample count lies in [count - error, count]); over a
+    sample, counts are scaled by 1 / p and the sampling error is added.
+    """
+    def __init__(self, field=None, k=10, capacity=None, fraction=1.0, confidence=0.95):
+        super().__init__(field, fraction, confidence)
+        self.k = k
+        self.capacity = capacity or max(10 * k, 100)
+
+    def initial(self):
+        return SpaceSaving(self.capacity)
+
+    def add(self, state, value):
+        state.add(value)
+        return state
+
+    def merge(self, left, right):
+        return left.copy().merge(right)
+
+    def result(self, state):
+        p = self.fraction
+        z = _z(self.confidence) if p < 1 else 0.0
+        confidence = self.confidence if p < 1 else 1.0
+        hitters = []
+        for key, count, error in state.top(self.k):
+            sampling = z * math.sqrt(count * (1 - p))
+            hitters.append((key, Estimate((count - error / 2) / p, (error / 2 + sampling) / p, confidence)))
+        return hitters
+
+
+class Frequencies:
+    # Result of frequencies(): frequencies[key] is the Estimate of how often 'key' occurs.
+    def __init__(self, sketch, fraction, confidence):
+        self.sketch = sketch
+        self.fraction = fraction
+        self.confidence = confidence
+
+    @property
+    def total(self):
+        return self.sketch.total / self.fraction
+
+    def __getitem__(self, key):
+        # The sketch estimate c is an upper bound: the true count is in [c - eps N, c]
+        # with probability 1 - delta; sampling error is added on top.
+        sketch = self.sketch
+        p = self.fraction
+        count = sketch.estimate(key)
+        error = sketch.error / 2
+        confidence = 1 - sketch.delta
+        if p < 1:
+            error += _z(self.confidence) * math.sqrt(count * (1 - p))
+            confidence -= 1 - self.confidence
+        return Estimate((count - sketch.error / 2) / p, error / p, confidence)
+
+
+class FrequencySketch(_Estimator):
+    # Count-Min sketch of a field's values; see frequencies().
+    def __init__(self, field=None, epsilon=0.001, delta=0.01, fraction=1.0, confidence=0.95):
+        super().__init__(field, fraction, confidence)
+        self.epsilon = epsilon
+        self.delta = delta
+
+    def initial(self):
+        return CountMinSketch(self.epsilon, self.delta)
+
+    def add(self, state, value):
+        state.add(value)
+        return state
+
+    def merge(self, left, right):
+        return left.copy().merge(right)
+
+    def result(self, state):
+        return Frequencies(state, self.fraction, self.confidence)
+
+
+def estimating(aggregator, fraction, confidence=0.95):
+    """
+    The aggregator estimating what 'aggregator' computes on the full data from a
+    'fraction' sample of it: count, sum and mean become ApproxCount/ApproxSum/ApproxMean
+    (also inside where()), the sketch aggregators above learn the fraction, and others
+    (min, max, top_k, ...) stay as they are, describing the sample. A dict of
+    aggregators is mapped item by item.
+    """
+    if isinstance(aggregator, dict):
+        return {name: estimating(value, fraction, confidence) for name, value in aggregator.items()}
+    if isinstance(aggregator, aggregations.Where):
+        return aggregations.Where(aggregator.predicate,
+                                  estimating(aggregator.aggregator, fraction, confidence))
+    for exact, approximate in ((aggregations.Count, ApproxCount), (aggregations.Sum, ApproxSum),
+                               (aggregations.Mean, ApproxMean)):
+        if type(aggregator) is exact:
+            return approximate(aggregator.field, fraction, confidence)
+    if isinstance(aggregator, _Estimator):
+        copy = object.__new__(type(aggregator))
+        copy.__dict__.update(aggregator.__dict__, fraction=fraction, confidence=confidence)
+        return copy
+    return aggregator
+
+
+# Factory functions, used like those of core/aggregations.py.
+def count(fraction=1.0, confidence=0.95):
+    return ApproxCount(None, fraction, confidence)
+
+def sum(field=None, fraction=1.0, confidence=0.95):
+    return ApproxSum(field, fraction, confidence)
+
+def mean(field=None, fraction=1.0, confidence=0.95):
+    return ApproxMean(field, fraction, confidence)
+
+def quantiles(field=None, qs=(0.5, 0.9, 0.99), compression=100):
+    return Quantiles(field, qs, compression)
+
+def heavy_hitters(field=None, k=10, capacity=None):
+    return HeavyHitters(field, k, capacity)
+
+def frequencies(field=None, epsilon=0.001, delta=0.01):
+    return FrequencySketch(field, epsilon, delta)
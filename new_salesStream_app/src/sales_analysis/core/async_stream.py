@@ -0,0 +1,194 @@
+import asyncio
+import inspect
+
+# Sentinel a producer puts on its queue once its source is exhausted.
+_END_OF_FEED = object()
+
+
+class _Failure:
+    # Carries a producer's exception through the queue to the consumer.
+    __slots__ = ('error',)
+
+    def __init__(self, error):
+        self.error = error
+
+
+async def _resolve(value):
+    # User functions may be plain or async; await the result only when it is awaitable.
+    if inspect.isawaitable(value):
+        return await value
+    return value
+
+
+async def _from_iterable(iterable):
+    for item in iterable:
+        yield item
+
+
+def _aiter(source):
+    # Accepts async iterables (feeds, sockets) and regular iterables (lists, generators).
+    if hasattr(source, '__aiter__'):
+        return source.__aiter__()
+    return _from_iterable(source).__aiter__()
+
+
+async def _pump(sources, size):
+    """
+    Runs one producer task per source, all feeding ONE bounded queue, and yields items as
+    they arrive. A full queue suspends the producers (await queue.put) until the consumer
+    catches up, so a fast feed can never buffer more than 'size' items in memory.
+    """
+    queue = asyncio.Queue(maxsize=size)
+
+    async def produce(source):
+        try:
+            async for item in _aiter(source):
+                await queue.put(item)
+        except Exception as error:
+            await queue.put(_Failure(error))
+        else:
+            await queue.put(_END_OF_FEED)
+
+    producers = [asyncio.ensure_future(produce(source)) for source in sources]
+    running = len(producers)
+    try:
+        while running:
+            item = await queue.get()
+            if item is _END_OF_FEED:
+                running -= 1
+            elif isinstance(item, _Failure):
+                raise item.error
+            else:
+                yield item
+    finally:
+        # The consumer stopped (finished, failed or broke out early): stop every producer.
+        for producer in producers:
+            producer.cancel()
+        await asyncio.gather(*producers, return_exceptions=True)
+
+
+class AsyncStream:
+    """
+    asyncio counterpart of Stream for live, unbounded feeds (sockets, growing files).
+
+    Wraps an async iterable (or a regular iterable) and chains lazy operations the same
+    way Stream does. Functions passed to map/filter/distinct/reduce may be plain functions
+    or coroutines. Nothing runs until a terminal operation (reduce, collect) is awaited or
+    the stream is consumed with 'async for'.
+    """
+    def __init__(self, source):
+        self.source = source
+
+    @classmethod
+    def merge(cls, *sources, buffer_size=1024):
+        # Interleaves several feeds on the current event loop as items arrive. All feeds
+        # share one bounded buffer, so together they can never run ahead by more than
+        # 'buffer_size' items.
+        return cls(_pump(sources, buffer_size))
+
+    def __aiter__(self):
+        return _aiter(self.source)
+
+    def map(self, func):
+        # Transforms each item; 'func' may return a value or an awaitable.
+        async def generator():
+            async for item in self:
+                yield await _resolve(func(item))
+        return AsyncStream(generator())
+
+    def filter(self, predicate):
+        # Keeps items for which predicate(item) (awaited if needed) is truthy.
+        async def generator():
+            async for item in self:
+                if await _resolve(predicate(item)):
+                    yield item
+        return AsyncStream(generator())
+
+    def distinct(self, key_func):
+        # Yields the first item for each key. The 'seen' set grows with the number of keys,
+        # which is unbounded on an endless feed; pair with limit() or windows if needed.
+        async def generator():
+            seen = set()
+            async for item in self:
+                key = await _resolve(key_func(item))
+                if key not in seen:
+                    seen.add(key)
+                    yield item
+        return AsyncStream(generator())
+
+    def limit(self, count):
+        # Stops after 'count' items (and closes the upstream feed).
+        async def generator():
+            if count <= 0:
+                return
+            taken = 0
+            iterator = self.__aiter__()
+            try:
+                async for item in iterator:
+                    yield item
+                    taken += 1
+                    if taken >= count:
+                        return
+            finally:
+                # Close the feed now rather than whenever it is garbage collected.
+                if hasattr(iterator, 'aclose'):
+                    await iterator.aclose()
+        return AsyncStream(generator())
+
+    def buffer(self, size=1024):
+        # Backpressure-aware decoupling: the upstream runs in its own task and may get up to
+        # 'size' items ahead of the consumer; beyond that it is suspended, not queued.
+        return AsyncStream(_pump([self], size))
+
+    def window(self, spec, agg, key=None, every=None, interval=None, tick=None):
+        # Windowed aggregation over a live feed (see core/windows.py). Yields WindowResults
+        # as windows close. While the feed is quiet, processing-time windows and the
+        # 'interval' trigger are still checked every 'tick' seconds (by default the window
+        # slide or the interval, whichever is shorter).
+        from sales_analysis.core.windows import WindowedAggregation
+
+        if tick is None:
+            timed = [] if spec.counted or spec.time is not None else [spec.slide]
+            timed += [interval] if interval is not None else []
+            tick = min(timed) if timed else None
+
+        async def generator():
+            state = WindowedAggregation(spec, agg, key, every, interval)
+            iterator = self.__aiter__()
+            pending = None
+            try:
+                while True:
+                    if pending is None:
+                        pending = asyncio.ensure_future(iterator.__anext__())
+                    # asyncio.wait (unlike wait_for) leaves the pending read running on timeout.
+                    done, _ = await asyncio.wait({pending}, timeout=tick)
+                    if pending in done:
+                        try:
+                            item = pending.result()
+                        except StopAsyncIteration:
+                            pending = None
+                            break
+                        pending = None
+                        results = state.add(item)
+                    else:
+                        results = state.advance()
+                    for result in results:
+                        yield result
+                for result in state.flush():
+                    yield result
+            finally:
+                if pending is not None:
+                    pending.cancel()
+                    await asyncio.gather(pending, return_exceptions=True)
+        return AsyncStream(generator())
+
+    async def reduce(self, func, initial):
+        # Terminal operation: folds the stream into one value (func may be async).
+        acc = initial
+        async for item in self:
+            acc = await _resolve(func(acc, item))
+        return acc
+
+    async def collect(self):
+        # Terminal operation: materializes the (finite) stream into a list.
+        return [item async for item in self]
@@ -0,0 +1,138 @@
+from functools import reduce as functional_reduce
+from itertools import compress
+
+from sales_analysis.core.expressions import Column, Expr
+from sales_analysis.core.stream import _top_k
+
+
+class ColumnarStream:
+    """
+    Columnar counterpart of Stream, backed by a ProductTable.
+
+    Instead of pushing one Product at a time through a generator chain, every operation
+    works on whole columns: a filter turns into a boolean mask plus a selection vector of
+    row indices, a map produces a new value column, and reduce/group_by consume columns
+    with C-level builtins. Operations accept column expressions (col('rating') > 4.5),
+    which run column-at-a-time, or regular lambdas, which fall back to per-row Products
+    so any existing Stream pipeline can run unchanged.
+    """
+    def __init__(self, table, rows=None, values=None):
+        self.table = table
+        # Selection vector: indices of the rows still in the stream (None means all rows)
+        self.rows = rows
+        # After a map(), the stream carries plain values instead of rows
+        self.values = values
+
+    def _row_indices(self):
+        return range(len(self.table)) if self.rows is None else self.rows
+
+    def _items(self):
+        # The current stream contents: mapped values, or rows materialized as Products.
+        if self.values is not None:
+            return self.values
+        return list(map(self.table.row, self._row_indices()))
+
+    def _evaluate(self, func):
+        # Evaluates a key/predicate/mapper over the current stream, one result per item.
+        if isinstance(func, Expr):
+            if self.values is not None:
+                raise TypeError("Column expressions cannot be applied after map(); use a lambda.")
+            return func.evaluate(self.table, self.rows)
+        return list(map(func, self._items()))
+
+    def map(self, func):
+        # Produces a new value column (vectorized when func is a column expression).
+        return ColumnarStream(self.table, self.rows, self._evaluate(func))
+
+    def filter(self, predicate):
+        # Builds a boolean mask and keeps the matching rows (or values).
+        return self._select(self._evaluate(predicate))
+
+    def distinct(self, key_func):
+        # Keeps the first row (or value) for every distinct key.
+        seen = set()
+        mask = []
+        for key in self._evaluate(key_func):
+            mask.append(key not in seen)
+            seen.add(key)
+        return self._select(mask)
+
+    def _select(self, mask):
+        if self.values is not None:
+            return ColumnarStream(self.table, None, list(compress(self.values, mask)))
+        return ColumnarStream(self.table, list(compress(self._row_indices(), mask)))
+
+    def _reorder(self, positions):
+        # Applies a permutation/subset given as positions into the current stream.
+        if self.values is not None:
+            return ColumnarStream(self.table, None, list(map(self.values.__getitem__, positions)))
+        rows = self._row_indices()
+        return ColumnarStream(self.table, list(map(rows.__getitem__, positions)))
+
+    def sorted(self, key=None, reverse=False):
+        # Sorts positions by a precomputed key column; rows are never copied.
+        keys = self._evaluate(key) if key is not None else self._items()
+        return self._reorder(sorted(range(len(keys)), key=keys.__getitem__, reverse=reverse))
+
+    def top_k(self, k, key=None, reverse=False, distinct_key=None):
+        # Same semantics as Stream.top_k, computed over key columns instead of objects.
+        keys = self._evaluate(key) if key is not None else self._items()
+        dedup = self._evaluate(distinct_key) if distinct_key is not None else None
+        positions = _top_k(range(len(keys)), k, keys.__getitem__, reverse,
+                           dedup.__getitem__ if dedup is not None else None)
+        return self._reorder(positions)
+
+    def group_by(self, key_func, agg=None):
+        # Groups by a key column. A col('category') key groups directly on the dictionary
+        # codes; aggregations fold whole per-group columns at once.
+        if (isinstance(key_func, Column) and key_func.name == 'category'
+                and self.values is None):
+            codes = self.table.category_codes
+            keys = codes if self.rows is None else list(map(codes.__getitem__, self.rows))
+            decode = self.table.categories.__getitem__
+        else:
+            keys = self._evaluate(key_func)
+            decode = None
+
+        positions_by_key = {}
+        for position, key in enumerate(keys):
+            bucket = positions_by_key.get(key)
+            if bucket is None:
+                bucket = positions_by_key[key] = []
+            bucket.append(position)
+
+        if agg is None:
+            items = self._items()
+            groups = {key: list(map(items.__getitem__, positions))
+                      for key, positions in positions_by_key.items()}
+        else:
+            columns = [(name, aggregator, self._aggregate_column(aggregator))
+                       for name, aggregator in agg.items()]
+            groups = {}
+            for key, positions in positions_by_key.items():
+                groups[key] = {
+                    name: aggregator.result(aggregator.fold(
+                        aggregator.initial(), list(map(column.__getitem__, positions))))
+                    for name, aggregator, column in columns
+                }
+        if decode is not None:
+            groups = {decode(key): value for key, value in groups.items()}
+        return groups
+
+    def _aggregate_column(self, aggregator):
+        # Aggregators built from a field name read the column directly; others run per item.
+        if isinstance(aggregator.field, str) and self.values is None:
+            return Column(aggregator.field).evaluate(self.table, self.rows)
+        return list(map(aggregator.extract, self._items()))
+
+    def reduce(self, func, initial):
+        # Folds the current column; runs in C when func is a builtin such as operator.add.
+        return functional_reduce(func, self._items(), initial)
+
+    def sum(self, start=0.0):
+        # Vectorized shortcut for .reduce(lambda acc, x: acc + x, start).
+        return sum(self._items(), start)
+
+    def collect(self):
+        return list(self._items())
+
@@ -0,0 +1,259 @@
+"""
+'Seen' sets for Stream.distinct and Stream.count_distinct.
+
+The default distinct keeps a Python set of every key, which grows with the number of
+unique keys. The other strategies bound that memory:
+
+    'exact'  - a set of every key (fastest; memory grows with the keys)
+    'spill'  - exact as well, but once the keys in memory exceed 'memory_limit' bytes they
+               are written to a sorted run on disk. Only every 64th key of a run and one
+               Bloom filter over all spilled keys stay in memory, so checking a key
+               costs block reads only when the filter cannot rule it out. Runs of
+               similar size are merged, so there are only O(log n) of them.
+    'bloom'  - a Bloom filter (core/sketches.py) with false-positive rate 'error_rate':
+               never lets a duplicate through, but may drop that fraction of new keys.
+
+Every strategy has the same interface: add(key) returns True for a new key, report()
+describes the keys and memory used, and close() releases temporary files.
+
+Without a 'report' callback, the DistinctReport of every run is logged at INFO level on
+the 'sales_analysis.core.distinct' logger (see log_report).
+"""
+import heapq
+import logging
+import marshal
+import os
+import shutil
+import sys
+import tempfile
+from bisect import bisect_right
+from collections import namedtuple
+
+from sales_analysis.core.sketches import BloomFilter, stable_hash
+
+METHODS = ('exact', 'spill', 'bloom')
+# In-memory budget of a 'spill' set before its keys go to disk.
+DEFAULT_MEMORY_LIMIT = 64 << 20
+# Every _INDEX_EVERY-th key of a run stays in memory; a lookup reads one block of keys.
+_INDEX_EVERY = 64
+
+logger = logging.getLogger(__name__)
+
+_DistinctReport = namedtuple('DistinctReport', 'method keys memory_bytes spilled_runs spilled_bytes error_rate')
+
+
+class DistinctReport(_DistinctReport):
+    """
+    What one distinct run used. 'keys' is the number of distinct keys found (an estimate
+    for 'hll' and 'bloom'), 'memory_bytes' the memory held at the end of the run, and
+    'error_rate' the bound on wrongly dropped keys (0.0 for the exact methods).
+    """
+    __slots__ = ()
+
+    def __str__(self):
+        text = f"distinct[{self.method}]: {self.keys:,} keys, {self.memory_bytes / 2 ** 20:.1f} MiB in memory"
+        if self.spilled_runs:
+            text += f", {self.spilled_runs} run(s) / {self.spilled_bytes / 2 ** 20:.1f} MiB on disk"
+        if self.error_rate:
+            text += f", error <= {self.error_rate:.2%}"
+        return text
+
+
+def log_report(report):
+    # Default destination of the reports of distinct() and count_distinct().
+    logger.info("%s", report)
+
+
+def reporting_enabled():
+    # True when log_report output would be shown, so an exact distinct() without a
+    # callback only pays for measuring its set when someone is listening.
+    return logger.isEnabledFor(logging.INFO)
+
+
+def _set_memory(keys):
+    # A set's table plus the key objects it holds.
+    return sys.getsizeof(keys) + sum(map(sys.getsizeof, keys))
+
+
+def _encode(key):
+    # Keys are compared on disk by their marshal bytes (version 0 is deterministic: no
+    # interning flags or back-references). Numbers that are equal but of different types
+    # (1 and 1.0) are therefore only recognised as duplicates while both are in memory.
+    try:
+        return marshal.dumps(key, 0)
+    except ValueError:
+        raise TypeError(f"distinct(method='spill') can only write str, bytes, numbers and tuples "
+                        f"of them to disk, got a {type(key).__name__} key.") from None
+
+
+class ExactSet:
+    method = 'exact'
+
+    def __init__(self):
+        self.keys = set()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self.keys
+
+    def add(self, key):
+        if key in self.keys:
+            return False
+        self.keys.add(key)
+        return True
+
+    def report(self):
+        return DistinctReport(self.method, len(self.keys), _set_memory(self.keys), 0, 0, 0.0)
+
+    def close(self):
+        pass
+
+
+class BloomSet:
+    method = 'bloom'
+
+    def __init__(self, error_rate=0.01, capacity=100_000):
+        self.filter = BloomFilter(error_rate, capacity)
+
+    def __len__(self):
+        return len(self.filter)
+
+    def __contains__(self, key):
+        return key in self.filter
+
+    def add(self, key):
+        return self.filter.add(key)
+
+    def report(self):
+        return DistinctReport(self.method, len(self.filter), self.filter.memory_usage(), 0, 0,
+                              self.filter.error_rate)
+
+    def close(self):
+        pass
+
+
+class _Run:
+    # One sorted file of encoded keys, written in blocks of _INDEX_EVERY keys (each block a
+    # marshalled list, decoded in C). The first key and offset of every block stay in memory.
+    def __init__(self, path, encoded_keys):
+        self.path = path
+        self.index = []
+        self.offsets = [0]
+        with open(path, 'wb') as f:
+            for start in range(0, len(encoded_keys), _INDEX_EVERY):
+                block = encoded_keys[start:start + _INDEX_EVERY]
+                self.index.append(block[0])
+                self.offsets.append(self.offsets[-1] + f.write(marshal.dumps(block)))
+        self.count = len(encoded_keys)
+        self.size = self.offsets[-1]
+        self.file = open(path, 'rb')
+
+    def _read_block(self, block):
+        self.file.seek(self.offsets[block])
+        return marshal.loads(self.file.read(self.offsets[block + 1] - self.offsets[block]))
+
+    def __contains__(self, encoded):
+        block = bisect_right(self.index, encoded) - 1
+        return block >= 0 and encoded in self._read_block(block)
+
+    def __iter__(self):
+        # All keys in sorted order, read block by block.
+        for block in range(len(self.index)):
+            yield from self._read_block(block)
+
+    def memory_usage(self):
+        return sys.getsizeof(self.index) + sys.getsizeof(self.offsets) + sum(map(sys.getsizeof, self.index))
+
+    def close(self):
+        self.file.close()
+        os.remove(self.path)
+
+
+class SpillingSet:
+    """
+    Exact seen-set whose keys move to sorted runs on disk when the in-memory keys exceed
+    'memory_limit' bytes. One Bloom filter over all spilled keys answers most lookups of
+    new keys without touching the disk. The run files live in a temporary directory
+    (under 'directory' if given) that close() removes.
+    """
+    method = 'spill'
+
+    def __init__(self, memory_limit=DEFAULT_MEMORY_LIMIT, directory=None, error_rate=0.01):
+        self.memory_limit = memory_limit
+        self.directory = tempfile.mkdtemp(prefix='stream-distinct-', dir=directory)
+        self.keys = set()
+        self.key_bytes = 0
+        self.spilled = BloomFilter(error_rate)
+        self.runs = []
+        self.count = 0
+        self.spills = 0
+
+    def __len__(self):
+        return self.count
+
+    def _on_disk(self, key):
+        encoded = _encode(key)
+        if not self.spilled.contains_hash(stable_hash(encoded)):
+            return False
+        return any(encoded in run for run in self.runs)
+
+    def __contains__(self, key):
+        return key in self.keys or (self.runs and self._on_disk(key))
+
+    def add(self, key):
+        if key in self.keys or (self.runs and self._on_disk(key)):
+            return False
+        self.keys.add(key)
+        self.count += 1
+        self.key_bytes += sys.getsizeof(key)
+        if self.key_bytes + sys.getsizeof(self.keys) > self.memory_limit:
+            self._spill()
+        return True
+
+    def _new_run(self, encoded_keys):
+        self.spills += 1
+        return _Run(os.path.join(self.directory, f"run-{self.spills:05d}.bin"), encoded_keys)
+
+    def _spill(self):
+        encoded_keys = sorted(map(_encode, self.keys))
+        for encoded in encoded_keys:
+            self.spilled.add_hash(stable_hash(encoded))
+        self.runs.append(self._new_run(encoded_keys))
+        self.keys = set()
+        self.key_bytes = 0
+        # Like a binary counter: a run absorbs the previous one once it is at least as
+        # large, so there are O(log n) runs and each key is rewritten O(log n) times.
+        # Runs hold disjoint keys, so merging them is a plain sorted merge.
+        while len(self.runs) > 1 and self.runs[-2].count <= self.runs[-1].count:
+            older, newer = self.runs[-2:]
+            merged = self._new_run(list(heapq.merge(older, newer)))
+            older.close()
+            newer.close()
+            self.runs[-2:] = [merged]
+
+    def memory_usage(self):
+        return (sys.getsizeof(self.keys) + self.key_bytes + self.spilled.memory_usage()
+                + sum(run.memory_usage() for run in self.runs))
+
+    def report(self):
+        return DistinctReport(self.method, self.count, self.memory_usage(), len(self.runs),
+                              sum(run.size for run in self.runs), 0.0)
+
+    def close(self):
+        for run in self.runs:
+            run.close()
+        self.runs = []
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def seen_set(method='exact', memory_limit=None, error_rate=0.01, capacity=100_000, directory=None):
+    """Creates the seen-set for one distinct run (see METHODS)."""
+    if method == 'exact':
+        return ExactSet()
+    if method == 'spill':
+        return SpillingSet(memory_limit or DEFAULT_MEMORY_LIMIT, directory)
+    if method == 'bloom':
+        return BloomSet(error_rate, capacity)
+    raise ValueError(f"Unknown distinct method: {method!r} (use one of {', '.join(METHODS)})")
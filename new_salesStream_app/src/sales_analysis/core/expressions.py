@@ -0,0 +1,143 @@
+"""
+Column expressions for the columnar engine.
+
+An expression such as  (col('rating') > 4.5) & (col('rating_count') > 1000)  can be
+evaluated two ways:
+  * row-wise, by calling it with a Product (so it works anywhere a lambda would), and
+  * column-wise, via evaluate(table, rows), which runs each operator over whole columns
+    with C-level map() calls instead of one Python function call per row.
+"""
+import operator
+from itertools import repeat
+
+
+class Expr:
+    """Base class for column expressions. Supports arithmetic, comparisons and & | ~."""
+
+    # Expressions overload ==, so restore identity hashing explicitly.
+    __hash__ = object.__hash__
+
+    def __call__(self, item):
+        raise NotImplementedError
+
+    def evaluate(self, table, rows=None):
+        # Returns a sequence with one value per selected row (all rows when rows is None).
+        raise NotImplementedError
+
+    def fields(self):
+        # Set of Product fields this expression reads.
+        raise NotImplementedError
+
+    def restart(self):
+        # Called when a run of the pipeline starts; stateful expressions (the sampler of
+        # core/approximate.py) reset here so every run gives the same result.
+        pass
+
+    def _binary(self, op, symbol, other, swap=False):
+        other = other if isinstance(other, Expr) else Literal(other)
+        return BinaryOp(op, symbol, other, self) if swap else BinaryOp(op, symbol, self, other)
+
+    def __add__(self, other): return self._binary(operator.add, '+', other)
+    def __radd__(self, other): return self._binary(operator.add, '+', other, swap=True)
+    def __sub__(self, other): return self._binary(operator.sub, '-', other)
+    def __rsub__(self, other): return self._binary(operator.sub, '-', other, swap=True)
+    def __mul__(self, other): return self._binary(operator.mul, '*', other)
+    def __rmul__(self, other): return self._binary(operator.mul, '*', other, swap=True)
+    def __truediv__(self, other): return self._binary(operator.truediv, '/', other)
+    def __rtruediv__(self, other): return self._binary(operator.truediv, '/', other, swap=True)
+    def __lt__(self, other): return self._binary(operator.lt, '<', other)
+    def __le__(self, other): return self._binary(operator.le, '<=', other)
+    def __gt__(self, other): return self._binary(operator.gt, '>', other)
+    def __ge__(self, other): return self._binary(operator.ge, '>=', other)
+    def __eq__(self, other): return self._binary(operator.eq, '==', other)
+    def __ne__(self, other): return self._binary(operator.ne, '!=', other)
+    def __and__(self, other): return self._binary(operator.and_, '&', other)
+    def __or__(self, other): return self._binary(operator.or_, '|', other)
+    def __invert__(self): return Not(self)
+
+
+class Column(Expr):
+    def __init__(self, name):
+        self.name = name
+        self._getter = operator.attrgetter(name)
+
+    def __call__(self, item):
+        return self._getter(item)
+
+    def evaluate(self, table, rows=None):
+        values = table.column(self.name)
+        return values if rows is None else list(map(values.__getitem__, rows))
+
+    def fields(self):
+        # 'savings' is derived from the two price columns
+        return {'actual_price', 'discounted_price'} if self.name == 'savings' else {self.name}
+
+    def __repr__(self):
+        return f"col({self.name!r})"
+
+
+class Literal(Expr):
+    def __init__(self, value):
+        self.value = value
+
+    def __call__(self, item):
+        return self.value
+
+    def evaluate(self, table, rows=None):
+        # Infinite on purpose: map() stops at the shortest input, so literals broadcast.
+        return repeat(self.value)
+
+    def fields(self):
+        return set()
+
+    def __repr__(self):
+        return repr(self.value)
+
+
+class BinaryOp(Expr):
+    def __init__(self, op, symbol, left, right):
+        self.op = op
+        self.symbol = symbol
+        self.left = left
+        self.right = right
+
+    def __call__(self, item):
+        return self.op(self.left(item), self.right(item))
+
+    def evaluate(self, table, rows=None):
+        return list(map(self.op, self.left.evaluate(table, rows), self.right.evaluate(table, rows)))
+
+    def fields(self):
+        return self.left.fields() | self.right.fields()
+
+    def restart(self):
+        self.left.restart()
+        self.right.restart()
+
+    def __repr__(self):
+        return f"({self.left!r} {self.symbol} {self.right!r})"
+
+
+class Not(Expr):
+    def __init__(self, operand):
+        self.operand = operand
+
+    def __call__(self, item):
+        return not self.operand(item)
+
+    def evaluate(self, table, rows=None):
+        return list(map(operator.not_, self.operand.evaluate(table, rows)))
+
+    def fields(self):
+        return self.operand.fields()
+
+    def restart(self):
+        self.operand.restart()
+
+    def __repr__(self):
+        return f"~{self.operand!r}"
+
+
+def col(name):
+    # Reference to a Product field, e.g. col('rating') > 4.5
+    return Column(name)
@@ -0,0 +1,52 @@
+"""
+External merge sort for Stream.sorted(run_size=...).
+
+The input is read in runs of 'run_size' items. Each run is sorted in memory and written
+to a temporary file (core/spill.py encoding), and the runs are then k-way merged back
+lazily. At most one run is in memory while sorting, and one item plus a 64 KiB read
+buffer per run while merging.
+Input that fits in a single run is sorted in memory and never touches the disk.
+
+More than _MAX_FAN_IN runs are first merged in groups into longer runs, so the number
+of open files stays bounded. The merge is stable like sorted(): runs keep input order,
+and heapq.merge prefers the earlier run on ties.
+"""
+import heapq
+from itertools import islice
+
+from sales_analysis.core.spill import SpillDirectory
+
+DEFAULT_RUN_SIZE = 100_000
+_MAX_FAN_IN = 64
+
+
+def external_sorted(source, key=None, reverse=False, run_size=DEFAULT_RUN_SIZE, directory=None):
+    """
+    Generator yielding the items of 'source' in sorted(source, key, reverse) order while
+    holding at most 'run_size' items in memory. Temporary files go to a private directory
+    (under 'directory' if given) that is removed when the generator finishes or is closed.
+    """
+    if run_size <= 0:
+        raise ValueError(f"run_size must be positive, got {run_size}.")
+    iterator = iter(source)
+    run = sorted(islice(iterator, run_size), key=key, reverse=reverse)
+    if len(run) < run_size:
+        yield from run
+        return
+
+    spill = SpillDirectory('stream-sort-', directory)
+    try:
+        runs = []
+        while run:
+            runs.append(spill.write(run))
+            run = sorted(islice(iterator, run_size), key=key, reverse=reverse)
+        del run
+
+        while len(runs) > _MAX_FAN_IN:
+            groups = [runs[start:start + _MAX_FAN_IN] for start in range(0, len(runs), _MAX_FAN_IN)]
+            runs = [spill.write(heapq.merge(*map(spill.read, group), key=key, reverse=reverse))
+                    for group in groups]
+
+        yield from heapq.merge(*map(spill.read, runs), key=key, reverse=reverse)
+    finally:
+        spill.cleanup()
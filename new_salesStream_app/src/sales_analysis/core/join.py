@@ -0,0 +1,177 @@
+"""
+Hash joins for Stream.join(other, key, how=...) (HashJoin).
+
+The build side is loaded into a hash table (key -> items) and the probe side is streamed
+past it once, so enriching N rows from a lookup dataset costs O(N + M) instead of a scan
+of the lookup data per row. The build side is the smaller input when both sizes are known
+(lists, plain Streams over lists), otherwise 'other' (the usual lookup table). A dict
+passed as 'other' already is a hash table and is probed directly.
+
+If the build side grows past 'memory_limit' bytes, the join falls back to a Grace hash
+join: both inputs are split by key hash into _PARTITIONS spill files (core/spill.py), and
+each pair of partitions is joined on its own. A partition that is still too large is
+split again with a different hash, up to _MAX_DEPTH times (beyond that a single key is
+too frequent to split, and its partition is joined in memory anyway).
+
+Results are (left, right) pairs, one per match. how='left' also yields (left, None) for
+left items without a match. When the left side is probed, results follow its order; a
+Grace join yields them partition by partition.
+"""
+from collections.abc import Mapping
+
+from sales_analysis.core.spill import SpillDirectory, approx_size
+
+JOIN_TYPES = ('inner', 'left')
+DEFAULT_MEMORY_LIMIT = 64 << 20
+_PARTITIONS = 16
+_MAX_DEPTH = 3
+
+
+def _known_size(side):
+    # Number of items if it can be known without consuming the input, else None.
+    from sales_analysis.core.stream import Stream
+    if isinstance(side, Stream):
+        return _known_size(side.source) if not side.plan else None
+    try:
+        return len(side)
+    except TypeError:
+        return None
+
+
+def _build(items, key, memory_limit):
+    # Loads items into key -> [items]. Returns (table, None) when everything fits, or
+    # (partial table, iterator over the rest) once the estimate passes memory_limit.
+    table = {}
+    used = 0
+    iterator = iter(items)
+    for item in iterator:
+        k = key(item)
+        matches = table.get(k)
+        if matches is None:
+            table[k] = [item]
+        else:
+            matches.append(item)
+        used += approx_size(item)
+        if used > memory_limit:
+            return table, iterator
+    return table, None
+
+
+def _probe(table, items, key, build_is_left, outer):
+    # Streams 'items' past the table; yields (left, right) pairs.
+    if not build_is_left:
+        for left in items:
+            matches = table.get(key(left))
+            if matches:
+                for right in matches:
+                    yield left, right
+            elif outer:
+                yield left, None
+        return
+    matched = set()
+    for right in items:
+        k = key(right)
+        matches = table.get(k)
+        if matches:
+            matched.add(k)
+            for left in matches:
+                yield left, right
+    if outer:
+        # Left items are on the build side: the unmatched ones are only known at the end.
+        for k, lefts in table.items():
+            if k not in matched:
+                for left in lefts:
+                    yield left, None
+
+
+def _partition(spill, items, key, depth):
+    # Splits items into _PARTITIONS spill files by hash of (depth, key).
+    writers = [spill.writer() for _ in range(_PARTITIONS)]
+    try:
+        for item in items:
+            writers[hash((depth, key(item))) % _PARTITIONS].write(item)
+    finally:
+        for writer in writers:
+            writer.close()
+    return [writer.path for writer in writers]
+
+
+def _grace(spill, build_items, probe_items, build_key, probe_key, build_is_left, outer,
+           memory_limit, depth):
+    build_paths = _partition(spill, build_items, build_key, depth)
+    probe_paths = _partition(spill, probe_items, probe_key, depth)
+    for build_path, probe_path in zip(build_paths, probe_paths):
+        table, rest = _build(spill.read(build_path), build_key, memory_limit)
+        if rest is not None and depth + 1 < _MAX_DEPTH:
+            overflow = _chain_table(table, rest)
+            table = None  # the partial table is only referenced by 'overflow' from here on
+            yield from _grace(spill, overflow, spill.read(probe_path), build_key, probe_key,
+                              build_is_left, outer, memory_limit, depth + 1)
+            continue
+        if rest is not None:
+            for item in rest:
+                table.setdefault(build_key(item), []).append(item)
+        yield from _probe(table, spill.read(probe_path), probe_key, build_is_left, outer)
+
+
+def _chain_table(table, rest):
+    for items in table.values():
+        yield from items
+    yield from rest
+
+
+class HashJoin:
+    """
+    Join of two iterables (or Streams) on key(left_item) == right_key(right_item)
+    (right_key defaults to key), usable as a Stream source. 'right' may also be a dict of
+    key -> value. Each iteration runs the join again, so it can be iterated as often as
+    its inputs can.
+    """
+    def __init__(self, left, right, key, right_key=None, how='inner', memory_limit=None, directory=None):
+        if how not in JOIN_TYPES:
+            raise ValueError(f"Unknown join type: {how!r} (use one of {', '.join(JOIN_TYPES)})")
+        self.left = left
+        self.right = right
+        self.key = key
+        self.right_key = key if right_key is None else right_key
+        self.how = how
+        self.memory_limit = memory_limit or DEFAULT_MEMORY_LIMIT
+        self.directory = directory
+
+    def __iter__(self):
+        return _join(self.left, self.right, self.key, self.right_key, self.how == 'left',
+                     self.memory_limit, self.directory)
+
+    def __repr__(self):
+        return f"HashJoin(how={self.how!r})"
+
+
+def _join(left, right, key, right_key, outer, memory_limit, directory):
+    if isinstance(right, Mapping):
+        missing = object()
+        for item in left:
+            match = right.get(key(item), missing)
+            if match is not missing:
+                yield item, match
+            elif outer:
+                yield item, None
+        return
+
+    left_size, right_size = _known_size(left), _known_size(right)
+    build_is_left = left_size is not None and right_size is not None and left_size < right_size
+    build, probe = (left, right) if build_is_left else (right, left)
+    build_key, probe_key = (key, right_key) if build_is_left else (right_key, key)
+
+    table, rest = _build(build, build_key, memory_limit)
+    if rest is None:
+        yield from _probe(table, probe, probe_key, build_is_left, outer)
+        return
+
+    overflow = _chain_table(table, rest)
+    table = None
+    spill = SpillDirectory('stream-join-', directory)
+    try:
+        yield from _grace(spill, overflow, probe, build_key, probe_key, build_is_left, outer,
+                          memory_limit, 0)
+    finally:
+        spill.cleanup()
@@ -0,0 +1,300 @@
+"""
+Result memoization for repeated pipelines (Stream.memoize, SharedScan(cache=...)).
+
+A ResultCache stores results under a key built from
+  * the dataset fingerprint: a source's fingerprint() (CsvSource: path, size, mtime and
+    SHA-256, hashed again only after size or mtime changed), or the content of an
+    in-memory list, computed once per run, and
+  * the pipeline: the plan operators and terminal call, with every function described
+    by its bytecode, constants, closure values, defaults and the globals it reads.
+Two separately written but identical lambdas therefore share results, while changing a
+threshold, a closure variable or the data is a miss. Sources that cannot be fingerprinted
+(generators, files being read) are never cached. Classes are keyed by name only, so
+clear() the disk tier after changing the code of a class used in a pipeline.
+
+Entries are kept serialized (lists of items in the compact spill encoding of
+core/spill.py, other values pickled), so the memory tier is capped by exact byte counts,
+a hit never shares mutable objects with an earlier caller, and the optional disk tier
+stores the very same bytes. Both tiers evict the least recently used entries.
+"""
+import hashlib
+import io
+import os
+import pickle
+import threading
+from collections import OrderedDict, namedtuple
+from types import BuiltinFunctionType, CodeType, FunctionType, MethodType, ModuleType
+
+from sales_analysis.core.expressions import Expr
+from sales_analysis.core.spill import encode, read_records
+
+DEFAULT_MAX_BYTES = 64 << 20
+_LIST = b'L'
+_VALUE = b'V'
+_PRIMITIVES = (type(None), bool, int, float, complex, str, bytes)
+_UNKNOWN = object()
+
+
+class _Unkeyable(Exception):
+    pass
+
+
+def _key(value, seen):
+    # Nested tuple describing 'value' by content; raises _Unkeyable when it cannot.
+    if isinstance(value, _PRIMITIVES):
+        return type(value).__name__, value  # 1, 1.0 and True stay distinct
+    if isinstance(value, (tuple, list)):
+        return type(value).__name__, tuple(_key(item, seen) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return 'set', tuple(sorted((_key(item, seen) for item in value), key=repr))
+    if isinstance(value, dict):
+        return 'dict', tuple(sorted(((_key(k, seen), _key(v, seen)) for k, v in value.items()), key=repr))
+    if isinstance(value, Expr):
+        return 'expr', repr(value)
+    if isinstance(value, ModuleType):
+        return 'module', value.__name__
+    if isinstance(value, type):
+        return 'class', value.__module__, value.__qualname__
+    if isinstance(value, CodeType):
+        return ('code', value.co_code, value.co_argcount, value.co_kwonlyargcount, value.co_flags,
+                value.co_names, value.co_varnames, value.co_freevars,
+                tuple(_key(const, seen) for const in value.co_consts))
+    if id(value) in seen:
+        return 'cycle', getattr(value, '__qualname__', type(value).__qualname__)
+    seen.add(id(value))
+    if isinstance(value, FunctionType):
+        return ('function', _key(value.__code__, seen), _key(value.__defaults__, seen),
+                _key(value.__kwdefaults__, seen),
+                tuple(_key(cell.cell_contents, seen) for cell in value.__closure__ or ()),
+                tuple((name, _key(value.__globals__[name], seen))
+                      for name in sorted(_global_names(value.__code__)) if name in value.__globals__))
+    if isinstance(value, MethodType):
+        return 'method', _key(value.__func__, seen), _key(value.__self__, seen)
+    if isinstance(value, BuiltinFunctionType) or type(value).__name__ in ('method_descriptor', 'wrapper_descriptor'):
+        owner = getattr(value, '__self__', None)
+        if owner is not None and not isinstance(owner, (ModuleType, type)):
+            return 'builtin', value.__qualname__, _key(owner, seen)
+        return 'builtin', getattr(value, '__module__', None), value.__qualname__
+    if type(value).__module__ in ('operator', 'functools'):
+        # itemgetter/attrgetter/methodcaller print their arguments; partial its parts.
+        if hasattr(value, 'func'):
+            return 'partial', _key(value.func, seen), _key(value.args, seen), _key(value.keywords, seen)
+        return 'operator', repr(value)
+    # Plain objects (aggregators, plan operators): their class and attribute values.
+    attributes = dict(getattr(value, '__dict__', {}))
+    for cls in type(value).__mro__:
+        for name in getattr(cls, '__slots__', ()):
+            if hasattr(value, name):
+                attributes[name] = getattr(value, name)
+    if attributes:
+        return 'object', _key(type(value), seen), _key(attributes, seen)
+    text = repr(value)
+    if type(value).__repr__ is object.__repr__ or ' at 0x' in text:
+        raise _Unkeyable(type(value).__qualname__)  # only identifies the object, not its content
+    return 'repr', _key(type(value), seen), text  # e.g. datetime, Decimal
+
+
+def _global_names(code):
+    # Names a function (and the functions nested in it) may look up in its globals.
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, CodeType):
+            names |= _global_names(const)
+    return names
+
+
+def _digest(parts):
+    return hashlib.blake2b(repr(parts).encode('utf-8', 'surrogatepass'), digest_size=16).hexdigest()
+
+
+def source_key(source):
+    """Content identity of a pipeline source, or None if it cannot be fingerprinted."""
+    from sales_analysis.core.stream import Stream
+    if isinstance(source, Stream):
+        inner = source_key(source.source)
+        return None if inner is None else ('stream', inner, plan_key(source.plan))
+    fingerprint = getattr(source, 'fingerprint', None)
+    if callable(fingerprint):
+        return 'source', type(source).__qualname__, repr(fingerprint())
+    if isinstance(source, (list, tuple)):
+        digest = hashlib.blake2b(digest_size=16)
+        for item in source:
+            digest.update(encode(item))
+        return 'items', len(source), digest.hexdigest()
+    return None
+
+
+def plan_key(ops):
+    # Memoize points do not change a pipeline's result (and their caches are not part of
+    # it), so they are left out.
+    from sales_analysis.core.plan import Memoize
+    return tuple(_key(op, set()) for op in ops if not isinstance(op, Memoize))
+
+
+def _dump(value):
+    if type(value) is list:
+        return _LIST + b''.join(map(encode, value))
+    return _VALUE + pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+
+def _load(data):
+    if data[:1] == _LIST:
+        return list(read_records(io.BytesIO(memoryview(data)[1:])))
+    return pickle.loads(memoryview(data)[1:])
+
+
+class CacheStats(namedtuple('CacheStats', 'hits misses disk_hits evictions uncacheable entries bytes')):
+    """Counters of a ResultCache; 'hits' includes the 'disk_hits' promoted from disk."""
+    __slots__ = ()
+
+    def __str__(self):
+        return (f"{self.hits} hits ({self.disk_hits} from disk), {self.misses} misses, "
+                f"{self.evictions} evictions, {self.entries} entries / {self.bytes / 2 ** 20:.1f} MiB")
+
+
+class ResultCache:
+    """
+    LRU cache of pipeline results: at most 'max_bytes' of serialized results in memory
+    and, with 'directory', a disk tier that survives the process (capped by
+    'max_disk_bytes' if given). Safe to share between threads (SharedScan pipelines).
+    """
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, directory=None, max_disk_bytes=None):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.disk_hits = self.evictions = self.uncacheable = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def key(self, source, plan=(), *parts, identity=_UNKNOWN):
+        """
+        Key for the result of the Stream operators 'plan' plus any further 'parts' (a
+        terminal call, a pipeline function) over 'source', or None if uncacheable.
+        Callers computing several keys over one source pass its source_key() as 'identity'.
+        """
+        if identity is _UNKNOWN:
+            identity = source_key(source)
+        if identity is None:
+            return None
+        try:
+            return _digest((identity, plan_key(plan), tuple(_key(part, set()) for part in parts)))
+        except _Unkeyable:
+            return None
+
+    def get(self, key):
+        # (True, value) on a hit, (False, None) on a miss. A disk hit moves into memory.
+        if key is None:
+            with self._lock:
+                self.uncacheable += 1
+            return False, None
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                data = self._read_disk(key)
+                if data is None:
+                    self.misses += 1
+                    return False, None
+                self.hits += 1
+                self.disk_hits += 1
+                self._remember(key, data)
+        return True, _load(data)
+
+    def put(self, key, value):
+        if key is None:
+            return
+        try:
+            data = _dump(value)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            with self._lock:
+                self.uncacheable += 1
+            return
+        with self._lock:
+            self._remember(key, data)
+            if self.directory is not None:
+                self._write_disk(key, data)
+
+    def compute(self, key, function):
+        """Returns the stored result for 'key', or runs function() and stores its result."""
+        found, value = self.get(key)
+        if not found:
+            value = function()
+            self.put(key, value)
+        return value
+
+    def stats(self):
+        with self._lock:
+            return CacheStats(self.hits, self.misses, self.disk_hits, self.evictions,
+                              self.uncacheable, len(self._entries), self._bytes)
+
+    def clear(self):
+        # Drops every entry from both tiers (the counters are kept).
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            for path, _ in self._disk_files():
+                os.remove(path)
+
+    def _remember(self, key, data):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= len(old)
+        if len(data) > self.max_bytes:
+            return  # larger than the whole memory tier: disk only
+        self._entries[key] = data
+        self._bytes += len(data)
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            self.evictions += 1
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.result')
+
+    def _read_disk(self, key):
+        if self.directory is None:
+            return None
+        try:
+            with open(self._path(key), 'rb') as f:
+                data = f.read()
+            os.utime(self._path(key))  # recently used: evicted last
+        except OSError:
+            return None
+        return data
+
+    def _write_disk(self, key, data):
+        temp = self._path(key) + '.tmp'
+        try:
+            with open(temp, 'wb') as f:
+                f.write(data)
+            os.replace(temp, self._path(key))
+        except OSError as error:
+            print(f"WARNING: Could not write result cache entry to {self.directory}: {error}")
+            return
+        if self.max_disk_bytes is None:
+            return
+        files = sorted(self._disk_files(), key=lambda entry: entry[1].st_mtime_ns)
+        used = sum(stat.st_size for _, stat in files)
+        for path, stat in files:
+            if used <= self.max_disk_bytes:
+                break
+            os.remove(path)
+            used -= stat.st_size
+            self.evictions += 1
+
+    def _disk_files(self):
+        if self.directory is None:
+            return []
+        return [(entry.path, entry.stat()) for entry in os.scandir(self.directory)
+                if entry.name.endswith('.result')]
+
+    def __repr__(self):
+        tiers = f"max_bytes={self.max_bytes}"
+        if self.directory is not None:
+            tiers += f", directory={self.directory!r}"
+        return f"ResultCache({tiers})"
@@ -5,7 +5,12 @@ class Product:
     """
     Immutable data structure representing a single product in the sales stream.
     Frozen to ensure data integrity during stream processing (functional style).
+    Declares __slots__, so instances carry no per-object __dict__ (pipelines such as
+    group_by, sorted and collect can keep millions of them alive).
     """
+    __slots__ = ('name', 'category', 'discounted_price', 'actual_price',
+                 'discount_percentage', 'rating', 'rating_count')
+
     name: str
     category: str
     discounted_price: float
@@ -17,4 +22,10 @@ class Product:
     @property
     def savings(self) -> float:
         # Calculated property to derive the absolute monetary value saved
-        return self.actual_price - self.discounted_price
\ No newline at end of file
+        return self.actual_price - self.discounted_price
+
+    def __reduce__(self):
+        # Frozen slotted instances cannot be restored attribute by attribute, so pickle
+        # (used by the process-parallel paths) rebuilds them through the constructor.
+        return (Product, (self.name, self.category, self.discounted_price, self.actual_price,
+                          self.discount_percentage, self.rating, self.rating_count))
\ No newline at end of file
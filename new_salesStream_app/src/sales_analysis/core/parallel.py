@@ -0,0 +1,204 @@
+import multiprocessing
+import os
+import pickle
+import sys
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import reduce as functional_reduce
+from itertools import count, islice
+
+from sales_analysis.core import plan as logical
+from sales_analysis.core.stream import Stream
+
+# Pipelines handed to forked worker processes. Registering the pipeline *before* the
+# pool forks lets workers inherit it, so plain lambdas work without being pickled.
+_PIPELINES = {}
+_pipeline_ids = count()
+
+
+def _fork_context():
+    # 'fork' is what makes lambdas usable in workers. It is only used while this is the
+    # process's one thread: a child forked while another thread (e.g. a SharedScan branch)
+    # holds a lock inherits the lock held and can deadlock on it. macOS offers fork too,
+    # but its system frameworks are not fork-safe (CPython defaults to spawn there).
+    if (sys.platform != 'darwin' and threading.active_count() == 1
+            and 'fork' in multiprocessing.get_all_start_methods()):
+        return multiprocessing.get_context('fork')
+    return None
+
+
+def _picklable(pipeline):
+    try:
+        pickle.dumps(pipeline)
+    except (pickle.PicklingError, AttributeError, TypeError):
+        return False
+    return True
+
+
+def _run_partition(pipeline, items):
+    # Executes the fused chain plus the partial terminal operation for one partition.
+    if not isinstance(pipeline, tuple):
+        pipeline = _PIPELINES[pipeline]
+    ops, terminal, args = pipeline
+    # The map/filter chain runs as one generated loop (see core/plan.py).
+    items = logical.fuse(ops)(items)
+
+    if terminal == 'reduce':
+        func, initial = args
+        return functional_reduce(func, items, initial)
+    if terminal == 'group_by':
+        key_func, agg = args
+        if agg is None:
+            return Stream(items).group_by(key_func)
+        aggregators = list(agg.values())
+        states = {}
+        for item in items:
+            key = key_func(item)
+            group = states.get(key)
+            if group is None:
+                group = states[key] = [aggregator.initial() for aggregator in aggregators]
+            for index, aggregator in enumerate(aggregators):
+                group[index] = aggregator.add(group[index], aggregator.extract(item))
+        return states
+    if terminal == 'distinct':
+        (key_func,) = args
+        seen = {}
+        for item in items:
+            key = key_func(item)
+            if key not in seen:
+                seen[key] = item
+        return list(seen.items())
+    return list(items)  # collect
+
+
+class ParallelStream:
+    """
+    Data-parallel execution of a Stream pipeline.
+
+    The source is cut into partitions of 'partition_size' items. Each partition runs the
+    fused map/filter chain and a *partial* terminal operation in a worker (process or
+    thread pool); the partial results are then merged in partition order:
+      * reduce   -> partials are folded with an associative 'combine' function,
+      * group_by -> per-key lists are concatenated, or aggregator states merged,
+      * distinct -> the first occurrence of each key across partitions wins,
+      * collect  -> partition lists are concatenated.
+    At most 2 * workers partitions are in flight, so memory stays bounded.
+
+    The process backend forks its workers so they inherit lambdas. Where fork is
+    unavailable (Windows) or unsafe (macOS, or other threads are running), workers
+    are spawned and the pipeline is pickled instead, which needs module-level functions;
+    a pipeline that cannot be pickled then runs its partitions serially in this process.
+    """
+    def __init__(self, source, workers=None, backend='process', partition_size=4096, ops=()):
+        if backend not in ('process', 'thread'):
+            raise ValueError(f"Unknown parallel backend: {backend!r} (use 'process' or 'thread')")
+        self.source = source
+        self.workers = workers or os.cpu_count() or 1
+        self.backend = backend
+        self.partition_size = partition_size
+        self.ops = tuple(ops)
+
+    def _with(self, op):
+        return ParallelStream(self.source, self.workers, self.backend, self.partition_size,
+                              self.ops + (op,))
+
+    def map(self, func):
+        return self._with(logical.Map(func))
+
+    def filter(self, predicate):
+        return self._with(logical.Filter(predicate))
+
+    def _partials(self, terminal, *args):
+        # Yields the partial result of every partition, in source order.
+        pipeline = (self.ops, terminal, args)
+        context = _fork_context() if self.backend == 'process' else None
+        token = None
+        if context is not None:
+            token = next(_pipeline_ids)
+            _PIPELINES[token] = pipeline
+        elif self.backend == 'process':
+            if not _picklable(pipeline):
+                print("WARNING: Pipeline functions cannot be pickled for spawned workers; "
+                      "running the partitions serially.")
+                yield from self._serial_partials(pipeline)
+                return
+            context = multiprocessing.get_context('spawn')
+
+        if self.backend == 'thread':
+            executor = ThreadPoolExecutor(max_workers=self.workers)
+        else:
+            executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+
+        task = token if token is not None else pipeline
+        iterator = iter(self.source)
+        try:
+            with executor:
+                in_flight = deque()
+                while True:
+                    while len(in_flight) < 2 * self.workers:
+                        partition = list(islice(iterator, self.partition_size))
+                        if not partition:
+                            break
+                        in_flight.append(executor.submit(_run_partition, task, partition))
+                    if not in_flight:
+                        return
+                    yield in_flight.popleft().result()
+        finally:
+            _PIPELINES.pop(token, None)
+
+    def _serial_partials(self, pipeline):
+        iterator = iter(self.source)
+        while True:
+            partition = list(islice(iterator, self.partition_size))
+            if not partition:
+                return
+            yield _run_partition(pipeline, partition)
+
+    def reduce(self, func, initial, combine=None):
+        # 'initial' is used as the starting value of every partition, so it must be the
+        # identity of 'combine' (e.g. 0.0 for addition). 'combine' merges two partial
+        # results and defaults to 'func' (valid when func is associative, like acc + x).
+        combine = combine or func
+        return functional_reduce(combine, self._partials('reduce', func, initial), initial)
+
+    def group_by(self, key_func, agg=None, combine=None):
+        # Same results as Stream.group_by. Without 'agg', 'combine' merges two partial
+        # group values (defaults to list concatenation, preserving source order).
+        if agg is None:
+            combine = combine or (lambda left, right: left + right)
+            groups = {}
+            for partial in self._partials('group_by', key_func, None):
+                for key, items in partial.items():
+                    groups[key] = combine(groups[key], items) if key in groups else items
+            return groups
+
+        aggregators = list(agg.items())
+        states = {}
+        for partial in self._partials('group_by', key_func, agg):
+            for key, group in partial.items():
+                if key not in states:
+                    states[key] = group
+                else:
+                    states[key] = [aggregator.merge(left, right) for (_, aggregator), left, right
+                                   in zip(aggregators, states[key], group)]
+        return {
+            key: {name: aggregator.result(group[index])
+                  for index, (name, aggregator) in enumerate(aggregators)}
+            for key, group in states.items()
+        }
+
+    def distinct(self, key_func):
+        # Keys are deduplicated per partition in the workers, then across partitions here.
+        # Returns a regular (sequential) Stream so the pipeline can continue.
+        def generator():
+            seen = set()
+            for partial in self._partials('distinct', key_func):
+                for key, item in partial:
+                    if key not in seen:
+                        seen.add(key)
+                        yield item
+        return Stream(generator())
+
+    def collect(self):
+        return [item for partial in self._partials('collect') for item in partial]
@@ -0,0 +1,470 @@
+"""
+Logical query plans for Stream pipelines.
+
+Stream.map/filter/distinct/sorted/limit/top_k/reservoir no longer wrap the previous generator in a
+new one; they append an operator to a plan. When a terminal operation runs, the plan is
+  1. optimized:
+       * a filter directly after sorted() is moved in front of it (filtering commutes
+         with a stable sort, and the sort then has fewer items to hold),
+       * adjacent filters are merged into one predicate list,
+       * sorted() [+ distinct()] + limit(k) becomes a bounded top_k(k),
+       * consecutive limits collapse to the smallest one;
+  2. split into segments at the stateful barriers (sorted, top_k, reservoir, memoize);
+  3. pushed down: when the source can scan a subset of fields (ingestion.loader.CsvSource),
+     only the fields the pipeline reads are parsed, and leading col() comparison filters
+     are evaluated by the loader before a Product is ever built;
+  4. compiled: each segment of streaming operators (map, filter, distinct, limit) plus
+     the terminal sink is generated as ONE Python loop, so a row costs one loop
+     iteration instead of one generator resume per stage.
+
+Map -> filter reordering is intentionally not attempted: map functions are opaque
+lambdas, so a later filter cannot be proven independent of what the map produced.
+"""
+import dis
+import os
+from functools import lru_cache
+from types import FunctionType
+
+from sales_analysis.core.expressions import Expr
+from sales_analysis.core.table import PRODUCT_FIELDS
+
+# Derived Product properties and the stored fields they read.
+DERIVED_FIELDS = {'savings': {'actual_price', 'discounted_price'}}
+
+
+class Operator:
+    __slots__ = ()
+    # Streaming operators run inside a fused loop; barriers must see all their input.
+    barrier = False
+
+    def describe(self):
+        raise NotImplementedError
+
+
+class Map(Operator):
+    __slots__ = ('func',)
+
+    def __init__(self, func):
+        self.func = func
+
+    def describe(self):
+        return f"map({describe_callable(self.func)})"
+
+
+class Filter(Operator):
+    __slots__ = ('predicates',)
+
+    def __init__(self, *predicates):
+        self.predicates = predicates
+
+    def describe(self):
+        return "filter(" + " and ".join(map(describe_callable, self.predicates)) + ")"
+
+
+class Distinct(Operator):
+    __slots__ = ('key', 'method', 'options', 'report')
+
+    def __init__(self, key, method='exact', report=None, **options):
+        self.key = key
+        self.method = method
+        self.options = options
+        self.report = report
+
+    @property
+    def tracked(self):
+        # The plain set is inlined into the fused loop; other strategies (and reporting,
+        # to a callback or to the log) go through a seen-set object from core/distinct.py.
+        from sales_analysis.core.distinct import reporting_enabled
+        return self.method != 'exact' or self.report is not None or reporting_enabled()
+
+    def new_seen(self):
+        from sales_analysis.core.distinct import log_report, seen_set
+        return _ReportingSeen(seen_set(self.method, **self.options), self.report or log_report)
+
+    def describe(self):
+        if self.method != 'exact':
+            return f"distinct({describe_callable(self.key)}, method={self.method})"
+        return f"distinct({describe_callable(self.key)})"
+
+
+class _ReportingSeen:
+    # Closes a seen-set at the end of a run and hands its report to the callback (the
+    # log by default).
+    __slots__ = ('seen', 'add', 'callback')
+
+    def __init__(self, seen, callback):
+        self.seen = seen
+        self.add = seen.add
+        self.callback = callback
+
+    def close(self):
+        report = self.seen.report()
+        self.seen.close()
+        self.callback(report)
+
+
+class Limit(Operator):
+    __slots__ = ('count',)
+
+    def __init__(self, count):
+        self.count = count
+
+    def describe(self):
+        return f"limit({self.count})"
+
+
+class Sorted(Operator):
+    __slots__ = ('key', 'reverse', 'run_size', 'directory')
+    barrier = True
+
+    def __init__(self, key=None, reverse=False, run_size=None, directory=None):
+        self.key = key
+        self.reverse = reverse
+        # run_size=None sorts in memory; otherwise an external merge sort (external_sort.py).
+        self.run_size = run_size
+        self.directory = directory
+
+    def describe(self):
+        text = f"sorted(key={describe_callable(self.key)}, reverse={self.reverse}"
+        if self.run_size is not None:
+            text += f", external run_size={self.run_size}"
+        return text + ")"
+
+
+class TopK(Operator):
+    __slots__ = ('k', 'key', 'reverse', 'distinct_key')
+    barrier = True
+
+    def __init__(self, k, key=None, reverse=False, distinct_key=None):
+        self.k = k
+        self.key = key
+        self.reverse = reverse
+        self.distinct_key = distinct_key
+
+    def describe(self):
+        text = f"top_k({self.k}, key={describe_callable(self.key)}, reverse={self.reverse}"
+        if self.distinct_key is not None:
+            text += f", distinct_key={describe_callable(self.distinct_key)}"
+        return text + ")"
+
+
+class Reservoir(Operator):
+    # Uniform random sample of 'size' items (core/approximate.reservoir_sample).
+    __slots__ = ('size', 'seed')
+    barrier = True
+
+    def __init__(self, size, seed=None):
+        self.size = size
+        self.seed = seed
+
+    def describe(self):
+        return f"reservoir({self.size}, seed={self.seed!r})"
+
+
+class Memoize(Operator):
+    # Materializes its input and stores it in a ResultCache (core/memo.py) under the
+    # source fingerprint and the plan so far; a later run of the same prefix starts here.
+    __slots__ = ('cache',)
+    barrier = True
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def describe(self):
+        return f"memoize({self.cache!r})"
+
+
+def describe_callable(func):
+    # Short, readable label for a user function: expressions print themselves, lambdas
+    # show where they were defined.
+    if func is None:
+        return "None"
+    code = getattr(func, '__code__', None)
+    name = getattr(func, '__name__', None)
+    if code is not None and name == '<lambda>':
+        return f"lambda@{os.path.basename(code.co_filename)}:{code.co_firstlineno}"
+    return name or repr(func)
+
+
+def optimize(plan):
+    """Applies the rewrite rules above until the plan stops changing."""
+    ops = list(plan)
+    changed = True
+    while changed:
+        changed = False
+        for index in range(len(ops) - 1):
+            current, following = ops[index], ops[index + 1]
+            if isinstance(current, Sorted) and isinstance(following, Filter):
+                ops[index], ops[index + 1] = following, current
+            elif isinstance(current, Filter) and isinstance(following, Filter):
+                ops[index:index + 2] = [Filter(*current.predicates, *following.predicates)]
+            elif isinstance(current, Limit) and isinstance(following, Limit):
+                ops[index:index + 2] = [Limit(min(current.count, following.count))]
+            elif isinstance(current, TopK) and isinstance(following, Limit):
+                ops[index:index + 2] = [TopK(min(current.k, following.count), current.key,
+                                             current.reverse, current.distinct_key)]
+            elif isinstance(current, Sorted) and isinstance(following, Limit):
+                ops[index:index + 2] = [TopK(following.count, current.key, current.reverse)]
+            elif (isinstance(current, Sorted) and isinstance(following, Distinct)
+                    and following.report is None  # top_k's own dedup is exact and bounded
+                    and index + 2 < len(ops) and isinstance(ops[index + 2], Limit)):
+                ops[index:index + 3] = [TopK(ops[index + 2].count, current.key,
+                                             current.reverse, following.key)]
+            else:
+                continue
+            changed = True
+            break
+    return ops
+
+
+# Opcodes pushing exactly one local variable (3.14 adds the borrowed-reference variant).
+_PLAIN_LOADS = ('LOAD_FAST', 'LOAD_FAST_BORROW')
+
+
+def _uses_local(instruction, name):
+    # True if the instruction reads, writes or deletes the local variable 'name', alone
+    # or as part of a superinstruction naming several locals.
+    if instruction.opcode not in dis.haslocal and 'FAST' not in instruction.opname:
+        return False
+    argval = instruction.argval
+    return argval == name or (isinstance(argval, tuple) and name in argval)
+
+
+def referenced_fields(func, argument=0):
+    """
+    Product fields read by 'func' when a Product is passed as its positional 'argument'.
+    Accepts field names, col() expressions, aggregator fields and plain functions. Returns
+    None (meaning "all fields") when that cannot be proven: for builtins and other opaque
+    callables, and for functions that let the Product escape (return it, pass it on, ...)
+    instead of only reading known attributes from it.
+    """
+    if func is None:
+        return set()
+    if isinstance(func, str):
+        if func in DERIVED_FIELDS:
+            return set(DERIVED_FIELDS[func])
+        return {func} if func in PRODUCT_FIELDS else None
+    if isinstance(func, Expr):
+        return func.fields()
+    if not isinstance(func, FunctionType):
+        return None
+
+    code = func.__code__
+    if argument >= code.co_argcount:
+        return None
+    name = code.co_varnames[argument]
+    if name in code.co_cellvars:
+        return None  # captured by a nested function, so it may be used anywhere
+
+    fields = set()
+    instructions = list(dis.get_instructions(code))
+    for instruction, following in zip(instructions, instructions[1:] + [None]):
+        if not _uses_local(instruction, name):
+            continue
+        # The argument may only ever be used as 'argument.<field>'. Any other instruction
+        # touching it (a store, or a combined load such as 3.13's LOAD_FAST_LOAD_FAST)
+        # cannot be followed, so every field is assumed to be needed.
+        if instruction.opname not in _PLAIN_LOADS:
+            return None
+        if following is None or following.opname not in ('LOAD_ATTR', 'LOAD_METHOD'):
+            return None
+        attribute = following.argval
+        if attribute in DERIVED_FIELDS:
+            fields |= DERIVED_FIELDS[attribute]
+        elif attribute in PRODUCT_FIELDS:
+            fields.add(attribute)
+        else:
+            return None
+    return fields
+
+
+def _consumer_fields(ops):
+    # Yields (callable, product argument index) for everything in 'ops' that reads items.
+    for op in ops:
+        if isinstance(op, Map):
+            yield op.func, 0
+        elif isinstance(op, Filter):
+            for predicate in op.predicates:
+                yield predicate, 0
+        elif isinstance(op, Distinct):
+            yield op.key, 0
+        elif isinstance(op, (Sorted, TopK)):
+            yield op.key, 0
+            if isinstance(op, TopK):
+                yield op.distinct_key, 0
+
+
+def restart(ops):
+    # Resets the stateful col() expressions of 'ops' (see Expr.restart) before a run.
+    for op in ops:
+        for func in getattr(op, 'predicates', ()) + (getattr(op, 'func', None),):
+            if isinstance(func, Expr):
+                func.restart()
+
+
+def pushdown(ops, consumers=(), escapes=True):
+    """
+    Splits an optimized plan for a scan-capable source. Returns (fields, predicates, ops):
+      * fields     - the Product fields the pipeline reads (None = all of them),
+      * predicates - col() expressions of the leading filter, to be evaluated by the source,
+      * ops        - the remaining plan.
+    'consumers' are the (callable, argument) pairs of the terminal operation that see the
+    items (group_by keys, aggregator fields, reduce functions); 'escapes' is True when the
+    items are handed back to the caller (collect, iteration).
+    """
+    ops = list(ops)
+    predicates = []
+    if ops and isinstance(ops[0], Filter):
+        predicates = [p for p in ops[0].predicates if isinstance(p, Expr)]
+        rest = [p for p in ops[0].predicates if not isinstance(p, Expr)]
+        ops[0:1] = [Filter(*rest)] if rest else []
+
+    # Items are Products until the first map; a map that only reads fields turns them
+    # into something else, so later operators cannot touch the Product any more.
+    first_map = next((i for i, op in enumerate(ops) if isinstance(op, (Map, Memoize))), None)
+    if first_map is not None and isinstance(ops[first_map], Memoize):
+        # Memoized items are reused by other pipelines, which may read any field.
+        return None, predicates, ops
+    seen = list(_consumer_fields(ops if first_map is None else ops[:first_map + 1]))
+    if first_map is None:
+        seen += list(consumers)
+    else:
+        escapes = False
+
+    fields = set()
+    for func, argument in seen:
+        used = referenced_fields(func, argument)
+        if used is None:
+            return None, predicates, ops
+        fields |= used
+    if escapes:
+        return None, predicates, ops
+    return fields, predicates, ops
+
+
+def segments(ops):
+    """
+    Splits an optimized plan into (streaming_ops, barrier) pairs; the last pair's
+    barrier is None. Each streaming_ops list becomes one fused loop.
+    """
+    result = []
+    pending = []
+    for op in ops:
+        if op.barrier:
+            result.append((pending, op))
+            pending = []
+        else:
+            pending.append(op)
+    result.append((pending, None))
+    return result
+
+
+# --- Code generation ---
+
+_SINKS = {
+    # sink name: (extra parameters, setup lines, per-item line, final line)
+    'yield': ((), (), "yield item", None),
+    'collect': ((), ("out = []", "append = out.append"), "append(item)", "return out"),
+    'reduce': (("func", "acc"), (), "acc = func(acc, item)", "return acc"),
+}
+
+
+@lru_cache(maxsize=256)
+def _compile(shape, sink):
+    # Generates and compiles the fused loop for a plan 'shape' such as
+    # (('map',), ('filter', 2), ('distinct',), ('limit',)). The code only depends on the
+    # shape, so it is cached; the actual functions are bound through the factory.
+    params, setup, emit, final = _SINKS[sink]
+    factory_args = []
+    body = []
+    prelude = list(setup)
+    exhausted = []
+    cleanup = []
+    for index, (kind, *extra) in enumerate(shape):
+        if kind == 'map':
+            factory_args.append(f"map_{index}")
+            body.append(f"item = map_{index}(item)")
+        elif kind == 'filter':
+            names = [f"pred_{index}_{n}" for n in range(extra[0])]
+            factory_args.extend(names)
+            condition = " and ".join(f"{name}(item)" for name in names)
+            body.append(f"if not ({condition}): continue")
+        elif kind == 'distinct' and extra:
+            # Seen-set object (spill / bloom / reporting): add() returns True for new keys,
+            # close() runs when the loop ends, however it ends.
+            factory_args.extend((f"key_{index}", f"new_seen_{index}"))
+            prelude.append(f"seen_{index} = new_seen_{index}()")
+            prelude.append(f"seen_add_{index} = seen_{index}.add")
+            body.append(f"if not seen_add_{index}(key_{index}(item)): continue")
+            cleanup.append(f"seen_{index}.close()")
+        elif kind == 'distinct':
+            factory_args.append(f"key_{index}")
+            prelude.append(f"seen_{index} = set()")
+            prelude.append(f"seen_add_{index} = seen_{index}.add")
+            body.append(f"key = key_{index}(item)")
+            body.append(f"if key in seen_{index}: continue")
+            body.append(f"seen_add_{index}(key)")
+        elif kind == 'limit':
+            factory_args.append(f"limit_{index}")
+            prelude.append(f"taken_{index} = 0")
+            body.append(f"if taken_{index} >= limit_{index}: break")
+            body.append(f"taken_{index} += 1")
+            exhausted.append(f"taken_{index} >= limit_{index}")
+    body.append(emit)
+    if exhausted:
+        # Stop right after the last allowed item instead of reading one more.
+        body.append(f"if {' or '.join(exhausted)}: break")
+
+    lines = [f"def factory({', '.join(factory_args)}):",
+             f"    def run({', '.join(('source',) + params)}):"]
+    lines += [f"        {line}" for line in prelude]
+    loop = ["for item in source:"] + [f"    {line}" for line in body]
+    if final:
+        loop.append(final)
+    if cleanup:
+        loop = ["try:"] + [f"    {line}" for line in loop] + ["finally:"] + [f"    {line}" for line in cleanup]
+    lines += [f"        {line}" for line in loop]
+    lines.append("    return run")
+    source = "\n".join(lines)
+
+    namespace = {}
+    exec(compile(source, "<stream-plan>", "exec"), namespace)
+    return namespace['factory'], source
+
+
+def _shape_and_args(ops):
+    shape = []
+    args = []
+    for op in ops:
+        if isinstance(op, Map):
+            shape.append(('map',))
+            args.append(op.func)
+        elif isinstance(op, Filter):
+            shape.append(('filter', len(op.predicates)))
+            args.extend(op.predicates)
+        elif isinstance(op, Distinct) and op.tracked:
+            shape.append(('distinct', 'tracked'))
+            args.extend((op.key, op.new_seen))
+        elif isinstance(op, Distinct):
+            shape.append(('distinct',))
+            args.append(op.key)
+        elif isinstance(op, Limit):
+            shape.append(('limit',))
+            args.append(op.count)
+    return tuple(shape), args
+
+
+def fuse(ops, sink='yield'):
+    """
+    Returns a function running the streaming operators 'ops' and the given sink in a
+    single loop: run(source) for 'yield'/'collect', run(source, func, acc) for 'reduce'.
+    """
+    shape, args = _shape_and_args(ops)
+    factory, _ = _compile(shape, sink)
+    return factory(*args)
+
+
+def generated_source(ops, sink='yield'):
+    # The Python code of the fused loop, for explain().
+    shape, _ = _shape_and_args(ops)
+    return _compile(shape, sink)[1]
@@ -0,0 +1,323 @@
+"""
+Per-operator profiling for Stream pipelines (Stream(source, profile=True)).
+
+A profiled run executes the optimized plan unfused: every operator runs as its own
+single-operator loop, and a counting wrapper sits after the source and after each stage.
+A wrapper adds up the wall and CPU time spent inside the next() calls it forwards, so a
+stage's own time is its wrapper's time minus the time of the wrapper below it (the sink's
+is the rest of the run). Per stage the profile records:
+  * rows in and rows out,
+  * wall time and CPU time (thread time, so SharedScan pipelines are measured apart),
+  * with memory=True, the peak of traced memory (tracemalloc) above the level at which
+    the stage was entered, e.g. what a sorted() holds. Like the wrapper times this
+    includes the stages below, so a stage pulling from a sort shows the sort's peak.
+A CsvSource also reports the time spent in the csv module separately from the cleaning
+and pushed-down filters. Timings include the profiler's own overhead, and tracemalloc
+slows allocations down, so compare stages with each other rather than with an
+unprofiled run (Profiler(memory=False) gives closer timings).
+
+Each stage is a Span. Hooks get on_start(span) before the run and on_end(span) after it;
+plain callables are called on_end only, and OpenTelemetryHook forwards spans to an
+OpenTelemetry tracer. The finished root span goes to 'report' (print by default, which
+prints the per-stage breakdown).
+
+Profiling is opt-in per Stream. Without it a terminal operation only checks one
+attribute and runs the usual fused loops.
+"""
+import tracemalloc
+from time import perf_counter_ns, thread_time_ns
+
+from sales_analysis.core import plan as logical
+
+# tracemalloc.reset_peak() is new in Python 3.9; without it, peaks are derived from the
+# whole-trace peak (see Profiler._checkpoint).
+_RESET_PEAK = getattr(tracemalloc, 'reset_peak', None)
+
+_SINK_NAMES = {'yield': 'iteration', 'collect': 'collect()', 'reduce': 'reduce()'}
+_NAME_WIDTH = 44
+
+
+class Span:
+    """
+    Counters of one profiled stage. 'wall_ns'/'cpu_ns' are the time spent inside the
+    stage and everything below it; 'self_wall_ns'/'self_cpu_ns' (set when the run ends)
+    are the stage's own share. 'children' are details, e.g. CSV parsing in the source.
+    """
+    def __init__(self, name, kind, parent=None, profiler=None):
+        self.name = name
+        self.kind = kind  # 'run', 'source', 'operator', 'sink' or 'detail'
+        self.parent = parent
+        self.profiler = parent.profiler if profiler is None else profiler
+        self.children = []
+        self.rows_in = None
+        self.rows_out = 0
+        self.wall_ns = 0
+        self.cpu_ns = 0
+        self.self_wall_ns = 0
+        self.self_cpu_ns = 0
+        self.peak_bytes = None
+        if parent is not None:
+            parent.children.append(self)
+
+    def child(self, name, kind='detail'):
+        return Span(name, kind, self)
+
+    def timed(self, iterable, name, size=None):
+        # Iterator over 'iterable' whose next() calls are measured by a new child span.
+        # For batches, 'size(batch)' gives the rows each one counts as.
+        return _Counted(iterable, self.child(name), size)
+
+    def attributes(self):
+        # Flat, None-free values for tracing backends.
+        values = {'kind': self.kind, 'rows_out': self.rows_out,
+                  'wall_ms': self.wall_ns / 1e6, 'cpu_ms': self.cpu_ns / 1e6,
+                  'self_wall_ms': self.self_wall_ns / 1e6, 'self_cpu_ms': self.self_cpu_ns / 1e6}
+        if self.rows_in is not None:
+            values['rows_in'] = self.rows_in
+        if self.peak_bytes is not None:
+            values['peak_bytes'] = self.peak_bytes
+        return values
+
+    def walk(self):
+        # This span and all its descendants, parents first.
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+    def __str__(self):
+        lines = [f"Profile of {self.name}: {self.wall_ns / 1e6:,.1f} ms wall, {self.cpu_ns / 1e6:,.1f} ms CPU",
+                 f"  {'stage':<{_NAME_WIDTH}} {'rows in':>10} {'rows out':>10} {'wall ms':>9} "
+                 f"{'cpu ms':>9} {'peak KiB':>9}"]
+        for span in self.walk():
+            if span is self:
+                continue
+            depth = 0
+            parent = span.parent
+            while parent is not self:
+                depth += 1
+                parent = parent.parent
+            name = ("  " * depth + span.name)
+            if len(name) > _NAME_WIDTH:
+                name = name[:_NAME_WIDTH - 3] + "..."
+            rows_in = "-" if span.rows_in is None else f"{span.rows_in:,}"
+            rows_out = "-" if span.kind == 'sink' else f"{span.rows_out:,}"
+            peak = "-" if span.peak_bytes is None else f"{span.peak_bytes / 1024:,.1f}"
+            lines.append(f"  {name:<{_NAME_WIDTH}} {rows_in:>10} {rows_out:>10} "
+                         f"{span.self_wall_ns / 1e6:>9,.1f} {span.self_cpu_ns / 1e6:>9,.1f} {peak:>9}")
+        return "\n".join(lines)
+
+
+class _Counted:
+    # Forwards next() to 'source', adding rows, wall and CPU time (and, when the profiler
+    # tracks memory, the peak) to 'span'.
+    __slots__ = ('source', 'span', 'size')
+
+    def __init__(self, source, span, size=None):
+        self.source = iter(source)
+        self.span = span
+        self.size = size
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        span = self.span
+        profiler = span.profiler
+        frame = profiler._enter() if profiler.memory else None
+        wall, cpu = perf_counter_ns(), thread_time_ns()
+        try:
+            item = next(self.source)
+        finally:
+            span.wall_ns += perf_counter_ns() - wall
+            span.cpu_ns += thread_time_ns() - cpu
+            if frame is not None:
+                profiler._leave(span, frame)
+        span.rows_out += 1 if self.size is None else self.size(item)
+        return item
+
+
+class ProfileHook:
+    """Base class for profiling hooks; both methods receive a Span."""
+    def on_start(self, span):
+        pass
+
+    def on_end(self, span):
+        pass
+
+
+class OpenTelemetryHook(ProfileHook):
+    """
+    Forwards every span to an OpenTelemetry tracer (tracer.start_span / span.end), with
+    the counters as 'stream.*' attributes. Stages become children of the run's span when
+    the opentelemetry package is importable; the tracer is the only thing required.
+    """
+    def __init__(self, tracer):
+        self.tracer = tracer
+        self._open = {}
+
+    def on_start(self, span):
+        parent = self._open.get(id(span.parent))
+        context = None
+        if parent is not None:
+            try:
+                from opentelemetry import trace
+                context = trace.set_span_in_context(parent)
+            except ImportError:
+                pass
+        if context is None:
+            self._open[id(span)] = self.tracer.start_span(span.name)
+        else:
+            self._open[id(span)] = self.tracer.start_span(span.name, context=context)
+
+    def on_end(self, span):
+        traced = self._open.pop(id(span), None)
+        if traced is None:
+            return
+        for name, value in span.attributes().items():
+            traced.set_attribute(f"stream.{name}", value)
+        traced.end()
+
+
+class Profiler:
+    """
+    Profiles the terminal operations of a Stream created with profile=<this profiler>.
+    'hooks' are ProfileHook objects or callables (called with each finished span),
+    'report' gets the root span of every run (None to stay silent), and 'memory' turns
+    tracemalloc peak tracking on. The root span of the latest run is kept as 'last'.
+    """
+    def __init__(self, hooks=(), report=print, memory=True):
+        self.hooks = list(hooks)
+        self.report = report
+        self.memory = memory
+        self.last = None
+        self._frames = []
+        self._traced_peak = 0
+
+    def _checkpoint(self):
+        # Folds the peak since the last checkpoint into every open frame, then resets it,
+        # so nested stages each see the peak reached while they were running.
+        current, peak = tracemalloc.get_traced_memory()
+        if _RESET_PEAK is not None:
+            _RESET_PEAK()
+        elif peak > self._traced_peak:
+            # The peak of the whole trace only grew during this interval if it is higher
+            # than at the last checkpoint; otherwise the current level is all that is known.
+            self._traced_peak = peak
+        else:
+            peak = current
+        for frame in self._frames:
+            if peak > frame[1]:
+                frame[1] = peak
+
+    def _enter(self):
+        self._checkpoint()
+        current = tracemalloc.get_traced_memory()[0]
+        frame = [current, current]  # level when entered, highest level seen
+        self._frames.append(frame)
+        return frame
+
+    def _leave(self, span, frame):
+        self._checkpoint()
+        self._frames.pop()
+        peak = frame[1] - frame[0]
+        if span.peak_bytes is None or peak > span.peak_bytes:
+            span.peak_bytes = peak
+
+    def _start(self, root):
+        self._traced_peak = tracemalloc.get_traced_memory()[1]
+        for span in root.walk():
+            for hook in self.hooks:
+                if isinstance(hook, ProfileHook):
+                    hook.on_start(span)
+
+    def _finish(self, root, stages, sink):
+        # Derives each stage's own time from the wrappers' inclusive times.
+        below = None
+        for span in stages:
+            span.self_wall_ns = span.wall_ns - (below.wall_ns if below else 0)
+            span.self_cpu_ns = span.cpu_ns - (below.cpu_ns if below else 0)
+            if below is not None:
+                span.rows_in = below.rows_out
+            below = span
+        source = stages[0]
+        if source.children:
+            details = list(source.children)
+            source.rows_in = details[0].rows_out
+            for detail in details:
+                detail.self_wall_ns, detail.self_cpu_ns = detail.wall_ns, detail.cpu_ns
+            rest = source.child("cleaning and scan filters")
+            rest.rows_in, rest.rows_out = details[0].rows_out, source.rows_out
+            rest.self_wall_ns = source.wall_ns - sum(detail.wall_ns for detail in details)
+            rest.self_cpu_ns = source.cpu_ns - sum(detail.cpu_ns for detail in details)
+            rest.wall_ns, rest.cpu_ns = rest.self_wall_ns, rest.self_cpu_ns
+        sink.rows_in = below.rows_out
+        sink.wall_ns, sink.cpu_ns = root.wall_ns, root.cpu_ns
+        sink.self_wall_ns = root.wall_ns - below.wall_ns
+        sink.self_cpu_ns = root.cpu_ns - below.cpu_ns
+        root.self_wall_ns, root.self_cpu_ns = root.wall_ns, root.cpu_ns
+        root.rows_out = below.rows_out
+
+        self.last = root
+        for span in reversed(list(root.walk())):  # children end before their parents
+            for hook in self.hooks:
+                if isinstance(hook, ProfileHook):
+                    hook.on_end(span)
+                else:
+                    hook(span)
+        if self.report is not None:
+            self.report(root)
+
+
+def _lazy(function, *args):
+    # Defers a barrier until its output is first requested, so its wrapper measures it.
+    yield from function(*args)
+
+
+def run_profiled(stream, sink, args, consumers, escapes):
+    """Stream._execute with every stage measured (see the module docstring)."""
+    profiler = stream.profile if isinstance(stream.profile, Profiler) else Profiler()
+    root = Span(_SINK_NAMES[sink], 'run', profiler=profiler)
+    source = root.child("source", 'source')
+    upstream, plan, _ = stream._prepare(consumers, escapes, span=source)
+    upstream = _Counted(upstream, source)
+    stages = [source]
+    for ops, barrier in logical.segments(plan):
+        for op in ops:
+            stages.append(root.child(op.describe(), 'operator'))
+            upstream = _Counted(logical.fuse([op])(upstream), stages[-1])
+        if barrier is None:
+            break
+        stages.append(root.child(barrier.describe(), 'operator'))
+        upstream = _Counted(_lazy(stream._run_barrier, barrier, upstream), stages[-1])
+    sink_span = root.child(_SINK_NAMES[sink] if sink != 'yield' else "consumer", 'sink')
+
+    def begin():
+        started = profiler.memory and not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        profiler._start(root)
+        return started, perf_counter_ns(), thread_time_ns()
+
+    def finish(started, wall, cpu):
+        root.wall_ns = perf_counter_ns() - wall
+        root.cpu_ns = thread_time_ns() - cpu
+        if started:
+            tracemalloc.stop()
+        profiler._finish(root, stages, sink_span)
+
+    if sink == 'yield':
+        return _profiled_iteration(upstream, begin, finish)
+    measurement = begin()
+    try:
+        return logical.fuse([], sink)(upstream, *args)
+    finally:
+        finish(*measurement)
+
+
+def _profiled_iteration(upstream, begin, finish):
+    # The consumer's own time (group_by, a for loop) is what remains of the run.
+    measurement = begin()
+    try:
+        yield from upstream
+    finally:
+        finish(*measurement)
@@ -0,0 +1,134 @@
+import threading
+from itertools import islice
+from queue import Queue
+
+from sales_analysis.core.memo import source_key
+from sales_analysis.core.stream import Stream
+
+# Sentinel placed on every branch queue once the shared source is exhausted.
+_END_OF_SCAN = object()
+
+
+class ScanBranch:
+    """
+    Handle for one pipeline registered on a SharedScan.
+    Holds the pipeline's terminal result (or the error it raised) once the scan has run.
+    """
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+        self._result = None
+        self._error = None
+        self._finished = False
+        self._key = None
+
+    def result(self):
+        # Returns the terminal value of the pipeline, re-raising any error it hit.
+        if not self._finished:
+            raise RuntimeError("SharedScan.run() must be called before reading branch results.")
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
+class SharedScan:
+    """
+    Feeds several independent Stream pipelines from a single pass over one source.
+
+    Each registered pipeline is a function that receives a fresh Stream and ends in a
+    terminal operation (reduce, group_by, collect, ...). The source is read exactly once;
+    items are handed to every pipeline in small batches through bounded queues, so memory
+    stays proportional to batch_size * buffer_size regardless of the input size.
+
+    With a 'cache' (core/memo.ResultCache), each pipeline's result is stored under the
+    fingerprint of 'dataset' (default: the source itself) and the pipeline's code. Stored
+    pipelines are not run again, and the source is not read at all when every one is.
+    """
+    def __init__(self, source, batch_size=1024, buffer_size=4, cache=None, dataset=None):
+        self.source = source
+        self.batch_size = batch_size
+        self.buffer_size = buffer_size
+        self.cache = cache
+        self.dataset = source if dataset is None else dataset
+        self._branches = []
+        self._has_run = False
+
+    def register(self, pipeline):
+        # Registers a pipeline (Stream -> result) and returns a handle to read its result later.
+        branch = ScanBranch(pipeline)
+        self._branches.append(branch)
+        return branch
+
+    def run(self):
+        # Terminal operation: scans the source once and returns every pipeline's result in
+        # registration order.
+        if self._has_run:
+            raise RuntimeError("A SharedScan can only be run once; its source is single-use.")
+        self._has_run = True
+
+        pending = []
+        if self.cache is not None:
+            identity = source_key(self.dataset)  # once for every branch
+        for branch in self._branches:
+            if self.cache is not None:
+                branch._key = self.cache.key(self.dataset, (), branch.pipeline, identity=identity)
+                found, branch._result = self.cache.get(branch._key)
+                if found:
+                    branch._finished = True
+                    continue
+            pending.append(branch)
+        if not pending:
+            return [branch.result() for branch in self._branches]
+
+        queues = [Queue(maxsize=self.buffer_size) for _ in pending]
+        workers = [
+            threading.Thread(target=self._consume, args=(branch, queue), daemon=True)
+            for branch, queue in zip(pending, queues)
+        ]
+        for worker in workers:
+            worker.start()
+
+        try:
+            iterator = iter(self.source)
+            while True:
+                batch = list(islice(iterator, self.batch_size))
+                if not batch:
+                    break
+                for queue in queues:
+                    queue.put(batch)
+        finally:
+            # Always release the consumers, even if reading the source failed.
+            for queue in queues:
+                queue.put(_END_OF_SCAN)
+            for worker in workers:
+                worker.join()
+
+        if self.cache is not None:
+            for branch in pending:
+                if branch._error is None:
+                    self.cache.put(branch._key, branch._result)
+        return [branch.result() for branch in self._branches]
+
+    @staticmethod
+    def _consume(branch, queue):
+        # Runs one pipeline against the items arriving on its queue.
+        exhausted = False
+
+        def items():
+            nonlocal exhausted
+            while True:
+                batch = queue.get()
+                if batch is _END_OF_SCAN:
+                    exhausted = True
+                    return
+                yield from batch
+
+        try:
+            branch._result = branch.pipeline(Stream(items()))
+        except Exception as error:
+            branch._error = error
+        finally:
+            # A pipeline may stop early (or fail); keep draining so the producer never blocks.
+            while not exhausted:
+                if queue.get() is _END_OF_SCAN:
+                    exhausted = True
+            branch._finished = True
@@ -0,0 +1,441 @@
+"""
+Probabilistic sketches: small, fixed-size summaries of a stream's keys.
+
+    BloomFilter   - set membership with no false negatives and a configurable
+                    false-positive rate (~9.6 bits per key at 1%), growing with the data
+    HyperLogLog   - number of distinct keys in 2**precision bytes (relative error
+                    ~1.04 / sqrt(2**precision), 0.8% at the default precision of 14)
+    TDigest       - quantiles of numeric values in O(compression) centroids, most
+                    accurate near the tails (p1, p99)
+    CountMinSketch - frequency of any key, over-estimated by at most epsilon * total
+                    with probability 1 - delta, in e/epsilon * ln(1/delta) counters
+    SpaceSaving   - the most frequent keys in 'capacity' counters, each count
+                    over-estimated by at most total / capacity
+
+All of them merge, so sketches of chunks, partitions or window panes combine into one.
+
+Keys are hashed with stable_hash (BLAKE2b), not the built-in hash(): str hashes are
+salted per process, which would make sketches built in different processes (parallel
+workers, a previous run) impossible to merge or compare.
+"""
+import heapq
+import marshal
+import math
+import sys
+from array import array
+from hashlib import blake2b
+
+_MASK_32 = (1 << 32) - 1
+
+
+def stable_hash(key):
+    # 64-bit hash of a key that is the same in every process and Python run.
+    if isinstance(key, str):
+        data = key.encode('utf-8', 'surrogatepass')
+    elif isinstance(key, bytes):
+        data = key
+    else:
+        try:
+            data = marshal.dumps(key, 0)
+        except ValueError:
+            raise TypeError(f"Sketches can only hash str, bytes, numbers and tuples of them, "
+                            f"got a {type(key).__name__} key.") from None
+    return int.from_bytes(blake2b(data, digest_size=8).digest(), 'little')
+
+
+class _BloomSlice:
+    # One fixed-size Bloom filter: 'bits' sized for 'capacity' keys at 'error_rate'.
+    __slots__ = ('capacity', 'size', 'hashes', 'bits', 'count')
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hashes = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, hashed):
+        # Kirsch-Mitzenmacher double hashing: k positions from one 64-bit hash.
+        first = hashed & _MASK_32
+        step = (hashed >> 32) | 1
+        return range(first, first + self.hashes * step, step)
+
+    def __contains__(self, hashed):
+        bits = self.bits
+        size = self.size
+        for position in self._positions(hashed):
+            position %= size
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def add(self, hashed):
+        # Sets the key's bits; returns True if they were all set already.
+        bits = self.bits
+        size = self.size
+        present = True
+        for position in self._positions(hashed):
+            position %= size
+            mask = 1 << (position & 7)
+            if not bits[position >> 3] & mask:
+                bits[position >> 3] |= mask
+                present = False
+        if not present:
+            self.count += 1
+        return present
+
+
+class BloomFilter:
+    """
+    Scalable Bloom filter. A lookup never misses a key that was added; it wrongly reports
+    an unseen key as present with probability at most 'error_rate'.
+
+    'capacity' is only the size of the first slice: once a slice holds its capacity, a
+    twice larger one with half the error rate is added, so the total false-positive rate
+    stays below 'error_rate' however many keys arrive (Almeida et al., 2007).
+    """
+    def __init__(self, error_rate=0.01, capacity=100_000):
+        if not 0 < error_rate < 1:
+            raise ValueError(f"error_rate must be between 0 and 1, got {error_rate}.")
+        if capacity <= 0:
+            raise ValueError(f"capacity must be positive, got {capacity}.")
+        self.error_rate = error_rate
+        self.slices = [_BloomSlice(capacity, error_rate / 2)]
+
+    def __len__(self):
+        return sum(s.count for s in self.slices)
+
+    def __contains__(self, key):
+        return self.contains_hash(stable_hash(key))
+
+    def add(self, key):
+        # Adds 'key' and returns True if it was not (probably) present before.
+        return self.add_hash(stable_hash(key))
+
+    def add_hash(self, hashed):
+        # add() for a key already hashed with stable_hash.
+        last = self.slices[-1]
+        for s in self.slices:
+            if s is not last and hashed in s:
+                return False
+        if last.count >= last.capacity:
+            if hashed in last:
+                return False
+            last = _BloomSlice(last.capacity * 2, self.error_rate / 2 ** (len(self.slices) + 1))
+            self.slices.append(last)
+        return not last.add(hashed)
+
+    def contains_hash(self, hashed):
+        return any(hashed in s for s in self.slices)
+
+    def memory_usage(self):
+        return sys.getsizeof(self) + sum(sys.getsizeof(s.bits) for s in self.slices)
+
+
+class HyperLogLog:
+    """
+    Cardinality estimate in 2**precision one-byte registers (Flajolet et al., 2007, with
+    linear counting for small cardinalities). Sketches of the same precision merge by
+    taking register maxima, so partial counts (chunks, workers) combine exactly.
+    """
+    def __init__(self, precision=14):
+        if not 4 <= precision <= 18:
+            raise ValueError(f"HyperLogLog precision must be between 4 and 18, got {precision}.")
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    @property
+    def relative_error(self):
+        # Standard error of count() for large cardinalities.
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def add(self, key):
+        hashed = stable_hash(key)
+        width = 64 - self.precision
+        index = hashed >> width
+        # Rank of the first 1-bit in the remaining bits (width + 1 if they are all zero).
+        rank = width - (hashed & ((1 << width) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("Only HyperLogLogs of the same precision can be merged.")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self):
+        registers = self.registers
+        size = len(registers)
+        alpha = 0.7213 / (1 + 1.079 / size)
+        estimate = alpha * size * size / sum(2.0 ** -rank for rank in registers)
+        empty = registers.count(0)
+        if estimate <= 2.5 * size and empty:
+            estimate = size * math.log(size / empty)
+        return int(round(estimate))
+
+    def memory_usage(self):
+        return sys.getsizeof(self) + sys.getsizeof(self.registers)
+
+
+class TDigest:
+    """
+    Merging t-digest (Dunning & Ertl, 2019): values are kept as weighted centroids whose
+    size is limited by the k1 scale function, so at most about 'compression' centroids
+    summarize any number of values, with small centroids (precise quantiles) at the
+    tails. Added values are buffered and merged in sorted batches.
+    """
+    def __init__(self, compression=100):
+        if compression < 10:
+            raise ValueError(f"TDigest compression must be at least 10, got {compression}.")
+        self.compression = compression
+        self.centroids = []  # sorted [mean, weight] pairs
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self._buffer = []
+
+    def __len__(self):
+        return self.count
+
+    def add(self, value, weight=1):
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self._buffer.append([value, weight])
+        self.count += weight
+        if len(self._buffer) >= 5 * self.compression:
+            self._compress()
+
+    def merge(self, other):
+        if other.count:
+            other._compress()
+            self._buffer.extend([mean, weight] for mean, weight in other.centroids)
+            self.count += other.count
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+            self._compress()
+        return self
+
+    def copy(self):
+        copy = TDigest(self.compression)
+        return copy.merge(self)
+
+    def _limit(self, q):
+        # Largest cumulative fraction a centroid starting at 'q' may reach: k1(q) + 1.
+        k = self.compression / (2 * math.pi) * math.asin(2 * q - 1) + 1
+        return 1.0 if k >= self.compression / 4 else (math.sin(2 * math.pi * k / self.compression) + 1) / 2
+
+    def _compress(self):
+        if not self._buffer:
+            return
+        points = sorted(self.centroids + self._buffer)
+        self._buffer = []
+        merged = [points[0]]
+        done = 0.0
+        limit = self._limit(0.0)
+        total = self.count
+        for mean, weight in points[1:]:
+            current = merged[-1]
+            if done + (current[1] + weight) / total <= limit:
+                current[1] += weight
+                current[0] += (mean - current[0]) * weight / current[1]
+            else:
+                done += current[1] / total
+                limit = self._limit(done)
+                merged.append([mean, weight])
+        self.centroids = merged
+
+    def _centroid_at(self, rank):
+        # (index, weight before it) of the centroid covering 'rank' (0 <= rank <= count).
+        before = 0
+        for index, (_, weight) in enumerate(self.centroids):
+            if rank < before + weight or index == len(self.centroids) - 1:
+                return index, before
+            before += weight
+
+    def quantile(self, q):
+        # Estimated q-quantile (0 <= q <= 1), or None for an empty digest. Values are
+        # interpolated between centroid means; the extremes are exact.
+        if not 0 <= q <= 1:
+            raise ValueError(f"Quantiles must be between 0 and 1, got {q}.")
+        self._compress()
+        if not self.count:
+            return None
+        centroids = self.centroids
+        rank = q * self.count
+        index, before = self._centroid_at(rank)
+        mean, weight = centroids[index]
+        middle = before + weight / 2
+        if rank < middle:
+            low_mean, low_rank = (self.min, 0.0) if index == 0 else (
+                centroids[index - 1][0], before - centroids[index - 1][1] / 2)
+            high_mean, high_rank = mean, middle
+        else:
+            low_mean, low_rank = mean, middle
+            high_mean, high_rank = (self.max, float(self.count)) if index == len(centroids) - 1 else (
+                centroids[index + 1][0], before + weight + centroids[index + 1][1] / 2)
+        if high_rank <= low_rank:
+            return low_mean
+        value = low_mean + (high_mean - low_mean) * (rank - low_rank) / (high_rank - low_rank)
+        return min(max(value, self.min), self.max)
+
+    def rank_error(self, q):
+        # Half the weight share of the centroid covering q: how far off, as a fraction of
+        # the values, the rank behind quantile(q) can be.
+        self._compress()
+        if not self.count:
+            return 0.0
+        index, _ = self._centroid_at(q * self.count)
+        return self.centroids[index][1] / (2 * self.count)
+
+    def memory_usage(self):
+        return (sys.getsizeof(self) + sys.getsizeof(self.centroids)
+                + sum(sys.getsizeof(c) for c in self.centroids) + sys.getsizeof(self._buffer))
+
+
+class CountMinSketch:
+    """
+    Count-Min sketch (Cormode & Muthukrishnan, 2005): 'depth' rows of 'width' counters;
+    a key adds to one counter per row and its estimate is the smallest of them. Estimates
+    never undercount, and overcount by more than epsilon * total with probability at most
+    delta. Sketches of the same shape merge by adding their counters.
+    """
+    def __init__(self, epsilon=0.001, delta=0.01):
+        if not 0 < epsilon < 1 or not 0 < delta < 1:
+            raise ValueError(f"epsilon and delta must be between 0 and 1, got {epsilon} and {delta}.")
+        self.epsilon = epsilon
+        self.delta = delta
+        self.width = int(math.ceil(math.e / epsilon))
+        self.depth = int(math.ceil(math.log(1 / delta)))
+        self.counters = array('q', bytes(8 * self.width * self.depth))
+        self.total = 0
+
+    def _cells(self, key):
+        # Kirsch-Mitzenmacher double hashing: one counter index per row.
+        hashed = stable_hash(key)
+        first = hashed & _MASK_32
+        step = (hashed >> 32) | 1
+        width = self.width
+        return [row * width + (first + row * step) % width for row in range(self.depth)]
+
+    def add(self, key, count=1):
+        counters = self.counters
+        for cell in self._cells(key):
+            counters[cell] += count
+        self.total += count
+
+    def estimate(self, key):
+        counters = self.counters
+        return min(counters[cell] for cell in self._cells(key))
+
+    def __getitem__(self, key):
+        return self.estimate(key)
+
+    @property
+    def error(self):
+        # Largest overcount of estimate(), with probability 1 - delta.
+        return self.epsilon * self.total
+
+    def merge(self, other):
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("Only Count-Min sketches of the same shape can be merged.")
+        self.counters = array('q', map(int.__add__, self.counters, other.counters))
+        self.total += other.total
+        return self
+
+    def copy(self):
+        copy = CountMinSketch(self.epsilon, self.delta)
+        return copy.merge(self)
+
+    def memory_usage(self):
+        return sys.getsizeof(self) + sys.getsizeof(self.counters)
+
+
+class SpaceSaving:
+    """
+    Space-Saving heavy hitters (Metwally et al., 2005) in 'capacity' counters. An unseen
+    key takes over the smallest counter and inherits its count as its error, so every
+    kept count overestimates the key's true frequency by at most that error, and every
+    key more frequent than total / capacity is kept. Summaries merge as in Agarwal et
+    al. (2012), "Mergeable summaries".
+    """
+    def __init__(self, capacity=100):
+        if capacity <= 0:
+            raise ValueError(f"capacity must be positive, got {capacity}.")
+        self.capacity = capacity
+        self.counters = {}  # key -> [count, error]
+        self.total = 0
+        self._heap = []  # [count, seq, key] entries, stale ones skipped lazily
+        self._seq = 0
+
+    def __len__(self):
+        return len(self.counters)
+
+    def _push(self, key, count):
+        self._seq += 1
+        heapq.heappush(self._heap, (count, self._seq, key))
+        if len(self._heap) > 4 * self.capacity:
+            counters = self.counters
+            self._heap = [entry for entry in self._heap if counters.get(entry[2], (None,))[0] == entry[0]]
+            heapq.heapify(self._heap)
+
+    def _smallest(self):
+        # Key and count of the smallest counter.
+        heap = self._heap
+        counters = self.counters
+        while True:
+            count, _, key = heap[0]
+            counter = counters.get(key)
+            if counter is not None and counter[0] == count:
+                return key, count
+            heapq.heappop(heap)
+
+    def add(self, key, count=1):
+        self.total += count
+        counter = self.counters.get(key)
+        if counter is None:
+            if len(self.counters) < self.capacity:
+                counter = self.counters[key] = [0, 0]
+            else:
+                evicted, smallest = self._smallest()
+                del self.counters[evicted]
+                counter = self.counters[key] = [smallest, smallest]
+        counter[0] += count
+        self._push(key, counter[0])
+
+    def minimum(self):
+        # Count an unkept key may have at most: the smallest counter once all are in use.
+        if len(self.counters) < self.capacity:
+            return 0
+        return self._smallest()[1]
+
+    def top(self, k=None):
+        # [(key, count, error)] of the k largest counters, largest first (ties by key
+        # order of first appearance).
+        ranked = sorted(self.counters.items(), key=lambda entry: -entry[1][0])
+        return [(key, count, error) for key, (count, error) in ranked[:k]]
+
+    def merge(self, other):
+        mine, theirs = self.minimum(), other.minimum()
+        combined = {}
+        for key in list(self.counters) + [key for key in other.counters if key not in self.counters]:
+            count, error = self.counters.get(key, (mine, mine))
+            other_count, other_error = other.counters.get(key, (theirs, theirs))
+            combined[key] = [count + other_count, error + other_error]
+        kept = sorted(combined.items(), key=lambda entry: -entry[1][0])[:self.capacity]
+        self.counters = dict(kept)
+        self.total += other.total
+        self._heap = []
+        for key, (count, _) in self.counters.items():
+            self._push(key, count)
+        return self
+
+    def copy(self):
+        copy = SpaceSaving(self.capacity)
+        return copy.merge(self)
+
+    def memory_usage(self):
+        return (sys.getsizeof(self) + sys.getsizeof(self.counters) + sys.getsizeof(self._heap)
+                + sum(sys.getsizeof(counter) for counter in self.counters.values()))
@@ -0,0 +1,133 @@
+"""
+Temporary record files for operators whose state outgrows memory (external sort, the
+Grace hash join).
+
+Items are written in a compact binary encoding. A Product takes a fixed 48-byte header
+(four float64, one int64, two uint32 string lengths) plus its UTF-8 name and category,
+about a third smaller than its pickle. Any other item (a mapped value, a tuple) is
+pickled. Each record starts with a one-byte tag, so both kinds can share a file. Files
+are read back lazily, one record at a time.
+"""
+import os
+import pickle
+import shutil
+import struct
+import sys
+import tempfile
+
+from sales_analysis.core.models import Product
+
+_PRODUCT = b'P'
+_PICKLED = b'O'
+_PRODUCT_HEADER = struct.Struct('<ddddqII')
+_PICKLE_HEADER = struct.Struct('<I')
+_BUFFER_SIZE = 1 << 16
+
+
+def encode(item):
+    # Binary record for one item (tag + payload).
+    if type(item) is Product:
+        try:
+            name = item.name.encode('utf-8', 'surrogatepass')
+            category = item.category.encode('utf-8', 'surrogatepass')
+            return b''.join((_PRODUCT, _PRODUCT_HEADER.pack(
+                item.discounted_price, item.actual_price, item.discount_percentage, item.rating,
+                item.rating_count, len(name), len(category)), name, category))
+        except (AttributeError, struct.error):
+            pass  # hand-built Product with unusual field types: pickle it instead
+    data = pickle.dumps(item, pickle.HIGHEST_PROTOCOL)
+    return b''.join((_PICKLED, _PICKLE_HEADER.pack(len(data)), data))
+
+
+def read_records(f):
+    """Generator decoding the records of an open binary file until its end."""
+    read = f.read
+    unpack_product = _PRODUCT_HEADER.unpack
+    while True:
+        tag = read(1)
+        if not tag:
+            return
+        if tag == _PRODUCT:
+            (discounted, actual, discount, rating, count,
+             name_length, category_length) = unpack_product(read(_PRODUCT_HEADER.size))
+            name = read(name_length).decode('utf-8', 'surrogatepass')
+            category = sys.intern(read(category_length).decode('utf-8', 'surrogatepass'))
+            yield Product(name, category, discounted, actual, discount, rating, count)
+        elif tag == _PICKLED:
+            (length,) = _PICKLE_HEADER.unpack(read(_PICKLE_HEADER.size))
+            yield pickle.loads(read(length))
+        else:
+            raise ValueError(f"Corrupt spill file: unknown record tag {tag!r}")
+
+
+def approx_size(item):
+    """
+    Rough number of bytes an item keeps alive: the object itself plus its direct fields
+    (Product slots, tuple/list elements, dict values). Shared objects are counted again,
+    so the estimate errs on the high side.
+    """
+    size = sys.getsizeof(item)
+    if isinstance(item, (tuple, list)):
+        return size + sum(map(sys.getsizeof, item))
+    if isinstance(item, dict):
+        return size + sum(map(sys.getsizeof, item.keys())) + sum(map(sys.getsizeof, item.values()))
+    slots = getattr(type(item), '__slots__', None)
+    if slots:
+        return size + sum(sys.getsizeof(getattr(item, name, None)) for name in slots)
+    fields = getattr(item, '__dict__', None)
+    if fields:
+        return size + sys.getsizeof(fields) + sum(map(sys.getsizeof, fields.values()))
+    return size
+
+
+class RecordWriter:
+    # Appends encoded records to one spill file; close() flushes it.
+    def __init__(self, path, directory):
+        self.path = path
+        self.directory = directory
+        self.file = open(path, 'wb', buffering=_BUFFER_SIZE)
+        self.records = 0
+
+    def write(self, item):
+        self.file.write(encode(item))
+        self.records += 1
+
+    def close(self):
+        if not self.file.closed:
+            self.directory.bytes_written += self.file.tell()
+            self.file.close()
+
+
+class SpillDirectory:
+    """
+    A private temporary directory (under 'directory' if given) for one operator run.
+    write(items) stores an iterable as a new file and returns its path (writer() opens one
+    to append to instead); read(path) streams it back. cleanup() removes every file, and
+    it is safe to call more than once.
+    """
+    def __init__(self, prefix, directory=None):
+        self.path = tempfile.mkdtemp(prefix=prefix, dir=directory)
+        self.files = 0
+        self.bytes_written = 0
+
+    def writer(self):
+        # A new, empty file in this directory to append records to.
+        self.files += 1
+        return RecordWriter(os.path.join(self.path, f"{self.files:06d}.bin"), self)
+
+    def write(self, items):
+        writer = self.writer()
+        for item in items:
+            writer.write(item)
+        writer.close()
+        return writer.path
+
+    def read(self, path, remove=True):
+        # Lazily decodes the file; with remove=True it is deleted once fully read.
+        with open(path, 'rb', buffering=_BUFFER_SIZE) as f:
+            yield from read_records(f)
+        if remove:
+            os.remove(path)
+
+    def cleanup(self):
+        shutil.rmtree(self.path, ignore_errors=True)
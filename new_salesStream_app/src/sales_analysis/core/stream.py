@@ -1,65 +1,404 @@
-from functools import reduce as functional_reduce
+import heapq
+from contextlib import contextmanager
+from functools import wraps
+
+from sales_analysis.core import plan as logical
+from sales_analysis.core.aggregations import _Descending
+
+def _terminal(method):
+    # Terminal operations of memoized streams look their result up in the cache of the
+    # last memoize() point (keyed on the source, the plan and the call) before running.
+    @wraps(method)
+    def run(self, *args, **kwargs):
+        memo = next((op for op in reversed(self.plan) if isinstance(op, logical.Memoize)), None)
+        if memo is None:
+            return method(self, *args, **kwargs)
+        with self._keyed_run():
+            key = self._cache_key(memo.cache, self.plan, (method.__name__, args, kwargs))
+            return memo.cache.compute(key, lambda: method(self, *args, **kwargs))
+    return run
 
 class Stream:
     """
     A custom implementation of a lazy-evaluation stream processor.
     It wraps a Python generator (or iterable) and allows chaining functional operations
     (map, filter, reduce) without loading the entire dataset into memory.
+
+    Chained operations are recorded as a logical plan (see core/plan.py) instead of being
+    nested as generators. A terminal operation optimizes the plan and runs each segment
+    as a single fused loop; explain() shows the plan that will run.
+
+    With profile=True (or a core/profile.Profiler with hooks), every terminal operation
+    runs the operators one by one and prints rows, time and memory per stage.
+
+    A stream made by approximate() carries the fraction of the data it samples, and its
+    aggregations estimate full-data results from the sample (see core/approximate.py).
     """
-    def __init__(self, source):
+    def __init__(self, source, plan=(), profile=None, sampling=None):
         # The source can be any iterable, typically a generator for lazy loading
         self.source = source
+        # Operators applied to the source, in call order (not yet optimized)
+        self.plan = tuple(plan)
+        self.profile = profile
+        # Fraction of the source's items this stream samples in approximate mode.
+        self.sampling = sampling
+        # Source identity for result-cache keys while a run is in progress (see _keyed_run).
+        self._run_identity = None
+
+    def _then(self, op):
+        # Every intermediate operation returns a NEW Stream sharing the same source.
+        return Stream(self.source, self.plan + (op,), self.profile, self.sampling)
 
     def map(self, func):
         # Transforms each item in the stream using the provided function.
-        # Returns a new Stream wrapping a generator that yields transformed items one by one.
-        def generator():
-            for item in self.source:
-                yield func(item)
-        return Stream(generator())
+        return self._then(logical.Map(func))
 
     def filter(self, predicate):
         # Filters items based on a boolean predicate.
         # Only items for which predicate(item) is True are yielded downstream.
-        def generator():
-            for item in self.source:
-                if predicate(item):
-                    yield item
-        return Stream(generator())
+        return self._then(logical.Filter(predicate))
 
-    def distinct(self, key_func):
+    def distinct(self, key_func, method='exact', memory_limit=None, error_rate=0.01, report=None):
         # Yields unique items based on a key derived from the item.
-        # Note: This maintains a 'seen' set in memory, so it grows with the number of unique keys.
-        def generator():
-            seen = set()
-            for item in self.source:
-                key = key_func(item)
-                if key not in seen:
-                    seen.add(key)
-                    yield item
-        return Stream(generator())
+        # Note: The default 'exact' method maintains a 'seen' set in memory, so it grows with
+        # the number of unique keys. method='spill' stays exact within 'memory_limit' bytes
+        # by moving keys to sorted runs on disk; method='bloom' uses a Bloom filter and may
+        # drop up to 'error_rate' of the unique items (see core/distinct.py).
+        # 'report' is called with a DistinctReport (keys, memory, spilled runs) after each run;
+        # without it the report is logged at INFO level (core/distinct.log_report).
+        options = {}
+        if method == 'spill':
+            options['memory_limit'] = memory_limit
+        elif method == 'bloom':
+            options['error_rate'] = error_rate
+        return self._then(logical.Distinct(key_func, method, report, **options))
+
+    def limit(self, count):
+        # Keeps only the first 'count' items (stops reading the source once reached).
+        return self._then(logical.Limit(count))
 
-    def sorted(self, key=None, reverse=False):
+    def sorted(self, key=None, reverse=False, run_size=None, directory=None):
         # Stateful operation: Breaking the lazy chain.
         # We must consume the entire stream into memory to sort it effectively.
-        sorted_items = sorted(self.source, key=key, reverse=reverse)
-        return Stream(sorted_items)
-
-    def group_by(self, key_func):
-        # Terminal operation (for now) that consumes the stream to group items.
-        # Returns a dictionary mapping keys to lists of items.
-        groups = {}
-        for item in self.source:
+        # (Followed by limit(), the optimizer turns it into a bounded top_k instead.)
+        # With run_size, an external merge sort holds at most 'run_size' items in memory,
+        # spilling sorted runs to temporary files and merging them back lazily.
+        return self._then(logical.Sorted(key, reverse, run_size, directory))
+
+    def top_k(self, k, key=None, reverse=False, distinct_key=None):
+        # Bounded alternative to sorted(...).distinct(...).collect()[:k].
+        # Keeps a heap of at most k candidates (O(n log k) time, O(k) memory) instead of
+        # materializing the whole stream. With distinct_key, only the best item per key is
+        # kept, and only the keys currently in the heap are remembered.
+        # Ties keep the earliest item, exactly like the stable sort it replaces.
+        return self._then(logical.TopK(k, key, reverse, distinct_key))
+
+    def sample(self, fraction, seed=None):
+        # Bernoulli sampling: keeps each item independently with probability 'fraction'.
+        # The sampler is a col()-style expression, so on a CsvSource it is pushed into the
+        # scan and rejected rows are dropped before any column is cleaned.
+        from sales_analysis.core.approximate import Sample
+        return self.filter(Sample(fraction, seed))
+
+    def reservoir(self, size, seed=None):
+        # Stateful operation: a uniform random sample of exactly 'size' items (all of them
+        # if there are fewer), kept in O(size) memory however long the stream is.
+        return self._then(logical.Reservoir(size, seed))
+
+    def approximate(self, fraction, seed=None):
+        # Approximate execution mode: samples 'fraction' of the items like sample(), and
+        # group_by(agg=...)/aggregate() estimate the full data's counts, sums and means
+        # from the sample, returning Estimates with 95% confidence bounds.
+        sampled = self.sample(fraction, seed)
+        return Stream(sampled.source, sampled.plan, self.profile, (self.sampling or 1.0) * fraction)
+
+    def memoize(self, cache):
+        # Stores the items reaching this point in 'cache' (a ResultCache, see core/memo.py),
+        # keyed on the source fingerprint and the plan so far. Pipelines that share this
+        # prefix start from the stored items instead of re-reading the source, and the
+        # terminal results (collect, reduce, group_by, count_distinct) of memoized streams
+        # are stored too, so an identical pipeline is not run again.
+        return self._then(logical.Memoize(cache))
+
+    @contextmanager
+    def _keyed_run(self):
+        # Every result-cache key of one run (terminal lookup, memoized prefixes, stored
+        # items) shares one source identity, computed on first use: it may hash the whole
+        # file or list, so it is not recomputed per lookup.
+        if self._run_identity is not None:
+            yield
+            return
+        self._run_identity = []
+        try:
+            yield
+        finally:
+            self._run_identity = None
+
+    def _cache_key(self, cache, plan, *parts):
+        identity = self._run_identity
+        if identity is None:  # outside a run, e.g. a profiled barrier running lazily
+            return cache.key(self.source, plan, *parts)
+        if not identity:
+            from sales_analysis.core.memo import source_key
+            identity.append(source_key(self.source))
+        return cache.key(self.source, plan, *parts, identity=identity[0])
+
+    def _resume(self):
+        # (stored items, operators after it) for the last memoize() point whose prefix is
+        # already in its cache; otherwise (source, whole plan).
+        for index in range(len(self.plan) - 1, -1, -1):
+            op = self.plan[index]
+            if isinstance(op, logical.Memoize):
+                found, items = op.cache.get(self._cache_key(op.cache, self.plan[:index]))
+                if found:
+                    return items, self.plan[index + 1:]
+        return self.source, self.plan
+
+    def _prepare(self, consumers=(), escapes=True, resume=True, span=None):
+        # Optimizes the plan. Sources that can scan a subset of fields (see
+        # ingestion.loader.CsvSource) receive the projection and the leading col() filters.
+        # With resume, a memoized prefix found in its cache replaces the source.
+        # A profiling 'span' is named after the source and handed to its scan.
+        # Stateful expressions (seeded samplers) start over for every run.
+        logical.restart(self.plan)
+        source, ops = self._resume() if resume else (self.source, self.plan)
+        ops = logical.optimize(ops)
+        if span is not None:
+            span.name = f"source: {source!r}" if hasattr(source, 'scan') else f"source: {type(source).__name__}"
+        if not hasattr(source, 'scan'):
+            return source, ops, None
+        fields, predicates, ops = logical.pushdown(ops, consumers, escapes)
+        if span is not None:
+            return source.scan(fields, predicates, span=span), ops, (fields, predicates)
+        return source.scan(fields, predicates), ops, (fields, predicates)
+
+    def _execute(self, sink='yield', *args, consumers=(), escapes=True):
+        # Runs the optimized plan: barriers (sorted/top_k) materialize their input,
+        # everything in between runs as one fused loop, and the last loop feeds the sink.
+        if self.profile:
+            from sales_analysis.core.profile import run_profiled
+            return run_profiled(self, sink, args, consumers, escapes)
+        with self._keyed_run():
+            upstream, plan, _ = self._prepare(consumers, escapes)
+            for ops, barrier in logical.segments(plan):
+                if barrier is None:
+                    return logical.fuse(ops, sink)(upstream, *args)
+                if ops:
+                    upstream = logical.fuse(ops)(upstream)
+                upstream = self._run_barrier(barrier, upstream)
+
+    def _run_barrier(self, barrier, upstream):
+        # Sorts, selects or stores everything 'upstream' produces.
+        if isinstance(barrier, logical.Sorted) and barrier.run_size is not None:
+            from sales_analysis.core.external_sort import external_sorted
+            return external_sorted(upstream, barrier.key, barrier.reverse,
+                                   barrier.run_size, barrier.directory)
+        if isinstance(barrier, logical.Sorted):
+            return sorted(upstream, key=barrier.key, reverse=barrier.reverse)
+        if isinstance(barrier, logical.Reservoir):
+            from sales_analysis.core.approximate import reservoir_sample
+            return reservoir_sample(upstream, barrier.size, barrier.seed)
+        if isinstance(barrier, logical.Memoize):
+            upstream = list(upstream)
+            cache = barrier.cache
+            cache.put(self._cache_key(cache, self.plan[:self.plan.index(barrier)]), upstream)
+            return upstream
+        return _top_k(upstream, barrier.k, barrier.key, barrier.reverse, barrier.distinct_key)
+
+    def __iter__(self):
+        # Iterating a Stream runs its plan lazily.
+        return self._execute('yield')
+
+    def explain(self):
+        # Prints (and returns) the optimized plan, one fused loop per segment.
+        # Pushdown is shown as if the items were collected (the most fields a run needs).
+        _, plan, pushed = self._prepare(resume=False)
+        lines = [f"Stream plan over {self.source!r}:" if pushed else
+                 f"Stream plan over {type(self.source).__name__}:"]
+        if pushed:
+            fields, predicates = pushed
+            lines.append(f"  scan fields: {'all' if fields is None else ', '.join(sorted(fields))}")
+            if predicates:
+                lines.append(f"  scan filter: {' and '.join(map(repr, predicates))}")
+        for number, (ops, barrier) in enumerate(logical.segments(plan), 1):
+            stages = " -> ".join(op.describe() for op in ops) or "pass-through"
+            lines.append(f"  [{number}] fused loop: {stages}")
+            if barrier is not None:
+                lines.append(f"      barrier: {barrier.describe()}")
+        text = "\n".join(lines)
+        print(text)
+        return text
+
+    @_terminal
+    def group_by(self, key_func, agg=None):
+        # Terminal operation that consumes the stream to group items.
+        # Without 'agg', returns a dictionary mapping keys to lists of items.
+        # With 'agg' (a dict of name -> Aggregator, see core/aggregations.py), each group only
+        # keeps one small accumulator state per aggregation, so memory is O(#groups) and the
+        # result maps keys to {name: aggregated value}. In approximate mode the values are
+        # estimates for the full data (core/approximate.estimating).
+        if agg is None:
+            groups = {}
+            for item in self._execute('yield', consumers=[(key_func, 0)]):
+                key = key_func(item)
+                if key not in groups:
+                    groups[key] = []
+                groups[key].append(item)
+            return groups
+
+        if self.sampling is not None:
+            from sales_analysis.core.approximate import estimating
+            agg = estimating(agg, self.sampling)
+        aggregators = list(agg.items())
+        states = {}
+        # Only the key and the aggregated fields are read, so nothing else is parsed.
+        consumers = [(key_func, 0)] + [(aggregator.field, 0) for _, aggregator in aggregators]
+        # Aggregators over the whole item (no field) may read anything from it.
+        escapes = any(aggregator.field is None and aggregator.uses_value for _, aggregator in aggregators)
+        for item in self._execute('yield', consumers=consumers, escapes=escapes):
             key = key_func(item)
-            if key not in groups:
-                groups[key] = []
-            groups[key].append(item)
-        return groups
+            group = states.get(key)
+            if group is None:
+                group = states[key] = [aggregator.initial() for _, aggregator in aggregators]
+            for index, (_, aggregator) in enumerate(aggregators):
+                group[index] = aggregator.add(group[index], aggregator.extract(item))
+        return {
+            key: {name: aggregator.result(group[index])
+                  for index, (name, aggregator) in enumerate(aggregators)}
+            for key, group in states.items()
+        }
+
+    def aggregate(self, agg):
+        # Terminal operation folding every item into the aggregators of 'agg' (a dict of
+        # name -> Aggregator) and returning {name: result}; group_by(agg=...) without keys.
+        groups = self.group_by(_whole_stream, agg)
+        if groups:
+            return groups[None]
+        if self.sampling is not None:
+            from sales_analysis.core.approximate import estimating
+            agg = estimating(agg, self.sampling)
+        return {name: aggregator.result(aggregator.initial()) for name, aggregator in agg.items()}
+
+    @_terminal
+    def count_distinct(self, key_func=None, method='hll', precision=14, memory_limit=None,
+                       error_rate=0.01, report=None):
+        # Terminal operation returning the number of distinct keys. The default 'hll' method
+        # estimates it with a HyperLogLog of 2**precision bytes (relative error about
+        # 1.04 / sqrt(2**precision)); 'exact', 'spill' and 'bloom' count the keys a
+        # distinct() with that method would let through. The DistinctReport goes to
+        # 'report', or to the log at INFO level.
+        from sales_analysis.core.distinct import DistinctReport, log_report, seen_set
+        from sales_analysis.core.sketches import HyperLogLog
+
+        key_func = key_func or (lambda item: item)
+        if method == 'hll':
+            sketch = HyperLogLog(precision)
+        else:
+            sketch = seen_set(method, memory_limit=memory_limit, error_rate=error_rate)
+        add = sketch.add
+        try:
+            for item in self._execute('yield', consumers=[(key_func, 0)], escapes=False):
+                add(key_func(item))
+            if method == 'hll':
+                result = DistinctReport(method, sketch.count(), sketch.memory_usage(), 0, 0,
+                                        sketch.relative_error)
+            else:
+                result = sketch.report()
+        finally:
+            if method != 'hll':
+                sketch.close()
+        (report or log_report)(result)
+        return result.keys
+
+    def join(self, other, key, other_key=None, how='inner', memory_limit=None, directory=None):
+        # Joins this stream with 'other' (an iterable, a Stream or a dict of key -> value) on
+        # key(item) == other_key(other_item) and yields (item, match) pairs; how='left' also
+        # keeps items without a match as (item, None). A hash table is built on the smaller
+        # side and the other side is streamed past it once. A build side larger than
+        # 'memory_limit' bytes is joined partition by partition from disk (core/join.py).
+        from sales_analysis.core.join import HashJoin
+        return Stream(HashJoin(self, other, key, other_key, how, memory_limit, directory),
+                      profile=self.profile)
+
+    def window(self, spec, agg, key=None, every=None, interval=None):
+        # Windowed aggregation (see core/windows.py): returns a Stream of WindowResults,
+        # emitted as each window closes, so it also works on sources that never end.
+        # 'key' groups inside each window; 'every'/'interval' add early partial results.
+        from sales_analysis.core.windows import windowed
+        return Stream(windowed(self, spec, agg, key, every, interval), profile=self.profile)
+
+    def parallel(self, workers=None, backend='process', partition_size=4096):
+        # Switches the rest of the pipeline to data-parallel execution across a process or
+        # thread pool (see core/parallel.py). map/filter chains run fused per partition and
+        # partial results are merged for reduce, group_by, distinct and collect.
+        from sales_analysis.core.parallel import ParallelStream
+        if all(isinstance(op, (logical.Map, logical.Filter)) for op in self.plan):
+            return ParallelStream(self.source, workers, backend, partition_size, self.plan)
+        # Stateful operators so far (distinct, sorted, ...) run sequentially first.
+        return ParallelStream(iter(self), workers, backend, partition_size)
 
+    @_terminal
     def reduce(self, func, initial):
         # Terminal operation that reduces the stream to a single value using an accumulator.
-        return functional_reduce(func, self.source, initial)
+        # The accumulator update runs inside the fused loop of the last segment.
+        return self._execute('reduce', func, initial, consumers=[(func, 1)], escapes=False)
     
+    @_terminal
     def collect(self):
         # Terminal operation that materializes the stream into a standard Python list.
-        return list(self.source)
\ No newline at end of file
+        return self._execute('collect')
+
+
+def _whole_stream(item):
+    # Group key of aggregate(): one group holding every item.
+    return None
+
+
+def _top_k(source, k, key, reverse, distinct_key):
+    # Heap entries are [rank, -seq, item, dedup_key, alive]. A larger rank is a better item,
+    # so heap[0] is always the current worst candidate. The -seq tie-breaker makes earlier
+    # items win ties and stops comparisons from ever reaching the item itself.
+    if k <= 0:
+        return []
+    key = key or (lambda item: item)
+    heap = []
+    entries_by_key = {}
+    live = 0
+
+    for seq, item in enumerate(source):
+        value = key(item)
+        dedup = distinct_key(item) if distinct_key else None
+
+        if distinct_key:
+            current = entries_by_key.get(dedup)
+            if current is not None:
+                # Same key already competing: keep whichever is strictly better.
+                held = current[0] if reverse else current[0].value
+                if not (value > held if reverse else value < held):
+                    continue
+                current[4] = False
+                live -= 1
+
+        if live >= k:
+            while not heap[0][4]:
+                heapq.heappop(heap)
+            worst = heap[0][0] if reverse else heap[0][0].value
+            if not (value > worst if reverse else value < worst):
+                continue
+            evicted = heapq.heappop(heap)
+            live -= 1
+            if distinct_key:
+                del entries_by_key[evicted[3]]
+
+        entry = [value if reverse else _Descending(value), -seq, item, dedup, True]
+        heapq.heappush(heap, entry)
+        live += 1
+        if distinct_key:
+            entries_by_key[dedup] = entry
+
+        # Superseded entries are dropped lazily; compact once they outnumber live ones.
+        if len(heap) > 2 * k:
+            heap = [e for e in heap if e[4]]
+            heapq.heapify(heap)
+
+    return [entry[2] for entry in sorted((e for e in heap if e[4]), reverse=True)]
@@ -0,0 +1,208 @@
+from array import array
+from operator import sub
+
+from sales_analysis.core.models import Product
+
+# Column order mirrors the Product dataclass fields.
+PRODUCT_FIELDS = (
+    'name', 'category', 'discounted_price', 'actual_price',
+    'discount_percentage', 'rating', 'rating_count',
+)
+
+# Typecodes of the numeric columns: float64 prices/percentages/ratings, int64 counts.
+NUMERIC_TYPECODES = {
+    'discounted_price': 'd',
+    'actual_price': 'd',
+    'discount_percentage': 'd',
+    'rating': 'd',
+    'rating_count': 'q',
+}
+
+
+class ProductTable:
+    """
+    Columnar (struct-of-arrays) representation of many Products.
+
+    Numeric fields live in typed arrays (float64 / int64) and categories are dictionary
+    encoded: 'category_codes' holds one small int per row that indexes into 'categories'.
+    This avoids one Python object per row and lets whole columns be processed by C-level
+    builtins (sum, min, map, itertools.compress) instead of per-row attribute lookups.
+    """
+    def __init__(self, name=None, category_codes=None, categories=None,
+                 discounted_price=None, actual_price=None, discount_percentage=None,
+                 rating=None, rating_count=None):
+        self.name = name if name is not None else []
+        self.category_codes = category_codes if category_codes is not None else array('i')
+        self.categories = categories if categories is not None else []
+        self.discounted_price = discounted_price if discounted_price is not None else array('d')
+        self.actual_price = actual_price if actual_price is not None else array('d')
+        self.discount_percentage = discount_percentage if discount_percentage is not None else array('d')
+        self.rating = rating if rating is not None else array('d')
+        self.rating_count = rating_count if rating_count is not None else array('q')
+
+    @classmethod
+    def from_products(cls, products):
+        # Builds a table from any iterable of Product objects (dictionary-encoding categories).
+        table = cls()
+        codes = {}
+        for product in products:
+            table.append(product.name, product.category, product.discounted_price,
+                         product.actual_price, product.discount_percentage,
+                         product.rating, product.rating_count, codes)
+        return table
+
+    @classmethod
+    def concat(cls, tables):
+        # Merges several tables (e.g. parallel-ingestion batches) into one, re-encoding the
+        # per-batch category dictionaries into a single shared one.
+        merged = cls()
+        codes = {}
+        for table in tables:
+            merged.extend(table.name, table.column('category'), table.discounted_price,
+                          table.actual_price, table.discount_percentage, table.rating,
+                          table.rating_count, codes)
+        return merged
+
+    def append(self, name, category, discounted_price, actual_price,
+               discount_percentage, rating, rating_count, category_index=None):
+        # Appends one row. 'category_index' (category -> code) may be passed in to avoid
+        # rebuilding the reverse lookup on every call while loading.
+        if category_index is None:
+            category_index = {cat: code for code, cat in enumerate(self.categories)}
+        code = category_index.get(category)
+        if code is None:
+            code = category_index[category] = len(self.categories)
+            self.categories.append(category)
+        self.name.append(name)
+        self.category_codes.append(code)
+        self.discounted_price.append(discounted_price)
+        self.actual_price.append(actual_price)
+        self.discount_percentage.append(discount_percentage)
+        self.rating.append(rating)
+        self.rating_count.append(rating_count)
+
+    def extend(self, names, categories, discounted_price, actual_price,
+               discount_percentage, rating, rating_count, category_index=None):
+        # Appends a whole batch of rows given as columns (e.g. one cleaned CSV chunk).
+        if category_index is None:
+            category_index = {cat: code for code, cat in enumerate(self.categories)}
+
+        def encode(category):
+            code = category_index.get(category)
+            if code is None:
+                code = category_index[category] = len(self.categories)
+                self.categories.append(category)
+            return code
+
+        self.name.extend(names)
+        self.category_codes.extend(map(encode, categories))
+        self.discounted_price.extend(discounted_price)
+        self.actual_price.extend(actual_price)
+        self.discount_percentage.extend(discount_percentage)
+        self.rating.extend(rating)
+        self.rating_count.extend(rating_count)
+
+    def __len__(self):
+        return len(self.category_codes)
+
+    def column(self, field):
+        # Returns the full column for a Product field. 'category' is decoded to strings and
+        # 'savings' is derived, mirroring the Product.savings property.
+        if field == 'category':
+            return list(map(self.categories.__getitem__, self.category_codes))
+        if field == 'savings':
+            return array('d', map(sub, self.actual_price, self.discounted_price))
+        if field in PRODUCT_FIELDS:
+            return getattr(self, field)
+        raise KeyError(f"Unknown product field: {field!r}")
+
+    def row(self, index):
+        # Materializes a single row as a regular (immutable) Product.
+        return Product(
+            name=self.name[index],
+            category=self.categories[self.category_codes[index]],
+            discounted_price=self.discounted_price[index],
+            actual_price=self.actual_price[index],
+            discount_percentage=self.discount_percentage[index],
+            rating=self.rating[index],
+            rating_count=self.rating_count[index],
+        )
+
+    def __iter__(self):
+        # Lazily yields every row as a Product, so a table can feed a regular Stream.
+        return map(self.row, range(len(self)))
+
+    def view(self, index):
+        # Lightweight read-only view of one row; values stay in the columns.
+        return ProductView(self, index)
+
+    def views(self):
+        # Lazily yields a ProductView per row. Keeping views alive (group_by, sorted,
+        # collect) costs one small object per row instead of a Product plus its values.
+        return map(self.view, range(len(self)))
+
+
+class ProductView:
+    """
+    A row of a ProductTable that reads like a Product (name, category, ..., savings) but
+    only stores the table and the row index; every attribute is read from the columns.
+    Views compare equal to the Product with the same values and pickle as that Product,
+    so they never drag the whole table into another process.
+    """
+    __slots__ = ('table', 'index')
+
+    def __init__(self, table, index):
+        self.table = table
+        self.index = index
+
+    @property
+    def name(self):
+        return self.table.name[self.index]
+
+    @property
+    def category(self):
+        return self.table.categories[self.table.category_codes[self.index]]
+
+    @property
+    def discounted_price(self):
+        return self.table.discounted_price[self.index]
+
+    @property
+    def actual_price(self):
+        return self.table.actual_price[self.index]
+
+    @property
+    def discount_percentage(self):
+        return self.table.discount_percentage[self.index]
+
+    @property
+    def rating(self):
+        return self.table.rating[self.index]
+
+    @property
+    def rating_count(self):
+        return self.table.rating_count[self.index]
+
+    @property
+    def savings(self):
+        return self.actual_price - self.discounted_price
+
+    def to_product(self):
+        return self.table.row(self.index)
+
+    def _values(self):
+        return tuple(getattr(self, field) for field in PRODUCT_FIELDS)
+
+    def __eq__(self, other):
+        if isinstance(other, (ProductView, Product)):
+            return self._values() == tuple(getattr(other, field) for field in PRODUCT_FIELDS)
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self._values())
+
+    def __reduce__(self):
+        return self.to_product().__reduce__()
+
+    def __repr__(self):
+        return f"ProductView({self.index}, {self.to_product()!r})"
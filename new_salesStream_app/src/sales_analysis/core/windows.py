@@ -0,0 +1,236 @@
+"""
+Windowed, incremental aggregation for unbounded streams.
+
+reduce/group_by/sorted need the source to end. On a live feed the same reports are
+computed per window instead, and each window is emitted as soon as it closes:
+
+    tumbling(size)          fixed, non-overlapping windows of 'size' seconds
+    sliding(size, slide)    windows of 'size' seconds starting every 'slide' seconds
+    counting(size, slide)   windows of 'size' items (tumbling, or sliding every 'slide')
+    running()               one window that never closes (running totals / top-K)
+
+Time windows use processing time (when the item arrives) unless a 'time' function reads
+an event timestamp from the item.
+
+State stays bounded. A window is cut into panes of 'slide' length, and every pane keeps
+one small aggregator state per key (see core/aggregations.py). A sliding window's result
+is the merge of its size / slide panes, and a pane is dropped once no open window needs
+it. A state is never a list of items.
+
+Besides the final result when a window closes, early (partial) results can be triggered
+every N items ('every') or every T seconds ('interval').
+
+Usage:
+    from sales_analysis.core import aggregations as agg
+    from sales_analysis.core.windows import counting
+    stream.window(counting(1000), agg={'revenue': agg.sum('discounted_price')})
+"""
+import time as clock
+from collections import namedtuple
+
+# One emitted window. 'values' is {name: result} without a key function and
+# {key: {name: result}} (like group_by) with one. 'final' is False for early results.
+# For count windows, start/end are item positions [start, end).
+WindowResult = namedtuple('WindowResult', 'start end values final')
+
+
+class WindowSpec:
+    """
+    Describes how items are assigned to windows: the pane length ('slide'), how many panes
+    make a window, and the position of an item (a timestamp, or its index for counts).
+    """
+    counted = False
+
+    def __init__(self, size, slide=None, time=None):
+        slide = size if slide is None else slide
+        if size <= 0 or slide <= 0:
+            raise ValueError("Window size and slide must be positive.")
+        if size % slide:
+            raise ValueError(f"Window size ({size}) must be a multiple of its slide ({slide}).")
+        self.size = size
+        self.slide = slide
+        self.time = time
+        self.panes = int(size // slide)
+
+    def position(self, item, index, now):
+        return self.time(item) if self.time is not None else now
+
+    def pane(self, position):
+        return int(position // self.slide)
+
+    def bounds(self, last_pane):
+        # [start, end) of the window whose last pane is 'last_pane'
+        end = (last_pane + 1) * self.slide
+        return end - self.size, end
+
+
+class CountWindowSpec(WindowSpec):
+    counted = True
+
+    def position(self, item, index, now):
+        return index
+
+    def bounds(self, last_pane):
+        # The first sliding windows are still filling up: they start at item 0.
+        start, end = super().bounds(last_pane)
+        return max(start, 0), end
+
+
+class RunningSpec(WindowSpec):
+    # A single window covering the whole stream; only triggers and the end emit it.
+    def __init__(self):
+        super().__init__(1)
+
+    def position(self, item, index, now):
+        return 0
+
+    def bounds(self, last_pane):
+        return None, None
+
+
+def tumbling(size, time=None):
+    return WindowSpec(size, None, time)
+
+def sliding(size, slide, time=None):
+    return WindowSpec(size, slide, time)
+
+def counting(size, slide=None):
+    return CountWindowSpec(size, slide)
+
+def running():
+    return RunningSpec()
+
+
+class WindowedAggregation:
+    """
+    Incremental window state machine shared by Stream.window and AsyncStream.window.
+
+    add(item) folds one item in and returns the WindowResults it caused (windows that
+    closed, early firings); advance(now) lets processing-time windows close while no items
+    arrive; flush() emits every window that still holds data (end of a finite stream).
+    Items older than every open window (late events) are counted in 'late' and dropped.
+    """
+    def __init__(self, spec, agg, key=None, every=None, interval=None, now=clock.monotonic):
+        self.spec = spec
+        self.aggregators = list(agg.items())
+        self.key = key
+        self.every = every
+        self.interval = interval
+        self.now = now
+        self.panes = {}       # pane id -> {key: [aggregator states]}
+        self.current = None  # newest pane seen; windows ending before it are closed
+        self.count = 0
+        self.late = 0
+        self._last_fired = None
+
+    def _fold(self, pane, item):
+        groups = self.panes.setdefault(pane, {})
+        group_key = self.key(item) if self.key is not None else None
+        states = groups.get(group_key)
+        if states is None:
+            states = groups[group_key] = [aggregator.initial() for _, aggregator in self.aggregators]
+        for index, (_, aggregator) in enumerate(self.aggregators):
+            states[index] = aggregator.add(states[index], aggregator.extract(item))
+
+    def _result(self, last_pane, final):
+        # Merges the panes of one window; None when the window holds no data.
+        merged = {}
+        for pane in range(last_pane - self.spec.panes + 1, last_pane + 1):
+            for group_key, states in self.panes.get(pane, {}).items():
+                if group_key not in merged:
+                    merged[group_key] = list(states)
+                else:
+                    merged[group_key] = [aggregator.merge(left, right) for (_, aggregator), left, right
+                                         in zip(self.aggregators, merged[group_key], states)]
+        if not merged:
+            return None
+        values = {
+            group_key: {name: aggregator.result(states[index])
+                        for index, (name, aggregator) in enumerate(self.aggregators)}
+            for group_key, states in merged.items()
+        }
+        start, end = self.spec.bounds(last_pane)
+        if self.spec.counted:
+            end = min(end, self.count)  # a trailing count window may be cut short
+        return WindowResult(start, end, values if self.key is not None else values[None], final)
+
+    def _close_until(self, pane):
+        # Emits every open window that ends before 'pane' and drops panes nobody needs.
+        results = []
+        if self.current is None:
+            return results
+        for last_pane in range(self.current, min(pane, self.current + self.spec.panes)):
+            result = self._result(last_pane, final=True)
+            if result is not None:
+                results.append(result)
+        oldest_needed = pane - self.spec.panes + 1
+        for stale in [p for p in self.panes if p < oldest_needed]:
+            del self.panes[stale]
+        self.current = pane
+        return results
+
+    def _due(self, now):
+        # Early-firing triggers: every N items, or T seconds since the last firing.
+        if self.every is not None and self.count % self.every == 0:
+            return True
+        if self.interval is not None:
+            if self._last_fired is None:
+                self._last_fired = now
+            return now - self._last_fired >= self.interval
+        return False
+
+    def _early(self, now):
+        # The partial result of the window that will close next.
+        self._last_fired = now
+        if self.current is None:
+            return []
+        result = self._result(self.current, final=False)
+        return [result] if result is not None else []
+
+    def add(self, item):
+        now = self.now()
+        position = self.spec.position(item, self.count, now)
+        pane = self.spec.pane(position)
+        self.count += 1
+        if self.current is not None and pane < self.current - self.spec.panes + 1:
+            self.late += 1
+            return []
+
+        results = self._close_until(pane) if self.current is None or pane > self.current else []
+        if self.current is None:
+            self.current = pane
+        self._fold(pane, item)
+        if self.spec.counted and self.count % self.spec.slide == 0:
+            # A count pane is complete after its last item; close its window right away.
+            results += self._close_until(pane + 1)
+        return results + self._early(now) if self._due(now) else results
+
+    def advance(self, now=None):
+        # Processing-time progress without new items (e.g. a quiet feed): closes time
+        # windows that have ended and fires the 'interval' trigger.
+        now = self.now() if now is None else now
+        results = []
+        if self.spec.time is None and not self.spec.counted and not isinstance(self.spec, RunningSpec):
+            pane = self.spec.pane(now)
+            if self.current is not None and pane > self.current:
+                results = self._close_until(pane)
+        if self.interval is not None and self._last_fired is not None and now - self._last_fired >= self.interval:
+            results += self._early(now)
+        return results
+
+    def flush(self):
+        # End of input: every window still holding data is emitted as final.
+        if self.current is None:
+            return []
+        if self.spec.counted:
+            # Only the pane still filling up is new; every earlier window was emitted.
+            return self._close_until(self.current + 1) if self.current in self.panes else []
+        return self._close_until(self.current + self.spec.panes)
+
+
+def windowed(source, spec, agg, key=None, every=None, interval=None):
+    """Generator version: yields WindowResults for an iterable of items."""
+    state = WindowedAggregation(spec, agg, key, every, interval)
+    for item in source:
+        yield from state.add(item)
+    yield from state.flush()
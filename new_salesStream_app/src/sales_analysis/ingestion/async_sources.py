@@ -0,0 +1,170 @@
+"""
+Async sources for live sales feeds, to be consumed with core.async_stream.AsyncStream.
+
+  * tail_lines / tail_csv follow a file that is still being appended to (like 'tail -f'),
+    reading in a worker thread and polling for new data without blocking the event loop,
+  * tcp_jsonl_source connects to a TCP feed that sends one JSON sales event per line.
+
+Every source is an async generator, so many feeds can run concurrently on one event loop
+(see AsyncStream.merge).
+"""
+import asyncio
+import csv
+import json
+import os
+
+from sales_analysis.core.models import Product
+from sales_analysis.ingestion.cleaning import (
+    currency_cleaner, percent_cleaner, rating_cleaner, count_cleaner
+)
+from sales_analysis.ingestion.loader import _primary_category, product_from_row
+from sales_analysis.ingestion.parallel import _record_end
+
+# Seconds between checks for new data once the end of a tailed file is reached.
+POLL_INTERVAL = 0.25
+# A tailed file hands control back to the event loop after this many lines, so one busy
+# feed cannot starve the others.
+_YIELD_EVERY = 256
+# Bytes a tailed file reads per call; reads run in the loop's default executor.
+_READ_SIZE = 1 << 16
+
+
+def _read_block(f, file_path):
+    # Runs in a worker thread, so file reads never block the event loop: the next block
+    # of the file, b'' at its end, or None if it shrank below the read position
+    # (truncated or rotated in place).
+    data = f.read(_READ_SIZE)
+    if not data and os.stat(file_path).st_size < f.tell():
+        return None
+    return data
+
+
+async def tail_lines(file_path, poll_interval=POLL_INTERVAL, from_end=False, stop=None, start=0):
+    """
+    Async generator yielding complete lines (without the newline) of a growing file,
+    starting at byte offset 'start' (or at the current end with from_end=True).
+    A line is only yielded once its newline has been written. If the file shrinks
+    (truncated or rotated in place) reading restarts from the beginning. Ends when the
+    asyncio.Event 'stop' is set and everything written so far has been read.
+    """
+    if not os.path.exists(file_path):
+        print(f"CRITICAL ERROR: Data file not found at: {file_path}")
+        return
+
+    loop = asyncio.get_running_loop()
+    with open(file_path, 'rb') as f:
+        if from_end:
+            f.seek(0, os.SEEK_END)
+        else:
+            f.seek(start)
+        pending = b''
+        while True:
+            data = await loop.run_in_executor(None, _read_block, f, file_path)
+            if data is None:
+                f.seek(0)
+                pending = b''
+                continue
+            if data:
+                lines = (pending + data).split(b'\n')
+                pending = lines.pop()  # not terminated yet
+                for count, line in enumerate(lines, 1):
+                    yield line.rstrip(b'\r').decode('utf-8')
+                    if count % _YIELD_EVERY == 0:
+                        await asyncio.sleep(0)
+                continue
+
+            if stop is not None and stop.is_set():
+                if pending:
+                    yield pending.rstrip(b'\r').decode('utf-8')
+                return
+            await asyncio.sleep(poll_interval)
+
+
+def _read_header(file_path):
+    # (header fields, offset of the first record); read in a worker thread.
+    with open(file_path, 'rb') as f:
+        header_end = _record_end(f, 0)
+        f.seek(0)
+        return next(csv.reader([f.read(header_end).decode('utf-8').rstrip('\r\n')]), []), header_end
+
+
+async def tail_csv(file_path, poll_interval=POLL_INTERVAL, from_end=False, stop=None):
+    """
+    Async generator yielding a Product for every record of a growing CSV file, cleaned
+    exactly like read_csv. The header is read from the top of the file; with from_end=True
+    only records appended after the call are yielded. Records whose quoted fields span
+    several lines are reassembled before parsing.
+    """
+    if not os.path.exists(file_path):
+        print(f"CRITICAL ERROR: Data file not found at: {file_path}")
+        return
+    header, header_end = await asyncio.get_running_loop().run_in_executor(None, _read_header, file_path)
+    if not header:
+        return  # nothing has been written yet, not even the header
+
+    record = []
+    quotes = 0
+    lines = tail_lines(file_path, poll_interval, from_end, stop, start=header_end)
+    async for line in lines:
+        # A newline only ends a record when the quotes seen so far are balanced.
+        record.append(line)
+        quotes += line.count('"')
+        if quotes % 2:
+            continue
+        text = "\n".join(record)
+        record = []
+        quotes = 0
+        if not text:
+            continue  # DictReader skips blank lines too
+        row = next(csv.reader([text]))
+        if row == header:
+            continue  # the file was truncated and rewritten from the top
+        yield product_from_row(dict(zip(header, row)))
+
+
+def product_from_record(record):
+    """
+    Builds a Product from one JSON sales event. Keys follow the CSV header; string values
+    go through the usual cleaners, while JSON numbers are taken as they are.
+    """
+    def number(key, cleaner, kind):
+        value = record.get(key)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return kind(value)
+        return cleaner(value)
+
+    return Product(
+        name=str(record.get('product_name', 'Unknown')),
+        category=_primary_category(str(record.get('category', 'Others'))),
+        discounted_price=number('discounted_price', currency_cleaner, float),
+        actual_price=number('actual_price', currency_cleaner, float),
+        discount_percentage=number('discount_percentage', percent_cleaner, float),
+        rating=number('rating', rating_cleaner, float),
+        rating_count=number('rating_count', count_cleaner, int),
+    )
+
+
+async def tcp_jsonl_source(host, port, limit=1 << 20):
+    """
+    Async generator that connects to a TCP feed and yields a Product per JSON line until
+    the server closes the connection. Blank lines are ignored; malformed lines are
+    reported and skipped so one bad event does not stop the feed. 'limit' caps the
+    length of a single line (asyncio.StreamReader buffer).
+    """
+    reader, writer = await asyncio.open_connection(host, port, limit=limit)
+    try:
+        async for line in reader:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            if not isinstance(record, dict):
+                print(f"WARNING: Skipping malformed event from {host}:{port}: {line[:80]!r}")
+                continue
+            yield product_from_record(record)
+    finally:
+        writer.close()
+        await writer.wait_closed()
@@ -0,0 +1,218 @@
+"""
+Binary columnar cache of the cleaned dataset.
+
+The first load of 'amazon.csv' writes its cleaned columns to 'amazon.csv.cache/' next to
+the source: one raw binary file per numeric column (float64 / int64 / int32 codes), the
+product names as one UTF-8 blob plus an offsets column, and a 'meta.json' describing the
+layout and the source fingerprint (size, mtime, SHA-256). Later loads memory-map those
+files instead of parsing text, so the columns are paged in lazily by the OS.
+
+Invalidation: a size change always rebuilds; an mtime change triggers a content hash, and
+the cache is only rebuilt if the hash differs (a plain 'touch' just refreshes the meta).
+"""
+import hashlib
+import json
+import mmap
+import os
+import sys
+from array import array
+
+from sales_analysis.core.table import NUMERIC_TYPECODES, ProductTable
+from sales_analysis.ingestion.columnar import read_table
+
+# Bump when the on-disk layout changes so stale caches are rebuilt automatically.
+CACHE_VERSION = 1
+META_FILE = 'meta.json'
+_HASH_BLOCK = 1 << 20
+
+
+def cache_dir(file_path):
+    return file_path + '.cache'
+
+
+def file_hash(file_path):
+    # SHA-256 of the source, read in 1 MiB blocks.
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# Content hashes taken in this process: absolute path -> (size, mtime_ns, sha256).
+_HASHES = {}
+
+
+def fingerprint(file_path, with_hash=True):
+    # Identity of a source file: size + mtime (cheap) and optionally the content hash.
+    # As in is_fresh, a hash is reused while size and mtime are unchanged: one taken
+    # earlier in this process, or the one in the column cache's meta.
+    stat = os.stat(file_path)
+    identity = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    if with_hash:
+        identity['sha256'] = _known_hash(file_path, stat.st_size, stat.st_mtime_ns) or file_hash(file_path)
+        _HASHES[os.path.abspath(file_path)] = (stat.st_size, stat.st_mtime_ns, identity['sha256'])
+    return identity
+
+
+def _known_hash(file_path, size, mtime_ns):
+    known = _HASHES.get(os.path.abspath(file_path))
+    if known is not None and known[:2] == (size, mtime_ns):
+        return known[2]
+    meta = _read_meta(cache_dir(file_path))
+    source = meta.get('source') if isinstance(meta, dict) else None
+    if isinstance(source, dict) and (source.get('size'), source.get('mtime_ns')) == (size, mtime_ns) \
+            and isinstance(source.get('sha256'), str):
+        return source['sha256']
+    return None
+
+
+class StringColumn:
+    """
+    Read-only column of strings stored as one UTF-8 blob plus an int64 offsets column.
+    Values are decoded on access, so untouched names never become Python strings.
+    """
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        return str(self.blob[self.offsets[index]:self.offsets[index + 1]], 'utf-8')
+
+    def __iter__(self):
+        return map(self.__getitem__, range(len(self)))
+
+
+def _read_meta(directory):
+    try:
+        with open(os.path.join(directory, META_FILE), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_fresh(file_path, meta, directory=None, version=CACHE_VERSION):
+    """
+    Checks a cache's meta against the current source. Returns True/False; when only the
+    mtime moved but the content hash still matches, the stored mtime is refreshed (if the
+    cache directory can be written). Meta without a complete 'source' is stale.
+    'directory' and 'version' default to the column cache's (the index reuses this check).
+    """
+    if not isinstance(meta, dict) or meta.get('version') != version or meta.get('byteorder') != sys.byteorder:
+        return False
+    source = meta.get('source')
+    if not isinstance(source, dict) or not {'size', 'mtime_ns', 'sha256'} <= source.keys():
+        return False
+    current = fingerprint(file_path, with_hash=False)
+    if current['size'] != source['size']:
+        return False
+    if current['mtime_ns'] == source['mtime_ns']:
+        return True
+    if file_hash(file_path) != source['sha256']:
+        return False
+    source['mtime_ns'] = current['mtime_ns']
+    directory = directory or cache_dir(file_path)
+    try:
+        _write_meta(directory, meta)
+    except OSError as error:
+        # Still fresh; the hash is just checked again next time.
+        print(f"WARNING: Could not refresh {os.path.join(directory, META_FILE)}: {error}")
+    return True
+
+
+def _write_meta(directory, meta):
+    temp = os.path.join(directory, META_FILE + '.tmp')
+    with open(temp, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(temp, os.path.join(directory, META_FILE))
+
+
+def _write_column(directory, name, data):
+    temp = os.path.join(directory, name + '.tmp')
+    with open(temp, 'wb') as f:
+        f.write(data)
+    os.replace(temp, os.path.join(directory, name))
+
+
+def write_cache(file_path, table, source=None):
+    """
+    Writes 'table' as the cache for 'file_path'. 'source' is the fingerprint taken before
+    the table was parsed (so edits made while parsing invalidate the cache). The meta file
+    is written last, so a half-written cache is never considered valid.
+    """
+    directory = cache_dir(file_path)
+    os.makedirs(directory, exist_ok=True)
+    meta_path = os.path.join(directory, META_FILE)
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+
+    source = source or fingerprint(file_path)
+    for field in NUMERIC_TYPECODES:
+        _write_column(directory, field + '.bin', getattr(table, field).tobytes())
+    _write_column(directory, 'category_codes.bin', array('i', table.category_codes).tobytes())
+
+    blob = bytearray()
+    offsets = array('q', [0])
+    for name in table.name:
+        blob += name.encode('utf-8')
+        offsets.append(len(blob))
+    _write_column(directory, 'name.bin', bytes(blob))
+    _write_column(directory, 'name_offsets.bin', offsets.tobytes())
+
+    _write_meta(directory, {
+        'version': CACHE_VERSION,
+        'byteorder': sys.byteorder,
+        'rows': len(table),
+        'categories': table.categories,
+        'source': source,
+    })
+
+
+def _map_file(path, typecode=None):
+    # Memory-maps a column file read-only; empty files become empty in-memory columns.
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return array(typecode) if typecode else b''
+        view = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+    return view.cast(typecode) if typecode else view
+
+
+def open_cache(file_path, meta):
+    # Builds a ProductTable whose columns are memory-mapped views of the cache files.
+    directory = cache_dir(file_path)
+    column = lambda name, typecode=None: _map_file(os.path.join(directory, name), typecode)
+    return ProductTable(
+        name=StringColumn(column('name.bin'), column('name_offsets.bin', 'q')),
+        category_codes=column('category_codes.bin', 'i'),
+        categories=meta['categories'],
+        **{field: column(field + '.bin', typecode) for field, typecode in NUMERIC_TYPECODES.items()},
+    )
+
+
+def load_table(file_path, rebuild=False):
+    """
+    Returns the cleaned dataset as a ProductTable, memory-mapping the binary cache when it
+    is fresh and (re)building it from the CSV otherwise. 'rebuild=True' forces a rebuild.
+    """
+    if not os.path.exists(file_path):
+        return read_table(file_path)  # reports the missing file, returns an empty table
+
+    directory = cache_dir(file_path)
+    if not rebuild:
+        meta = _read_meta(directory)
+        if is_fresh(file_path, meta):
+            return open_cache(file_path, meta)
+
+    source = fingerprint(file_path)
+    table = read_table(file_path)
+    try:
+        write_cache(file_path, table, source)
+    except OSError as error:
+        # A read-only data directory should not stop the analysis, only the caching.
+        print(f"WARNING: Could not write cache to {directory}: {error}")
+    return table
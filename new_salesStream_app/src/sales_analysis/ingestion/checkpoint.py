@@ -0,0 +1,286 @@
+"""
+Incremental re-analysis of an append-only CSV file.
+
+An IncrementalScan runs registered aggregations (dicts of core/aggregations.py
+aggregators, optionally grouped by a key, like group_by(agg=...)) over the file and
+saves a checkpoint next to it: the aggregator states, the byte offset of the last
+complete record they include, and a fingerprint of the file up to that offset. A later
+run on the grown file loads the states and only reads, cleans and folds the records
+appended after the offset, so its cost depends on the new data, not the whole file.
+Resumed states continue exactly where the previous run stopped, so the results are the
+ones a full pass would give.
+
+The file is read from scratch instead when there is no usable checkpoint: none yet, one
+for another file, reports whose definitions changed (aggregators and key functions are
+compared by their code, like memoized pipelines in core/memo.py), or a prefix that no
+longer matches (the file was truncated, rewritten or edited). The prefix fingerprint is
+the header plus the PROBE_BYTES at the start of the records and just before the offset,
+so checking it costs the same however large the file is; an edit in the middle of the
+prefix that keeps every byte offset is not noticed.
+
+A last record without its newline is never part of the checkpoint, so the next run reads
+it again in full. It is included in this run's results when it has every column (a file
+that just does not end in a newline), and skipped as still being written otherwise.
+"""
+import csv
+import hashlib
+import os
+import pickle
+from collections import namedtuple
+from itertools import islice
+
+from sales_analysis.core.memo import _Unkeyable, _digest, _key
+from sales_analysis.ingestion.loader import scan_rows
+from sales_analysis.ingestion.parallel import _record_end
+
+# Bump when the checkpoint layout changes so old checkpoints are ignored.
+CHECKPOINT_VERSION = 1
+PROBE_BYTES = 1 << 16
+_BLOCK = 1 << 16
+_BATCH = 4096
+
+
+def checkpoint_path(file_path):
+    return file_path + '.checkpoint'
+
+
+def prefix_fingerprint(f, header_end, offset):
+    # Hashes of the header and of the records' first and last PROBE_BYTES before 'offset'.
+    def digest(start, end):
+        f.seek(start)
+        return hashlib.sha256(f.read(max(end - start, 0))).hexdigest()
+
+    return {
+        'header': digest(0, header_end),
+        'head': digest(header_end, min(header_end + PROBE_BYTES, offset)),
+        'tail': digest(max(offset - PROBE_BYTES, header_end), offset),
+    }
+
+
+def _complete_end(f, start, size):
+    # Offset just past the last newline in [start, size) that ends a record (outside
+    # quotes), or 'start' if no record there is complete yet.
+    f.seek(start)
+    position = end = start
+    quotes = 0
+    while position < size:
+        block = f.read(min(_BLOCK, size - position))
+        if not block:
+            break
+        search_from = 0
+        while True:
+            newline = block.find(b'\n', search_from)
+            if newline < 0:
+                quotes += block.count(b'"', search_from)
+                break
+            quotes += block.count(b'"', search_from, newline)
+            if quotes % 2 == 0:
+                end = position + newline + 1
+            search_from = newline + 1
+        position += len(block)
+    return end
+
+
+def _lines(f, start, end):
+    # Text lines of the bytes [start, end), with CRLF read as LF like text mode does.
+    f.seek(start)
+    position = start
+    while position < end:
+        line = f.readline(end - position)
+        if not line:
+            return
+        position += len(line)
+        if line.endswith(b'\r\n'):
+            line = line[:-2] + b'\n'
+        yield line.decode('utf-8')
+
+
+class Aggregation:
+    """
+    Handle for one aggregation registered on an IncrementalScan: 'agg' maps names to
+    aggregators; with a 'key' function the items are grouped first. result() is
+    {name: value}, or {key: {name: value}} like group_by(key, agg=...).
+    """
+    def __init__(self, agg, key=None):
+        self.aggregators = list(agg.items())
+        self.key = key
+        self._state = None
+
+    def initial(self):
+        if self.key is not None:
+            return {}
+        return [aggregator.initial() for _, aggregator in self.aggregators]
+
+    def copy(self, state):
+        # States of single aggregators are immutable; only the containers are copied.
+        if self.key is not None:
+            return {key: list(group) for key, group in state.items()}
+        return list(state)
+
+    def fold(self, state, items):
+        aggregators = [aggregator for _, aggregator in self.aggregators]
+        for item in items:
+            if self.key is None:
+                group = state
+            else:
+                key = self.key(item)
+                group = state.get(key)
+                if group is None:
+                    group = state[key] = [aggregator.initial() for aggregator in aggregators]
+            for index, aggregator in enumerate(aggregators):
+                group[index] = aggregator.add(group[index], aggregator.extract(item))
+        return state
+
+    def _results(self, group):
+        return {name: aggregator.result(group[index])
+                for index, (name, aggregator) in enumerate(self.aggregators)}
+
+    def result(self):
+        if self._state is None:
+            raise RuntimeError("IncrementalScan.run() must be called before reading results.")
+        if self.key is None:
+            return self._results(self._state)
+        return {key: self._results(group) for key, group in self._state.items()}
+
+
+class CheckpointStats(namedtuple('CheckpointStats', 'resumed reason offset rows total_rows')):
+    """
+    What one IncrementalScan.run() did: whether it resumed from the checkpoint (else
+    'reason' says why not), the byte offset it started reading at, the rows it read and
+    the rows the results cover.
+    """
+    __slots__ = ()
+
+    def __str__(self):
+        if self.resumed:
+            return (f"resumed at byte {self.offset:,}, read {self.rows:,} new rows "
+                    f"({self.total_rows:,} in total)")
+        return f"full scan of {self.rows:,} rows ({self.reason})"
+
+
+class IncrementalScan:
+    """
+    Runs the registered aggregations over the append-only CSV 'file_path', resuming from
+    and updating the checkpoint file 'checkpoint' (default: next to the CSV).
+    """
+    def __init__(self, file_path, checkpoint=None):
+        self.file_path = file_path
+        self.checkpoint = checkpoint_path(file_path) if checkpoint is None else checkpoint
+        self.stats = None
+        self._aggregations = []
+
+    def register(self, agg, key=None):
+        # Registers an aggregation and returns its handle; read result() after run().
+        aggregation = Aggregation(agg, key)
+        self._aggregations.append(aggregation)
+        return aggregation
+
+    def signature(self):
+        # Digest of the registered aggregations' definitions, or None if they cannot be
+        # described by content (then the checkpoint is never reused).
+        try:
+            return _digest(tuple((_key(aggregation.aggregators, set()), _key(aggregation.key, set()))
+                                 for aggregation in self._aggregations))
+        except _Unkeyable:
+            return None
+
+    def _load(self, f, header_end, size, signature):
+        # (offset, rows, states) of a checkpoint that still matches, else (reason, None).
+        try:
+            with open(self.checkpoint, 'rb') as stored:
+                saved = pickle.load(stored)
+        except FileNotFoundError:
+            return "no checkpoint", None
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError) as error:
+            print(f"WARNING: Ignoring unreadable checkpoint {self.checkpoint}: {error}")
+            return "unreadable checkpoint", None
+        if not isinstance(saved, dict) or saved.get('version') != CHECKPOINT_VERSION:
+            return "old checkpoint format", None
+        if saved['file'] != os.path.abspath(self.file_path):
+            return "checkpoint of another file", None
+        if signature is None or saved['signature'] != signature:
+            return "reports changed", None
+        offset = saved['offset']
+        if offset > size or prefix_fingerprint(f, header_end, offset) != saved['prefix']:
+            return "file changed before the checkpoint", None
+        return "", (offset, saved['rows'], saved['states'])
+
+    def _save(self, f, header_end, offset, rows, states, signature):
+        saved = {
+            'version': CHECKPOINT_VERSION,
+            'file': os.path.abspath(self.file_path),
+            'signature': signature,
+            'offset': offset,
+            'prefix': prefix_fingerprint(f, header_end, offset),
+            'rows': rows,
+            'states': states,
+        }
+        temp = self.checkpoint + '.tmp'
+        try:
+            with open(temp, 'wb') as out:
+                pickle.dump(saved, out, pickle.HIGHEST_PROTOCOL)
+            os.replace(temp, self.checkpoint)
+        except (OSError, pickle.PicklingError, TypeError, AttributeError) as error:
+            print(f"WARNING: Could not write checkpoint {self.checkpoint}: {error}")
+            if os.path.exists(temp):
+                os.remove(temp)
+
+    def _fold(self, f, header, start, end, states, complete=True):
+        # Folds the products of the records in [start, end) into 'states' a batch at a
+        # time and returns how many there were. With complete=False, rows missing columns
+        # are left out.
+        rows = csv.reader(_lines(f, start, end))
+        if not complete:
+            rows = (row for row in rows if len(row) >= len(header))
+        products = scan_rows(rows, header)
+        rows = 0
+        while True:
+            batch = list(islice(products, _BATCH))
+            if not batch:
+                return rows
+            rows += len(batch)
+            for aggregation, state in zip(self._aggregations, states):
+                aggregation.fold(state, batch)
+
+    def run(self):
+        """
+        Reads the records appended since the checkpoint (all of them without one), updates
+        the checkpoint and returns every aggregation's result in registration order.
+        """
+        for aggregation in self._aggregations:
+            aggregation._state = aggregation.initial()
+        if not os.path.exists(self.file_path):
+            print(f"CRITICAL ERROR: Data file not found at: {self.file_path}")
+            self.stats = CheckpointStats(False, "no data file", 0, 0, 0)
+            return [aggregation.result() for aggregation in self._aggregations]
+
+        signature = self.signature()
+        with open(self.file_path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            header_end = _record_end(f, 0)
+            f.seek(0)
+            header = next(csv.reader([f.read(header_end).decode('utf-8')]), None)
+            if header is None:
+                self.stats = CheckpointStats(False, "empty file", 0, 0, 0)
+                return [aggregation.result() for aggregation in self._aggregations]
+
+            reason, loaded = self._load(f, header_end, size, signature)
+            if loaded is None:
+                offset, previous_rows = header_end, 0
+                states = [aggregation._state for aggregation in self._aggregations]
+            else:
+                offset, previous_rows, states = loaded
+
+            complete = _complete_end(f, offset, size)
+            rows = self._fold(f, header, offset, complete, states)
+            if signature is not None:
+                self._save(f, header_end, complete, previous_rows + rows, states, signature)
+            if complete < size:
+                # An unterminated last record: in this run's results, not in the checkpoint.
+                states = [aggregation.copy(state) for aggregation, state in zip(self._aggregations, states)]
+                rows += self._fold(f, header, complete, size, states, complete=False)
+
+        for aggregation, state in zip(self._aggregations, states):
+            aggregation._state = state
+        self.stats = CheckpointStats(loaded is not None, reason, offset, rows, previous_rows + rows)
+        return [aggregation.result() for aggregation in self._aggregations]
@@ -1,3 +1,6 @@
+import re
+from array import array
+
 def currency_cleaner(value):
     """
     Robustly parses currency strings (e.g., '₹1,099') into floats.
@@ -44,4 +47,104 @@ def count_cleaner(value):
     try:
         return int(str(value).replace(',', '').strip())
     except ValueError:
-        return 0
\ No newline at end of file
+        return 0
+
+# --- Batch (column-at-a-time) cleaners ---
+# Each takes a whole column of raw values and returns (typed array, invalid_mask), where
+# invalid_mask[i] == 1 marks a value that was missing or unparseable and fell back to 0.
+# A column of strings is joined once, so its symbols are removed by one replace() (or
+# re.sub) over the whole column, and the pieces are converted by a C-level
+# array.extend(map(float, ...)) without a Python call per value. A bad value stops that
+# pass after the values before it were appended; it gets the fallback and the pass
+# resumes right after it, so only bad values cost Python-level work. Columns holding
+# non-strings (or separators) are parsed value by value with the same fallbacks.
+
+_INVALID_VALUE = (ValueError, TypeError, AttributeError, OverflowError)
+
+# Removes the metadata after the pipe of every rating in a joined column ('4.5|...').
+_RATING_SUFFIX = re.compile(r'\|[^\n]*')
+
+def _strip_currency(text):
+    return text.replace('₹', '').replace(',', '')
+
+def _strip_percent(text):
+    return text.replace('%', '')
+
+def _strip_rating(text):
+    return _RATING_SUFFIX.sub('', text)
+
+def _strip_count(text):
+    return text.replace(',', '')
+
+def _parse_currency(value):
+    return float(_strip_currency(value))
+
+def _parse_percent(value):
+    return float(_strip_percent(value))
+
+def _parse_rating(value):
+    return float(str(value).partition('|')[0])
+
+def _parse_count(value):
+    return int(_strip_count(str(value)))
+
+def _stripped(values, strip):
+    # 'strip' applied to the whole column at once, split back into one piece per value;
+    # None when a value is not a string or contains the separator, so the pieces would
+    # not line up with the values.
+    try:
+        joined = '\n'.join(values)
+    except TypeError:
+        return None
+    pieces = strip(joined).split('\n')
+    return pieces if len(pieces) == len(values) else None
+
+def _clean_column(values, parse, typecode, fallback):
+    # One shared iterator: map() has consumed the bad value when parse raises, so the
+    # next extend() continues with the value after it.
+    values = iter(values)
+    column = array(typecode)
+    mask = bytearray()
+    while True:
+        try:
+            column.extend(map(parse, values))
+        except _INVALID_VALUE:
+            mask.extend(bytes(len(column) - len(mask)))
+            mask.append(1)
+            column.append(fallback)
+        else:
+            mask.extend(bytes(len(column) - len(mask)))
+            return column, mask
+
+def _clean_strings(values, strip, convert, parse, typecode, fallback):
+    values = list(values)  # read twice when the fast path does not apply
+    pieces = _stripped(values, strip)
+    if pieces is None:
+        return _clean_column(values, parse, typecode, fallback)
+    return _clean_column(pieces, convert, typecode, fallback)
+
+def currency_cleaner_batch(values):
+    """
+    Batch form of currency_cleaner: returns (float64 array, invalid mask).
+    """
+    return _clean_strings(values, _strip_currency, float, _parse_currency, 'd', 0.0)
+
+def percent_cleaner_batch(values):
+    """
+    Batch form of percent_cleaner: returns (float64 array, invalid mask).
+    """
+    return _clean_strings(values, _strip_percent, float, _parse_percent, 'd', 0.0)
+
+def rating_cleaner_batch(values):
+    """
+    Batch form of rating_cleaner: returns (float64 array, invalid mask).
+    Falsy values (None, '') are masked and become 0.0, like the scalar version.
+    """
+    return _clean_strings(values, _strip_rating, float, _parse_rating, 'd', 0.0)
+
+def count_cleaner_batch(values):
+    """
+    Batch form of count_cleaner: returns (int64 array, invalid mask).
+    Counts that do not fit in int64 are treated as invalid.
+    """
+    return _clean_strings(values, _strip_count, int, _parse_count, 'q', 0)
@@ -0,0 +1,65 @@
+import csv
+import os
+from itertools import islice
+from sales_analysis.core.table import ProductTable
+from sales_analysis.ingestion.cleaning import (
+    currency_cleaner_batch, percent_cleaner_batch, rating_cleaner_batch, count_cleaner_batch
+)
+from sales_analysis.ingestion.compression import open_text
+
+# Rows parsed per batch before the columns are handed to the batch cleaners.
+CHUNK_SIZE = 8192
+
+def _column(rows, index, default):
+    # Extracts one raw column from a chunk. Missing columns and short rows behave like
+    # DictReader: an absent header gives the default, a short row gives None.
+    if index is None:
+        return [default] * len(rows)
+    return [row[index] if index < len(row) else None for row in rows]
+
+def _primary_category(category):
+    return category.split('|')[0]
+
+def append_rows(table, rows, position, category_index):
+    """
+    Cleans one chunk of csv.reader rows column by column and appends it to 'table'.
+    'position' maps header names to column indexes; 'category_index' is the table's
+    category -> code lookup, carried across chunks.
+    """
+    table.extend(
+        _column(rows, position.get('product_name'), 'Unknown'),
+        map(_primary_category, _column(rows, position.get('category'), 'Others')),
+        currency_cleaner_batch(_column(rows, position.get('discounted_price'), None))[0],
+        currency_cleaner_batch(_column(rows, position.get('actual_price'), None))[0],
+        percent_cleaner_batch(_column(rows, position.get('discount_percentage'), None))[0],
+        rating_cleaner_batch(_column(rows, position.get('rating'), None))[0],
+        count_cleaner_batch(_column(rows, position.get('rating_count'), None))[0],
+        category_index,
+    )
+
+def read_table(file_path, chunk_size=CHUNK_SIZE):
+    """
+    Columnar loader: parses the whole CSV into a ProductTable (typed arrays) instead of
+    yielding one Product object per row. Rows are read in chunks and each column of a
+    chunk is cleaned in one batch call, with the same cleaning rules as read_csv.
+    """
+    table = ProductTable()
+    if not os.path.exists(file_path):
+        print(f"CRITICAL ERROR: Data file not found at: {file_path}")
+        return table
+
+    with open_text(file_path) as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return table
+        position = {column: index for index, column in enumerate(header)}
+        rows_without_blanks = filter(None, reader)  # DictReader skips blank lines too
+
+        category_index = {}
+        while True:
+            rows = list(islice(rows_without_blanks, chunk_size))
+            if not rows:
+                break
+            append_rows(table, rows, position, category_index)
+    return table
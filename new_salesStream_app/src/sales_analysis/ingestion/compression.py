@@ -0,0 +1,155 @@
+"""
+Transparent reading of compressed exports (.csv.gz, .csv.bz2, .csv.xz, .csv.zst).
+
+The compression is detected from the file's magic bytes, not its name, so a renamed or
+extension-less export still works. open_text() returns a text stream over the
+decompressed data: a background thread reads and decompresses the file in chunks into a
+bounded queue while the caller parses and cleans what is already there. zlib, bz2, lzma
+and zstandard release the GIL while they decompress, so both sides really run at once,
+and the queue bounds memory to a few chunks however large the file is. Uncompressed files
+are opened directly, exactly as before.
+
+gzip, bz2 and xz use the standard library. zstd uses compression.zstd (Python 3.14+) or
+the optional zstandard package.
+"""
+import io
+import os
+import queue
+import threading
+
+# Decompressed bytes per queued chunk, and how many chunks may wait in the queue.
+CHUNK_SIZE = 1 << 20
+QUEUE_DEPTH = 8
+
+MAGIC = (
+    (b'\x1f\x8b', 'gzip'),
+    (b'BZh', 'bz2'),
+    (b'\xfd7zXZ\x00', 'xz'),
+    (b'\x28\xb5\x2f\xfd', 'zstd'),
+)
+
+
+def detect_compression(file_path):
+    """'gzip', 'bz2', 'xz' or 'zstd' from the file's first bytes, or None if uncompressed."""
+    try:
+        descriptor = os.open(file_path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+    except OSError:
+        return None  # reported by the open() that follows
+    try:
+        head = os.read(descriptor, 6)
+    finally:
+        os.close(descriptor)
+    for magic, name in MAGIC:
+        if head.startswith(magic):
+            return name
+    return None
+
+
+def _zstd_reader(file_path):
+    try:
+        from compression import zstd
+        return zstd.open(file_path, 'rb')
+    except ImportError:
+        pass
+    try:
+        import zstandard
+    except ImportError as error:
+        raise ImportError("zstd-compressed files need Python 3.14 or the zstandard package "
+                          "(pip install zstandard)") from error
+    return zstandard.ZstdDecompressor().stream_reader(open(file_path, 'rb'), read_across_frames=True)
+
+
+def open_compressed(file_path, compression):
+    # Binary reader over the decompressed data (all members/frames of the file).
+    if compression == 'gzip':
+        import gzip
+        return gzip.open(file_path, 'rb')
+    if compression == 'bz2':
+        import bz2
+        return bz2.open(file_path, 'rb')
+    if compression == 'xz':
+        import lzma
+        return lzma.open(file_path, 'rb')
+    if compression == 'zstd':
+        return _zstd_reader(file_path)
+    raise ValueError(f"Unknown compression: {compression!r}")
+
+
+class PrefetchReader(io.RawIOBase):
+    """
+    Raw binary stream whose data is read from 'reader' (e.g. a GzipFile) by a background
+    thread, at most 'depth' chunks of 'chunk_size' bytes ahead of the consumer. Errors of
+    the thread are raised by the read that reaches them. Closing stops the thread.
+    """
+    def __init__(self, reader, chunk_size=CHUNK_SIZE, depth=QUEUE_DEPTH):
+        super().__init__()
+        self._queue = queue.Queue(depth)
+        self._stop = threading.Event()
+        self._pending = memoryview(b'')
+        self._done = False
+        self._thread = threading.Thread(target=self._fill, args=(reader, chunk_size),
+                                        name="decompress", daemon=True)
+        self._thread.start()
+
+    def _fill(self, reader, chunk_size):
+        try:
+            with reader:
+                while not self._stop.is_set():
+                    chunk = reader.read(chunk_size)
+                    self._put(chunk)  # b'' marks the end
+                    if not chunk:
+                        return
+        except BaseException as error:
+            self._put(error)
+
+    def _put(self, item):
+        # Waits for room in the queue, but gives up once the consumer has closed.
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._pending:
+            if self._done:
+                return 0
+            item = self._queue.get()
+            if isinstance(item, BaseException):
+                self._done = True
+                raise item
+            if not item:
+                self._done = True
+                return 0
+            self._pending = memoryview(item)
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+    def close(self):
+        if not self.closed:
+            self._stop.set()
+            while True:  # unblocks a waiting put()
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            self._thread.join()
+        super().close()
+
+
+def open_text(file_path, encoding='utf-8'):
+    """
+    Opens 'file_path' for reading as text like open(file_path, 'r', encoding=...),
+    decompressing it in a background thread when it is compressed.
+    """
+    compression = detect_compression(file_path)
+    if compression is None:
+        return open(file_path, mode='r', encoding=encoding)
+    raw = PrefetchReader(open_compressed(file_path, compression))
+    return io.TextIOWrapper(io.BufferedReader(raw, CHUNK_SIZE), encoding=encoding)
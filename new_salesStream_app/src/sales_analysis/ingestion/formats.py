@@ -0,0 +1,311 @@
+"""
+Binary and line-based alternatives to the CSV source: JSON-lines, Arrow IPC (Feather v2)
+and Parquet.
+
+The files hold the already cleaned Product fields (float prices, int counts, the primary
+category), so reading them skips CSV parsing and cleaning entirely. convert() (and the
+convert.py script) writes them once from an amazon.csv export; open_source(path) picks
+the reader from the file extension.
+
+Every source reads its file in record batches: dicts of Product field -> column (a list
+of values), holding only the projected fields. Like CsvSource, a Stream pushes its
+projection and leading col() filters into scan(); the filters run column-at-a-time on
+each batch before any Product is built, and Parquet row groups whose min/max statistics
+rule a comparison out are not read at all. Arrow and Parquet files are read through the
+optional pyarrow package; JSON-lines only needs the standard library.
+"""
+import json
+import os
+import sys
+from itertools import chain, compress, islice, repeat
+
+from sales_analysis.core.models import Product
+from sales_analysis.core.table import NUMERIC_TYPECODES, PRODUCT_FIELDS
+from sales_analysis.ingestion.compression import open_text
+from sales_analysis.ingestion.loader import _comparison, _conjuncts, read_csv
+
+# Rows per record batch, both when writing and when reading.
+BATCH_SIZE = 16384
+
+
+def _pyarrow():
+    # Imported lazily: only the Arrow and Parquet formats need it.
+    try:
+        import pyarrow
+    except ImportError as error:
+        raise ImportError("Arrow and Parquet files need the pyarrow package "
+                          "(pip install pyarrow)") from error
+    return pyarrow
+
+
+def _arrow_schema(pa):
+    types = {'d': pa.float64(), 'q': pa.int64()}
+    return pa.schema([('name', pa.string()), ('category', pa.dictionary(pa.int32(), pa.string()))] +
+                     [(field, types[typecode]) for field, typecode in NUMERIC_TYPECODES.items()])
+
+
+def _needed(fields, predicates):
+    # Fields a scan has to read: the projection plus whatever the filters look at.
+    if fields is None:
+        return list(PRODUCT_FIELDS)
+    needed = set(fields)
+    for predicate in predicates:
+        needed |= predicate.fields()
+    # A batch needs at least one column to know how many rows it has.
+    return [field for field in PRODUCT_FIELDS if field in needed] or ['rating_count']
+
+
+def _batches_of(products, batch_size):
+    # Groups Products into column batches for the writers.
+    products = iter(products)
+    while True:
+        chunk = list(islice(products, batch_size))
+        if not chunk:
+            return
+        yield {field: [getattr(product, field) for product in chunk] for field in PRODUCT_FIELDS}
+
+
+def batch_size(batch):
+    # Rows in a column batch.
+    return len(next(iter(batch.values()), ()))
+
+
+def select(batch, predicates):
+    """
+    Applies col() 'predicates' to a column 'batch' and returns the kept rows' Products
+    (fields missing from the batch are None). Comparisons against literals are checked
+    column by column; anything else is evaluated on the Products that remain.
+    """
+    size = batch_size(batch)
+    rows = None  # indexes still selected; None = all
+    rest = []
+    for predicate in predicates:
+        for conjunct in _conjuncts(predicate):
+            comparison = _comparison(conjunct)
+            if comparison is None:
+                rest.append(conjunct)
+                continue
+            slot, op, value = comparison
+            column = batch[PRODUCT_FIELDS[slot]]
+            if rows is None:
+                rows = list(compress(range(size), map(op, column, repeat(value))))
+            else:
+                rows = [row for row in rows if op(column[row], value)]
+    columns = [batch.get(field) for field in PRODUCT_FIELDS]
+    if rows is None:
+        products = map(Product, *(repeat(None, size) if column is None else column for column in columns))
+    else:
+        products = (Product(*(None if column is None else column[row] for column in columns)) for row in rows)
+    for conjunct in rest:
+        products = filter(conjunct, products)
+    return products
+
+
+def _interned(batch):
+    # Every product of a category shares one string object, as with read_csv.
+    if 'category' in batch:
+        batch['category'] = list(map(sys.intern, batch['category']))
+    return batch
+
+
+class FileSource:
+    """
+    Base class of the batch-reading sources. Subclasses implement batches(fields) and
+    the classmethod write(path, batches); everything else is shared.
+    """
+    format = None
+    extensions = ()
+
+    def __init__(self, file_path, batch_size=BATCH_SIZE):
+        self.file_path = file_path
+        self.batch_size = batch_size
+
+    def batches(self, fields=None, predicates=()):
+        # Yields dicts of field -> column for the Product 'fields' (None = all). Formats
+        # that can skip data by 'predicates' may do so; the predicates are still checked.
+        raise NotImplementedError
+
+    def __iter__(self):
+        return self.scan()
+
+    def scan(self, fields=None, predicates=(), span=None):
+        # Products with only 'fields' set, filtered by 'predicates' (see CsvSource.scan).
+        if not os.path.exists(self.file_path):
+            print(f"CRITICAL ERROR: Data file not found at: {self.file_path}")
+            return iter(())
+        batches = self.batches(_needed(fields, predicates), predicates)
+        if span is not None:
+            batches = span.timed(batches, f"{self.format} batches", batch_size)
+        return chain.from_iterable(select(_interned(batch), predicates) for batch in batches)
+
+    def fingerprint(self):
+        # Identity of the data for result caches (core/memo.py): path, size, mtime, SHA-256.
+        from sales_analysis.ingestion.cache import fingerprint
+        return os.path.abspath(self.file_path), fingerprint(self.file_path)
+
+    @classmethod
+    def write(cls, file_path, batches):
+        raise NotImplementedError
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.file_path!r})"
+
+
+class JsonLinesSource(FileSource):
+    """One JSON object of Product fields per line (standard library only)."""
+    format = 'jsonl'
+    extensions = ('.jsonl', '.ndjson')
+
+    def batches(self, fields=None, predicates=()):
+        fields = list(PRODUCT_FIELDS) if fields is None else fields
+        loads = json.loads
+        with open_text(self.file_path) as f:
+            lines = (line for line in f if line.strip())
+            while True:
+                records = list(map(loads, islice(lines, self.batch_size)))
+                if not records:
+                    return
+                yield {field: [record.get(field) for record in records] for field in fields}
+
+    @classmethod
+    def write(cls, file_path, batches):
+        with open(file_path, 'w', encoding='utf-8') as f:
+            for batch in batches:
+                columns = [batch[field] for field in PRODUCT_FIELDS]
+                for values in zip(*columns):
+                    f.write(json.dumps(dict(zip(PRODUCT_FIELDS, values)), ensure_ascii=False))
+                    f.write('\n')
+
+
+class ArrowSource(FileSource):
+    """
+    Arrow IPC file (Feather v2). The file is memory-mapped, so a projected read only
+    touches the pages of the columns it uses.
+    """
+    format = 'arrow'
+    extensions = ('.arrow', '.feather', '.ipc')
+
+    def batches(self, fields=None, predicates=()):
+        pa = _pyarrow()
+        fields = list(PRODUCT_FIELDS) if fields is None else fields
+        with pa.memory_map(self.file_path) as source:
+            reader = pa.ipc.open_file(source)
+            for index in range(reader.num_record_batches):
+                batch = reader.get_batch(index)
+                yield {field: batch.column(field).to_pylist() for field in fields}
+
+    @classmethod
+    def write(cls, file_path, batches):
+        pa = _pyarrow()
+        schema = _arrow_schema(pa)
+        with pa.OSFile(file_path, 'wb') as sink, pa.ipc.new_file(sink, schema) as writer:
+            for batch in batches:
+                writer.write_batch(pa.record_batch([batch[field] for field in PRODUCT_FIELDS], schema=schema))
+
+
+class ParquetSource(FileSource):
+    """
+    Parquet file, one row group per written batch. Only the projected column chunks are
+    read, and row groups whose statistics cannot satisfy a pushed comparison are skipped.
+    """
+    format = 'parquet'
+    extensions = ('.parquet', '.pq')
+
+    def batches(self, fields=None, predicates=()):
+        _pyarrow()
+        import pyarrow.parquet as pq
+        fields = list(PRODUCT_FIELDS) if fields is None else fields
+        parquet = pq.ParquetFile(self.file_path)
+        groups = [group for group in range(parquet.metadata.num_row_groups)
+                  if _may_match(parquet.metadata.row_group(group), predicates)]
+        if not groups:
+            return
+        for batch in parquet.iter_batches(batch_size=self.batch_size, row_groups=groups, columns=fields):
+            yield {field: batch.column(field).to_pylist() for field in fields}
+
+    @classmethod
+    def write(cls, file_path, batches):
+        pa = _pyarrow()
+        import pyarrow.parquet as pq
+        schema = _arrow_schema(pa)
+        with pq.ParquetWriter(file_path, schema) as writer:
+            for batch in batches:
+                writer.write_table(pa.Table.from_pydict({field: batch[field] for field in PRODUCT_FIELDS},
+                                                        schema=schema))
+
+
+def _may_match(row_group, predicates):
+    # False when a comparison conjunct cannot hold for any value between the row group's
+    # min and max statistics (missing statistics never rule anything out).
+    positions = {row_group.column(index).path_in_schema: index for index in range(row_group.num_columns)}
+    for predicate in predicates:
+        for conjunct in _conjuncts(predicate):
+            comparison = _comparison(conjunct)
+            if comparison is None or conjunct.symbol == '!=':
+                continue
+            slot, _, value = comparison
+            index = positions.get(PRODUCT_FIELDS[slot])
+            statistics = None if index is None else row_group.column(index).statistics
+            if statistics is None or not statistics.has_min_max:
+                continue
+            low, high = statistics.min, statistics.max
+            try:
+                possible = {'<': low < value, '<=': low <= value, '>': high > value,
+                            '>=': high >= value, '==': low <= value <= high}[conjunct.symbol]
+            except TypeError:
+                continue
+            if not possible:
+                return False
+    return True
+
+
+_COMPRESSED_EXTENSIONS = ('.gz', '.bz2', '.xz', '.zst')
+FORMATS = {source.format: source for source in (JsonLinesSource, ArrowSource, ParquetSource)}
+
+
+def format_of(file_path):
+    """The format name for 'file_path' from its extension, or None (e.g. for CSV)."""
+    root, extension = os.path.splitext(file_path.lower())
+    if extension in _COMPRESSED_EXTENSIONS:  # e.g. amazon.jsonl.gz
+        extension = os.path.splitext(root)[1]
+    for name, source in FORMATS.items():
+        if extension in source.extensions:
+            return name
+    return None
+
+
+def open_source(file_path):
+    """A Stream source for 'file_path': the matching FileSource, or a CsvSource."""
+    name = format_of(file_path)
+    if name is None:
+        from sales_analysis.ingestion.loader import CsvSource
+        return CsvSource(file_path)
+    return FORMATS[name](file_path)
+
+
+def convert(csv_path, target_path, format=None, batch_size=BATCH_SIZE):
+    """
+    Writes the cleaned products of the CSV file 'csv_path' to 'target_path' in 'format'
+    (default: from the target's extension) and returns the number of rows written. The
+    CSV is read as a stream, so memory stays bounded by one batch.
+    """
+    format = format or format_of(target_path)
+    if format not in FORMATS:
+        raise ValueError(f"Unknown format for {target_path!r}: choose one of {', '.join(FORMATS)}")
+    written = 0
+
+    def counted(batches):
+        nonlocal written
+        for batch in batches:
+            written += len(batch['name'])
+            yield batch
+
+    temp = target_path + '.tmp'
+    try:
+        FORMATS[format].write(temp, counted(_batches_of(read_csv(csv_path), batch_size)))
+    except BaseException:
+        if os.path.exists(temp):
+            os.remove(temp)
+        raise
+    os.replace(temp, target_path)
+    return written
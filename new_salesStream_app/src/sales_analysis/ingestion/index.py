@@ -0,0 +1,274 @@
+"""
+Persistent secondary indexes over the CSV dataset.
+
+build_index writes 'amazon.csv.index/' next to the source in one pass over the CSV:
+  * offsets.bin                       - byte offset of every record, plus the end offset
+  * name.hashes.bin / name.rows.bin   - hash index on the product name: the stable_hash of
+                                        every name, sorted, with the row it belongs to
+  * category.rows.bin                 - rows grouped by primary category; meta.json maps
+                                        each category to its [start, end) slice
+  * <field>.keys.bin / <field>.rows.bin - sorted indexes on rating, rating_count and
+                                        discount_percentage (value order, then row order)
+Like the column cache (cache.py), every file is a raw native array that is memory-mapped
+on load, and meta.json holds the source fingerprint, so a stale index is rebuilt.
+
+ProductIndex.scan(fields, predicates) is the indexed counterpart of scan_csv. It picks the
+most selective conjunct an index can answer (name == x, category == x, or a comparison on
+a sorted field), seeks straight to those records in file order and runs the normal
+cleaning and filter steps on them, so every predicate is still checked on the rows found.
+Selective queries cost O(matches) instead of O(file). When no conjunct is selective enough
+the file is scanned sequentially as usual.
+"""
+import csv
+import io
+import os
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+
+from sales_analysis.core.expressions import BinaryOp, Column, Literal
+from sales_analysis.core.sketches import stable_hash
+from sales_analysis.ingestion.cache import (
+    META_FILE, _map_file, _read_meta, _write_column, _write_meta, fingerprint, is_fresh
+)
+from sales_analysis.ingestion.compression import detect_compression
+from sales_analysis.ingestion.loader import FIELD_SOURCES, _conjuncts, scan_csv, scan_rows
+from sales_analysis.ingestion.parallel import _record_end
+
+# Bump when the on-disk layout changes so stale indexes are rebuilt automatically.
+INDEX_VERSION = 1
+SORTED_FIELDS = {'rating': 'd', 'rating_count': 'q', 'discount_percentage': 'd'}
+# Beyond this fraction of all rows, one sequential scan is cheaper than seeking to each.
+MAX_SELECTIVITY = 0.2
+
+
+def index_dir(file_path):
+    return file_path + '.index'
+
+
+def _records(f, offset):
+    # Yields (start offset, text) of every non-blank record from 'offset' (a record
+    # boundary) on. A newline only ends a record when the quotes before it are balanced.
+    lines = []
+    quotes = 0
+    start = offset
+    for line in f:
+        if not lines:
+            start = offset
+        lines.append(line)
+        offset += len(line)
+        quotes += line.count(b'"')
+        if quotes % 2:
+            continue
+        text = b''.join(lines).decode('utf-8')
+        lines = []
+        quotes = 0
+        if '\r' in text:
+            text = text.replace('\r\n', '\n').replace('\r', '\n')  # as text mode reads it
+        if text.strip('\n'):
+            yield start, text
+    if lines:
+        yield start, b''.join(lines).decode('utf-8')
+
+
+def build_index(file_path):
+    """Writes the index for 'file_path' and returns its meta (see the module docstring)."""
+    source = fingerprint(file_path)
+    offsets = array('q')
+    name_hashes = array('Q')
+    categories = {}
+    values = {field: [] for field in SORTED_FIELDS}
+
+    with open(file_path, 'rb') as f:
+        header_end = _record_end(f, 0)
+        f.seek(0)
+        header = next(csv.reader([f.read(header_end).decode('utf-8')]), [])
+        position = {column: index for index, column in enumerate(header)}
+        fields = ['name', 'category'] + list(SORTED_FIELDS)
+        parsers = [(FIELD_SOURCES[field][2], position.get(FIELD_SOURCES[field][0]), FIELD_SOURCES[field][1])
+                   for field in fields]
+        f.seek(header_end)
+        for start, text in _records(f, header_end):
+            row = next(csv.reader([text]))
+            width = len(row)
+            name, category, *numbers = [
+                clean(default if index is None else row[index] if index < width else None)
+                for clean, index, default in parsers]
+            row_number = len(offsets)
+            offsets.append(start)
+            name_hashes.append(stable_hash(name))
+            categories.setdefault(category, array('q')).append(row_number)
+            for field, value in zip(SORTED_FIELDS, numbers):
+                values[field].append(value)
+        end = f.tell()
+    offsets.append(max(end, offsets[-1] if offsets else end))
+
+    directory = index_dir(file_path)
+    os.makedirs(directory, exist_ok=True)
+    meta_path = os.path.join(directory, META_FILE)
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+
+    rows = len(offsets) - 1
+    _write_column(directory, 'offsets.bin', offsets.tobytes())
+    order = sorted(range(rows), key=name_hashes.__getitem__)
+    _write_column(directory, 'name.hashes.bin', array('Q', (name_hashes[i] for i in order)).tobytes())
+    _write_column(directory, 'name.rows.bin', array('q', order).tobytes())
+
+    comparable = {}
+    category_rows = array('q')
+    category_slices = {}
+    for category in sorted(categories):
+        category_slices[category] = [len(category_rows), len(category_rows) + len(categories[category])]
+        category_rows.extend(categories[category])
+    _write_column(directory, 'category.rows.bin', category_rows.tobytes())
+
+    for field, typecode in SORTED_FIELDS.items():
+        column = values[field]
+        # NaN (a 'nan' cell parses as a float) sorts last and is left out of lookups,
+        # since it never satisfies a comparison.
+        order = sorted(range(rows), key=lambda row: (column[row] != column[row], column[row]))
+        comparable[field] = sum(1 for value in column if value == value)
+        _write_column(directory, f'{field}.keys.bin', array(typecode, (column[i] for i in order)).tobytes())
+        _write_column(directory, f'{field}.rows.bin', array('q', order).tobytes())
+
+    meta = {
+        'version': INDEX_VERSION,
+        'byteorder': sys.byteorder,
+        'rows': rows,
+        'header_end': header_end,
+        'categories': category_slices,
+        'comparable': comparable,
+        'source': source,
+    }
+    _write_meta(directory, meta)
+    return meta
+
+
+def _indexable(conjunct):
+    # (field, symbol, value) for "col(field) <op> literal" conjuncts an index can answer.
+    if not (isinstance(conjunct, BinaryOp) and isinstance(conjunct.left, Column)
+            and isinstance(conjunct.right, Literal)):
+        return None
+    field, symbol, value = conjunct.left.name, conjunct.symbol, conjunct.right.value
+    if field in ('name', 'category') and symbol == '==':
+        return field, symbol, value
+    if field in SORTED_FIELDS and symbol in ('<', '<=', '>', '>=', '=='):
+        return field, symbol, value
+    return None
+
+
+class ProductIndex:
+    """Memory-mapped secondary indexes of one CSV file (see the module docstring)."""
+    def __init__(self, file_path, meta):
+        self.file_path = file_path
+        self.meta = meta
+        directory = index_dir(file_path)
+        column = lambda name, typecode: _map_file(os.path.join(directory, name), typecode)
+        self.offsets = column('offsets.bin', 'q')
+        self.name_hashes = column('name.hashes.bin', 'Q')
+        self.name_rows = column('name.rows.bin', 'q')
+        self.category_rows = column('category.rows.bin', 'q')
+        self.sorted_keys = {field: column(f'{field}.keys.bin', typecode)
+                            for field, typecode in SORTED_FIELDS.items()}
+        self.sorted_rows = {field: column(f'{field}.rows.bin', 'q') for field in SORTED_FIELDS}
+
+    def __len__(self):
+        return self.meta['rows']
+
+    def _slice(self, field, symbol, value):
+        # (rows column, start, end) of the index entries matching one conjunct.
+        if field == 'name':
+            hashed = stable_hash(value) if isinstance(value, str) else None
+            if hashed is None:
+                return self.name_rows, 0, 0
+            return (self.name_rows, bisect_left(self.name_hashes, hashed),
+                    bisect_right(self.name_hashes, hashed))
+        if field == 'category':
+            start, end = self.meta['categories'].get(value, (0, 0))
+            return self.category_rows, start, end
+        keys = self.sorted_keys[field]
+        start, end = 0, self.meta['comparable'][field]
+        if symbol in ('>', '<='):
+            split = bisect_right(keys, value, 0, end)
+        else:
+            split = bisect_left(keys, value, 0, end)
+        if symbol in ('>', '>='):
+            start = split
+        elif symbol in ('<', '<='):
+            end = split
+        else:
+            start, end = split, bisect_right(keys, value, split, end)
+        return self.sorted_rows[field], start, end
+
+    def rows(self, field, value, symbol='=='):
+        """Row numbers (in file order) whose cleaned 'field' satisfies 'symbol value'."""
+        column, start, end = self._slice(field, symbol, value)
+        return sorted(column[start:end])
+
+    def choose(self, predicates):
+        # The most selective indexable conjunct as (matching row count, field, symbol,
+        # value), or None when nothing is indexable or selective enough.
+        best = None
+        for predicate in predicates:
+            for conjunct in _conjuncts(predicate):
+                found = _indexable(conjunct)
+                if found is None:
+                    continue
+                _, start, end = self._slice(*found)
+                if best is None or end - start < best[0]:
+                    best = (end - start, *found)
+        if best is None or best[0] > MAX_SELECTIVITY * len(self):
+            return None
+        return best
+
+    def read_rows(self, rows):
+        """Yields the CSV rows (lists of strings) of the given ascending row numbers."""
+        offsets = self.offsets
+        with open(self.file_path, 'rb') as f:
+            index = 0
+            while index < len(rows):
+                # Consecutive rows are read with one seek and one read.
+                first = last = rows[index]
+                index += 1
+                while index < len(rows) and rows[index] == last + 1:
+                    last = rows[index]
+                    index += 1
+                f.seek(offsets[first])
+                data = f.read(offsets[last + 1] - offsets[first])
+                yield from csv.reader(io.TextIOWrapper(io.BytesIO(data), encoding='utf-8'))
+
+    def scan(self, fields=None, predicates=(), span=None):
+        """Generator like scan_csv that uses the index for the most selective predicate."""
+        choice = self.choose(predicates)
+        if choice is None:
+            yield from scan_csv(self.file_path, fields, predicates, span)
+            return
+        _, field, symbol, value = choice
+        with open(self.file_path, 'rb') as f:
+            header = next(csv.reader([f.read(self.meta['header_end']).decode('utf-8')]), [])
+        rows = self.read_rows(self.rows(field, value, symbol))
+        if span is not None:
+            rows = span.timed(rows, f"index reads ({field} {symbol} {value!r})")
+        yield from scan_rows(rows, header, fields, predicates)
+
+
+def load_index(file_path, rebuild=False):
+    """
+    Returns the ProductIndex of 'file_path', building (or rebuilding) it when it is
+    missing or stale. Returns None if the file is missing, compressed (its records cannot
+    be read by seeking) or the index cannot be written.
+    """
+    if not os.path.exists(file_path) or detect_compression(file_path):
+        return None
+    directory = index_dir(file_path)
+    if not rebuild:
+        meta = _read_meta(directory)
+        if is_fresh(file_path, meta, directory, INDEX_VERSION):
+            return ProductIndex(file_path, meta)
+    try:
+        meta = build_index(file_path)
+    except OSError as error:
+        print(f"WARNING: Could not write index to {directory}: {error}")
+        return None
+    return ProductIndex(file_path, meta)
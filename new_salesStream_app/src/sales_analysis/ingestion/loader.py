@@ -1,29 +1,203 @@
 import csv
 import os
+import sys
+from operator import itemgetter
+from sales_analysis.core.expressions import BinaryOp, Column, Literal
 from sales_analysis.core.models import Product
+from sales_analysis.core.table import PRODUCT_FIELDS
 from sales_analysis.ingestion.cleaning import (
     currency_cleaner, percent_cleaner, rating_cleaner, count_cleaner
 )
+from sales_analysis.ingestion.compression import open_text
 
-def read_csv(file_path):
+def _primary_category(category):
+    # Take primary category only. Interned, so every product of a category shares one
+    # string object instead of holding its own copy.
+    return sys.intern(category.split('|')[0])
+
+def read_csv(file_path, use_cache=False, rebuild_cache=False):
     """
     A generator function that reads a CSV file row by row.
     Yields Product objects one at a time to avoid loading the entire file into RAM.
+    With use_cache=True the cleaned columns are memory-mapped from the binary cache next
+    to the file (built on first use, see ingestion/cache.py) instead of parsing the text.
     """
+    if use_cache or rebuild_cache:
+        # Imported lazily: the cache module depends on the columnar loader.
+        from sales_analysis.ingestion.cache import load_table
+        yield from load_table(file_path, rebuild=rebuild_cache)
+        return
+
     if not os.path.exists(file_path):
         print(f"CRITICAL ERROR: Data file not found at: {file_path}")
         return
 
-    with open(file_path, mode='r', encoding='utf-8') as f:
+    with open_text(file_path) as f:
         reader = csv.DictReader(f)
         for row in reader:
-            # Construct a Product object, applying cleaning functions to raw string data
-            yield Product(
-                name=row.get('product_name', 'Unknown'),
-                category=row.get('category', 'Others').split('|')[0], # Take primary category only
-                discounted_price=currency_cleaner(row.get('discounted_price')),
-                actual_price=currency_cleaner(row.get('actual_price')),
-                discount_percentage=percent_cleaner(row.get('discount_percentage')),
-                rating=rating_cleaner(row.get('rating')),
-                rating_count=count_cleaner(row.get('rating_count'))
-            )
\ No newline at end of file
+            yield product_from_row(row)
+
+def product_from_row(row):
+    """
+    Builds a Product from one raw CSV record (a dict keyed by the CSV header), applying
+    the cleaning functions to the raw string data. Shared by every row-based source.
+    """
+    return Product(
+        name=row.get('product_name', 'Unknown'),
+        category=_primary_category(row.get('category', 'Others')),
+        discounted_price=currency_cleaner(row.get('discounted_price')),
+        actual_price=currency_cleaner(row.get('actual_price')),
+        discount_percentage=percent_cleaner(row.get('discount_percentage')),
+        rating=rating_cleaner(row.get('rating')),
+        rating_count=count_cleaner(row.get('rating_count'))
+    )
+
+def _raw(value):
+    return value
+
+# Product field -> (CSV column, default when the column is missing, cleaner)
+FIELD_SOURCES = {
+    'name': ('product_name', 'Unknown', _raw),
+    'category': ('category', 'Others', _primary_category),
+    'discounted_price': ('discounted_price', None, currency_cleaner),
+    'actual_price': ('actual_price', None, currency_cleaner),
+    'discount_percentage': ('discount_percentage', None, percent_cleaner),
+    'rating': ('rating', None, rating_cleaner),
+    'rating_count': ('rating_count', None, count_cleaner),
+}
+
+class _Record(list):
+    # Cleaned values of one row in PRODUCT_FIELDS order. Fields are readable as
+    # attributes, so col() predicates can be evaluated before a Product is built.
+    __slots__ = ()
+    savings = property(lambda record: record.actual_price - record.discounted_price)
+
+for _index, _field in enumerate(PRODUCT_FIELDS):
+    setattr(_Record, _field, property(itemgetter(_index)))
+
+_COMPARISONS = ('<', '<=', '>', '>=', '==', '!=')
+
+def _conjuncts(predicate):
+    # Splits (a & b & ...) into its parts, so each can be checked as early as possible.
+    if isinstance(predicate, BinaryOp) and predicate.symbol == '&':
+        return _conjuncts(predicate.left) + _conjuncts(predicate.right)
+    return [predicate]
+
+def _comparison(predicate):
+    # (slot, operator, literal) for "col(field) <op> literal", else None.
+    if (isinstance(predicate, BinaryOp) and predicate.symbol in _COMPARISONS
+            and isinstance(predicate.left, Column) and predicate.left.name in PRODUCT_FIELDS
+            and isinstance(predicate.right, Literal)):
+        return PRODUCT_FIELDS.index(predicate.left.name), predicate.op, predicate.right.value
+    return None
+
+def scan_csv(file_path, fields=None, predicates=(), span=None):
+    """
+    Generator like read_csv that only cleans the given Product 'fields' (None = all);
+    the others are left as None. 'predicates' (col() expressions) are split into their
+    '&' parts and each part is checked as soon as its own columns are cleaned, so a
+    rejected row skips the remaining cleaning and never allocates a Product.
+    With a profiling 'span' (core/profile.py), the csv module's time is measured apart.
+    """
+    if not os.path.exists(file_path):
+        print(f"CRITICAL ERROR: Data file not found at: {file_path}")
+        return
+
+    with open_text(file_path) as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        if span is not None:
+            reader = span.timed(reader, "csv parsing")
+        yield from scan_rows(reader, header, fields, predicates)
+
+def scan_rows(rows, header, fields=None, predicates=()):
+    """
+    The cleaning and filtering loop of scan_csv over already split CSV 'rows' (lists of
+    strings in 'header' order). Also used for rows read by seeking through an index.
+    """
+    position = {column: index for index, column in enumerate(header)}
+    cleaned = set()
+
+    def parsers(names):
+        # (slot in the record, CSV column index or None, default, cleaner) for every
+        # field in 'names' that has not been cleaned by an earlier step.
+        result = []
+        for slot, field in enumerate(PRODUCT_FIELDS):
+            if field in names and field not in cleaned:
+                column, default, clean = FIELD_SOURCES[field]
+                result.append((slot, position.get(column), default, clean))
+                cleaned.add(field)
+        return result
+
+    # One step per conjunct: clean its columns, then test it. Plain comparisons
+    # against a literal skip the expression tree and compare the slot directly.
+    steps = []
+    for predicate in predicates:
+        for conjunct in _conjuncts(predicate):
+            comparison = _comparison(conjunct)
+            if comparison is None:
+                steps.append((parsers(conjunct.fields()), None, conjunct, None))
+            else:
+                steps.append((parsers(conjunct.fields()), *comparison))
+    rest = parsers(set(PRODUCT_FIELDS if fields is None else fields))
+    empty = [None] * len(PRODUCT_FIELDS)
+
+    for row in rows:
+        if not row:
+            continue  # DictReader skips blank lines too
+        record = _Record(empty)
+        width = len(row)
+        for step_parsers, slot, test, value in steps:
+            for target, index, default, clean in step_parsers:
+                # Missing column -> default; short row -> None (as with DictReader)
+                record[target] = clean(default if index is None else row[index] if index < width else None)
+            if not (test(record) if slot is None else test(record[slot], value)):
+                break
+        else:
+            for target, index, default, clean in rest:
+                record[target] = clean(default if index is None else row[index] if index < width else None)
+            yield Product(*record)
+
+class CsvSource:
+    """
+    Iterable CSV source for Stream. Iterating it behaves exactly like read_csv, but a
+    Stream reading from it pushes its projection (the fields the pipeline uses) and its
+    leading col() filters down into scan_csv. With use_index=True, pushed-down filters
+    are answered from the persistent secondary indexes (see ingestion/index.py). With
+    use_mmap=True the file is scanned by scan_mmap (ingestion/mmap_scan.py), which only
+    decodes the columns in use: faster for wide files with long text columns.
+    """
+    def __init__(self, file_path, use_index=False, use_mmap=False):
+        self.file_path = file_path
+        self.use_index = use_index
+        self.use_mmap = use_mmap
+
+    def __iter__(self):
+        if self.use_mmap:
+            return self.scan()
+        return read_csv(self.file_path)
+
+    def scan(self, fields=None, predicates=(), span=None):
+        if self.use_index and predicates:
+            # Imported lazily: the index module depends on this one.
+            from sales_analysis.ingestion.index import load_index
+            index = load_index(self.file_path)
+            if index is not None:
+                return index.scan(fields, predicates, span)
+        if self.use_mmap:
+            # Imported lazily: the mmap scanner depends on this module.
+            from sales_analysis.ingestion.mmap_scan import scan_mmap
+            return scan_mmap(self.file_path, fields, predicates, span)
+        return scan_csv(self.file_path, fields, predicates, span)
+
+    def fingerprint(self):
+        # Identity of the data for result caches (core/memo.py): path, size, mtime, SHA-256.
+        # Imported lazily: the cache module depends on the columnar loader.
+        from sales_analysis.ingestion.cache import fingerprint
+        return os.path.abspath(self.file_path), fingerprint(self.file_path)
+
+    def __repr__(self):
+        options = "".join(f", {name}=True" for name in ('use_index', 'use_mmap') if getattr(self, name))
+        return f"CsvSource({self.file_path!r}{options})"
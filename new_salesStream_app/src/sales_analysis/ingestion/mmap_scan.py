@@ -0,0 +1,128 @@
+"""
+Zero-copy CSV scanning over a memory-mapped file.
+
+scan_mmap() is a drop-in replacement for scan_csv (same arguments, same Products) that
+never decodes the columns a pipeline does not use. The file is memory-mapped and a
+regular expression compiled for the needed column positions finds the records in the
+raw bytes, a chunk of about CHUNK_SIZE bytes at a time: the columns before the last
+needed one are matched but not captured, and everything after it is skipped in one
+step. Only the captured columns become bytes objects, and they are unquoted and decoded
+a whole chunk at a time with map() over the bytes methods, so no Python code runs per
+field until the usual cleaning and filter steps (scan_rows). A pipeline reading the
+rating of a file with long description columns touches those descriptions only as
+mapped pages, never as Python objects.
+
+Records follow the csv module's defaults: quoted fields may hold commas, doubled quotes
+and newlines (CRLF inside quotes reads as LF, like a file opened in text mode), and
+blank lines are skipped. Unlike csv.DictReader, columns missing from a short row read as
+empty strings rather than None, and text after a field's closing quote is not
+supported. Compressed files cannot be mapped and are read by scan_csv.
+"""
+import csv
+import mmap
+import os
+import re
+from itertools import chain, repeat
+from operator import add
+
+from sales_analysis.ingestion.compression import detect_compression
+from sales_analysis.ingestion.loader import FIELD_SOURCES, scan_csv, scan_rows
+
+# Bytes of records searched per regular expression call.
+CHUNK_SIZE = 1 << 20
+
+# Every pattern below can match a given text in only one way (loops are unrolled, so a
+# run of plain characters is always followed by a quote), which keeps backtracking
+# linear on malformed rows without needing possessive quantifiers (Python 3.11+).
+_QUOTED = rb'(?:"[^"]*")+'  # "..." with "" escapes, as adjacent quoted runs
+_PLAIN = rb'(?:[^,\r\n"][^,\r\n]*)?'
+_FIELD = rb'(?:' + _QUOTED + rb'|' + _PLAIN + rb')'
+# A needed field captures the inside of its quotes and its plain text as two groups
+# (one of them stays empty).
+_CAPTURED = rb'(?:"([^"]*(?:""[^"]*)*)"|(' + _PLAIN + rb'))'
+# The rest of a record after the last needed column, including quoted newlines.
+_REST = rb'[^"\r\n]*(?:"[^"]*"[^"\r\n]*)*'
+
+
+def record_pattern(positions):
+    """
+    Compiled pattern matching one record (and any blank lines before it) that captures
+    the columns at the sorted 'positions', in order: two groups per column, the text of
+    a quoted value and the text of a plain one. Columns a short row does not have are
+    captured as empty.
+    """
+    last = positions[-1]
+    pattern = (_CAPTURED if last in positions else _FIELD) + _REST
+    for position in reversed(range(last)):
+        field = _CAPTURED if position in positions else _FIELD
+        pattern = field + rb'(?:,' + pattern + rb')?'
+    # A record starts with a character other than a line break: blank lines and the
+    # end of the file never match.
+    return re.compile(rb'(?:\r?\n)*(?=[^\r\n])' + pattern + rb'(?:\r?\n|\Z)')
+
+
+def _chunks(data, start, size):
+    # (start, end) byte ranges of whole records from 'start' on, about 'size' bytes each.
+    # A newline only ends a record when the quotes before it are balanced.
+    length = len(data)
+    while start < length:
+        end = scanned = min(start + size, length)
+        quotes = data[start:scanned].count(b'"')
+        while end < length:
+            end = data.find(b'\n', end)
+            end = length if end < 0 else end + 1
+            quotes += data[scanned:end].count(b'"')
+            if quotes % 2 == 0:
+                break
+            scanned = end
+        yield start, end
+        start = end
+
+
+def _rows(data, start, pattern, width):
+    # Tuples of the 'width' decoded columns of every record from 'start' on.
+    for chunk_start, chunk_end in _chunks(data, start, CHUNK_SIZE):
+        groups = list(chain.from_iterable(pattern.findall(data, chunk_start, chunk_end)))
+        quoted = map(bytes.replace, groups[0::2], repeat(b'""'), repeat(b'"'))
+        if data.find(b'\r', chunk_start, chunk_end) >= 0:
+            quoted = map(bytes.replace, quoted, repeat(b'\r\n'), repeat(b'\n'))
+        texts = map(bytes.decode, map(add, quoted, groups[1::2]))
+        yield from zip(*[texts] * width)
+
+
+def _columns(header, fields, predicates):
+    # CSV column positions the scan has to decode, in file order.
+    names = set(FIELD_SOURCES if fields is None else fields)
+    for predicate in predicates:
+        names |= predicate.fields()
+    wanted = {FIELD_SOURCES[name][0] for name in names if name in FIELD_SOURCES}
+    positions = [index for index, column in enumerate(header) if column in wanted]
+    # A record needs at least one captured column to be told apart from a blank line.
+    return positions or [0]
+
+
+def scan_mmap(file_path, fields=None, predicates=(), span=None):
+    """
+    Generator like scan_csv that splits records on the memory-mapped bytes of the file
+    and decodes only the columns the 'fields' and 'predicates' use. With a profiling
+    'span', the time spent finding and decoding columns is measured apart.
+    """
+    if not os.path.exists(file_path):
+        print(f"CRITICAL ERROR: Data file not found at: {file_path}")
+        return
+    if detect_compression(file_path) is not None or os.path.getsize(file_path) == 0:
+        yield from scan_csv(file_path, fields, predicates, span)
+        return
+
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        # The header is one plain line; the csv module splits it.
+        end = data.find(b'\n')
+        end = len(data) if end < 0 else end + 1
+        header = next(csv.reader([data[:end].decode('utf-8')]), None)
+        if header is None:
+            return
+        positions = _columns(header, fields, predicates)
+        rows = _rows(data, end, record_pattern(positions), len(positions))
+        if span is not None:
+            rows = span.timed(rows, "mmap tokenizing")
+        yield from scan_rows(rows, [header[index] for index in positions], fields, predicates)
@@ -0,0 +1,162 @@
+"""
+Parallel chunked CSV ingestion.
+
+The file is split into byte ranges that always end on a record boundary, each range is
+parsed and cleaned into a compact ProductTable batch by a ProcessPoolExecutor worker, and
+the batches are streamed back to the caller (in file order, or as soon as they finish).
+
+Record boundaries: product names may contain newlines inside quoted fields, so a newline
+only ends a record when the number of quote characters before it is even. Quotes are
+counted with bytes.count() over the raw file in the parent process, which is a C-speed
+scan that is far cheaper than the parsing and cleaning the workers do. This assumes quote
+characters only appear in quoted fields (RFC 4180, as written by csv.writer).
+"""
+import csv
+import io
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import chain
+
+from sales_analysis.core.table import ProductTable
+from sales_analysis.ingestion.columnar import CHUNK_SIZE, append_rows, read_table
+from sales_analysis.ingestion.compression import detect_compression
+
+# Target size of one work unit; actual ranges end at the next record boundary.
+CHUNK_BYTES = 8 << 20
+_QUOTE = b'"'
+_NEWLINE = b'\n'
+
+
+def _record_end(f, start, quotes=0):
+    """
+    Returns the offset just past the first newline at or after 'start' that is outside a
+    quoted field (or EOF). 'quotes' is the parity of quote characters already open at 'start'.
+    """
+    f.seek(start)
+    position = start
+    while True:
+        block = f.read(1 << 16)
+        if not block:
+            return position
+        search_from = 0
+        while True:
+            newline = block.find(_NEWLINE, search_from)
+            if newline < 0:
+                quotes += block.count(_QUOTE, search_from)
+                break
+            quotes += block.count(_QUOTE, search_from, newline)
+            if quotes % 2 == 0:
+                return position + newline + 1
+            search_from = newline + 1
+        position += len(block)
+
+
+def split_ranges(file_path, chunk_bytes=CHUNK_BYTES):
+    """
+    Splits a CSV file into (header_bytes, [(start, end), ...]) where every range holds
+    whole records and the ranges cover the file after the header exactly once.
+    """
+    size = os.path.getsize(file_path)
+    ranges = []
+    with open(file_path, 'rb') as f:
+        header_end = _record_end(f, 0)
+        f.seek(0)
+        header = f.read(header_end)
+
+        start = header_end
+        while start < size:
+            target = min(start + chunk_bytes, size)
+            if target >= size:
+                end = size
+            else:
+                # 'start' is a record boundary, so the quote parity of [start, target) tells
+                # whether 'target' falls inside a quoted field.
+                f.seek(start)
+                open_quotes = f.read(target - start).count(_QUOTE) % 2
+                end = _record_end(f, target, open_quotes)
+            ranges.append((start, end))
+            start = end
+    return header, ranges
+
+
+def parse_range(file_path, header, start, end, chunk_size=CHUNK_SIZE):
+    """
+    Worker task: parses the records in [start, end) into a ProductTable batch, using the
+    same decoding and cleaning rules as read_table.
+    """
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    # TextIOWrapper mirrors open(..., encoding='utf-8'), including newline translation.
+    text = io.TextIOWrapper(io.BytesIO(header + data), encoding='utf-8')
+    reader = csv.reader(text)
+    columns = next(reader, None) or []
+    position = {column: index for index, column in enumerate(columns)}
+
+    table = ProductTable()
+    category_index = {}
+    rows = []
+    for row in reader:
+        if not row:
+            continue
+        rows.append(row)
+        if len(rows) >= chunk_size:
+            append_rows(table, rows, position, category_index)
+            rows = []
+    if rows:
+        append_rows(table, rows, position, category_index)
+    return table
+
+
+def read_csv_parallel(file_path, workers=None, ordered=True, chunk_bytes=CHUNK_BYTES):
+    """
+    Generator yielding ProductTable batches parsed by a pool of 'workers' processes.
+    With ordered=True batches arrive in file order; otherwise as soon as each finishes.
+    At most 2 * workers batches are in flight, so memory stays bounded.
+    """
+    if not os.path.exists(file_path):
+        print(f"CRITICAL ERROR: Data file not found at: {file_path}")
+        return
+    if detect_compression(file_path):
+        # A compressed stream cannot be split by seeking to byte offsets: it is decompressed
+        # once, in a background thread that overlaps with the parsing.
+        yield read_table(file_path)
+        return
+
+    header, ranges = split_ranges(file_path, chunk_bytes)
+    workers = workers or os.cpu_count() or 1
+    pending_ranges = iter(ranges)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        def submit_next():
+            next_range = next(pending_ranges, None)
+            if next_range is None:
+                return None
+            return executor.submit(parse_range, file_path, header, *next_range)
+
+        in_flight = deque()
+        for _ in range(2 * workers):
+            future = submit_next()
+            if future is None:
+                break
+            in_flight.append(future)
+
+        while in_flight:
+            if ordered:
+                done = in_flight.popleft()
+            else:
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                done = finished.pop()
+                in_flight.remove(done)
+            batch = done.result()
+            future = submit_next()
+            if future is not None:
+                in_flight.append(future)
+            yield batch
+
+
+def iter_products(batches):
+    # Flattens ProductTable batches into Products, e.g. Stream(iter_products(batches)).
+    return chain.from_iterable(batches)
@@ -0,0 +1,108 @@
+import unittest
+import random
+import statistics
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from sales_analysis.core import aggregations as agg
+from sales_analysis.core.stream import Stream
+from sales_analysis.core.models import Product
+
+class TestAggregations(unittest.TestCase):
+
+    def setUp(self):
+        self.raw_data = [
+            Product("Laptop", "Electronics", 1000.0, 1500.0, 33.0, 4.5, 100),
+            Product("Mouse", "Electronics", 50.0, 100.0, 50.0, 4.0, 50),
+            Product("Cable", "Electronics", 10.0, 20.0, 50.0, 3.0, 5),
+            Product("Shirt", "Clothing", 20.0, 40.0, 50.0, 3.5, 10),
+        ]
+
+    def test_group_by_with_aggregators(self):
+        """Aggregating group_by returns one summary dict per key instead of item lists."""
+        stats = Stream(iter(self.raw_data)).group_by(
+            lambda p: p.category,
+            agg={
+                'n': agg.count(),
+                'revenue': agg.sum('discounted_price'),
+                'avg_rating': agg.mean('rating'),
+                'min_rating': agg.min('rating'),
+                'max_count': agg.max('rating_count'),
+                'var_rating': agg.variance('rating'),
+            })
+
+        self.assertEqual(list(stats), ["Electronics", "Clothing"])
+        electronics = stats["Electronics"]
+        self.assertEqual(electronics['n'], 3)
+        self.assertEqual(electronics['revenue'], 1060.0)
+        self.assertAlmostEqual(electronics['avg_rating'], 11.5 / 3)
+        self.assertEqual(electronics['min_rating'], 3.0)
+        self.assertEqual(electronics['max_count'], 100)
+        self.assertAlmostEqual(electronics['var_rating'], statistics.pvariance([4.5, 4.0, 3.0]))
+
+    def test_callable_fields_and_sample_variance(self):
+        """Fields can be callables; ddof=1 gives the sample variance."""
+        stats = Stream(self.raw_data).group_by(
+            lambda p: "all",
+            agg={'savings': agg.sum(lambda p: p.savings), 'var': agg.variance('rating', ddof=1)})
+        self.assertEqual(stats["all"]['savings'], 580.0)
+        self.assertAlmostEqual(stats["all"]['var'], statistics.variance([4.5, 4.0, 3.0, 3.5]))
+
+    def test_merge_matches_single_pass(self):
+        """Merging partial states gives the same answer as aggregating everything at once."""
+        values = [4.5, 4.0, 3.0, 3.5, 5.0]
+        for aggregator in (agg.count(), agg.sum(), agg.mean(), agg.min(), agg.max(), agg.variance()):
+            whole = aggregator.initial()
+            for value in values:
+                whole = aggregator.add(whole, value)
+            left, right = aggregator.initial(), aggregator.initial()
+            for value in values[:2]:
+                left = aggregator.add(left, value)
+            for value in values[2:]:
+                right = aggregator.add(right, value)
+            merged = aggregator.merge(left, right)
+            self.assertAlmostEqual(aggregator.result(merged), aggregator.result(whole))
+            # Merging with an empty state is the identity
+            self.assertEqual(aggregator.result(aggregator.merge(aggregator.initial(), whole)),
+                             aggregator.result(whole))
+
+    def test_empty_results(self):
+        """Aggregators that need data report None when they have seen nothing."""
+        self.assertIsNone(agg.mean().result(agg.mean().initial()))
+        self.assertIsNone(agg.variance().result(agg.variance().initial()))
+        self.assertIsNone(agg.min().result(agg.min().initial()))
+
+    def test_top_k_matches_stream_top_k(self):
+        """The bounded top_k aggregator equals Stream.top_k, also when merged from parts."""
+        rng = random.Random(3)
+        for _ in range(200):
+            items = [(rng.randint(0, 9), rng.randint(0, 5), n) for n in range(rng.randint(0, 30))]
+            k, reverse = rng.randint(0, 5), rng.random() < 0.5
+            distinct = (lambda item: item[1]) if rng.random() < 0.5 else None
+            aggregator = agg.top_k(k, key=lambda item: item[0], reverse=reverse, distinct_key=distinct)
+            expected = Stream(items).top_k(k, key=lambda item: item[0], reverse=reverse,
+                                           distinct_key=distinct).collect()
+            cut = rng.randint(0, len(items))
+            left = aggregator.fold(aggregator.initial(), items[:cut])
+            right = aggregator.fold(aggregator.initial(), items[cut:])
+            self.assertEqual(aggregator.result(aggregator.fold(aggregator.initial(), items)), expected)
+            parts = (aggregator.result(left), aggregator.result(right))
+            self.assertEqual(aggregator.result(aggregator.merge(left, right)), expected)
+            self.assertEqual((aggregator.result(left), aggregator.result(right)), parts)  # inputs intact
+            self.assertLessEqual(len(left), k)
+
+    def test_where_filters_items(self):
+        """where() only feeds matching items to the wrapped aggregator."""
+        stats = Stream(self.raw_data).group_by(lambda p: p.category, agg={
+            'rated': agg.where(lambda p: p.rating >= 4.0, agg.count()),
+            'best': agg.where(lambda p: p.discount_percentage > 40,
+                              agg.top_k(1, key=lambda p: p.rating, reverse=True)),
+        })
+        self.assertEqual(stats["Electronics"]['rated'], 2)
+        self.assertEqual([p.name for p in stats["Electronics"]['best']], ["Mouse"])
+        self.assertEqual(stats["Clothing"], {'rated': 0, 'best': [self.raw_data[3]]})
+
+if __name__ == '__main__':
+    unittest.main()
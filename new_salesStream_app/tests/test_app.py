@@ -24,8 +24,7 @@ class TestApp(unittest.TestCase):
             Product("P3", "Cat2", 20.0, 40.0, 50.0, 4.9, 2000),
         ]
         # Use side_effect to return a FRESH iterator every time it's called
-        # This is critical because the app calls use_stream() multiple times
-        mock_reader.side_effect = lambda _: iter(mock_data)
+        mock_reader.side_effect = lambda *args, **kwargs: iter(mock_data)
 
         # Capture stdout to verify output
         captured_output = io.StringIO()
@@ -37,6 +36,9 @@ class TestApp(unittest.TestCase):
             sys.stdout = sys.__stdout__ # Reset stdout
 
         output = captured_output.getvalue()
+
+        # All reports are fed from a single scan of the source
+        mock_reader.assert_called_once_with("dummy_path.csv", use_cache=False, rebuild_cache=False)
         
         # Verify key parts of the report were printed
         self.assertIn("AMAZON PRODUCT STREAM ANALYSIS", output)
@@ -0,0 +1,198 @@
+import bisect
+import io
+import os
+import random
+import shutil
+import tempfile
+import unittest
+import sys
+from collections import Counter
+from contextlib import redirect_stdout
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from sales_analysis.app import main
+from sales_analysis.core import aggregations as agg
+from sales_analysis.core import approximate as approx
+from sales_analysis.core.approximate import Estimate, reservoir_sample
+from sales_analysis.core.expressions import col
+from sales_analysis.core.models import Product
+from sales_analysis.core.sketches import CountMinSketch, SpaceSaving, TDigest
+from sales_analysis.core.stream import Stream
+from sales_analysis.ingestion.loader import CsvSource, read_csv
+
+HEADER = "product_name,category,discounted_price,actual_price,discount_percentage,rating,rating_count\n"
+
+
+def products(count, seed=3):
+    rng = random.Random(seed)
+    return [Product(f"Product {int(rng.paretovariate(1.5))}", rng.choice(["Cat1", "Cat2", "Cat3"]),
+                    round(rng.expovariate(1 / 500), 2), 1000.0, 10.0, round(rng.uniform(1, 5), 1), 10)
+            for _ in range(count)]
+
+
+class TestSketches(unittest.TestCase):
+
+    def test_tdigest_quantiles(self):
+        """Quantiles land within the reported rank error; merged digests agree."""
+        rng = random.Random(1)
+        values = [rng.lognormvariate(0, 1.5) for _ in range(50000)]
+        digest, left, right = TDigest(), TDigest(), TDigest()
+        for index, value in enumerate(values):
+            digest.add(value)
+            (left if index % 2 else right).add(value)
+        left.merge(right)
+        ordered = sorted(values)
+        for q in (0.01, 0.1, 0.5, 0.9, 0.99):
+            for sketch in (digest, left):
+                rank = bisect.bisect_left(ordered, sketch.quantile(q)) / len(ordered)
+                self.assertLessEqual(abs(rank - q), sketch.rank_error(q) + 0.001)
+        self.assertEqual((digest.quantile(0), digest.quantile(1)), (ordered[0], ordered[-1]))
+        self.assertLess(len(digest.centroids), 100)
+        self.assertIsNone(TDigest().quantile(0.5))
+
+    def test_heavy_hitter_sketches(self):
+        """Count-Min never undercounts; Space-Saving bounds hold, also after merging."""
+        rng = random.Random(2)
+        keys = [int(rng.paretovariate(1.1)) for _ in range(30000)]
+        counts = Counter(keys)
+        sketch = CountMinSketch(epsilon=0.001, delta=0.01)
+        summary, left, right = SpaceSaving(50), SpaceSaving(50), SpaceSaving(50)
+        for index, key in enumerate(keys):
+            sketch.add(key)
+            summary.add(key)
+            (left if index % 2 else right).add(key)
+        for key, count in counts.items():
+            self.assertGreaterEqual(sketch[key], count)
+            self.assertLessEqual(sketch[key], count + sketch.error)
+        left.merge(right)
+        for top in (summary, left):
+            self.assertEqual(len(top), 50)
+            for key, count, error in top.top():
+                self.assertTrue(count - error <= counts[key] <= count)
+            self.assertEqual([key for key, _, _ in top.top(3)], [key for key, _ in counts.most_common(3)])
+
+
+class TestSampling(unittest.TestCase):
+
+    def setUp(self):
+        self.items = products(20000)
+
+    def test_bernoulli_sample(self):
+        """Seeded samples repeat, keep about 'fraction' of the items, and fraction 1 keeps all."""
+        sampled = Stream(self.items).sample(0.1, seed=5).collect()
+        self.assertEqual(sampled, Stream(self.items).sample(0.1, seed=5).collect())
+        stream = Stream(range(20)).filter(approx.Sample(0.3, seed=1))
+        self.assertEqual(stream.collect(), stream.collect())  # re-seeded for every run
+        self.assertAlmostEqual(len(sampled) / len(self.items), 0.1, delta=0.01)
+        self.assertEqual(Stream(self.items).sample(1.0).collect(), self.items)
+        with self.assertRaises(ValueError):
+            Stream(self.items).sample(0)
+
+    def test_reservoir(self):
+        """Exactly n items, uniformly chosen; fewer items are all kept."""
+        self.assertEqual(sorted(Stream(range(5)).reservoir(10).collect()), list(range(5)))
+        self.assertEqual(len(Stream(range(100000)).reservoir(100, seed=1).collect()), 100)
+        hits = Counter()
+        for seed in range(2000):
+            hits.update(reservoir_sample(range(10), 3, seed=seed))
+        self.assertTrue(all(500 <= hits[value] <= 700 for value in range(10)))
+        with redirect_stdout(io.StringIO()):
+            self.assertIn("reservoir(5", Stream(range(10)).reservoir(5).explain())
+
+    def test_approximate_mode(self):
+        """Exact count/sum/mean specs return Estimates whose bounds cover the true values."""
+        spec = {'n': agg.count(), 'revenue': agg.sum('discounted_price'), 'rating': agg.mean('rating'),
+                'max': agg.max('rating')}
+        exact = Stream(self.items).aggregate(spec)
+        covered = Counter()
+        for seed in range(40):
+            estimate = Stream(self.items).approximate(0.05, seed).aggregate(spec)
+            for name in ('n', 'revenue', 'rating'):
+                self.assertIsInstance(estimate[name], Estimate)
+                covered[name] += estimate[name].low <= exact[name] <= estimate[name].high
+            self.assertLessEqual(estimate['max'], exact['max'])
+        self.assertTrue(all(covered[name] >= 34 for name in ('n', 'revenue', 'rating')))
+
+        full = Stream(self.items).approximate(1.0).group_by(lambda p: p.category, agg=spec)
+        grouped = Stream(self.items).group_by(lambda p: p.category, agg=spec)
+        for category, values in grouped.items():
+            self.assertEqual(full[category]['n'], Estimate(values['n'], 0.0, 0.95))
+            self.assertAlmostEqual(full[category]['revenue'].value, values['revenue'])
+        self.assertEqual(f"{Estimate(1234.5, 12.25, 0.95):,.2f}", "1,234.50 ± 12.25")
+        self.assertEqual(Stream([]).approximate(0.5).aggregate({'n': agg.count()})['n'].value, 0)
+
+    def test_sketch_aggregators(self):
+        """quantiles, heavy_hitters and frequencies report Estimates, exactly or sampled."""
+        spec = {'price': approx.quantiles('discounted_price', (0.5, 0.9)),
+                'names': approx.heavy_hitters('name', 3),
+                'frequency': approx.frequencies('name', epsilon=0.01)}
+        exact = Stream(self.items).aggregate(spec)
+        counts = Counter(product.name for product in self.items)
+        self.assertEqual([name for name, _ in exact['names']], [name for name, _ in counts.most_common(3)])
+        for name, estimate in exact['names']:
+            self.assertTrue(estimate.low <= counts[name] <= estimate.high)
+            self.assertEqual(estimate.confidence, 1.0)
+            frequency = exact['frequency'][name]
+            self.assertTrue(frequency.low <= counts[name] <= frequency.high)
+        prices = sorted(product.discounted_price for product in self.items)
+        sampled = Stream(self.items).approximate(0.2, seed=4).aggregate(spec)
+        for q in (0.5, 0.9):
+            true = prices[int(q * len(prices))]
+            self.assertTrue(exact['price'][q].low <= true <= exact['price'][q].high)
+            self.assertTrue(sampled['price'][q].low <= true <= sampled['price'][q].high)
+        top = counts.most_common(1)[0]
+        self.assertEqual(sampled['names'][0][0], top[0])
+        self.assertTrue(sampled['names'][0][1].low <= top[1] <= sampled['names'][0][1].high)
+        # Sketch states merge like any other aggregator's (e.g. across window panes).
+        aggregator = approx.quantiles('discounted_price')
+        halves = [aggregator.fold(aggregator.initial(), prices[start::2]) for start in (0, 1)]
+        merged = aggregator.result(aggregator.merge(*halves))
+        self.assertAlmostEqual(merged[0.5].value, prices[len(prices) // 2], delta=merged[0.5].error)
+
+
+class TestApproximateScan(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "amazon.csv")
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write(HEADER)
+            for index in range(3000):
+                f.write(f"Item {index % 40},Cat{index % 3}|Sub,₹{100 + index % 50},₹200,10%,{3 + index % 3},5\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_sample_is_pushed_into_the_scan(self):
+        """The sampler is a scan filter, checked before other filters clean any column."""
+        stream = Stream(CsvSource(self.path)).sample(0.5, seed=1).filter(col('rating') > 3)
+        with redirect_stdout(io.StringIO()):
+            plan = stream.explain()
+        self.assertIn("scan filter: sample(0.5, seed=1) and (col('rating') > 3)", plan)
+        kept = stream.collect()
+        expected = [p for p in read_csv(self.path) if p.rating > 3]
+        self.assertAlmostEqual(len(kept) / len(expected), 0.5, delta=0.05)
+        self.assertTrue(set(kept) <= set(expected))
+        # Every run draws the same decisions, in the scan and row by row alike.
+        self.assertEqual(stream.collect(), kept)
+        rows = Stream(list(read_csv(self.path))).sample(0.5, seed=1)
+        self.assertEqual(rows.filter(lambda p: p.rating > 3).collect(), kept)
+
+    def test_main_approximate_reports(self):
+        """main(approximate=...) prints estimated revenue, categories, quantiles and heavy hitters."""
+        output = io.StringIO()
+        with redirect_stdout(output):
+            main(self.path, approximate=0.5, seed=2)
+        text = output.getvalue()
+        self.assertIn("estimated from a 50% sample", text)
+        self.assertIn("Total Revenue:     ₹", text)
+        self.assertIn(" ± ", text)
+        for section in ("AVERAGE/MEAN RATING BY CATEGORY", "PRICE AND RATING QUANTILES",
+                        "MOST FREQUENT CATEGORIES AND PRODUCTS", "Cat0", "Item "):
+            self.assertIn(section, text)
+        self.assertNotIn("TOP 5 MOST DISCOUNTED", text)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,243 @@
+import asyncio
+import io
+import json
+import unittest
+import tempfile
+import threading
+import sys
+import os
+from contextlib import redirect_stdout
+from unittest.mock import patch
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from sales_analysis.core.async_stream import AsyncStream
+from sales_analysis.core.models import Product
+from sales_analysis.core.stream import Stream
+from sales_analysis.ingestion import async_sources
+from sales_analysis.ingestion.async_sources import (
+    product_from_record, tail_csv, tail_lines, tcp_jsonl_source
+)
+from sales_analysis.ingestion.loader import read_csv
+
+HEADER = "product_id,product_name,category,discounted_price,actual_price,discount_percentage,rating,rating_count\n"
+ROWS = [
+    "1,Laptop,Electronics|Computers,\"₹1,000\",\"₹1,500\",33%,4.5,\"1,100\"\n",
+    "2,\"Mouse,\nwireless\",Electronics|Accessories,₹50,₹100,50%,4.0|12,50\n",
+    "3,Shirt,Clothing|Men,₹20,₹40,50%,4.7,2000\n",
+]
+
+async def feed(items, delay=0):
+    for item in items:
+        await asyncio.sleep(delay)
+        yield item
+
+async def serve_jsonl(lines):
+    # Test stand-in for a live sales feed: sends the lines, then closes the connection.
+    async def handle(reader, writer):
+        for line in lines:
+            writer.write(line.encode('utf-8') + b"\n")
+            await writer.drain()
+        writer.close()
+        await writer.wait_closed()
+    server = await asyncio.start_server(handle, '127.0.0.1', 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+class TestAsyncStream(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.raw_data = [
+            Product("Laptop", "Electronics", 1000.0, 1500.0, 33.0, 4.5, 100),
+            Product("Laptop", "Electronics", 1000.0, 1500.0, 33.0, 4.5, 100),
+            Product("Mouse", "Electronics", 50.0, 100.0, 50.0, 4.0, 50),
+            Product("Shirt", "Clothing", 20.0, 40.0, 50.0, 3.5, 10),
+            Product("Pen", "Office", 5.0, 5.0, 0.0, 4.8, 500),
+        ]
+
+    async def test_operations_match_stream(self):
+        """map/filter/distinct/reduce give the same answers as the synchronous Stream."""
+        async def is_rated(product):
+            await asyncio.sleep(0)
+            return product.rating >= 4.0
+
+        names = await AsyncStream(feed(self.raw_data)) \
+            .filter(is_rated) \
+            .distinct(lambda p: p.name) \
+            .map(lambda p: p.name) \
+            .collect()
+        self.assertEqual(names, ["Laptop", "Mouse", "Pen"])
+
+        total = await AsyncStream(self.raw_data).map(lambda p: p.savings).reduce(lambda acc, x: acc + x, 0.0)
+        expected = Stream(self.raw_data).map(lambda p: p.savings).reduce(lambda acc, x: acc + x, 0.0)
+        self.assertEqual(total, expected)
+
+    async def test_buffer_applies_backpressure(self):
+        """A fast producer is suspended once the bounded buffer is full."""
+        produced = []
+        async def producer():
+            for i in range(100):
+                produced.append(i)
+                yield i
+
+        seen = []
+        async for item in AsyncStream(producer()).buffer(size=3):
+            seen.append(item)
+            await asyncio.sleep(0.001)  # slow consumer
+            # queue (3) + the item being put + the one handed over
+            self.assertLessEqual(len(produced) - len(seen), 5)
+        self.assertEqual(seen, list(range(100)))
+
+    async def test_buffer_propagates_errors_and_stops_producer(self):
+        """Producer errors reach the consumer; leaving early cancels the producer."""
+        async def failing():
+            yield 1
+            raise ValueError("feed broke")
+        with self.assertRaises(ValueError):
+            await AsyncStream(failing()).buffer(2).collect()
+
+        closed = asyncio.Event()
+        async def endless():
+            try:
+                i = 0
+                while True:
+                    yield i
+                    i += 1
+            finally:
+                closed.set()
+        first = await AsyncStream(endless()).buffer(4).limit(3).collect()
+        self.assertEqual(first, [0, 1, 2])
+        await asyncio.wait_for(closed.wait(), timeout=1)
+
+    async def test_merge_runs_feeds_concurrently(self):
+        """Several slow feeds are interleaved on one loop instead of running back to back."""
+        feeds = [feed(range(n * 10, n * 10 + 5), delay=0.01) for n in range(5)]
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        items = await AsyncStream.merge(*feeds, buffer_size=4).collect()
+        self.assertEqual(sorted(items), sorted(x for n in range(5) for x in range(n * 10, n * 10 + 5)))
+        self.assertLess(loop.time() - start, 0.2)  # sequential would take >= 0.25s
+
+    async def test_tcp_jsonl_source(self):
+        """Events from a TCP JSON-lines feed become cleaned Products; bad lines are skipped."""
+        events = [
+            json.dumps({"product_name": "Laptop", "category": "Electronics|PC", "discounted_price": "₹1,000",
+                        "actual_price": 1500, "discount_percentage": "33%", "rating": 4.5, "rating_count": "1,100"}),
+            "",
+            "not json",
+            json.dumps({"product_name": "Pen", "category": "Office", "rating": "4.8|x"}),
+        ]
+        server, port = await serve_jsonl(events)
+        async with server:
+            with redirect_stdout(io.StringIO()) as output:
+                products = await AsyncStream(tcp_jsonl_source('127.0.0.1', port)).collect()
+        self.assertEqual(products, [
+            Product("Laptop", "Electronics", 1000.0, 1500.0, 33.0, 4.5, 1100),
+            Product("Pen", "Office", 0.0, 0.0, 0.0, 4.8, 0),
+        ])
+        self.assertIn("WARNING", output.getvalue())
+
+    async def test_many_tcp_feeds_on_one_loop(self):
+        """Concurrent feeds merged into one AsyncStream are all consumed."""
+        servers = []
+        for n in range(3):
+            lines = [json.dumps({"product_name": f"P{n}-{i}", "discounted_price": "₹10"}) for i in range(50)]
+            servers.append(await serve_jsonl(lines))
+        total = await AsyncStream.merge(*(tcp_jsonl_source('127.0.0.1', port) for _, port in servers)) \
+            .map(lambda p: p.discounted_price) \
+            .reduce(lambda acc, x: acc + x, 0.0)
+        self.assertEqual(total, 1500.0)
+        for server, _ in servers:
+            server.close()
+            await server.wait_closed()
+
+    async def test_product_from_record_matches_csv_cleaning(self):
+        """String values are cleaned exactly like CSV cells."""
+        record = {"product_name": "Mouse", "category": "Electronics|Accessories", "discounted_price": "₹50",
+                  "actual_price": "₹100", "discount_percentage": "50%", "rating": "4.0|12", "rating_count": "50"}
+        self.assertEqual(product_from_record(record), Product("Mouse", "Electronics", 50.0, 100.0, 50.0, 4.0, 50))
+
+
+class TestTailing(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".csv")
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def append(self, text):
+        with open(self.path, "a", encoding="utf-8", newline="") as f:
+            f.write(text)
+
+    async def test_tail_lines_waits_for_complete_lines(self):
+        """Lines appear as they are appended; half-written lines wait for their newline."""
+        self.append("first\nsec")
+        stop = asyncio.Event()
+        lines = tail_lines(self.path, poll_interval=0.01, stop=stop)
+        self.assertEqual(await lines.__anext__(), "first")
+        pending = asyncio.ensure_future(lines.__anext__())
+        await asyncio.sleep(0.05)
+        self.assertFalse(pending.done())
+        self.append("ond\nthird\n")
+        self.assertEqual(await asyncio.wait_for(pending, 1), "second")
+        stop.set()
+        self.assertEqual([line async for line in lines], ["third"])
+
+    async def test_tail_lines_reads_off_the_event_loop(self):
+        """File reads run in a worker thread, so a slow disk does not stall other feeds."""
+        self.append("a\r\nb\n")
+        threads = []
+        original = async_sources._read_block
+
+        def read_block(f, file_path):
+            threads.append(threading.current_thread())
+            return original(f, file_path)
+
+        stop = asyncio.Event()
+        stop.set()
+        with patch.object(async_sources, "_read_block", read_block):
+            self.assertEqual([line async for line in tail_lines(self.path, stop=stop)], ["a", "b"])
+        self.assertTrue(threads)
+        self.assertNotIn(threading.main_thread(), threads)
+
+    async def test_tail_csv_follows_appended_records(self):
+        """Appended records (even multi-line ones) match what read_csv yields."""
+        self.append(HEADER + ROWS[0])
+        stop = asyncio.Event()
+
+        async def writer():
+            for row in ROWS[1:]:
+                await asyncio.sleep(0.02)
+                self.append(row)
+            stop.set()
+
+        task = asyncio.ensure_future(writer())
+        products = await AsyncStream(tail_csv(self.path, poll_interval=0.01, stop=stop)).collect()
+        await task
+        self.assertEqual(products, list(read_csv(self.path)))
+        self.assertEqual(products[1].name, "Mouse,\nwireless")
+
+    async def test_tail_csv_from_end_skips_existing_rows(self):
+        """from_end=True only reports records written after the tail started."""
+        self.append(HEADER + ROWS[0])
+        stop = asyncio.Event()
+        products = tail_csv(self.path, poll_interval=0.01, from_end=True, stop=stop)
+        pending = asyncio.ensure_future(products.__anext__())
+        await asyncio.sleep(0.03)
+        self.append(ROWS[2])
+        product = await asyncio.wait_for(pending, 1)
+        self.assertEqual(product.name, "Shirt")
+        stop.set()
+        self.assertEqual([p async for p in products], [])
+
+    async def test_missing_file(self):
+        """A missing file is reported and yields nothing."""
+        with redirect_stdout(io.StringIO()) as output:
+            self.assertEqual(await AsyncStream(tail_csv("missing.csv")).collect(), [])
+        self.assertIn("CRITICAL ERROR", output.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import hashlib
+import json
+import re
+import shutil
+import tempfile
+import unittest
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '../benchmarks'))
+
+from dataset import dataset_path, write_dataset
+from suite import CASES, compare, run_case, run_suite
+from sales_analysis.ingestion.loader import read_csv
+
+
+def file_hash(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+class TestBenchmarks(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_dataset_is_deterministic_and_dirty(self):
+        """The same rows and seed give the same bytes, with the dirty values of amazon.csv."""
+        first = os.path.join(self.directory, "a.csv")
+        second = os.path.join(self.directory, "b.csv")
+        write_dataset(first, 3000)
+        write_dataset(second, 3000)
+        self.assertEqual(file_hash(first), file_hash(second))
+        write_dataset(second, 3000, seed=8)
+        self.assertNotEqual(file_hash(first), file_hash(second))
+
+        with open(first, encoding='utf-8') as f:
+            text = f.read()
+        self.assertIn('"₹', text)  # prices with thousands separators
+        self.assertTrue(re.search(r'%,"\d\.\d\|[\d,]+",', text))  # '4.5|1,234' ratings
+        self.assertTrue(re.search(r'%,[^,\n]*,,', text))  # missing rating counts
+        products = list(read_csv(first))
+        self.assertEqual(len(products), 3000)  # multi-line names stay one record
+        self.assertTrue(any('\n' in p.name for p in products))
+        self.assertTrue(any(p.rating_count == 0 for p in products))
+        self.assertLess(len({p.name for p in products}), 1500)  # names repeat, for distinct()
+        self.assertTrue(all(0 < p.actual_price < 100000 for p in products))
+
+    def test_cases_run_and_measure(self):
+        """Every case runs; streaming cases report a time to first row."""
+        path = dataset_path(500, directory=self.directory)
+        self.assertEqual(dataset_path(500, directory=self.directory), path)  # reused
+        for name in CASES:
+            with self.subTest(name):
+                try:
+                    result = run_case(name, path, operator_rows=200)
+                except ImportError:  # Arrow and Parquet cases without pyarrow
+                    continue
+                self.assertGreater(result['seconds'], 0)
+                streams = CASES[name][2]
+                self.assertEqual(result['first_row_seconds'] is not None, streams)
+        self.assertEqual(run_case('stream.map', path, 200)['rows_out'], 200)
+        self.assertEqual(run_case('clean.rating_batch', path, 200)['rows_out'], 500)
+
+    def test_results_file(self):
+        """Each case runs in its own process; results can be compared across runs."""
+        document = run_suite(['300'], ['stream.sorted', 'ingest.read_csv'], operator_rows=100,
+                             data_dir=self.directory, report=None)
+        document = json.loads(json.dumps(document))
+        self.assertEqual(document['datasets']['300']['rows'], 300)
+        sorted_run, read = document['results']
+        self.assertEqual((sorted_run['name'], sorted_run['rows'], read['rows']), ('stream.sorted', 100, 300))
+        self.assertIn('mb_per_second', read)
+        self.assertNotIn('mb_per_second', sorted_run)
+        if sorted_run['peak_rss_bytes'] is not None:
+            self.assertGreater(sorted_run['peak_rss_bytes'], 0)
+        lines = []
+        compare(document, document, report=lines.append)
+        self.assertEqual(len(lines), 3)
+        self.assertIn("1.00x faster", lines[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
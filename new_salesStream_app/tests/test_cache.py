@@ -0,0 +1,109 @@
+import io
+import unittest
+from contextlib import redirect_stdout
+from unittest.mock import patch
+import shutil
+import tempfile
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from sales_analysis.ingestion import cache
+from sales_analysis.ingestion.loader import read_csv
+
+CSV_DATA = (
+    "product_name,category,discounted_price,actual_price,discount_percentage,rating,rating_count\n"
+    "Laptop,Electronics|Computers,\"₹1,000\",\"₹1,500\",33%,4.5,\"1,100\"\n"
+    "\"Mouse, wireless ✓\",Electronics|Accessories,₹50,₹100,50%,4.0|12,50\n"
+    "Pen,Office,₹5,₹5,0%,,\n"
+)
+
+class TestColumnCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "amazon.csv")
+        self.write(CSV_DATA)
+        self.expected = list(read_csv(self.path))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, text):
+        with open(self.path, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+
+    def test_first_load_writes_cache_and_second_load_maps_it(self):
+        """The cache is built next to the source, then memory-mapped on later loads."""
+        first = cache.load_table(self.path)
+        self.assertEqual(list(first), self.expected)
+        self.assertTrue(os.path.exists(os.path.join(self.path + ".cache", "meta.json")))
+
+        with patch.object(cache, "read_table") as parse:
+            second = cache.load_table(self.path)
+            parse.assert_not_called()
+        self.assertIsInstance(second.discounted_price, memoryview)
+        self.assertIsInstance(second.name, cache.StringColumn)
+        self.assertEqual(list(second), self.expected)
+        self.assertEqual(second.name[-1], "Pen")
+        self.assertEqual(list(read_csv(self.path, use_cache=True)), self.expected)
+
+    def test_touch_keeps_cache_but_content_change_rebuilds(self):
+        """An mtime-only change is validated by hash; a content change forces a rebuild."""
+        cache.load_table(self.path)
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        with patch.object(cache, "read_table") as parse:
+            cache.load_table(self.path)
+            parse.assert_not_called()
+
+        # Same size, different content: only the hash can tell
+        self.write(CSV_DATA.replace("Laptop", "Tablet"))
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 2 * 10**9))
+        self.assertEqual(cache.load_table(self.path).name[0], "Tablet")
+
+        self.write(CSV_DATA + "Desk,Furniture,₹10,₹20,50%,3.0,5\n")
+        self.assertEqual(len(cache.load_table(self.path)), 4)
+
+    def test_forced_rebuild_and_incompatible_meta(self):
+        """rebuild=True always re-parses; caches from another layout version are ignored."""
+        cache.load_table(self.path)
+        with patch.object(cache, "read_table", wraps=cache.read_table) as parse:
+            cache.load_table(self.path, rebuild=True)
+            self.assertEqual(parse.call_count, 1)
+        self.assertFalse(cache.is_fresh(self.path, {"version": cache.CACHE_VERSION + 1}))
+        self.assertFalse(cache.is_fresh(self.path, None))
+
+    def test_header_only_file_and_missing_file(self):
+        """Empty datasets round-trip through the cache; missing files yield no rows."""
+        self.write(CSV_DATA.splitlines()[0] + "\n")
+        cache.load_table(self.path)
+        self.assertEqual(len(cache.load_table(self.path)), 0)
+        self.assertEqual(len(cache.load_table(os.path.join(self.directory, "missing.csv"))), 0)
+
+    def test_unwritable_cache_falls_back_to_parsing(self):
+        """If the cache cannot be written the parsed table is still returned."""
+        with patch.object(cache, "write_cache", side_effect=OSError("read-only")):
+            table = cache.load_table(self.path)
+        self.assertEqual(list(table), self.expected)
+
+    def test_touched_source_with_read_only_cache(self):
+        """An mtime refresh that cannot be written still uses the cache; bad meta is stale."""
+        cache.load_table(self.path)
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        with patch.object(cache, "_write_meta", side_effect=OSError("read-only")), \
+                patch.object(cache, "read_table") as parse, redirect_stdout(io.StringIO()) as output:
+            self.assertEqual(list(cache.load_table(self.path)), self.expected)
+            parse.assert_not_called()
+        self.assertIn("WARNING: Could not refresh", output.getvalue())
+
+        meta = {"version": cache.CACHE_VERSION, "byteorder": sys.byteorder}
+        self.assertFalse(cache.is_fresh(self.path, meta))
+        self.assertFalse(cache.is_fresh(self.path, dict(meta, source={"size": 1})))
+        self.assertFalse(cache.is_fresh(self.path, dict(meta, source="broken")))
+        self.assertFalse(cache.is_fresh(self.path, ["not", "a", "dict"]))
+
+if __name__ == '__main__':
+    unittest.main()
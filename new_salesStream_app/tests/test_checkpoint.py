@@ -0,0 +1,152 @@
+import gzip
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from sales_analysis.app import main
+from sales_analysis.core import aggregations as agg
+from sales_analysis.core.stream import Stream
+from sales_analysis.ingestion.checkpoint import IncrementalScan, checkpoint_path
+from sales_analysis.ingestion.loader import read_csv
+
+HEADER = "product_name,category,discounted_price,actual_price,discount_percentage,rating,rating_count\r\n"
+ROWS = [
+    "Laptop,Electronics|Computers,\"₹1,000\",\"₹1,500\",33%,4.5,\"1,100\"\r\n",
+    "\"Mouse\r\nwith a \"\"quoted\"\"\nsecond line\",Electronics|Accessories,₹50,₹100,50%,4.0|12,50\r\n",
+    "\r\n",
+    "Shirt,Clothing|Men,₹20,₹40,50%,4.7,2000\r\n",
+    "Pen,Office,₹5,₹5,0%,,\r\n",
+    "Lamp,Home|Lighting,₹300,₹450,33%,4.6,\"12,000\"\r\n",
+]
+
+
+def register(scan, threshold=4.2):
+    totals = scan.register({'revenue': agg.sum('discounted_price'), 'count': agg.count()})
+    ratings = scan.register({'avg_rating': agg.mean('rating'), 'count': agg.count()},
+                            key=lambda product: product.category)
+    leaders = scan.register({'best': agg.where(lambda product: product.rating > threshold,
+                                               agg.top_k(2, key=lambda product: product.rating_count,
+                                                         reverse=True, distinct_key=lambda product: product.name))})
+    return totals, ratings, leaders
+
+
+def expected(path, threshold=4.2):
+    # The same reports computed with Stream over the whole file.
+    products = list(read_csv(path))
+    return [
+        {'revenue': Stream(products).map(lambda p: p.discounted_price).reduce(lambda a, x: a + x, 0.0),
+         'count': len(products)},
+        Stream(products).group_by(lambda p: p.category, agg={'avg_rating': agg.mean('rating'), 'count': agg.count()}),
+        {'best': Stream(products).filter(lambda p: p.rating > threshold)
+            .top_k(2, key=lambda p: p.rating_count, reverse=True, distinct_key=lambda p: p.name).collect()},
+    ]
+
+
+class TestCheckpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "amazon.csv")
+        self.write(HEADER + "".join(ROWS * 3), 'wb')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, text, mode='ab'):
+        with open(self.path, mode) as f:
+            f.write(text.encode('utf-8'))
+
+    def run_scan(self, threshold=4.2):
+        scan = IncrementalScan(self.path)
+        register(scan, threshold)
+        return scan.run(), scan.stats
+
+    def test_resume_reads_only_appended_rows(self):
+        """A resumed run reads only the new rows and gives exactly a full pass's results."""
+        results, stats = self.run_scan()
+        self.assertEqual(results, expected(self.path))
+        self.assertEqual((stats.resumed, stats.rows, stats.reason), (False, 15, "no checkpoint"))
+        self.assertTrue(os.path.exists(checkpoint_path(self.path)))
+
+        for appended in (ROWS[3:], ROWS, []):
+            self.write("".join(appended))
+            results, stats = self.run_scan()
+            self.assertTrue(stats.resumed)
+            self.assertEqual(stats.rows, len([row for row in appended if row.strip()]))
+            self.assertEqual(results, expected(self.path))
+        self.assertEqual(stats.total_rows, 15 + 3 + 5)
+
+    def test_changed_prefix_or_reports_recompute(self):
+        """Edited or truncated files and changed report definitions are read from scratch."""
+        self.run_scan()
+        self.write(HEADER + "".join(ROWS * 3).replace("Laptop", "Tablet"), 'wb')
+        self.write(ROWS[0])
+        results, stats = self.run_scan()
+        self.assertEqual((stats.resumed, stats.reason), (False, "file changed before the checkpoint"))
+        self.assertEqual(results, expected(self.path))
+
+        self.write(HEADER + ROWS[0], 'wb')
+        results, stats = self.run_scan()
+        self.assertFalse(stats.resumed)
+        self.assertEqual(results, expected(self.path))
+
+        results, stats = self.run_scan(threshold=4.0)
+        self.assertEqual((stats.resumed, stats.reason), (False, "reports changed"))
+        self.assertEqual(results, expected(self.path, threshold=4.0))
+
+    def test_unterminated_last_record(self):
+        """A record still being written is not checkpointed, and is counted once when done."""
+        self.run_scan()
+        record = ROWS[1]
+        self.write(record[:30])  # inside the quoted, multi-line name
+        results, stats = self.run_scan()
+        self.assertEqual(results[0]['count'], 15)
+        self.write(record[30:-2])  # every column, but no newline yet
+        results, stats = self.run_scan()
+        self.assertEqual(results, expected(self.path))
+        self.write("\r\n" + ROWS[0])
+        results, stats = self.run_scan()
+        self.assertTrue(stats.resumed)
+        self.assertEqual(stats.rows, 2)
+        self.assertEqual(results, expected(self.path))
+
+    def test_app_report(self):
+        """main(checkpoint=...) prints the full report after resuming from a checkpoint."""
+        def report(**options):
+            output = io.StringIO()
+            with redirect_stdout(output):
+                main(self.path, **options)
+            return output.getvalue()
+
+        checkpoint = os.path.join(self.directory, "reports.checkpoint")
+        report(checkpoint=checkpoint)
+        self.write("".join(ROWS[::-1]))
+        resumed = report(checkpoint=checkpoint)
+        self.assertIn("Checkpoint: resumed at byte", resumed)
+        lines = lambda text: [line for line in text.splitlines() if line and "Checkpoint:" not in line]
+        self.assertEqual(lines(resumed), lines(report()))
+
+    def test_unsupported_inputs(self):
+        compressed = self.path + ".gz"
+        with open(self.path, 'rb') as f, open(compressed, 'wb') as out:
+            out.write(gzip.compress(f.read()))
+        output = io.StringIO()
+        with redirect_stdout(output):
+            main(compressed, checkpoint=True)
+        self.assertIn("WARNING: Checkpoints need an uncompressed CSV", output.getvalue())
+        self.assertFalse(os.path.exists(checkpoint_path(compressed)))
+        with redirect_stdout(io.StringIO()):
+            scan = IncrementalScan(os.path.join(self.directory, "missing.csv"))
+            totals, _, _ = register(scan)
+            scan.run()
+        self.assertEqual(totals.result(), {'revenue': 0.0, 'count': 0})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+import unittest
+import operator
+import pickle
+import tempfile
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from sales_analysis.core import aggregations as agg
+from sales_analysis.core.columnar import ColumnarStream
+from sales_analysis.core.expressions import col
+from sales_analysis.core.models import Product
+from sales_analysis.core.stream import Stream
+from sales_analysis.core.table import ProductTable
+from sales_analysis.ingestion.columnar import read_table
+from sales_analysis.ingestion.loader import read_csv
+
+CSV_DATA = (
+    "product_id,product_name,category,discounted_price,actual_price,discount_percentage,rating,rating_count\n"
+    "1,Laptop,Electronics|Computers,\"₹1,000\",\"₹1,500\",33%,4.5,\"1,100\"\n"
+    "2,Laptop,Electronics|Computers,\"₹1,000\",\"₹1,500\",33%,4.5,\"1,100\"\n"
+    "3,\"Mouse, wireless\",Electronics|Accessories,₹50,₹100,50%,4.0|12,50\n"
+    "4,Shirt,Clothing|Men,₹20,₹40,50%,4.7,2000\n"
+    "5,Pen,Office,₹5,₹5,0%,,\n"
+    "6,\"Multi\nline\",Office|Writing,junk,₹10,abc%,4.9,\"3,000\"\n"
+)
+
+class TestColumnarEngine(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        handle, cls.path = tempfile.mkstemp(suffix=".csv")
+        with os.fdopen(handle, "w", encoding="utf-8", newline="") as f:
+            f.write(CSV_DATA)
+
+    @classmethod
+    def tearDownClass(cls):
+        os.remove(cls.path)
+
+    def setUp(self):
+        self.table = read_table(self.path)
+
+    def rows(self):
+        return Stream(read_csv(self.path))
+
+    def columns(self):
+        return ColumnarStream(self.table)
+
+    def test_table_matches_reference_loader(self):
+        """The columnar loader produces exactly the same Products as read_csv."""
+        self.assertEqual(list(self.table), list(read_csv(self.path)))
+        self.assertEqual(self.table.categories, ["Electronics", "Clothing", "Office"])
+        self.assertEqual(self.table.rating_count.typecode, 'q')
+        self.assertEqual(self.table.discounted_price.typecode, 'd')
+
+    def test_reduce_matches_row_engine(self):
+        """Revenue and savings totals agree between both engines."""
+        expected = self.rows().map(lambda p: p.discounted_price).reduce(lambda a, x: a + x, 0.0)
+        self.assertEqual(self.columns().map(col('discounted_price')).reduce(operator.add, 0.0), expected)
+        self.assertEqual(self.columns().map(col('discounted_price')).sum(), expected)
+        self.assertEqual(self.columns().map(col('savings')).sum(),
+                         self.rows().map(lambda p: p.savings).reduce(lambda a, x: a + x, 0.0))
+
+    def test_group_by_matches_row_engine(self):
+        """Category aggregates agree whether the key is a column expression or a lambda."""
+        spec = {'avg': agg.mean('rating'), 'n': agg.count(), 'max': agg.max('rating_count'),
+                'var': agg.variance('rating'), 'savings': agg.sum(lambda p: p.savings)}
+        expected = self.rows().group_by(lambda p: p.category, agg=spec)
+        for key in (col('category'), lambda p: p.category):
+            actual = self.columns().group_by(key, agg=spec)
+            self.assertEqual(list(actual), list(expected))
+            for category, stats in expected.items():
+                for name, value in stats.items():
+                    self.assertAlmostEqual(actual[category][name], value)
+        plain = self.columns().filter(col('rating') > 4.0).group_by(col('category'))
+        self.assertEqual(plain, self.rows().filter(lambda p: p.rating > 4.0).group_by(lambda p: p.category))
+
+    def test_report_pipelines_match_row_engine(self):
+        """Filter / distinct / sorted / top_k pipelines return the same products."""
+        expected = self.rows() \
+            .filter(lambda p: p.rating > 4.5 and p.rating_count > 1000) \
+            .sorted(key=lambda p: p.rating_count, reverse=True) \
+            .distinct(lambda p: p.name) \
+            .collect()
+        actual = self.columns() \
+            .filter((col('rating') > 4.5) & (col('rating_count') > 1000)) \
+            .sorted(key=col('rating_count'), reverse=True) \
+            .distinct(col('name')) \
+            .collect()
+        self.assertEqual(actual, expected)
+
+        top = self.columns() \
+            .filter(col('discount_percentage') > 0) \
+            .top_k(2, key=col('discount_percentage'), reverse=True, distinct_key=col('name')) \
+            .collect()
+        self.assertEqual(top, self.rows()
+            .filter(lambda p: p.discount_percentage > 0)
+            .top_k(2, key=lambda p: p.discount_percentage, reverse=True, distinct_key=lambda p: p.name)
+            .collect())
+
+    def test_lambdas_and_values_after_map(self):
+        """Plain lambdas run per row; operations after map() act on the mapped values."""
+        names = self.columns().filter(lambda p: p.category == "Office").map(lambda p: p.name).collect()
+        self.assertEqual(names, ["Pen", "Multi\nline"])
+        prices = self.columns().map(col('discounted_price')).filter(lambda x: x > 10) \
+            .distinct(lambda x: x).sorted().collect()
+        self.assertEqual(prices, [20.0, 50.0, 1000.0])
+        self.assertEqual(self.columns().map(col('rating')).top_k(1, reverse=True).collect(), [4.9])
+        with self.assertRaises(TypeError):
+            self.columns().map(col('rating')).filter(col('rating') > 1)
+
+    def test_expressions_work_row_wise(self):
+        """Column expressions are also callables usable in the row-based Stream."""
+        expr = (col('discounted_price') * 2 + 1 <= 41) | ~(col('rating') < 4.8)
+        result = Stream(iter(self.table)).filter(expr).map(col('name')).collect()
+        self.assertEqual(result, ["Shirt", "Pen", "Multi\nline"])
+        self.assertEqual(expr.fields(), {'discounted_price', 'rating'})
+        self.assertEqual(repr(col('rating') > 4.5), "(col('rating') > 4.5)")
+
+    def test_from_products_and_missing_file(self):
+        """Tables can be built from Products; a missing file yields an empty table."""
+        products = [Product("A", "X", 1.0, 2.0, 50.0, 4.0, 3), Product("B", "Y", 2.0, 2.0, 0.0, 3.0, 1)]
+        table = ProductTable.from_products(products)
+        self.assertEqual(list(table), products)
+        self.assertEqual(table.column('category'), ["X", "Y"])
+        self.assertEqual(list(table.column('savings')), [1.0, 0.0])
+        with self.assertRaises(KeyError):
+            table.column('price')
+        self.assertEqual(len(read_table("non_existent.csv")), 0)
+
+    def test_row_views_read_like_products(self):
+        """Row views expose the Product API, compare/hash equal and pickle as Products."""
+        products = list(read_csv(self.path))
+        views = list(self.table.views())
+        self.assertEqual(views, products)
+        self.assertEqual([v.savings for v in views], [p.savings for p in products])
+        self.assertEqual(hash(views[0]), hash(products[0]))
+        self.assertEqual(views[2].to_product(), products[2])
+        restored = pickle.loads(pickle.dumps(views[3]))
+        self.assertIsInstance(restored, Product)
+        self.assertEqual(restored, products[3])
+        # Loaders intern categories, so equal categories share one string object.
+        self.assertIs(products[0].category, products[1].category)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+import bz2
+import gzip
+import lzma
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from sales_analysis.core.expressions import col
+from sales_analysis.core.stream import Stream
+from sales_analysis.ingestion.columnar import read_table
+from sales_analysis.ingestion.compression import PrefetchReader, detect_compression, open_text
+from sales_analysis.ingestion.formats import convert, format_of, open_source
+from sales_analysis.ingestion.index import load_index
+from sales_analysis.ingestion.loader import CsvSource, read_csv
+from sales_analysis.ingestion.parallel import iter_products, read_csv_parallel
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+HEADER = "product_name,category,discounted_price,actual_price,discount_percentage,rating,rating_count\n"
+ROWS = [
+    "Laptop,Electronics|Computers,\"₹1,000\",\"₹1,500\",33%,4.5,\"1,100\"\n",
+    "\"Mouse\nwith a \"\"quoted\"\"\nsecond line\",Electronics|Accessories,₹50,₹100,50%,4.0|12,50\n",
+    "Shirt,Clothing|Men,₹20,₹40,50%,4.7,2000\n",
+    "Pen,Office,₹5,₹5,0%,,\n",
+]
+COMPRESSORS = {'gzip': gzip.compress, 'bz2': bz2.compress, 'xz': lzma.compress}
+
+
+class SlowReader:
+    # Binary reader handing out numbered chunks, counting how many were read.
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+        self.reads = 0
+
+    def read(self, size):
+        self.reads += 1
+        return self.chunks.pop(0) if self.chunks else b''
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+class TestCompression(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.text = HEADER + "".join(ROWS * 500)
+        self.plain = self.write("amazon.csv", self.text.encode('utf-8'))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, data):
+        path = os.path.join(self.directory, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_compressed_csv_reads_like_plain(self):
+        """gzip, bz2 and xz files give the same products through every loader."""
+        expected = list(read_csv(self.plain))
+        pipeline = lambda source: Stream(source).filter(col('rating') > 4.2).map(lambda p: p.name).collect()
+        for compression, compress in COMPRESSORS.items():
+            with self.subTest(compression):
+                # The name says nothing: detection goes by the magic bytes.
+                path = self.write(f"export-{compression}.csv", compress(self.text.encode('utf-8')))
+                self.assertEqual(detect_compression(path), compression)
+                self.assertEqual(list(read_csv(path)), expected)
+                self.assertEqual(pipeline(CsvSource(path)), pipeline(CsvSource(self.plain)))
+                self.assertEqual(list(read_table(path)), expected)
+                self.assertEqual(list(iter_products(read_csv_parallel(path, workers=2))), expected)
+        self.assertIsNone(detect_compression(self.plain))
+
+    def test_multi_member_gzip(self):
+        """Concatenated gzip members (e.g. appended exports) are read in full."""
+        data = self.text.encode('utf-8')
+        path = self.write("amazon.csv.gz", gzip.compress(data[:1000]) + gzip.compress(data[1000:]))
+        self.assertEqual(list(read_csv(path)), list(read_csv(self.plain)))
+
+    def test_indexes_fall_back_to_scanning(self):
+        """Compressed files cannot be read by seeking, so no index is built for them."""
+        path = self.write("amazon.csv.gz", gzip.compress(self.text.encode('utf-8')))
+        self.assertIsNone(load_index(path))
+        source = CsvSource(path, use_index=True)
+        self.assertEqual(len(Stream(source).filter(col('name') == 'Shirt').collect()), 500)
+        self.assertFalse(os.path.exists(path + '.index'))
+
+    def test_compressed_converted_files(self):
+        """Converted JSON-lines files can be compressed too."""
+        target = os.path.join(self.directory, "amazon.jsonl")
+        convert(self.plain, target)
+        with open(target, 'rb') as f:
+            compressed = self.write("amazon.jsonl.gz", gzip.compress(f.read()))
+        self.assertEqual(format_of(compressed), "jsonl")
+        self.assertEqual(list(open_source(compressed)), list(read_csv(self.plain)))
+
+    def test_decompression_runs_ahead_within_bound(self):
+        """The background thread stays at most 'depth' chunks ahead of the reader."""
+        reader = SlowReader(bytes([65 + index]) * 10 for index in range(50))
+        raw = PrefetchReader(reader, chunk_size=10, depth=3)
+        self.assertEqual(raw.read(5), b'AAAAA')
+        time.sleep(0.2)
+        self.assertLessEqual(reader.reads, 5)  # the chunk being read, 3 queued, 1 waiting
+        raw.close()
+        self.assertFalse(raw._thread.is_alive())
+
+    def test_errors_and_early_close(self):
+        """A corrupt stream raises in the reader; stopping early ends the thread."""
+        data = gzip.compress(self.text.encode('utf-8'))
+        corrupt = self.write("corrupt.csv.gz", data[:len(data) // 2])
+        with self.assertRaises(EOFError):
+            list(read_csv(corrupt))
+
+        threads = threading.active_count()
+        products = read_csv(self.write("amazon.csv.gz", data))
+        next(products)
+        products.close()
+        self.assertEqual(threading.active_count(), threads)
+        with open_text(self.plain) as f:
+            self.assertEqual(f.readline(), HEADER)
+
+    @unittest.skipIf(zstandard is None, "zstandard is not installed")
+    def test_zstd(self):
+        path = self.write("amazon.csv.zst", zstandard.ZstdCompressor().compress(self.text.encode('utf-8')))
+        self.assertEqual(detect_compression(path), 'zstd')
+        self.assertEqual(list(read_csv(path)), list(read_csv(self.plain)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+import os
+import random
+import tempfile
+import unittest
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from sales_analysis.core.distinct import SpillingSet, seen_set
+from sales_analysis.core.models import Product
+from sales_analysis.core.sketches import BloomFilter, HyperLogLog, stable_hash
+from sales_analysis.core.stream import Stream
+
+
+def names(count, unique, seed=7):
+    rng = random.Random(seed)
+    return [f"Product {rng.randrange(unique)}" for _ in range(count)]
+
+
+class TestDistinctMethods(unittest.TestCase):
+
+    def test_spill_is_exact_and_cleans_up(self):
+        """With a tiny budget, keys spill to several runs and the result is still exact."""
+        keys = names(20000, 8000)
+        expected = list(dict.fromkeys(keys))
+        reports = []
+        directory = tempfile.mkdtemp()
+        try:
+            stream = Stream(keys).distinct(lambda k: k, method='spill', memory_limit=20000, report=reports.append)
+            seen = seen_set('spill', memory_limit=20000, directory=directory)
+            self.assertEqual(stream.collect(), expected)
+            for key in keys:
+                seen.add(key)
+            self.assertGreater(seen.spills, 1)
+            self.assertTrue(all(key in seen for key in expected[:100]))
+            self.assertNotIn("Product -1", seen)
+            seen.close()
+            self.assertEqual(os.listdir(directory), [])
+        finally:
+            os.rmdir(directory)
+
+        (report,) = reports
+        self.assertEqual((report.method, report.keys, report.error_rate), ('spill', len(expected), 0.0))
+        self.assertGreater(report.spilled_runs, 0)
+        self.assertIn("on disk", str(report))
+
+    def test_spill_rejects_keys_it_cannot_write(self):
+        seen = SpillingSet(memory_limit=1)
+        try:
+            with self.assertRaises(TypeError):
+                seen.add(object())
+                seen.add(object())
+        finally:
+            seen.close()
+
+    def test_bloom_never_yields_duplicates(self):
+        """Bloom mode keeps every item unique and drops at most ~error_rate of new keys."""
+        keys = names(30000, 20000)
+        expected = list(dict.fromkeys(keys))
+        result = Stream(keys).distinct(lambda k: k, method='bloom', error_rate=0.01).collect()
+        self.assertEqual(len(result), len(set(result)))
+        self.assertTrue(set(result) <= set(expected))
+        self.assertGreater(len(result), len(expected) * 0.98)
+
+    def test_reports_and_plan_shape(self):
+        """A report is delivered after each run, including runs cut short by limit()."""
+        reports = []
+        stream = Stream(names(500, 50)).distinct(lambda k: k, report=reports.append).limit(3)
+        self.assertEqual(len(stream.collect()), 3)
+        self.assertEqual(len(list(stream)), 3)
+        self.assertEqual([r.keys for r in reports], [3, 3])
+        self.assertEqual(reports[0].method, 'exact')
+        self.assertGreater(reports[0].memory_bytes, 0)
+
+        with self.assertRaises(ValueError):
+            Stream([1]).distinct(lambda k: k, method='cuckoo').collect()
+
+    def test_reports_are_logged_by_default(self):
+        """Without a callback, each run's report goes to the log at INFO level."""
+        keys = names(500, 50)
+        with self.assertLogs('sales_analysis.core.distinct', level='INFO') as logs:
+            self.assertEqual(Stream(keys).distinct(lambda k: k).collect(), list(dict.fromkeys(keys)))
+            Stream(keys).distinct(lambda k: k, method='bloom').collect()
+            Stream(keys).count_distinct()
+        self.assertEqual(len(logs.records), 3)
+        self.assertIn("distinct[exact]: 50 keys", logs.output[0])
+        self.assertIn("distinct[hll]", logs.output[2])
+
+    def test_unsupported_keys_are_rejected_clearly(self):
+        """Keys a sketch cannot hash raise a TypeError naming their type."""
+        with self.assertRaisesRegex(TypeError, "got a object key"):
+            Stream([object()]).distinct(lambda k: k, method='bloom').collect()
+        with self.assertRaisesRegex(TypeError, "got a object key"):
+            Stream([object()]).count_distinct()
+
+    def test_distinct_pushdown_still_applies(self):
+        """A spill distinct over Products behaves exactly like the default one."""
+        products = [Product(f"P{i % 13}", "Office", 1.0, 2.0, 50.0, 4.0, i) for i in range(100)]
+        default = Stream(products).distinct(lambda p: p.name).collect()
+        spilled = Stream(products).distinct(lambda p: p.name, method='spill', memory_limit=500).collect()
+        self.assertEqual(spilled, default)
+
+
+class TestSketches(unittest.TestCase):
+
+    def test_stable_hash_is_process_independent(self):
+        self.assertEqual(stable_hash("Laptop"), stable_hash(b"Laptop"))
+        self.assertEqual(stable_hash(("a", 1)), stable_hash(("a", 1)))
+        self.assertLess(stable_hash("Laptop"), 1 << 64)
+
+    def test_bloom_filter_grows_within_its_error_rate(self):
+        """No false negatives; false positives stay under error_rate past the capacity."""
+        bloom = BloomFilter(error_rate=0.01, capacity=1000)
+        for i in range(10000):
+            bloom.add(i)
+        self.assertGreater(len(bloom.slices), 1)
+        self.assertTrue(all(i in bloom for i in range(10000)))
+        false_positives = sum(i in bloom for i in range(10000, 30000))
+        self.assertLess(false_positives / 20000, 0.01)
+        with self.assertRaises(ValueError):
+            BloomFilter(error_rate=1.5)
+
+    def test_hyperloglog_estimates_and_merges(self):
+        """Estimates stay within a few standard errors; merged sketches count the union."""
+        left, right = HyperLogLog(12), HyperLogLog(12)
+        for i in range(30000):
+            left.add(f"key-{i}")
+        for i in range(20000, 50000):
+            right.add(f"key-{i}")
+        self.assertLess(abs(left.count() - 30000) / 30000, 4 * left.relative_error)
+        self.assertLess(abs(left.merge(right).count() - 50000) / 50000, 4 * left.relative_error)
+
+        small = HyperLogLog()
+        for key in "abcabc":
+            small.add(key)
+        self.assertEqual(small.count(), 3)
+        with self.assertRaises(ValueError):
+            HyperLogLog(3)
+
+    def test_count_distinct(self):
+        """count_distinct estimates with HLL and counts exactly with the other methods."""
+        keys = names(40000, 25000)
+        exact = len(set(keys))
+        reports = []
+        estimate = Stream(keys).count_distinct(report=reports.append)
+        self.assertLess(abs(estimate - exact) / exact, 0.04)
+        self.assertEqual(reports[0].method, 'hll')
+        self.assertLess(reports[0].memory_bytes, 20000)
+        self.assertEqual(Stream(keys).count_distinct(method='exact'), exact)
+        self.assertEqual(Stream(keys).count_distinct(method='spill', memory_limit=50000), exact)
+        products = [Product(f"P{i % 7}", "Office", 1.0, 2.0, 0.0, 4.0, i) for i in range(50)]
+        self.assertEqual(Stream(products).count_distinct(lambda p: p.name, method='exact'), 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import io
+import os
+import random
+import shutil
+import tempfile
+import tracemalloc
+import unittest
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from sales_analysis.core import external_sort
+from sales_analysis.core.external_sort import external_sorted
+from sales_analysis.core.models import Product
+from sales_analysis.core.spill import encode, read_records
+from sales_analysis.core.stream import Stream
+
+CATEGORIES = ["Electronics", "Clothing", "Office"]
+
+def products(count, seed=3):
+    rng = random.Random(seed)
+    for i in range(count):
+        yield Product(f"Product {i} ünïcode", CATEGORIES[i % 3], float(rng.randrange(1000)),
+                      1000.0, float(rng.randrange(90)), rng.randrange(10, 50) / 10, rng.randrange(10000))
+
+
+class TestExternalSort(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_codec_round_trip(self):
+        """Products use the binary layout, other items are pickled, both read back equal."""
+        items = list(products(5)) + [("tuple", 1), 2.5, Product("x", "y", 1, 2, 3, 4, 5.5)]
+        encoded = b''.join(map(encode, items))
+        self.assertEqual(list(read_records(io.BytesIO(encoded))), items)
+        self.assertLess(len(encode(items[0])), 100)
+        with self.assertRaises(ValueError):
+            list(read_records(io.BytesIO(b'Z')))
+
+    def test_matches_builtin_sorted_and_is_stable(self):
+        """Spilled runs merge to exactly sorted()'s order, including ties and reverse."""
+        data = list(products(2000))
+        for key, reverse in [(lambda p: p.rating, True), (lambda p: p.discount_percentage, False)]:
+            expected = sorted(data, key=key, reverse=reverse)
+            result = Stream(data).sorted(key=key, reverse=reverse, run_size=150,
+                                         directory=self.directory).collect()
+            self.assertEqual([p.name for p in result], [p.name for p in expected])
+        self.assertEqual(list(external_sorted([3, 1, 2], run_size=10)), [1, 2, 3])
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_many_runs_are_merged_in_passes(self):
+        """More runs than the fan-in limit are merged in several passes."""
+        original = external_sort._MAX_FAN_IN
+        external_sort._MAX_FAN_IN = 4
+        try:
+            data = [random.random() for _ in range(1000)]
+            self.assertEqual(list(external_sorted(data, run_size=20, directory=self.directory)), sorted(data))
+        finally:
+            external_sort._MAX_FAN_IN = original
+
+    def test_lazy_downstream_and_cleanup_on_close(self):
+        """Items arrive before the merge ends; closing early removes the temporary files."""
+        stream = Stream(products(1000)).sorted(key=lambda p: p.rating_count, run_size=100,
+                                              directory=self.directory)
+        iterator = iter(stream)
+        first = next(iterator)
+        self.assertEqual(first.rating_count, min(p.rating_count for p in products(1000)))
+        self.assertEqual(len(os.listdir(self.directory)), 1)
+        iterator.close()
+        self.assertEqual(os.listdir(self.directory), [])
+        self.assertIn("external run_size=100", stream.plan[0].describe())
+
+    def test_memory_stays_flat(self):
+        """Peak memory depends on run_size, not on the number of items sorted."""
+        def peak(count):
+            tracemalloc.start()
+            total = Stream(products(count)).sorted(key=lambda p: p.rating, run_size=500,
+                                                   directory=self.directory) \
+                .reduce(lambda acc, p: acc + 1, 0)
+            usage = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            self.assertEqual(total, count)
+            return usage
+        # Each merged run holds one read buffer, and at most _MAX_FAN_IN runs are merged at once.
+        original = external_sort._MAX_FAN_IN
+        external_sort._MAX_FAN_IN = 8
+        try:
+            self.assertLess(peak(40000), 1.5 * peak(8000))
+        finally:
+            external_sort._MAX_FAN_IN = original
+
+        with self.assertRaises(ValueError):
+            list(external_sorted([1], run_size=0))
+
+
+if __name__ == '__main__':
+    unittest.main()
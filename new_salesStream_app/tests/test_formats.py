@@ -0,0 +1,158 @@
+import io
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from sales_analysis.app import main
+from sales_analysis.core.expressions import col
+from sales_analysis.core.stream import Stream
+from sales_analysis.ingestion import formats
+from sales_analysis.ingestion.formats import (
+    ArrowSource, JsonLinesSource, ParquetSource, convert, format_of, open_source
+)
+from sales_analysis.ingestion.loader import CsvSource, read_csv
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+HEADER = "product_name,category,discounted_price,actual_price,discount_percentage,rating,rating_count\n"
+ROWS = [
+    "Laptop,Electronics|Computers,\"₹1,000\",\"₹1,500\",33%,4.5,\"1,100\"\n",
+    "\"Mouse\nwith a \"\"quoted\"\"\nsecond line\",Electronics|Accessories,₹50,₹100,50%,4.0|12,50\n",
+    "Shirt,Clothing|Men,₹20,₹40,50%,4.7,2000\n",
+    "Pen,Office,₹5,₹5,0%,,\n",
+    "Lamp,Home|Lighting,₹300,₹450,33%,4.1,\"12,000\"\n",
+]
+
+PIPELINES = [
+    lambda stream: stream.collect(),
+    lambda stream: stream.map(lambda p: p.rating).collect(),
+    lambda stream: stream.filter(col('rating') > 4.2).map(lambda p: p.name).collect(),
+    lambda stream: stream.filter((col('discount_percentage') == 33) & (col('savings') > 100)).collect(),
+    lambda stream: stream.filter((col('rating') < 4.2) | (col('category') == 'Office')).collect(),
+    lambda stream: stream.map(lambda p: 1).reduce(lambda acc, x: acc + x, 0),
+]
+
+
+class FakeStatistics:
+    def __init__(self, low, high):
+        self.min, self.max, self.has_min_max = low, high, True
+
+
+class FakeColumn:
+    def __init__(self, path, statistics):
+        self.path_in_schema, self.statistics = path, statistics
+
+
+class FakeRowGroup:
+    # The part of pyarrow's RowGroupMetaData that row-group pruning reads.
+    def __init__(self, **ranges):
+        self.columns = [FakeColumn(field, FakeStatistics(*bounds)) for field, bounds in ranges.items()]
+        self.num_columns = len(self.columns)
+
+    def column(self, index):
+        return self.columns[index]
+
+
+class TestFormats(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.csv_path = os.path.join(self.directory, "amazon.csv")
+        with open(self.csv_path, "w", encoding="utf-8", newline="") as f:
+            f.write(HEADER + "".join(ROWS * 3))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def converted(self, extension):
+        path = os.path.join(self.directory, "amazon" + extension)
+        self.assertEqual(convert(self.csv_path, path, batch_size=4), 15)
+        return path
+
+    def check_source(self, source):
+        # Every pipeline gives the CsvSource's result, with the same pushdown.
+        for pipeline in PIPELINES:
+            self.assertEqual(pipeline(Stream(source)), pipeline(Stream(CsvSource(self.csv_path))))
+        self.assertEqual(list(source), list(read_csv(self.csv_path)))
+
+    def test_json_lines(self):
+        """JSON-lines files hold cleaned products and read back like the CSV."""
+        path = self.converted(".jsonl")
+        self.assertEqual(format_of(path), "jsonl")
+        source = open_source(path)
+        self.assertIsInstance(source, JsonLinesSource)
+        self.check_source(source)
+
+    def test_batches_and_projection(self):
+        """Sources read record batches holding only the projected columns."""
+        source = JsonLinesSource(self.converted(".ndjson"), batch_size=4)
+        batches = list(source.batches(['name', 'rating']))
+        self.assertEqual([len(batch['name']) for batch in batches], [4, 4, 4, 3])
+        self.assertEqual(set(batches[0]), {'name', 'rating'})
+        products = list(source.scan(fields={'rating'}, predicates=[col('rating_count') > 1000]))
+        self.assertEqual([(p.rating, p.name, p.rating_count) for p in products],
+                         [(4.5, None, 1100), (4.7, None, 2000), (4.1, None, 12000)] * 3)
+        # Categories are shared string objects, as with read_csv.
+        categories = [p.category for p in source]
+        self.assertIs(categories[0], categories[5])
+
+    def test_row_group_pruning(self):
+        """Row groups whose statistics exclude a comparison are skipped."""
+        group = FakeRowGroup(rating=(3.0, 4.2), rating_count=(10, 500))
+        self.assertTrue(formats._may_match(group, []))
+        self.assertTrue(formats._may_match(group, [col('rating') >= 4.2]))
+        self.assertFalse(formats._may_match(group, [col('rating') > 4.2]))
+        self.assertFalse(formats._may_match(group, [(col('rating') > 3.5) & (col('rating_count') == 1000)]))
+        self.assertTrue(formats._may_match(group, [col('rating_count') != 20]))
+        self.assertTrue(formats._may_match(group, [col('discounted_price') > 10 ** 6]))  # no statistics
+        self.assertTrue(formats._may_match(group, [(col('rating') > 4.5) | (col('rating') < 3.5)]))
+
+    def test_app_reads_converted_files(self):
+        """The report over a converted file is the same as over the CSV."""
+        path = self.converted(".jsonl")
+        reports = []
+        for source in (self.csv_path, path):
+            output = io.StringIO()
+            with redirect_stdout(output):
+                main(source)
+            reports.append(output.getvalue())
+        self.assertEqual(reports[0], reports[1])
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            convert(self.csv_path, os.path.join(self.directory, "amazon.xlsx"))
+        self.assertEqual(os.listdir(self.directory), ["amazon.csv"])
+        self.assertIsInstance(open_source(self.csv_path), CsvSource)
+        output = io.StringIO()
+        with redirect_stdout(output):
+            self.assertEqual(list(open_source("missing.parquet")), [])
+        self.assertIn("CRITICAL ERROR", output.getvalue())
+
+    @unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+    def test_arrow(self):
+        """Arrow IPC (Feather) files read back like the CSV."""
+        source = open_source(self.converted(".feather"))
+        self.assertIsInstance(source, ArrowSource)
+        self.check_source(source)
+
+    @unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+    def test_parquet(self):
+        """Parquet files read back like the CSV and skip row groups by statistics."""
+        source = open_source(self.converted(".parquet"))
+        self.assertIsInstance(source, ParquetSource)
+        self.check_source(source)
+        # Ratings of the 4 row groups: only those with a rating above 4.6 are read.
+        batches = list(source.batches(['rating'], [col('rating') > 4.6]))
+        self.assertEqual(sum(len(batch['rating']) for batch in batches), 11)
+
+
+if __name__ == '__main__':
+    unittest.main()
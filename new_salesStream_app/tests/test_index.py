@@ -0,0 +1,107 @@
+import random
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from sales_analysis.core.expressions import col
+from sales_analysis.core.stream import Stream
+from sales_analysis.ingestion import index
+from sales_analysis.ingestion.loader import CsvSource, scan_csv
+
+HEADER = "product_id,product_name,category,discounted_price,actual_price,discount_percentage,rating,rating_count\n"
+CATEGORIES = ["Electronics|Computers", "Clothing|Men", "Office|Writing", "Toys", "Home|Kitchen"]
+
+def csv_data(count, seed=7):
+    # Quoted commas, multi-line names, blank lines, junk values and a few 'nan' ratings.
+    rng = random.Random(seed)
+    lines = [HEADER]
+    for i in range(count):
+        name = f"\"Item {i}\nline two\"" if i % 97 == 0 else f"\"Item {i % 300}, ünï\""
+        rating = "nan" if i % 151 == 0 else f"{rng.randrange(10, 50) / 10}"
+        discount = "abc%" if i % 89 == 0 else f"{rng.randrange(90)}%"
+        lines.append(f"{i},{name},{CATEGORIES[i % 5] if i % 50 else 'Rare'},\"₹1,{i:03d}\",₹2000,"
+                     f"{discount},{rating},\"{rng.randrange(5000):,}\"\r\n")
+        if i % 211 == 0:
+            lines.append("\n")
+    return "".join(lines)
+
+
+class TestSecondaryIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "amazon.csv")
+        self.write(csv_data(2000))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, text):
+        with open(self.path, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+
+    def check(self, predicate, fields=None):
+        expected = list(scan_csv(self.path, fields, [predicate]))
+        result = list(index.load_index(self.path).scan(fields, [predicate]))
+        self.assertEqual(list(map(repr, result)), list(map(repr, expected)))  # nan != nan
+        return result
+
+    def test_point_and_range_queries_match_a_full_scan(self):
+        """Every indexed lookup returns exactly the scan's rows, in file order."""
+        self.assertTrue(self.check(col('name') == "Item 42, ünï"))
+        self.assertTrue(self.check(col('name') == "Item 97\nline two"))
+        self.assertEqual(self.check(col('name') == "missing"), [])
+        self.assertTrue(self.check(col('category') == "Rare"))
+        rating = col('rating')
+        for predicate in [rating > 4.8, rating >= 4.8, rating < 1.1, rating <= 1.1, rating == 2.5]:
+            self.assertTrue(self.check(predicate))
+        self.check(col('rating_count') < 100, fields={'name'})
+        self.check((col('discount_percentage') == 0) & (col('category') == "Toys"))
+        self.check((col('rating') >= 4.9) & (col('name') != "Item 7, ünï"), fields={'rating'})
+
+    def test_only_matching_records_are_read(self):
+        """A selective lookup parses O(matches) rows; unselective ones fall back to a scan."""
+        product_index = index.load_index(self.path)
+        self.assertEqual(len(product_index), 2000)
+        rows = product_index.rows('category', 'Rare')
+        self.assertEqual(len(rows), 40)
+        parsed = []
+        original = index.scan_rows
+        with patch.object(index, "scan_rows", lambda rows, *args: original(
+                (parsed.append(row) or row for row in rows), *args)):
+            self.assertEqual(len(list(product_index.scan(None, [col('category') == "Rare"]))), 40)
+        self.assertEqual(len([row for row in parsed if row]), 40)  # plus skipped blank lines
+        self.assertIsNone(product_index.choose([col('rating') > 0]))
+        self.assertIsNone(product_index.choose([col('actual_price') > 0]))
+        self.check(col('rating') > 0)
+
+    def test_stale_index_is_rebuilt(self):
+        """An edited source rebuilds the index; an unchanged one reuses it."""
+        index.load_index(self.path)
+        with patch.object(index, "build_index") as build:
+            index.load_index(self.path)
+            build.assert_not_called()
+        self.write(csv_data(500, seed=8))
+        self.assertEqual(len(index.load_index(self.path)), 500)
+        self.check(col('rating') > 4.7)
+
+    def test_stream_uses_the_index(self):
+        """CsvSource(use_index=True) answers pushed-down filters through the index."""
+        query = lambda source: Stream(source).filter(col('category') == "Rare") \
+            .filter(col('rating') > 3).map(lambda p: p.name).collect()
+        expected = query(CsvSource(self.path))
+        with patch.object(index.ProductIndex, "read_rows", autospec=True,
+                          side_effect=index.ProductIndex.read_rows) as read_rows:
+            self.assertEqual(query(CsvSource(self.path, use_index=True)), expected)
+            read_rows.assert_called_once()
+        self.assertTrue(os.path.exists(os.path.join(self.path + ".index", "meta.json")))
+        self.assertEqual(repr(CsvSource(self.path, use_index=True)), f"CsvSource({self.path!r}, use_index=True)")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,7 +7,8 @@ import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
 
 from sales_analysis.ingestion.cleaning import (
-    currency_cleaner, percent_cleaner, rating_cleaner, count_cleaner
+    currency_cleaner, percent_cleaner, rating_cleaner, count_cleaner,
+    currency_cleaner_batch, percent_cleaner_batch, rating_cleaner_batch, count_cleaner_batch
 )
 from sales_analysis.ingestion.loader import read_csv
 
@@ -42,6 +43,40 @@ class TestIngestion(unittest.TestCase):
         # Test the split logic
         self.assertEqual(rating_cleaner("4.5|12345"), 4.5)
 
+    # --- Batch Cleaning Tests ---
+    def test_batch_cleaners_keep_scalar_semantics(self):
+        """Batch cleaners return the scalar results for every value, plus an invalid mask."""
+        raw = ["₹1,099", "", None, "4.5|...", "junk", " 12 % ", "24,269", 100, "4.5"]
+        for scalar, batch in ((currency_cleaner, currency_cleaner_batch),
+                              (percent_cleaner, percent_cleaner_batch),
+                              (rating_cleaner, rating_cleaner_batch),
+                              (count_cleaner, count_cleaner_batch)):
+            values, mask = batch(raw)
+            self.assertEqual(list(values), [scalar(v) for v in raw], batch.__name__)
+            self.assertEqual(len(mask), len(raw))
+            self.assertEqual((mask[1], mask[2], mask[4]), (1, 1, 1))  # '', None, junk
+
+    def test_batch_cleaners_fast_path(self):
+        """A fully valid column is returned as a typed array with an all-zero mask."""
+        prices, mask = currency_cleaner_batch(["₹1,099", "₹ 1,200.50 ", "5"])
+        self.assertEqual(prices.typecode, 'd')
+        self.assertEqual(list(prices), [1099.0, 1200.5, 5.0])
+        self.assertEqual(mask, bytearray(3))
+        self.assertEqual(list(rating_cleaner_batch(["4.5|12345", "3"])[0]), [4.5, 3.0])
+        counts, mask = count_cleaner_batch(["1,000", "9" * 30])
+        self.assertEqual(counts.typecode, 'q')
+        self.assertEqual((list(counts), list(mask)), ([1000, 0], [0, 1]))  # overflows int64
+        self.assertEqual(list(percent_cleaner_batch([])[0]), [])
+
+    def test_batch_cleaners_resume_after_bad_values(self):
+        """Values after a bad one are still parsed, also from a one-shot iterator."""
+        prices, mask = currency_cleaner_batch(iter(['₹1', 'x', '₹3', '₹4']))
+        self.assertEqual((list(prices), list(mask)), ([1.0, 0.0, 3.0, 4.0], [0, 1, 0, 0]))
+        ratings, mask = rating_cleaner_batch(['', '4.5|1,234', 'bad|4', '3.9'])
+        self.assertEqual((list(ratings), list(mask)), ([0.0, 4.5, 0.0, 3.9], [1, 0, 1, 0]))
+        counts, mask = count_cleaner_batch(['1,000', 'multi\nline', '7', None])
+        self.assertEqual((list(counts), list(mask)), ([1000, 0, 7, 0], [0, 1, 0, 1]))
+
     # --- Loader Tests ---
     @patch('os.path.exists')
     def test_loader_file_not_found(self, mock_exists):
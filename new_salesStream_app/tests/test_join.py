@@ -0,0 +1,100 @@
+import os
+import random
+import shutil
+import tempfile
+import unittest
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from sales_analysis.core import join
+from sales_analysis.core.models import Product
+from sales_analysis.core.stream import Stream
+
+CATEGORIES = ["Electronics", "Clothing", "Office", "Toys"]
+
+def products(count, seed=5):
+    rng = random.Random(seed)
+    return [Product(f"P{rng.randrange(count // 2)}", CATEGORIES[i % 4], float(i), float(i + 10),
+                    10.0, 4.0, i) for i in range(count)]
+
+def nested_loop_join(left, right, key, right_key, how):
+    # Reference implementation: scans 'right' once per left item.
+    result = []
+    for item in left:
+        matches = [(item, other) for other in right if right_key(other) == key(item)]
+        result += matches or ([(item, None)] if how == 'left' else [])
+    return result
+
+
+class TestJoin(unittest.TestCase):
+
+    def setUp(self):
+        self.products = products(400)
+        # Inventory rows (name, stock): some names repeat, some products have none.
+        self.inventory = [(f"P{i % 150}", i) for i in range(180)]
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def check(self, left, right, how, **options):
+        expected = nested_loop_join(self.products, self.inventory, lambda p: p.name, lambda row: row[0], how)
+        result = Stream(left).join(right, key=lambda p: p.name, other_key=lambda row: row[0],
+                                   how=how, **options).collect()
+        self.assertEqual(sorted(result, key=repr), sorted(expected, key=repr))
+        return result
+
+    def test_inner_and_left_joins_match_nested_loops(self):
+        """Every match is paired once; left joins keep unmatched items with None."""
+        for how in ('inner', 'left'):
+            result = self.check(iter(self.products), iter(self.inventory), how)
+            # The left side was probed, so results keep its order.
+            self.assertEqual([p for p, _ in result],
+                             [p for p, _ in nested_loop_join(self.products, self.inventory,
+                                                             lambda p: p.name, lambda row: row[0], how)])
+        self.assertIn(None, [match for _, match in self.check(self.products, self.inventory, 'left')])
+
+    def test_builds_on_the_smaller_side(self):
+        """With known sizes, a smaller left side becomes the hash table."""
+        small = self.products[:20]
+        self.assertEqual(join._known_size(Stream(small)), 20)
+        self.assertIsNone(join._known_size(Stream(small).filter(bool)))
+        for how in ('inner', 'left'):
+            expected = nested_loop_join(small, self.inventory, lambda p: p.name, lambda row: row[0], how)
+            result = Stream(small).join(self.inventory, key=lambda p: p.name,
+                                        other_key=lambda row: row[0], how=how).collect()
+            self.assertEqual(sorted(result, key=repr), sorted(expected, key=repr))
+
+    def test_grace_fallback_spills_partitions(self):
+        """A build side over the memory budget is joined partition by partition from disk."""
+        joined = Stream(self.products).join(iter(self.inventory), key=lambda p: p.name,
+                                            other_key=lambda row: row[0], memory_limit=2000,
+                                            directory=self.directory)
+        iterator = iter(joined)
+        next(iterator)
+        self.assertEqual(len(os.listdir(self.directory)), 1)
+        iterator.close()
+        self.assertEqual(os.listdir(self.directory), [])
+        for how in ('inner', 'left'):
+            self.check(self.products, iter(self.inventory), how, memory_limit=2000, directory=self.directory)
+            # Product build side, split again at deeper levels.
+            self.check(iter(self.products), self.inventory, how, memory_limit=300, directory=self.directory)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_dict_lookup_enrichment(self):
+        """A dict is used as the hash table directly: one value per key."""
+        margins = {"Electronics": 0.2, "Office": 0.5}
+        result = Stream(self.products[:4]).join(margins, key=lambda p: p.category, how='left') \
+            .map(lambda pair: (pair[0].category, pair[1])).collect()
+        self.assertEqual(result, [("Electronics", 0.2), ("Clothing", None), ("Office", 0.5), ("Toys", None)])
+        inner = Stream(self.products[:4]).join(margins, key=lambda p: p.category).collect()
+        self.assertEqual(len(inner), 2)
+
+    def test_invalid_join_type(self):
+        with self.assertRaises(ValueError):
+            Stream([]).join([], key=len, how='outer')
+
+
+if __name__ == '__main__':
+    unittest.main()
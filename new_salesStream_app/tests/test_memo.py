@@ -0,0 +1,153 @@
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from sales_analysis.core import aggregations as agg
+from sales_analysis.core.expressions import col
+from sales_analysis.core.memo import ResultCache
+from sales_analysis.core.models import Product
+from sales_analysis.core.scan import SharedScan
+from sales_analysis.core.stream import Stream
+from sales_analysis.ingestion import loader
+from sales_analysis.ingestion.loader import CsvSource
+
+CSV_DATA = (
+    "product_name,category,discounted_price,actual_price,discount_percentage,rating,rating_count\n"
+    "Laptop,Electronics|Computers,\"₹1,000\",\"₹1,500\",33%,4.5,\"1,100\"\n"
+    "\"Mouse, wireless\",Electronics|Accessories,₹50,₹100,50%,4.0|12,50\n"
+    "Shirt,Clothing|Men,₹20,₹40,50%,4.7,2000\n"
+    "Pen,Office,₹5,₹5,0%,,\n"
+)
+
+
+class TestResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "amazon.csv")
+        with open(self.path, "w", encoding="utf-8", newline="") as f:
+            f.write(CSV_DATA)
+        self.cache = ResultCache()
+        self.scans = 0
+        original = loader.scan_csv
+
+        def counting_scan(*args):
+            self.scans += 1
+            return original(*args)
+        patcher = patch.object(loader, "scan_csv", counting_scan)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def stream(self):
+        return Stream(CsvSource(self.path)).memoize(self.cache)
+
+    def test_identical_pipelines_hit(self):
+        """Separately written but identical pipelines share one result; changes miss."""
+        revenue = self.stream().map(lambda p: p.discounted_price).reduce(lambda acc, x: acc + x, 0.0)
+        again = self.stream().map(lambda p: p.discounted_price).reduce(lambda acc, x: acc + x, 0.0)
+        self.assertEqual((revenue, again), (1075.0, 1075.0))
+        self.assertEqual(self.cache.stats().hits, 1)
+
+        for threshold in (4.0, 4.6):
+            high = lambda p: p.rating > threshold  # closure values are part of the key
+            self.assertEqual(len(self.stream().filter(high).collect()), 2 if threshold == 4.0 else 1)
+        self.assertEqual(self.stream().map(lambda p: p.actual_price).reduce(lambda acc, x: acc + x, 0.0), 1645.0)
+        grouped = self.stream().group_by(lambda p: p.category, agg={'n': agg.count()})
+        self.assertEqual(self.stream().group_by(lambda p: p.category, agg={'n': agg.count()}), grouped)
+        # Every terminal miss started from the stored source items (memoize() right after
+        # the source), so the file was only scanned once.
+        stats = self.cache.stats()
+        self.assertEqual((stats.hits, stats.misses, self.scans), (6, 6, 1))
+
+    def test_shared_prefix_is_reused(self):
+        """Pipelines sharing a memoized filter stage start from its stored items."""
+        discounted = Stream(CsvSource(self.path)).filter(col('discount_percentage') > 0).memoize(self.cache)
+        top = discounted.top_k(2, key=lambda p: p.rating, reverse=True).collect()
+        self.assertEqual([p.name for p in top], ["Shirt", "Laptop"])
+        # Only ratings were needed so far, but the stored items are complete Products.
+        total = discounted.map(lambda p: p.discounted_price).reduce(lambda acc, x: acc + x, 0.0)
+        self.assertEqual(total, 1070.0)
+        self.assertEqual(discounted.map(lambda p: p.name).collect(), ["Laptop", "Mouse, wireless", "Shirt"])
+        self.assertEqual(self.scans, 1)
+        stats = self.cache.stats()
+        self.assertEqual((stats.hits, stats.misses), (2, 4))
+
+    def test_dataset_change_misses(self):
+        """Editing the file changes its fingerprint, so stored results are not reused."""
+        count = lambda: self.stream().map(lambda p: 1).reduce(lambda acc, x: acc + x, 0)
+        self.assertEqual(count(), 4)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("Cup,Home,₹1,₹2,50%,3.0,1\n")
+        self.assertEqual(count(), 5)
+        self.assertEqual(self.scans, 2)
+
+    def test_source_is_hashed_once(self):
+        """A run fingerprints its source once, and an unchanged file is not hashed again."""
+        from sales_analysis.core import memo
+        from sales_analysis.ingestion import cache
+        cache._HASHES.clear()
+        with patch.object(cache, "file_hash", side_effect=cache.file_hash) as file_hash, \
+                patch.object(memo, "source_key", side_effect=memo.source_key) as source_key:
+            for _ in range(2):
+                self.assertEqual(len(self.stream().filter(lambda p: p.rating > 4.2).collect()), 2)
+        self.assertEqual(file_hash.call_count, 1)
+        self.assertEqual(source_key.call_count, 2)  # once per terminal call, miss or hit
+        self.assertEqual(self.cache.stats().hits, 1)
+
+    def test_results_are_not_shared_between_callers(self):
+        result = self.stream().collect()
+        result.clear()
+        self.assertEqual(len(self.stream().collect()), 4)
+
+    def test_lru_eviction_and_disk_tier(self):
+        """The memory tier evicts least recently used entries; the disk tier survives it."""
+        cache = ResultCache(max_bytes=150, directory=os.path.join(self.directory, "memo"))
+        for key in ("a", "b", "c"):
+            cache.put(key, [Product(key * 20, "X", 1.0, 2.0, 3.0, 4.0, 5)])
+        stats = cache.stats()
+        self.assertEqual((stats.entries, stats.evictions), (2, 1))
+        self.assertEqual(cache.get("a")[1][0].name, "a" * 20)  # promoted back from disk
+        self.assertEqual(cache.stats().disk_hits, 1)
+
+        fresh = ResultCache(directory=os.path.join(self.directory, "memo"), max_disk_bytes=150)
+        self.assertEqual(fresh.get("c"), (True, [Product("c" * 20, "X", 1.0, 2.0, 3.0, 4.0, 5)]))
+        fresh.put("d", {"total": 1.5})
+        self.assertEqual(len(os.listdir(fresh.directory)), 2)  # 'a' and 'b' were used least recently
+        self.assertTrue(ResultCache(directory=fresh.directory).get("c")[0])
+        self.assertEqual(fresh.get("d"), (True, {"total": 1.5}))
+        fresh.clear()
+        self.assertEqual(fresh.get("d"), (False, None))
+
+    def test_uncacheable_sources_still_run(self):
+        """Generators cannot be fingerprinted, so their pipelines always run."""
+        products = lambda: (p for p in [Product("A", "X", 1.0, 2.0, 3.0, 4.0, 5)])
+        for _ in range(2):
+            self.assertEqual(len(Stream(products()).memoize(self.cache).collect()), 1)
+        self.assertEqual(self.cache.stats().uncacheable, 4)
+        self.assertIsNotNone(self.cache.key([1, 2], (), "collect"))
+        self.assertNotEqual(self.cache.key([1, 2], (), "collect"), self.cache.key([1, 3], (), "collect"))
+
+    def test_shared_scan_skips_stored_pipelines(self):
+        """A SharedScan whose pipelines are all stored does not read its source."""
+        def run():
+            scan = SharedScan(loader.read_csv(self.path), cache=self.cache, dataset=CsvSource(self.path))
+            ratings = scan.register(lambda stream: stream.map(lambda p: p.rating).collect())
+            scan.run()
+            return ratings.result()
+
+        with patch.object(loader, "product_from_row", side_effect=loader.product_from_row) as parse:
+            self.assertEqual(run(), [4.5, 4.0, 4.7, 0.0])
+            self.assertEqual(run(), [4.5, 4.0, 4.7, 0.0])
+        self.assertEqual(parse.call_count, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import gzip
+import io
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest.mock import patch
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from sales_analysis.core.expressions import col
+from sales_analysis.core.stream import Stream
+from sales_analysis.ingestion import mmap_scan
+from sales_analysis.ingestion.loader import CsvSource, read_csv, scan_csv
+from sales_analysis.ingestion.mmap_scan import record_pattern, scan_mmap
+
+HEADER = "product_id,product_name,category,discounted_price,actual_price,discount_percentage,rating,rating_count,about_product\r\n"
+ROWS = [
+    "B1,Laptop,Electronics|Computers,\"₹1,000\",\"₹1,500\",33%,4.5,\"1,100\",\"Fast, light\"\r\n",
+    "B2,\"Mouse\r\nwith a \"\"quoted\"\"\nsecond line\",Electronics|Accessories,₹50,₹100,50%,4.0|12,50,\"\"\r\n",
+    "\r\n",
+    "B3,Shirt,Clothing|Men,₹20,₹40,50%,4.7,2000,\"Cotton\n\"\"slim\"\" fit\"\r\n",
+    "B4,Pen,Office,₹5,₹5,0%,,,\r\n",
+    "B5,\"\",Home|Lighting,₹300,₹450,33%,4.1,\"12,000\",a \"\"plain\"\" quote\r\n",
+]
+
+QUERIES = [
+    (None, ()),
+    ({'rating'}, ()),
+    ({'name', 'rating_count'}, ()),
+    (set(), ()),
+    ({'name'}, (col('rating') > 4.2,)),
+    ({'category'}, ((col('discount_percentage') == 33) & (col('savings') > 100),)),
+    (None, ((col('rating') < 4.2) | (col('category') == 'Office'),)),
+]
+
+
+class TestMmapScan(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = self.write("amazon.csv", HEADER + "".join(ROWS * 40))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, text):
+        path = os.path.join(self.directory, name)
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+        return path
+
+    def test_same_products_as_scan_csv(self):
+        """Projected and filtered mmap scans give scan_csv's products, quoting and all."""
+        for fields, predicates in QUERIES:
+            with self.subTest(fields=fields, predicates=predicates):
+                self.assertEqual(list(scan_mmap(self.path, fields, predicates)),
+                                 list(scan_csv(self.path, fields, predicates)))
+        names = [p.name for p in scan_mmap(self.path, {'name'})]
+        self.assertEqual(names[1], 'Mouse\nwith a "quoted"\nsecond line')
+        self.assertEqual(len(names), 200)
+
+    def test_chunk_boundaries(self):
+        """Records split across chunks, including inside quoted newlines, read whole."""
+        expected = list(scan_csv(self.path))
+        for size in (1, 7, 64, 1000):
+            with self.subTest(size=size):
+                with patch.object(mmap_scan, 'CHUNK_SIZE', size):
+                    self.assertEqual(list(scan_mmap(self.path)), expected)
+
+    def test_only_needed_columns_are_captured(self):
+        """The pattern captures the needed columns only and skips the rest of the record."""
+        pattern = record_pattern([1, 6])
+        self.assertEqual(pattern.groups, 4)
+        record = b'B1,"A ""big"", one",x,1,2,3,4.5,"1,100","long\ntext"\nB2,'
+        match = pattern.match(record)
+        self.assertEqual(match.groups(), (b'A ""big"", one', None, None, b'4.5'))
+        self.assertEqual(record[match.end():], b'B2,')
+        # Columns a short row does not have are empty.
+        self.assertEqual(pattern.findall(b'B9,Short\n'), [(b'', b'Short', b'', b'')])
+
+    def test_csv_source_option(self):
+        """CsvSource(use_mmap=True) gives the pipelines the same results."""
+        source = CsvSource(self.path, use_mmap=True)
+        self.assertEqual(repr(source), f"CsvSource({self.path!r}, use_mmap=True)")
+        self.assertEqual(list(source), list(read_csv(self.path)))
+        for pipeline in (lambda s: s.filter(col('rating') > 4.2).map(lambda p: p.name).collect(),
+                         lambda s: s.map(lambda p: p.rating_count).reduce(lambda acc, x: acc + x, 0)):
+            self.assertEqual(pipeline(Stream(source)), pipeline(Stream(CsvSource(self.path))))
+
+    def test_fallbacks(self):
+        """Compressed, empty, header-only and missing files behave like scan_csv."""
+        compressed = os.path.join(self.directory, "amazon.csv.gz")
+        with open(self.path, 'rb') as f, open(compressed, 'wb') as out:
+            out.write(gzip.compress(f.read()))
+        self.assertEqual(list(scan_mmap(compressed, {'rating'})), list(scan_csv(self.path, {'rating'})))
+        self.assertEqual(list(scan_mmap(self.write("empty.csv", ""))), [])
+        self.assertEqual(list(scan_mmap(self.write("header.csv", HEADER.rstrip()))), [])
+        self.assertEqual(list(scan_mmap(self.write("no_newline.csv", HEADER + ROWS[0].rstrip()))),
+                         list(read_csv(self.path))[:1])
+        output = io.StringIO()
+        with redirect_stdout(output):
+            self.assertEqual(list(scan_mmap(os.path.join(self.directory, "missing.csv"))), [])
+        self.assertIn("CRITICAL ERROR", output.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
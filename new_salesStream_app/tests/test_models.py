@@ -1,6 +1,9 @@
 import unittest
+import copy
+import pickle
 import sys
 import os
+from dataclasses import FrozenInstanceError
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
 
@@ -19,3 +22,15 @@ class TestModels(unittest.TestCase):
         )
         # Explicitly access the property to ensure coverage
         self.assertEqual(p.savings, 20.0)
+
+    def test_product_is_compact_and_picklable(self):
+        """
+        Products use __slots__ (no per-instance __dict__), stay frozen,
+        and survive a pickle round trip (used by the process-parallel paths).
+        """
+        p = Product("Test", "Test", 80.0, 100.0, 20.0, 5.0, 1)
+        self.assertFalse(hasattr(p, '__dict__'))
+        with self.assertRaises(FrozenInstanceError):
+            p.rating = 1.0
+        self.assertEqual(pickle.loads(pickle.dumps(p)), p)
+        self.assertEqual(copy.copy(p), p)
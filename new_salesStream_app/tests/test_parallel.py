@@ -0,0 +1,77 @@
+import unittest
+import shutil
+import tempfile
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from sales_analysis.core.stream import Stream
+from sales_analysis.core.table import ProductTable
+from sales_analysis.ingestion.loader import read_csv
+from sales_analysis.ingestion.parallel import (
+    iter_products, parse_range, read_csv_parallel, split_ranges
+)
+
+HEADER = "product_name,category,discounted_price,actual_price,discount_percentage,rating,rating_count\n"
+ROWS = [
+    "Laptop,Electronics|Computers,\"₹1,000\",\"₹1,500\",33%,4.5,\"1,100\"\n",
+    "\"Mouse\nwith a \"\"quoted\"\"\nsecond line\",Electronics|Accessories,₹50,₹100,50%,4.0|12,50\n",
+    "Shirt,Clothing|Men,₹20,₹40,50%,4.7,2000\n",
+    "\n",
+    "\"Pen, blue\",Office,₹5,₹5,0%,,\n",
+    "\"Lamp\r\nwith CRLF\",Home|Lighting,₹300,₹450,33%,4.1,\"12,000\"\n",
+]
+
+class TestParallelIngestion(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "amazon.csv")
+        with open(self.path, "w", encoding="utf-8", newline="") as f:
+            f.write(HEADER + "".join(ROWS * 20))
+        self.expected = list(read_csv(self.path))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_ranges_cover_file_on_record_boundaries(self):
+        """Every tiny chunk size yields contiguous ranges that parse to whole records."""
+        size = os.path.getsize(self.path)
+        for chunk_bytes in (1, 7, 64, 500, size):
+            header, ranges = split_ranges(self.path, chunk_bytes)
+            self.assertEqual(header, HEADER.encode("utf-8"))
+            self.assertEqual(ranges[0][0], len(header))
+            self.assertEqual(ranges[-1][1], size)
+            for (_, end), (start, _) in zip(ranges, ranges[1:]):
+                self.assertEqual(end, start)
+            batches = [parse_range(self.path, header, start, end) for start, end in ranges]
+            self.assertEqual(list(iter_products(batches)), self.expected, chunk_bytes)
+
+    def test_parallel_batches_match_reference_loader(self):
+        """Ordered parallel ingestion returns exactly the rows read_csv yields."""
+        batches = list(read_csv_parallel(self.path, workers=2, chunk_bytes=200))
+        self.assertGreater(len(batches), 1)
+        self.assertTrue(all(isinstance(batch, ProductTable) for batch in batches))
+        self.assertEqual(list(iter_products(batches)), self.expected)
+        self.assertEqual(list(ProductTable.concat(batches)), self.expected)
+        self.assertIn("Mouse\nwith a \"quoted\"\nsecond line", [p.name for p in self.expected])
+
+    def test_unordered_mode_feeds_a_stream(self):
+        """Unordered batches contain the same rows and can feed a regular Stream."""
+        batches = read_csv_parallel(self.path, workers=2, ordered=False, chunk_bytes=300)
+        total = Stream(iter_products(batches)) \
+            .map(lambda p: p.discounted_price) \
+            .reduce(lambda acc, x: acc + x, 0.0)
+        self.assertEqual(total, sum(p.discounted_price for p in self.expected))
+
+    def test_missing_and_header_only_files(self):
+        """A missing file yields nothing; a header-only file has no ranges."""
+        self.assertEqual(list(read_csv_parallel(os.path.join(self.directory, "missing.csv"))), [])
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(HEADER)
+        self.assertEqual(split_ranges(self.path)[1], [])
+        self.assertEqual(list(read_csv_parallel(self.path, workers=1)), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import unittest
+import sys
+import os
+import io
+import threading
+from contextlib import redirect_stdout
+from unittest.mock import patch
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from sales_analysis.core import aggregations as agg
+from sales_analysis.core import parallel
+from sales_analysis.core.models import Product
+from sales_analysis.core.stream import Stream
+
+def discounted_price(product):
+    return product.discounted_price
+
+class TestParallelStream(unittest.TestCase):
+
+    def setUp(self):
+        base = [
+            Product("Laptop", "Electronics", 1000.0, 1500.0, 33.0, 4.5, 100),
+            Product("Mouse", "Electronics", 50.0, 100.0, 50.0, 4.0, 50),
+            Product("Shirt", "Clothing", 20.0, 40.0, 50.0, 3.5, 10),
+            Product("Pen", "Office", 5.0, 5.0, 0.0, 4.8, 500),
+        ]
+        self.raw_data = [
+            Product(f"{p.name}-{i % 7}", p.category, p.discounted_price + i, p.actual_price + i,
+                    p.discount_percentage, p.rating, p.rating_count)
+            for i in range(50) for p in base
+        ]
+
+    def parallel(self, backend):
+        return Stream(iter(self.raw_data)).parallel(workers=2, backend=backend, partition_size=16)
+
+    def test_reduce_with_lambdas_on_both_backends(self):
+        """map/filter/reduce with plain lambdas gives the sequential answer on both backends."""
+        expected = Stream(self.raw_data) \
+            .filter(lambda p: p.rating > 3.6) \
+            .map(lambda p: p.savings) \
+            .reduce(lambda acc, x: acc + x, 0.0)
+        for backend in ("process", "thread"):
+            total = self.parallel(backend) \
+                .filter(lambda p: p.rating > 3.6) \
+                .map(lambda p: p.savings) \
+                .reduce(lambda acc, x: acc + x, 0.0)
+            self.assertEqual(total, expected, backend)
+
+    def test_reduce_with_separate_combine(self):
+        """A reduce whose accumulator differs from its items needs an explicit combine."""
+        count = self.parallel("process").reduce(lambda acc, _: acc + 1, 0, combine=lambda a, b: a + b)
+        self.assertEqual(count, len(self.raw_data))
+        prices = self.parallel("thread").map(discounted_price).reduce(max, 0.0)
+        self.assertEqual(prices, max(p.discounted_price for p in self.raw_data))
+
+    def test_group_by_matches_sequential(self):
+        """Grouped lists keep source order; aggregator states merge across partitions."""
+        expected = Stream(self.raw_data).group_by(lambda p: p.category)
+        self.assertEqual(self.parallel("process").group_by(lambda p: p.category), expected)
+
+        spec = {'n': agg.count(), 'avg': agg.mean('rating'), 'var': agg.variance('discounted_price')}
+        expected = Stream(self.raw_data).group_by(lambda p: p.category, agg=spec)
+        actual = self.parallel("process").group_by(lambda p: p.category, agg=spec)
+        self.assertEqual(list(actual), list(expected))
+        for key, stats in expected.items():
+            for name, value in stats.items():
+                self.assertAlmostEqual(actual[key][name], value)
+
+        # A custom combine merges the per-partition lists, e.g. capping each group's size
+        capped = self.parallel("thread").group_by(
+            lambda p: p.category, combine=lambda left, right: (left + right)[:5])
+        self.assertEqual({key: len(items) for key, items in capped.items()},
+                         {"Electronics": 5, "Clothing": 5, "Office": 5})
+
+    def test_distinct_and_collect_preserve_order(self):
+        """distinct keeps the first occurrence across partitions and returns a Stream."""
+        expected = Stream(self.raw_data).distinct(lambda p: p.name).collect()
+        result = self.parallel("process").distinct(lambda p: p.name)
+        self.assertIsInstance(result, Stream)
+        self.assertEqual(result.collect(), expected)
+        self.assertEqual(self.parallel("thread").map(lambda p: p.name).collect(),
+                         [p.name for p in self.raw_data])
+        self.assertEqual(Stream([]).parallel(workers=2).collect(), [])
+
+    def test_no_fork_while_other_threads_run(self):
+        """With another thread alive (or on macOS), workers are spawned, or lambdas run serially."""
+        with patch.object(parallel.sys, 'platform', 'darwin'):
+            self.assertIsNone(parallel._fork_context())
+        expected = sum(p.discounted_price for p in self.raw_data)
+        stop = threading.Event()
+        thread = threading.Thread(target=stop.wait)
+        thread.start()
+        try:
+            self.assertIsNone(parallel._fork_context())
+            with patch.object(parallel.ProcessPoolExecutor, 'submit', autospec=True,
+                              side_effect=AssertionError("forked")), \
+                    redirect_stdout(io.StringIO()) as output:
+                total = self.parallel("process").map(lambda p: p.discounted_price) \
+                    .reduce(lambda acc, x: acc + x, 0.0)
+            self.assertAlmostEqual(total, expected)
+            self.assertIn("running the partitions serially", output.getvalue())
+
+            with patch.object(parallel.multiprocessing, 'get_context',
+                              wraps=parallel.multiprocessing.get_context) as get_context:
+                total = self.parallel("process").map(discounted_price).reduce(max, 0.0)
+            get_context.assert_called_once_with('spawn')
+            self.assertEqual(total, max(p.discounted_price for p in self.raw_data))
+        finally:
+            stop.set()
+            thread.join()
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            Stream(self.raw_data).parallel(backend="gpu")
+
+if __name__ == '__main__':
+    unittest.main()
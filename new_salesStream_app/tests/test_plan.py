@@ -0,0 +1,119 @@
+import io
+import unittest
+import sys
+import os
+from contextlib import redirect_stdout
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from sales_analysis.core import plan
+from sales_analysis.core.stream import Stream
+from sales_analysis.core.models import Product
+
+
+def by_rating(p):
+    return p.rating
+
+
+class TestOptimizer(unittest.TestCase):
+
+    def kinds(self, ops):
+        return [type(op).__name__ for op in ops]
+
+    def test_adjacent_filters_merge(self):
+        """Consecutive filters become one Filter with all predicates, in order."""
+        first, second = (lambda p: True), (lambda p: False)
+        ops = plan.optimize([plan.Filter(first), plan.Filter(second)])
+        self.assertEqual(self.kinds(ops), ['Filter'])
+        self.assertEqual(ops[0].predicates, (first, second))
+
+    def test_filter_moves_before_sorted(self):
+        """A filter after sorted() is applied before the sort."""
+        ops = plan.optimize([plan.Sorted(by_rating), plan.Filter(bool)])
+        self.assertEqual(self.kinds(ops), ['Filter', 'Sorted'])
+
+    def test_sorted_limit_becomes_top_k(self):
+        """sorted + limit, and sorted + distinct + limit, are rewritten to top_k."""
+        ops = plan.optimize([plan.Sorted(by_rating, True), plan.Limit(3)])
+        self.assertEqual(self.kinds(ops), ['TopK'])
+        self.assertEqual((ops[0].k, ops[0].reverse, ops[0].distinct_key), (3, True, None))
+
+        ops = plan.optimize([plan.Sorted(by_rating), plan.Distinct(str), plan.Limit(2), plan.Limit(5)])
+        self.assertEqual(self.kinds(ops), ['TopK'])
+        self.assertEqual((ops[0].k, ops[0].distinct_key), (2, str))
+
+    def test_map_filter_order_is_kept(self):
+        """Opaque maps are never reordered with the filters around them."""
+        ops = plan.optimize([plan.Map(str), plan.Filter(bool)])
+        self.assertEqual(self.kinds(ops), ['Map', 'Filter'])
+
+    def test_segments_split_at_barriers(self):
+        """Streaming operators are grouped into one segment per barrier."""
+        ops = [plan.Map(str), plan.TopK(2), plan.Filter(bool)]
+        shape = [(self.kinds(streaming), type(barrier).__name__) for streaming, barrier in plan.segments(ops)]
+        self.assertEqual(shape, [(['Map'], 'TopK'), (['Filter'], 'NoneType')])
+
+    def test_fused_code_is_a_single_loop(self):
+        """The generated code has exactly one 'for' loop whatever the chain length."""
+        ops = [plan.Map(str), plan.Filter(bool, bool), plan.Distinct(len), plan.Limit(3)]
+        code = plan.generated_source(ops, 'collect')
+        self.assertEqual(code.count("for item in source"), 1)
+        self.assertEqual(plan.fuse(ops, 'collect')([1, 22, 3, 44, 555, 6666]), ['1', '22', '555'])
+
+
+class TestPlannedStream(unittest.TestCase):
+
+    def setUp(self):
+        self.raw_data = [
+            Product("Laptop", "Electronics", 1000.0, 1500.0, 33.0, 4.5, 100),
+            Product("Laptop", "Electronics", 1000.0, 1500.0, 33.0, 4.5, 100),
+            Product("Mouse", "Electronics", 50.0, 100.0, 50.0, 4.0, 50),
+            Product("Shirt", "Clothing", 20.0, 40.0, 50.0, 3.5, 10),
+            Product("Pen", "Office", 5.0, 5.0, 0.0, 4.8, 500),
+        ]
+
+    def test_sorted_distinct_limit_matches_slicing(self):
+        """The top_k rewrite returns exactly what sort + dedup + slice would."""
+        result = Stream(self.raw_data) \
+            .sorted(key=lambda p: p.discount_percentage, reverse=True) \
+            .distinct(lambda p: p.name) \
+            .limit(2) \
+            .collect()
+        self.assertEqual([p.name for p in result], ["Mouse", "Shirt"])
+
+    def test_limit_stops_reading_the_source(self):
+        """limit() breaks out of the fused loop instead of draining the source."""
+        consumed = []
+        def source():
+            for product in self.raw_data:
+                consumed.append(product)
+                yield product
+        result = Stream(source()).map(lambda p: p.name).limit(2).collect()
+        self.assertEqual(result, ["Laptop", "Laptop"])
+        self.assertEqual(len(consumed), 2)
+
+    def test_stream_is_reusable_over_a_list(self):
+        """Streams are plans: running one twice over a list gives the same answer."""
+        names = Stream(self.raw_data).filter(lambda p: p.rating > 4.0).map(lambda p: p.name)
+        self.assertEqual(names.collect(), names.collect())
+        self.assertEqual(list(names), ["Laptop", "Laptop", "Pen"])
+
+    def test_explain_shows_the_optimized_plan(self):
+        """explain() prints one line per fused loop and names the barrier."""
+        pipeline = Stream(self.raw_data) \
+            .filter(lambda p: p.rating > 4.0) \
+            .sorted(key=by_rating) \
+            .filter(lambda p: p.rating_count > 10) \
+            .limit(1)
+        with redirect_stdout(io.StringIO()) as output:
+            text = pipeline.explain()
+        self.assertEqual(output.getvalue().strip(), text)
+        self.assertIn("[1] fused loop: filter(lambda@test_plan.py", text)
+        self.assertIn(" and lambda@test_plan.py", text)
+        self.assertIn("barrier: top_k(1, key=by_rating, reverse=False)", text)
+        self.assertIn("[2] fused loop: pass-through", text)
+        self.assertEqual([p.name for p in pipeline.collect()], ["Laptop"])
+
+
+if __name__ == '__main__':
+    unittest.main()
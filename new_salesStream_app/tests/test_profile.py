@@ -0,0 +1,145 @@
+import io
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+import sys
+import os
+from contextlib import redirect_stdout
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from sales_analysis.core import profile
+from sales_analysis.core.expressions import col
+from sales_analysis.core.models import Product
+from sales_analysis.core.profile import OpenTelemetryHook, ProfileHook, Profiler
+from sales_analysis.core.stream import Stream
+from sales_analysis.ingestion.loader import CsvSource
+
+PRODUCTS = [Product(f"P{i}", "Electronics" if i % 2 else "Office", float(i), float(i + 5),
+                    float(i % 7), (i % 5) + 0.5, i * 10) for i in range(200)]
+
+CSV_DATA = (
+    "product_name,category,discounted_price,actual_price,discount_percentage,rating,rating_count\n"
+    "Laptop,Electronics|Computers,\"₹1,000\",\"₹1,500\",33%,4.5,\"1,100\"\n"
+    "\"Mouse, wireless\",Electronics|Accessories,₹50,₹100,50%,4.0|12,50\n"
+    "Shirt,Clothing|Men,₹20,₹40,50%,4.7,2000\n"
+    "Pen,Office,₹5,₹5,0%,,\n"
+)
+
+
+class Recorder(ProfileHook):
+    def __init__(self):
+        self.events = []
+
+    def on_start(self, span):
+        self.events.append(("start", span.name))
+
+    def on_end(self, span):
+        self.events.append(("end", span.name))
+
+
+class FakeTracer:
+    # The parts of the OpenTelemetry tracer API the hook uses.
+    def __init__(self):
+        self.spans = []
+
+    def start_span(self, name, context=None):
+        span = {"name": name, "attributes": {}, "ended": False}
+        span["set_attribute"] = lambda key, value: span["attributes"].__setitem__(key, value)
+        span["end"] = lambda: span.__setitem__("ended", True)
+        self.spans.append(span)
+        return type("Span", (), {"set_attribute": staticmethod(span["set_attribute"]),
+                                 "end": staticmethod(span["end"])})()
+
+
+class TestProfiling(unittest.TestCase):
+
+    def pipeline(self, stream):
+        return stream.filter(lambda p: p.rating > 2).map(lambda p: p.rating_count) \
+            .sorted(reverse=True).limit(5)
+
+    def test_rows_and_times_per_stage(self):
+        """Each stage reports rows in/out; the stages' own times add up to the run's."""
+        profiler = Profiler(report=None)
+        result = self.pipeline(Stream(PRODUCTS, profile=profiler)).collect()
+        self.assertEqual(result, self.pipeline(Stream(PRODUCTS)).collect())
+
+        root = profiler.last
+        rows = [(span.kind, span.rows_in, span.rows_out) for span in root.children]
+        self.assertEqual(rows, [('source', None, 200), ('operator', 200, 120),
+                                ('operator', 120, 120), ('operator', 120, 5), ('sink', 5, 0)])
+        self.assertEqual(root.children[3].name, "top_k(5, key=None, reverse=True)")
+        self.assertEqual(sum(span.self_wall_ns for span in root.children), root.wall_ns)
+        self.assertTrue(all(span.self_wall_ns >= 0 for span in root.children))
+        # The top_k stage holds a heap; memory is tracked per stage.
+        self.assertGreater(root.children[3].peak_bytes, 0)
+
+    def test_memory_without_reset_peak(self):
+        """Before Python 3.9 (no tracemalloc.reset_peak) stage peaks still get measured."""
+        profiler = Profiler(report=None)
+        with patch.object(profile, '_RESET_PEAK', None):
+            result = self.pipeline(Stream(PRODUCTS, profile=profiler)).collect()
+        self.assertEqual(result, self.pipeline(Stream(PRODUCTS)).collect())
+        self.assertGreater(profiler.last.children[3].peak_bytes, 0)
+        self.assertTrue(all(span.peak_bytes >= 0 for span in profiler.last.children
+                            if span.peak_bytes is not None))
+
+    def test_report_is_printed_after_each_terminal(self):
+        """profile=True prints a per-stage breakdown after every terminal operation."""
+        stream = Stream(PRODUCTS, profile=True).filter(col('rating') > 4)
+        output = io.StringIO()
+        with redirect_stdout(output):
+            total = stream.map(lambda p: p.discounted_price).reduce(lambda acc, x: acc + x, 0.0)
+            groups = stream.group_by(lambda p: p.category)
+        self.assertEqual(total, sum(p.discounted_price for p in PRODUCTS if p.rating > 4))
+        self.assertEqual(sum(map(len, groups.values())), 40)
+        text = output.getvalue()
+        self.assertEqual(text.count("Profile of"), 2)
+        self.assertIn("Profile of reduce()", text)
+        self.assertIn("source: list", text)
+        self.assertIn("consumer", text)
+
+    def test_csv_parsing_is_measured_apart_from_cleaning(self):
+        """A CsvSource reports csv parsing and cleaning (with pushed filters) as details."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "amazon.csv")
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            f.write(CSV_DATA)
+        profiler = Profiler(report=None, memory=False)
+        names = Stream(CsvSource(path), profile=profiler).filter(col('rating') > 4.2) \
+            .map(lambda p: p.name).collect()
+        self.assertEqual(names, ["Laptop", "Shirt"])
+        source = profiler.last.children[0]
+        self.assertEqual(source.name, f"source: CsvSource({path!r})")
+        self.assertEqual([(span.name, span.rows_in, span.rows_out) for span in source.children],
+                         [("csv parsing", None, 4), ("cleaning and scan filters", 4, 2)])
+        self.assertEqual((source.rows_in, source.rows_out), (4, 2))
+        self.assertIsNone(source.peak_bytes)
+
+    def test_hooks_receive_spans(self):
+        """Hooks see every span start before the run and end after it, children first."""
+        recorder = Recorder()
+        ended = []
+        tracer = FakeTracer()
+        profiler = Profiler(hooks=[recorder, ended.append, OpenTelemetryHook(tracer)], report=None)
+        Stream(PRODUCTS, profile=profiler).filter(lambda p: p.rating > 4).collect()
+        names = [span.name for span in profiler.last.walk()]
+        self.assertEqual(recorder.events, [("start", name) for name in names] +
+                         [("end", name) for name in reversed(names)])
+        self.assertEqual([span.name for span in ended], list(reversed(names)))
+        self.assertEqual([span["name"] for span in tracer.spans], names)
+        self.assertTrue(all(span["ended"] for span in tracer.spans))
+        self.assertEqual(tracer.spans[2]["attributes"]["stream.rows_out"], 40)
+        self.assertEqual(tracer.spans[2]["attributes"]["stream.rows_in"], 200)
+
+    def test_disabled_profiling_uses_fused_loops(self):
+        """Without profile, terminal operations never enter the profiler."""
+        with patch.object(profile, "run_profiled") as profiled:
+            self.assertEqual(len(self.pipeline(Stream(PRODUCTS)).collect()), 5)
+            profiled.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
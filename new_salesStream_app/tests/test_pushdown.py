@@ -0,0 +1,140 @@
+import dis
+import io
+import unittest
+import tempfile
+import sys
+import os
+from contextlib import redirect_stdout
+from unittest.mock import patch
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from sales_analysis.core import aggregations as agg
+from sales_analysis.core.expressions import col
+from sales_analysis.core.models import Product
+from sales_analysis.core.plan import referenced_fields
+from sales_analysis.core.stream import Stream
+from sales_analysis.ingestion.loader import CsvSource, read_csv, scan_csv
+
+CSV_DATA = (
+    "product_id,product_name,category,discounted_price,actual_price,discount_percentage,rating,rating_count\n"
+    "1,Laptop,Electronics|Computers,\"₹1,000\",\"₹1,500\",33%,4.5,\"1,100\"\n"
+    "2,Laptop,Electronics|Computers,\"₹1,000\",\"₹1,500\",33%,4.5,\"1,100\"\n"
+    "3,\"Mouse, wireless\",Electronics|Accessories,₹50,₹100,50%,4.0|12,50\n"
+    "4,Shirt,Clothing|Men,₹20,₹40,50%,4.7,2000\n"
+    "\n"
+    "5,Pen,Office,₹5,₹5,0%,,\n"
+    "6,\"Multi\nline\",Office|Writing,junk,₹10,abc%,4.9,\"3,000\"\n"
+)
+
+def helper(product):
+    return product.rating
+
+class TestFieldAnalysis(unittest.TestCase):
+
+    def test_attribute_reads_are_found(self):
+        """Fields read from the argument are reported; 'savings' expands to both prices."""
+        self.assertEqual(referenced_fields(lambda p: p.rating > 4 and p.name.startswith("A")),
+                         {'rating', 'name'})
+        self.assertEqual(referenced_fields(lambda p: p.savings), {'actual_price', 'discounted_price'})
+        self.assertEqual(referenced_fields(lambda acc, p: acc + p.rating_count, 1), {'rating_count'})
+        self.assertEqual(referenced_fields('discount_percentage'), {'discount_percentage'})
+        self.assertEqual(referenced_fields(col('rating') > 1), {'rating'})
+        self.assertEqual(referenced_fields(None), set())
+
+    def test_escaping_or_opaque_callables_need_every_field(self):
+        """If the Product itself leaves the function (or cannot be inspected), return None."""
+        self.assertIsNone(referenced_fields(lambda p: p))
+        self.assertIsNone(referenced_fields(lambda p: helper(p)))
+        self.assertIsNone(referenced_fields(lambda p: [q.rating for q in [p]]))
+        self.assertIsNone(referenced_fields(lambda p: p.unknown_attribute))
+        self.assertIsNone(referenced_fields(str))
+        self.assertIsNone(referenced_fields('not_a_field'))
+
+    def test_unknown_loads_need_every_field(self):
+        """Loads other than LOAD_FAST + LOAD_ATTR (e.g. 3.13's LOAD_FAST_LOAD_FAST) mean all fields."""
+        func = lambda acc, p: acc + (1 if p.rating_count else 0)
+        instructions = list(dis.get_instructions(func))
+        first = next(i for i, instruction in enumerate(instructions) if instruction.argval == 'acc')
+        fused = instructions[first]._replace(opname='LOAD_FAST_LOAD_FAST', argval=('acc', 'p'))
+        rewritten = instructions[:first] + [fused] + instructions[first + 2:]
+        with patch('sales_analysis.core.plan.dis.get_instructions', return_value=rewritten):
+            self.assertIsNone(referenced_fields(func, 1))
+        borrowed = [instruction._replace(opname='LOAD_FAST_BORROW') if instruction.argval == 'p' else instruction
+                    for instruction in instructions]
+        with patch('sales_analysis.core.plan.dis.get_instructions', return_value=borrowed):
+            self.assertEqual(referenced_fields(func, 1), {'rating_count'})
+
+
+class TestPushdown(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        handle, cls.path = tempfile.mkstemp(suffix=".csv")
+        with os.fdopen(handle, "w", encoding="utf-8", newline="") as f:
+            f.write(CSV_DATA)
+
+    @classmethod
+    def tearDownClass(cls):
+        os.remove(cls.path)
+
+    def both(self, build):
+        # Runs the same pipeline over read_csv and over a pushdown-capable CsvSource.
+        return build(Stream(read_csv(self.path))), build(Stream(CsvSource(self.path)))
+
+    def test_full_scan_matches_read_csv(self):
+        """Without projection or filters, scan_csv yields exactly what read_csv yields."""
+        self.assertEqual(list(scan_csv(self.path)), list(read_csv(self.path)))
+        self.assertEqual(list(CsvSource(self.path)), list(read_csv(self.path)))
+
+    def test_projection_leaves_other_fields_empty(self):
+        """Unrequested fields are not parsed at all."""
+        products = list(scan_csv(self.path, fields={'rating'}))
+        self.assertEqual([p.rating for p in products], [4.5, 4.5, 4.0, 4.7, 0.0, 4.9])
+        self.assertTrue(all(p.name is None and p.discounted_price is None for p in products))
+
+    def test_pipelines_give_the_same_results(self):
+        """Projected and filtered scans do not change any pipeline's result."""
+        pipelines = [
+            lambda s: s.map(lambda p: p.discounted_price).reduce(lambda acc, x: acc + x, 0.0),
+            lambda s: s.reduce(lambda acc, p: acc + p.savings, 0.0),
+            lambda s: s.group_by(lambda p: p.category, agg={'avg': agg.mean('rating'), 'n': agg.count()}),
+            lambda s: s.filter((col('rating') > 4.5) & (col('rating_count') > 1000))
+                       .top_k(2, key=lambda p: p.rating_count, reverse=True).collect(),
+            lambda s: s.filter(col('discount_percentage') > 0).filter(lambda p: p.rating >= 4.5)
+                       .map(lambda p: p.name).collect(),
+            lambda s: s.filter(~(col('rating') < 4.6) | (col('savings') > 100)).collect(),
+        ]
+        for build in pipelines:
+            expected, actual = self.both(build)
+            self.assertEqual(actual, expected)
+
+    def test_rejected_rows_never_build_products(self):
+        """Pushed-down comparisons are checked before a Product is allocated."""
+        with patch('sales_analysis.ingestion.loader.Product', wraps=Product) as product:
+            names = Stream(CsvSource(self.path)) \
+                .filter((col('rating') > 4.5) & (col('rating_count') > 1000)) \
+                .map(lambda p: p.name) \
+                .collect()
+        self.assertEqual(names, ["Shirt", "Multi\nline"])
+        self.assertEqual(product.call_count, 2)
+
+    def test_explain_shows_the_pushdown(self):
+        """explain() lists the scanned fields and the filter handed to the loader."""
+        pipeline = Stream(CsvSource(self.path)) \
+            .filter(col('rating') > 4.5) \
+            .map(lambda p: p.name)
+        with redirect_stdout(io.StringIO()):
+            text = pipeline.explain()
+        self.assertIn("scan fields: name", text)
+        self.assertIn("scan filter: (col('rating') > 4.5)", text)
+
+    def test_missing_file(self):
+        """A missing file reports the error and yields nothing, like read_csv."""
+        with redirect_stdout(io.StringIO()) as output:
+            self.assertEqual(list(scan_csv("non_existent.csv")), [])
+        self.assertIn("CRITICAL ERROR", output.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from sales_analysis.core.scan import SharedScan
+from sales_analysis.core.models import Product
+
+class TestSharedScan(unittest.TestCase):
+
+    def setUp(self):
+        self.raw_data = [
+            Product("Laptop", "Electronics", 1000.0, 1500.0, 33.0, 4.5, 100),
+            Product("Mouse", "Electronics", 50.0, 100.0, 50.0, 4.0, 50),
+            Product("Shirt", "Clothing", 20.0, 40.0, 50.0, 3.5, 10),
+            Product("Pen", "Office", 5.0, 5.0, 0.0, 4.8, 500),
+        ]
+
+    def test_all_pipelines_share_one_pass(self):
+        """Every registered pipeline sees the full source while it is iterated only once."""
+        reads = []
+
+        def source():
+            for product in self.raw_data:
+                reads.append(product)
+                yield product
+
+        scan = SharedScan(source(), batch_size=3)
+        revenue = scan.register(lambda s: s.map(lambda p: p.discounted_price).reduce(lambda a, x: a + x, 0.0))
+        names = scan.register(lambda s: s.filter(lambda p: p.rating > 4.2).map(lambda p: p.name).collect())
+        groups = scan.register(lambda s: s.group_by(lambda p: p.category))
+
+        results = scan.run()
+
+        self.assertEqual(len(reads), 4)
+        self.assertEqual(revenue.result(), 1075.0)
+        self.assertEqual(names.result(), ["Laptop", "Pen"])
+        self.assertEqual(len(groups.result()["Electronics"]), 2)
+        self.assertEqual(results[0], revenue.result())
+
+    def test_early_exit_and_errors_do_not_block_the_scan(self):
+        """A pipeline that stops early or raises must not stall the other pipelines."""
+        scan = SharedScan(iter(self.raw_data * 100), batch_size=1, buffer_size=1)
+        first = scan.register(lambda s: next(iter(s.source)))
+        broken = scan.register(lambda s: s.map(lambda p: 1 / 0).collect())
+        count = scan.register(lambda s: s.reduce(lambda acc, _: acc + 1, 0))
+
+        with self.assertRaises(ZeroDivisionError):
+            scan.run()
+
+        self.assertEqual(first.result().name, "Laptop")
+        self.assertEqual(count.result(), 400)
+        with self.assertRaises(ZeroDivisionError):
+            broken.result()
+
+    def test_scan_is_single_use(self):
+        """Results are unavailable before run() and the scan cannot be replayed."""
+        scan = SharedScan(iter(self.raw_data))
+        branch = scan.register(lambda s: s.collect())
+        with self.assertRaises(RuntimeError):
+            branch.result()
+        scan.run()
+        with self.assertRaises(RuntimeError):
+            scan.run()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -76,6 +76,38 @@ class TestStreamProcessor(unittest.TestCase):
         self.assertEqual(cheapest_first[0].name, "Pen")
         self.assertEqual(cheapest_first[-1].name, "Laptop")
 
+    def test_top_k(self):
+        """Top-K returns the same rows as sorted -> distinct -> slice, in the same order."""
+        expected = self.stream \
+            .sorted(key=lambda p: p.discount_percentage, reverse=True) \
+            .distinct(lambda p: p.name) \
+            .collect()[:2]
+        top = Stream(self.raw_data) \
+            .top_k(2, key=lambda p: p.discount_percentage, reverse=True, distinct_key=lambda p: p.name) \
+            .collect()
+        self.assertEqual(top, expected)
+        # Mouse and Shirt tie on 50%: the earlier item (Mouse) wins, as with a stable sort
+        self.assertEqual([p.name for p in top], ["Mouse", "Shirt"])
+
+    def test_top_k_ascending_and_edge_cases(self):
+        """Ascending order, k larger than the stream, and k <= 0."""
+        cheapest = Stream(self.raw_data).top_k(2, key=lambda p: p.discounted_price).collect()
+        self.assertEqual([p.name for p in cheapest], ["Pen", "Shirt"])
+        self.assertEqual(len(Stream(self.raw_data).top_k(10, key=lambda p: p.rating).collect()), 5)
+        self.assertEqual(Stream(self.raw_data).top_k(0, key=lambda p: p.rating).collect(), [])
+
+    def test_top_k_replaces_worse_duplicate(self):
+        """A later, better item for an already-held key replaces the earlier one."""
+        data = [
+            Product("A", "X", 1.0, 1.0, 10.0, 1.0, 1),
+            Product("B", "X", 1.0, 1.0, 20.0, 1.0, 1),
+            Product("A", "X", 1.0, 1.0, 90.0, 1.0, 1),
+            Product("C", "X", 1.0, 1.0, 5.0, 1.0, 1),
+        ]
+        top = Stream(iter(data)).top_k(2, key=lambda p: p.discount_percentage, reverse=True,
+                                       distinct_key=lambda p: p.name).collect()
+        self.assertEqual([(p.name, p.discount_percentage) for p in top], [("A", 90.0), ("B", 20.0)])
+
     def test_group_by(self):
         """Test grouping aggregation."""
         groups = self.stream.group_by(lambda p: p.category)
@@ -0,0 +1,161 @@
+import asyncio
+import io
+import unittest
+import tempfile
+import sys
+import os
+from contextlib import redirect_stdout
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from sales_analysis.app import follow
+from sales_analysis.core import aggregations as agg
+from sales_analysis.core.async_stream import AsyncStream
+from sales_analysis.core.models import Product
+from sales_analysis.core.stream import Stream
+from sales_analysis.core.windows import (
+    WindowedAggregation, WindowResult, counting, running, sliding, tumbling, windowed
+)
+
+CATEGORIES = ["Electronics", "Clothing", "Office"]
+
+def products(count):
+    return [Product(f"P{i % 7}", CATEGORIES[i % 3], float(i), float(i + 10), float(i % 40),
+                    (i % 5) + 0.5, i * 3) for i in range(count)]
+
+class FakeClock:
+    def __init__(self):
+        self.time = 0.0
+
+    def __call__(self):
+        return self.time
+
+
+class TestWindows(unittest.TestCase):
+
+    def test_tumbling_count_windows_match_batches(self):
+        """Each count window equals a batch reduce/group_by over the same items."""
+        data = products(25)
+        spec = {'revenue': agg.sum('discounted_price'), 'n': agg.count()}
+        results = list(Stream(data).window(counting(10), spec))
+        self.assertEqual([(r.start, r.end) for r in results], [(0, 10), (10, 20), (20, 25)])
+        for result in results:
+            batch = Stream(data[result.start:result.end])
+            self.assertEqual(result.values['revenue'], batch.reduce(lambda acc, p: acc + p.discounted_price, 0.0))
+            self.assertEqual(result.values['n'], result.end - result.start)
+            self.assertTrue(result.final)
+
+        grouped = list(Stream(data).window(counting(10), {'avg': agg.mean('rating')}, key=lambda p: p.category))
+        expected = Stream(data[:10]).group_by(lambda p: p.category, agg={'avg': agg.mean('rating')})
+        self.assertEqual(grouped[0].values, expected)
+
+    def test_sliding_count_windows_match_brute_force(self):
+        """A sliding window of 6 items every 2 equals recomputing the last 6 items."""
+        data = products(17)
+        results = list(windowed(data, counting(6, 2), {'avg': agg.mean('rating')}, key=lambda p: p.category))
+        self.assertEqual(len(results), 9)
+        for result in results:
+            expected = Stream(data[result.start:result.end]).group_by(
+                lambda p: p.category, agg={'avg': agg.mean('rating')})
+            self.assertEqual(result.values, expected)
+            self.assertLessEqual(result.end - result.start, 6)
+
+    def test_event_time_windows_and_late_events(self):
+        """Event-time windows close when a later event arrives; too-late events are dropped."""
+        events = [(0, 1), (4, 2), (12, 3), (3, 100), (27, 4), (1, 1000)]
+        state = WindowedAggregation(sliding(10, 5, time=lambda e: e[0]), {'s': agg.sum(lambda e: e[1])})
+        results = []
+        for event in events:
+            results += state.add(event)
+        results += state.flush()
+        self.assertEqual([(r.start, r.end, r.values['s']) for r in results], [
+            (-5, 5, 3.0), (0, 10, 3.0), (5, 15, 3.0), (10, 20, 3.0), (20, 30, 4.0), (25, 35, 4.0)])
+        # [15, 25) holds no event and is skipped. (3, 100) and (1, 1000) arrive after every
+        # window covering them has closed.
+        self.assertEqual(state.late, 2)
+
+    def test_processing_time_windows_close_without_items(self):
+        """advance() closes processing-time windows while the feed is quiet."""
+        now = FakeClock()
+        state = WindowedAggregation(tumbling(10), {'n': agg.count()}, now=now)
+        now.time = 1.0
+        self.assertEqual(state.add("a") + state.add("b"), [])
+        now.time = 9.0
+        self.assertEqual(state.advance(), [])
+        now.time = 10.5
+        self.assertEqual(state.advance(), [WindowResult(0, 10, {'n': 2}, True)])
+        self.assertEqual(state.flush(), [])
+
+    def test_early_triggers_and_running_top_k(self):
+        """every=N emits partial results of the open window; running() never closes."""
+        data = products(9)
+        spec = {'top': agg.top_k(2, key=lambda p: p.discount_percentage, reverse=True,
+                                 distinct_key=lambda p: p.name)}
+        results = list(Stream(data).window(running(), spec, every=4))
+        self.assertEqual([r.final for r in results], [False, False, True])
+        self.assertEqual(results[-1].values['top'],
+                         Stream(data).top_k(2, key=lambda p: p.discount_percentage, reverse=True,
+                                            distinct_key=lambda p: p.name).collect())
+
+        now = FakeClock()
+        state = WindowedAggregation(tumbling(100), {'n': agg.count()}, interval=5, now=now)
+        state.add("a")
+        now.time = 6.0
+        self.assertEqual(state.advance(), [WindowResult(0, 100, {'n': 1}, False)])
+
+    def test_state_stays_bounded(self):
+        """Only the panes of open windows are kept, however long the stream runs."""
+        state = WindowedAggregation(counting(50, 10), {'n': agg.count()}, key=lambda p: p.category)
+        for product in products(5000):
+            state.add(product)
+            self.assertLessEqual(len(state.panes), 5)
+
+    def test_invalid_windows(self):
+        with self.assertRaises(ValueError):
+            sliding(10, 3)
+        with self.assertRaises(ValueError):
+            counting(0)
+
+
+class TestLiveWindows(unittest.IsolatedAsyncioTestCase):
+
+    async def test_async_window_ticks_on_a_quiet_feed(self):
+        """A processing-time window is emitted even if no further item arrives."""
+        gate = asyncio.Event()
+
+        async def feed():
+            yield 1
+            yield 2
+            await gate.wait()
+
+        windows = AsyncStream(feed()).window(tumbling(0.05), {'s': agg.sum()}).__aiter__()
+        first = await asyncio.wait_for(windows.__anext__(), timeout=1)
+        self.assertEqual(first.values, {'s': 3.0})
+        gate.set()
+        self.assertEqual([w async for w in windows], [])
+
+    async def test_follow_reports_windows(self):
+        """The live report prints revenue, ratings and leaders per window."""
+        handle, path = tempfile.mkstemp(suffix=".csv")
+        with os.fdopen(handle, "w", encoding="utf-8", newline="") as f:
+            f.write("product_name,category,discounted_price,actual_price,discount_percentage,rating,rating_count\n")
+            for i in range(5):
+                f.write(f"Item {i},Office|Pens,₹{10 + i},₹20,{50 - i}%,4.{6 + i % 3},{2000 + i}\n")
+        try:
+            stop = asyncio.Event()
+            stop.set()
+            with redirect_stdout(io.StringIO()) as output:
+                await follow(path, window=2, stop=stop)
+        finally:
+            os.remove(path)
+        text = output.getvalue()
+        self.assertIn("[REVENUE] sales 0-2", text)
+        self.assertIn("Revenue: ₹21.00", text)
+        self.assertIn("[REVENUE] sales 4-5", text)
+        self.assertIn("Office", text)
+        self.assertIn("[LEADERS] running (partial)", text)
+        self.assertIn("50.0% off: Item 0", text)
+
+
+if __name__ == '__main__':
+    unittest.main()
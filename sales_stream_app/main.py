@@ -70,16 +70,16 @@ def main():
 
     # ---------------------------------------------------------
     # ANALYSIS 3: TOP 5 MOST DISCOUNTED PRODUCTS
-    # Demonstrates: Filter, Sort, DISTINCT (New!), Map, Slicing
+    # Demonstrates: Filter, bounded Top-K with DISTINCT, Map
     # ---------------------------------------------------------
     print("\n[3] TOP 5 MOST DISCOUNTED PRODUCTS")
     
     top_discounts = get_stream() \
         .filter(lambda p: p.discount_percentage > 0) \
-        .sorted(key=lambda p: p.discount_percentage, reverse=True) \
-        .distinct(lambda p: p.name) \
+        .top_k(5, key=lambda p: p.discount_percentage, reverse=True,
+               distinct_key=lambda p: p.name) \
         .map(lambda p: f"{p.discount_percentage}% off: {p.name[:50]}...") \
-        .collect()[:5]  # Materialize and slice the top 5
+        .collect()
     
     for item in top_discounts:
         print(f"   > {item}")
@@ -93,9 +93,9 @@ def main():
     
     verified_hits = get_stream() \
         .filter(lambda p: p.rating > 4.5 and p.rating_count > 1000) \
-        .sorted(key=lambda p: p.rating_count, reverse=True) \
-        .distinct(lambda p: p.name) \
-        .collect()[:5]
+        .top_k(5, key=lambda p: p.rating_count, reverse=True,
+               distinct_key=lambda p: p.name) \
+        .collect()
 
     if not verified_hits:
         print("   > No products matched criteria (Check CSV parsing)")
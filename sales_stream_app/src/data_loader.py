@@ -1,4 +1,5 @@
 import csv
+import sys
 from models import Product
 from utils import clean_currency, clean_percentage, clean_rating, clean_count
 
@@ -17,7 +18,8 @@ def csv_reader(file_path):
                 yield Product(
                     name=row.get('product_name', 'Unknown'),
                     # Categories often look like "Electronics|Cables|..." -> We take "Electronics"
-                    category=row.get('category', 'Others').split('|')[0],
+                    # Interned, so all products of a category share one string object.
+                    category=sys.intern(row.get('category', 'Others').split('|')[0]),
                     discounted_price=clean_currency(row.get('discounted_price')),
                     actual_price=clean_currency(row.get('actual_price')),
                     discount_percentage=clean_percentage(row.get('discount_percentage')),
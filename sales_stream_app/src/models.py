@@ -5,7 +5,12 @@ class Product:
     """
     Immutable representation of a Product.
     Attributes match the business domain.
+    Uses __slots__ instead of a per-instance __dict__ to keep large
+    in-memory collections of products compact.
     """
+    __slots__ = ('name', 'category', 'discounted_price', 'actual_price',
+                 'discount_percentage', 'rating', 'rating_count')
+
     name: str
     category: str
     discounted_price: float
@@ -20,4 +25,11 @@ class Product:
         Calculates the absolute money saved.
         Logic: Actual Price - Discounted Price
         """
-        return self.actual_price - self.discounted_price
\ No newline at end of file
+        return self.actual_price - self.discounted_price
+
+    def __reduce__(self):
+        """
+        Pickle support: frozen slotted instances are rebuilt through the constructor.
+        """
+        return (Product, (self.name, self.category, self.discounted_price, self.actual_price,
+                          self.discount_percentage, self.rating, self.rating_count))
\ No newline at end of file
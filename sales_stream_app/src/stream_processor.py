@@ -1,3 +1,4 @@
+import heapq
 from functools import reduce as functional_reduce
 
 class Stream:
@@ -61,6 +62,16 @@ class Stream:
         sorted_items = sorted(self.source, key=key, reverse=reverse)
         return Stream(sorted_items)
 
+    def top_k(self, k, key=None, reverse=False, distinct_key=None):
+        """
+        Bounded Top-K.
+        Equivalent to sorted(key, reverse).distinct(distinct_key).collect()[:k],
+        but keeps only a heap of k candidates: O(n log k) time, O(k) memory.
+        With distinct_key, only the best item per key survives (ties keep the
+        earliest item, matching the stable sort it replaces).
+        """
+        return Stream(_top_k(self.source, k, key, reverse, distinct_key))
+
     def group_by(self, key_func):
         """
         Terminal Operation.
@@ -87,4 +98,68 @@ class Stream:
         Terminal Operation.
         Materializes the stream into a standard Python list.
         """
-        return list(self.source)
\ No newline at end of file
+        return list(self.source)
+
+
+class _Descending:
+    """Inverts comparisons so an ascending top_k can keep its worst item at heap[0]."""
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+def _top_k(source, k, key, reverse, distinct_key):
+    """
+    Heap entries are [rank, -seq, item, dedup_key, alive].
+    A larger rank is a better item, so heap[0] is always the current worst candidate;
+    -seq lets earlier items win ties. Superseded entries are dropped lazily.
+    """
+    if k <= 0:
+        return []
+    key = key or (lambda item: item)
+    heap = []
+    entries_by_key = {}
+    live = 0
+
+    for seq, item in enumerate(source):
+        value = key(item)
+        dedup = distinct_key(item) if distinct_key else None
+
+        if distinct_key:
+            current = entries_by_key.get(dedup)
+            if current is not None:
+                held = current[0] if reverse else current[0].value
+                if not (value > held if reverse else value < held):
+                    continue
+                current[4] = False
+                live -= 1
+
+        if live >= k:
+            while not heap[0][4]:
+                heapq.heappop(heap)
+            worst = heap[0][0] if reverse else heap[0][0].value
+            if not (value > worst if reverse else value < worst):
+                continue
+            evicted = heapq.heappop(heap)
+            live -= 1
+            if distinct_key:
+                del entries_by_key[evicted[3]]
+
+        entry = [value if reverse else _Descending(value), -seq, item, dedup, True]
+        heapq.heappush(heap, entry)
+        live += 1
+        if distinct_key:
+            entries_by_key[dedup] = entry
+
+        if len(heap) > 2 * k:
+            heap = [e for e in heap if e[4]]
+            heapq.heapify(heap)
+
+    return [entry[2] for entry in sorted((e for e in heap if e[4]), reverse=True)]
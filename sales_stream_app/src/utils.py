@@ -1,3 +1,6 @@
+import re
+from array import array
+
 def clean_currency(value):
     """
     Converts currency strings like '₹1,099' or '₹1,099.00' to float 1099.0.
@@ -47,4 +50,99 @@ def clean_count(value):
         # Remove commas
         return int(str(value).replace(',', '').strip())
     except ValueError:
-        return 0
\ No newline at end of file
+        return 0
+
+
+# --- Batch cleaners ---
+# Column-at-a-time versions of the functions above. Each returns (typed array, invalid_mask):
+# invalid_mask[i] == 1 means the raw value was missing/unparseable and fell back to 0.
+# A column of strings is joined once, its symbols are removed by one replace() (or re.sub)
+# over the whole column, and the pieces are converted by a C-level array.extend(map(float)).
+# A bad value stops that pass after the values before it; it gets the fallback and the pass
+# resumes right after it. Columns holding non-strings are parsed one value at a time.
+
+_INVALID_VALUE = (ValueError, TypeError, AttributeError, OverflowError)
+_RATING_SUFFIX = re.compile(r'\|[^\n]*')
+
+def _strip_currency(text):
+    return text.replace('₹', '').replace(',', '')
+
+def _strip_percentage(text):
+    return text.replace('%', '')
+
+def _strip_rating(text):
+    return _RATING_SUFFIX.sub('', text)
+
+def _strip_count(text):
+    return text.replace(',', '')
+
+def _parse_currency(value):
+    return float(_strip_currency(value))
+
+def _parse_percentage(value):
+    return float(_strip_percentage(value))
+
+def _parse_rating(value):
+    return float(str(value).partition('|')[0])
+
+def _parse_count(value):
+    return int(_strip_count(str(value)))
+
+def _stripped(values, strip):
+    # 'strip' applied to the joined column, split back into one piece per value; None
+    # when a value is not a string or contains a line break (the pieces would not line up).
+    try:
+        joined = '\n'.join(values)
+    except TypeError:
+        return None
+    pieces = strip(joined).split('\n')
+    return pieces if len(pieces) == len(values) else None
+
+def _clean_column(values, parse, typecode, fallback):
+    # map() has consumed the bad value when parse raises, so the next extend() on the
+    # same iterator continues with the value after it.
+    values = iter(values)
+    column = array(typecode)
+    mask = bytearray()
+    while True:
+        try:
+            column.extend(map(parse, values))
+        except _INVALID_VALUE:
+            mask.extend(bytes(len(column) - len(mask)))
+            mask.append(1)
+            column.append(fallback)
+        else:
+            mask.extend(bytes(len(column) - len(mask)))
+            return column, mask
+
+def _clean_strings(values, strip, convert, parse, typecode, fallback):
+    values = list(values)  # read twice when the fast path does not apply
+    pieces = _stripped(values, strip)
+    if pieces is None:
+        return _clean_column(values, parse, typecode, fallback)
+    return _clean_column(pieces, convert, typecode, fallback)
+
+def clean_currency_batch(values):
+    """
+    Cleans a column of currency strings -> (float64 array, invalid mask).
+    """
+    return _clean_strings(values, _strip_currency, float, _parse_currency, 'd', 0.0)
+
+def clean_percentage_batch(values):
+    """
+    Cleans a column of percentage strings -> (float64 array, invalid mask).
+    """
+    return _clean_strings(values, _strip_percentage, float, _parse_percentage, 'd', 0.0)
+
+def clean_rating_batch(values):
+    """
+    Cleans a column of rating strings ('4.5|234' keeps 4.5) -> (float64 array, invalid mask).
+    """
+    return _clean_strings(values, _strip_rating, float, _parse_rating, 'd', 0.0)
+
+def clean_count_batch(values):
+    """
+    Cleans a column of counts with commas -> (int64 array, invalid mask).
+    Counts that do not fit in int64 are treated as invalid.
+    """
+    return _clean_strings(values, _strip_count, int, _parse_count, 'q', 0)
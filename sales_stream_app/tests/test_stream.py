@@ -7,7 +7,10 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
 
 from stream_processor import Stream
 from models import Product
-from utils import clean_currency, clean_rating, clean_count
+from utils import (
+    clean_currency, clean_rating, clean_count, clean_percentage,
+    clean_currency_batch, clean_rating_batch, clean_count_batch, clean_percentage_batch
+)
 
 class TestStreamProcessor(unittest.TestCase):
     
@@ -35,6 +38,30 @@ class TestStreamProcessor(unittest.TestCase):
         self.assertEqual(clean_rating("4.5|1234"), 4.5)  # Handling dirty separator
         self.assertEqual(clean_rating("NotRated"), 0.0)
 
+    def test_batch_cleaners_match_scalar(self):
+        """Batch cleaners give the same values as the scalar ones, plus an invalid mask."""
+        raw = ["₹1,099", "", None, "4.5|...", "junk", "64%", "24,269", " 12 "]
+        for scalar, batch in ((clean_currency, clean_currency_batch),
+                              (clean_percentage, clean_percentage_batch),
+                              (clean_rating, clean_rating_batch),
+                              (clean_count, clean_count_batch)):
+            values, mask = batch(raw)
+            self.assertEqual(list(values), [scalar(v) for v in raw])
+            self.assertEqual(mask[1], 1)  # empty string is flagged
+            self.assertEqual(mask[2], 1)  # None is flagged
+
+        values, mask = clean_currency_batch(["₹1,099", "₹5"])
+        self.assertEqual(values.typecode, 'd')
+        self.assertEqual(list(mask), [0, 0])
+        self.assertEqual(clean_count_batch(["1,000"])[0].typecode, 'q')
+
+    def test_batch_cleaners_resume_after_bad_values(self):
+        """Values after a bad one are still parsed, also from a one-shot iterator."""
+        values, mask = clean_currency_batch(iter(["₹1", "x", "₹3", "₹4"]))
+        self.assertEqual((list(values), list(mask)), ([1.0, 0.0, 3.0, 4.0], [0, 1, 0, 0]))
+        values, mask = clean_rating_batch(["4.5|234", "", "3.9"])
+        self.assertEqual((list(values), list(mask)), ([4.5, 0.0, 3.9], [0, 1, 0]))
+
     # --- TEST STREAM OPERATIONS ---
     def test_map(self):
         """Test if map can extract prices."""
@@ -68,6 +95,17 @@ class TestStreamProcessor(unittest.TestCase):
         self.assertEqual(cheapest_first[0].name, "Pen")     # 5.0
         self.assertEqual(cheapest_first[-1].name, "Laptop") # 1000.0
 
+    def test_top_k(self):
+        """Test bounded top-k matches sorted + distinct + slice."""
+        top = self.stream \
+            .top_k(2, key=lambda p: p.discount_percentage, reverse=True,
+                   distinct_key=lambda p: p.name) \
+            .collect()
+        self.assertEqual([p.name for p in top], ["Mouse", "Shirt"])  # ties keep input order
+
+        cheapest = Stream(self.raw_data).top_k(3, key=lambda p: p.discounted_price).collect()
+        self.assertEqual([p.name for p in cheapest], ["Pen", "Shirt", "Mouse"])
+
     def test_group_by(self):
         """Test grouping by category."""
         groups = self.stream.group_by(lambda p: p.category)